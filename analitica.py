@@ -0,0 +1,358 @@
+"""
+ANALÍTICA DE INTERACCIONES - SISTEMA RECOMENDADOR DE HOTELES
+============================================================
+
+Este archivo contiene los agregados por hora y por día de vistas,
+favoritos y valoraciones por hotel (tablas analitica_hora y analitica_dia)
+y las consultas del panel de analítica, que solo leen esos agregados.
+
+CARACTERÍSTICAS:
+- Mantenimiento incremental (actualizar_agregados): cada pasada recalcula
+  las horas desde la última hora agregada menos MARGEN_RECALCULO (las
+  vistas que llegan tarde o que se suman a una fila existente caen ahí)
+  y reemplaza esas horas y sus días; el resto no se vuelve a leer
+- Las tablas de eventos se leen por rango de fecha (índices
+  idx_interacciones_fecha e idx_valoraciones_fecha) y por tramos de
+  DIAS_POR_TRAMO días, un tramo por transacción
+- Las valoraciones se agregan también por puntuación redondeada
+  (distribución de puntuaciones) y con la suma para la media
+- Las horas de más de ANALITICA_DIAS_HORAS días se borran; los días se
+  conservan
+- El programador encola la pasada cada INTERVALO_ANALITICA (trabajo
+  'analitica')
+
+USO:
+    actualizar_agregados()          # o `flask analitica`, o la tarea del programador
+    resumen_analitica(dias=30)      # lo que muestra /admin/analitica
+
+VERSIÓN: 2.0
+"""
+
+from datetime import date, datetime, timedelta
+import logging
+
+from flask import current_app
+from sqlalchemy import func, insert, select
+
+from models import db, AnaliticaDia, AnaliticaHora, Hoteles, InteraccionesUsuario, Valoraciones
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Horas anteriores a la última hora agregada que se recalculan en cada pasada
+MARGEN_RECALCULO = timedelta(hours=2)
+
+# Días de eventos por transacción en la primera pasada (o tras una parada larga)
+DIAS_POR_TRAMO = 7
+
+# Días que se conservan los agregados por hora (Config.ANALITICA_DIAS_HORAS)
+DIAS_HORAS = 30
+
+# Hoteles en el ranking del panel
+TOP_HOTELES = 10
+
+TIPOS = ('vista', 'favorito', 'valoracion')
+
+# =============================================================================
+# FECHAS
+# =============================================================================
+
+def inicio_hora(fecha):
+    return fecha.replace(minute=0, second=0, microsecond=0)
+
+
+def _hora_sql(columna):
+    """Inicio de la hora de una columna DATETIME en el motor actual"""
+    dialecto = db.engine.dialect.name
+    if dialecto == 'mysql':
+        return func.date_format(columna, '%Y-%m-%d %H:00:00')
+    if dialecto == 'postgresql':
+        return func.date_trunc('hour', columna)
+    return func.strftime('%Y-%m-%d %H:00:00', columna)
+
+
+def _a_fecha_hora(valor):
+    if isinstance(valor, datetime):
+        return valor
+    return datetime.strptime(str(valor)[:19], '%Y-%m-%d %H:%M:%S')
+
+
+def _a_fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+# =============================================================================
+# AGREGACIÓN DESDE LAS TABLAS DE EVENTOS
+# =============================================================================
+
+def _ids_hoteles(valores):
+    """
+    id_hotel de valoraciones: numérico, o el nombre del hotel en filas
+    antiguas (se resuelven con una consulta)
+    """
+    ids, nombres = {}, set()
+    for valor in valores:
+        texto = str(valor).strip()
+        if texto.isdigit():
+            ids[valor] = int(texto)
+        else:
+            nombres.add(texto)
+    if nombres:
+        filas = db.session.execute(
+            select(Hoteles.nombre, Hoteles.id_hotel).where(Hoteles.nombre.in_(nombres))
+        ).all()
+        por_nombre = {nombre: id_hotel for nombre, id_hotel in filas}
+        for valor in valores:
+            if str(valor).strip() in por_nombre:
+                ids[valor] = por_nombre[str(valor).strip()]
+    return ids
+
+
+def agregar_horas(desde, hasta):
+    """
+    Agrega los eventos con fecha en [desde, hasta) por hora, hotel y tipo
+
+    Returns:
+        Lista de diccionarios con las columnas de AnaliticaHora
+    """
+    filas = {}
+
+    hora = _hora_sql(InteraccionesUsuario.fecha_interaccion).label('hora')
+    for f in db.session.execute(
+        select(
+            hora,
+            InteraccionesUsuario.id_hotel,
+            InteraccionesUsuario.tipo_interaccion,
+            func.sum(func.coalesce(InteraccionesUsuario.conteo, 1)),
+        )
+        .where(
+            InteraccionesUsuario.fecha_interaccion >= desde,
+            InteraccionesUsuario.fecha_interaccion < hasta,
+            InteraccionesUsuario.tipo_interaccion.in_(['vista', 'favorito']),
+        )
+        .group_by(hora, InteraccionesUsuario.id_hotel, InteraccionesUsuario.tipo_interaccion)
+    ):
+        clave = (_a_fecha_hora(f[0]), f[1], f[2], 0)
+        filas[clave] = [int(f[3]), 0.0]
+
+    hora = _hora_sql(Valoraciones.fecha_valoracion).label('hora')
+    puntuacion = func.round(Valoraciones.puntuacion).label('puntuacion')
+    valoraciones = db.session.execute(
+        select(hora, Valoraciones.id_hotel, puntuacion, func.count(), func.sum(Valoraciones.puntuacion))
+        .where(Valoraciones.fecha_valoracion >= desde, Valoraciones.fecha_valoracion < hasta)
+        .group_by(hora, Valoraciones.id_hotel, puntuacion)
+    ).all()
+    ids = _ids_hoteles({f[1] for f in valoraciones})
+    for f in valoraciones:
+        if f[1] not in ids:
+            continue
+        clave = (_a_fecha_hora(f[0]), ids[f[1]], 'valoracion', int(f[2]))
+        acumulado = filas.setdefault(clave, [0, 0.0])
+        acumulado[0] += int(f[3])
+        acumulado[1] += float(f[4] or 0)
+
+    return [
+        {'periodo': periodo, 'id_hotel': id_hotel, 'tipo': tipo, 'puntuacion': puntuacion,
+         'eventos': eventos, 'suma_puntuacion': suma}
+        for (periodo, id_hotel, tipo, puntuacion), (eventos, suma) in filas.items()
+    ]
+
+
+def _recalcular_dias(desde, hasta):
+    """Reemplaza los días de [desde, hasta] con la suma de sus horas"""
+    dia = func.date(AnaliticaHora.periodo).label('dia')
+    filas = db.session.execute(
+        select(dia, AnaliticaHora.id_hotel, AnaliticaHora.tipo, AnaliticaHora.puntuacion,
+               func.sum(AnaliticaHora.eventos), func.sum(AnaliticaHora.suma_puntuacion))
+        .where(AnaliticaHora.periodo >= datetime.combine(desde, datetime.min.time()),
+               AnaliticaHora.periodo < datetime.combine(hasta + timedelta(days=1), datetime.min.time()))
+        .group_by(dia, AnaliticaHora.id_hotel, AnaliticaHora.tipo, AnaliticaHora.puntuacion)
+    ).all()
+    db.session.execute(
+        AnaliticaDia.__table__.delete().where(AnaliticaDia.fecha >= desde, AnaliticaDia.fecha <= hasta)
+    )
+    if filas:
+        db.session.execute(insert(AnaliticaDia), [
+            {'fecha': _a_fecha(f[0]), 'id_hotel': f[1], 'tipo': f[2], 'puntuacion': f[3],
+             'eventos': int(f[4]), 'suma_puntuacion': float(f[5] or 0)}
+            for f in filas
+        ])
+    return len(filas)
+
+
+def _inicio_pendiente(limite_horas):
+    """
+    Primera hora a recalcular: la última hora agregada menos el margen (sin
+    pasar de las horas ya borradas), el día siguiente al último día
+    agregado si ya no quedan horas, o el primer evento
+    """
+    ultima = db.session.execute(select(func.max(AnaliticaHora.periodo))).scalar()
+    if ultima is not None:
+        return max(inicio_hora(_a_fecha_hora(ultima) - MARGEN_RECALCULO), limite_horas)
+    ultimo_dia = db.session.execute(select(func.max(AnaliticaDia.fecha))).scalar()
+    if ultimo_dia is not None:
+        return datetime.combine(_a_fecha(ultimo_dia) + timedelta(days=1), datetime.min.time())
+    primeras = [
+        db.session.execute(select(func.min(InteraccionesUsuario.fecha_interaccion))).scalar(),
+        db.session.execute(select(func.min(Valoraciones.fecha_valoracion))).scalar(),
+    ]
+    primeras = [_a_fecha_hora(f) for f in primeras if f is not None]
+    return inicio_hora(min(primeras)) if primeras else None
+
+
+def actualizar_agregados(ahora=None, dias_por_tramo=DIAS_POR_TRAMO):
+    """
+    Pasada incremental: recalcula las horas y días pendientes hasta `ahora`
+
+    Returns:
+        Diccionario con desde, horas y dias escritos y horas_borradas
+    """
+    ahora = ahora or datetime.now()
+    hasta = inicio_hora(ahora) + timedelta(hours=1)
+    dias_horas = int(current_app.config.get('ANALITICA_DIAS_HORAS', DIAS_HORAS))
+    limite = datetime.combine(ahora.date() - timedelta(days=dias_horas), datetime.min.time())
+    desde = _inicio_pendiente(limite)
+    resumen = {'desde': desde.isoformat() if desde else None, 'horas': 0, 'dias': 0, 'horas_borradas': 0}
+    if desde is None:
+        return resumen
+
+    tramo = desde
+    while tramo < hasta:
+        fin = min(tramo + timedelta(days=dias_por_tramo), hasta)
+        filas = agregar_horas(tramo, fin)
+        db.session.execute(
+            AnaliticaHora.__table__.delete().where(AnaliticaHora.periodo >= tramo, AnaliticaHora.periodo < fin)
+        )
+        if filas:
+            db.session.execute(insert(AnaliticaHora), filas)
+        resumen['dias'] += _recalcular_dias(tramo.date(), (fin - timedelta(microseconds=1)).date())
+        db.session.commit()
+        resumen['horas'] += len(filas)
+        tramo = fin
+
+    resumen['horas_borradas'] = db.session.execute(
+        AnaliticaHora.__table__.delete().where(AnaliticaHora.periodo < limite)
+    ).rowcount
+    db.session.commit()
+    logger.info(f"Analítica actualizada desde {resumen['desde']}: {resumen['horas']} horas, {resumen['dias']} días")
+    return resumen
+
+# =============================================================================
+# CONSULTAS DEL PANEL (SOLO AGREGADOS)
+# =============================================================================
+
+def _conversion(vistas, favoritos):
+    return round(favoritos / vistas, 4) if vistas else None
+
+
+def resumen_analitica(dias=30, ahora=None, id_hotel=None):
+    """
+    Totales, serie diaria, distribución de puntuaciones y hoteles más vistos
+
+    Args:
+        dias: Días hacia atrás (incluido hoy)
+        ahora: Fecha de referencia
+        id_hotel: Limitar a un hotel (opcional)
+
+    Returns:
+        Diccionario serializable a JSON
+    """
+    from servicio_hoteles import obtener_resumenes
+
+    hoy = (ahora or datetime.now()).date()
+    desde = hoy - timedelta(days=max(1, int(dias)) - 1)
+    filtros = [AnaliticaDia.fecha >= desde, AnaliticaDia.fecha <= hoy]
+    if id_hotel is not None:
+        filtros.append(AnaliticaDia.id_hotel == id_hotel)
+
+    # Serie diaria y distribución de puntuaciones
+    serie = {desde + timedelta(days=i): dict.fromkeys(TIPOS, 0) for i in range((hoy - desde).days + 1)}
+    distribucion = {p: 0 for p in range(11)}
+    totales = dict.fromkeys(TIPOS, 0)
+    suma_puntuacion = 0.0
+    for fecha, tipo, puntuacion, eventos, suma in db.session.execute(
+        select(AnaliticaDia.fecha, AnaliticaDia.tipo, AnaliticaDia.puntuacion,
+               func.sum(AnaliticaDia.eventos), func.sum(AnaliticaDia.suma_puntuacion))
+        .where(*filtros)
+        .group_by(AnaliticaDia.fecha, AnaliticaDia.tipo, AnaliticaDia.puntuacion)
+    ):
+        eventos = int(eventos)
+        serie[_a_fecha(fecha)][tipo] += eventos
+        totales[tipo] += eventos
+        if tipo == 'valoracion':
+            distribucion[max(0, min(10, int(puntuacion)))] += eventos
+            suma_puntuacion += float(suma or 0)
+
+    # Hoteles más vistos con su conversión de vistas a favoritos
+    vistas = func.sum(AnaliticaDia.eventos).label('vistas')
+    top = db.session.execute(
+        select(AnaliticaDia.id_hotel, vistas)
+        .where(*filtros, AnaliticaDia.tipo == 'vista')
+        .group_by(AnaliticaDia.id_hotel)
+        .order_by(vistas.desc())
+        .limit(TOP_HOTELES)
+    ).all()
+    ids = [f.id_hotel for f in top]
+    favoritos = dict(db.session.execute(
+        select(AnaliticaDia.id_hotel, func.sum(AnaliticaDia.eventos))
+        .where(*filtros, AnaliticaDia.tipo == 'favorito', AnaliticaDia.id_hotel.in_(ids))
+        .group_by(AnaliticaDia.id_hotel)
+    ).all()) if ids else {}
+    hoteles = obtener_resumenes(ids)
+
+    return {
+        'desde': desde.isoformat(),
+        'hasta': hoy.isoformat(),
+        'totales': {
+            'vistas': totales['vista'],
+            'favoritos': totales['favorito'],
+            'valoraciones': totales['valoracion'],
+            'puntuacion_media': round(suma_puntuacion / totales['valoracion'], 2) if totales['valoracion'] else None,
+            'conversion_favoritos': _conversion(totales['vista'], totales['favorito']),
+        },
+        'serie': [
+            {'fecha': fecha.isoformat(), 'vistas': v['vista'], 'favoritos': v['favorito'],
+             'valoraciones': v['valoracion']}
+            for fecha, v in sorted(serie.items())
+        ],
+        'distribucion_puntuaciones': {str(p): n for p, n in distribucion.items()},
+        'top_hoteles': [
+            {
+                'id_hotel': f.id_hotel,
+                'nombre': hoteles[f.id_hotel].nombre if f.id_hotel in hoteles else str(f.id_hotel),
+                'slug': hoteles[f.id_hotel].slug if f.id_hotel in hoteles else '',
+                'vistas': int(f.vistas),
+                'favoritos': int(favoritos.get(f.id_hotel, 0)),
+                'conversion_favoritos': _conversion(int(f.vistas), int(favoritos.get(f.id_hotel, 0))),
+            }
+            for f in top
+        ],
+    }
+
+
+def ultimas_horas(horas=24, ahora=None):
+    """
+    Vistas, favoritos y valoraciones por hora en las últimas `horas` horas
+
+    Returns:
+        Lista de {'hora', 'vistas', 'favoritos', 'valoraciones'}
+    """
+    fin = inicio_hora(ahora or datetime.now())
+    desde = fin - timedelta(hours=horas - 1)
+    serie = {desde + timedelta(hours=i): dict.fromkeys(TIPOS, 0) for i in range(horas)}
+    for periodo, tipo, eventos in db.session.execute(
+        select(AnaliticaHora.periodo, AnaliticaHora.tipo, func.sum(AnaliticaHora.eventos))
+        .where(AnaliticaHora.periodo >= desde, AnaliticaHora.periodo <= fin)
+        .group_by(AnaliticaHora.periodo, AnaliticaHora.tipo)
+    ):
+        serie[_a_fecha_hora(periodo)][tipo] += int(eventos)
+    return [
+        {'hora': hora.isoformat(), 'vistas': v['vista'], 'favoritos': v['favorito'], 'valoraciones': v['valoracion']}
+        for hora, v in sorted(serie.items())
+    ]
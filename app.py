@@ -26,7 +26,23 @@ VERSIÓN: Ultima jajaj, creo que ya estoy quedando loco
 
 # Flask y extensiones principales
 from flask import Flask, render_template, redirect, url_for, flash, request, session, jsonify, abort
-from scraper import scrape_booking_hotels
+from ingesta import slugify
+from trabajos import init_trabajos, encolar_trabajo, obtener_trabajo, cancelar_trabajo, trabajos_recientes, bucle_trabajador, TrabajoEnCurso
+from programador import bucle_programador
+from eventos import init_eventos, registrar_vista, compactar_vistas, VISTAS_DIAS_DETALLE
+from particiones import aplicar_retencion, crear_particiones, estado_meses, MESES_ADELANTE
+import servicio_favoritos
+import tendencias
+from servicio_historial import pagina_historial
+from servicio_hoteles import obtener_resumenes
+from servicio_borrado import solicitar_borrado
+from servicio_usuarios import directorio_usuarios
+from analitica import actualizar_agregados, resumen_analitica, ultimas_horas
+from enriquecimiento import enriquecer_hoteles
+from snapshot_catalogo import obtener_catalogo, escribir_snapshot
+from catalogo_json import escribir_hoteles, iterar_hoteles, exportar_catalogo, importar_catalogo
+from migraciones import ejecutar_migracion, estado_migracion, migraciones_registradas
+from metricas import texto_prometheus
 from config import Config
 
 # Modelos de base de datos
@@ -53,11 +69,11 @@ import unicodedata
 from flask_wtf import CSRFProtect
 import logging
 import html
+import hmac
 import click
 import random
 from models import CodigoVerificacion
 from flask_mail import Mail, Message
-from collections import defaultdict
 import locale
 
 # Configuración de localización para fechas en español
@@ -105,6 +121,15 @@ login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 login_manager.login_message_category = 'info'
 
+# Trabajos en segundo plano (scraping fuera de la petición HTTP)
+init_trabajos(app)
+
+# Eventos de interacción (vistas) guardados por lotes fuera de la petición
+init_eventos(app)
+
+# Contadores de hoteles en tendencia (en memoria, con snapshot periódico)
+tendencias.init_tendencias(app)
+
 # =============================================================================
 # VARIABLES GLOBALES
 # =============================================================================
@@ -132,20 +157,20 @@ def load_user(user_id):
 def guardar_hoteles_scrapeados(hoteles):
     """
     Guarda los hoteles scrapeados en un archivo JSON (función legacy)
-    Esta función se usa para almacenar temporalmente los datos scrapeados
+    Esta función se usa para almacenar temporalmente los datos scrapeados.
+    Acepta cualquier iterable y escribe hotel a hotel.
     """
-    with open(SCRAPED_HOTELS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(hoteles, f, ensure_ascii=False)
+    escribir_hoteles(hoteles, SCRAPED_HOTELS_FILE)
 
 def cargar_hoteles_scrapeados():
     """
     Carga los hoteles desde el archivo JSON (función legacy)
-    Lee los datos scrapeados guardados anteriormente
+    Devuelve un iterador que lee el archivo hotel a hotel, con el nombre
+    normalizado en la clave 'name'
     """
     if os.path.exists(SCRAPED_HOTELS_FILE):
-        with open(SCRAPED_HOTELS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+        return iterar_hoteles(SCRAPED_HOTELS_FILE)
+    return iter([])
 
 # =============================================================================
 # RUTAS PRINCIPALES DE LA APLICACIÓN
@@ -312,7 +337,9 @@ def perfil():
     preferencias = current_user.preferencias
     valoraciones = Valoraciones.query.filter_by(id_usuario=current_user.id_usuario).all()
     interacciones = InteraccionesUsuario.query.filter_by(id_usuario=current_user.id_usuario).all()
-    hoteles_dict = {h.id_hotel: h for h in Hoteles.query.all()}
+    # Solo los hoteles que aparecen en la página
+    # Las valoraciones guardan el nombre del hotel en id_hotel y se muestran tal cual
+    hoteles_dict = obtener_resumenes(i.id_hotel for i in interacciones)
     return render_template('perfil.html', user=current_user, preferencias=preferencias, valoraciones=valoraciones, interacciones=interacciones, hoteles_dict=hoteles_dict)
 
 @app.route('/perfil/borrar_historial', methods=['POST'])
@@ -327,13 +354,10 @@ def borrar_historial_usuario():
     if current_user.email == 'admin@gmail.com':
         return redirect(url_for('perfil'))
     
-    # Eliminar valoraciones
-    Valoraciones.query.filter_by(id_usuario=current_user.id_usuario).delete()
-    
-    # Eliminar interacciones
-    InteraccionesUsuario.query.filter_by(id_usuario=current_user.id_usuario).delete()
-    
-    db.session.commit()
+    # Valoraciones e interacciones por lotes (en segundo plano si son muchas)
+    id_trabajo, _ = solicitar_borrado(current_user.id_usuario, id_solicitante=current_user.id_usuario)
+    if id_trabajo:
+        flash('Tu historial se está borrando en segundo plano.', 'info')
     return redirect(url_for('perfil'))
 
 # =============================================================================
@@ -347,6 +371,11 @@ def hotels():
     
     Retorna todos los hoteles en formato JSON para consumo de frontend
     """
+    catalogo = obtener_catalogo()
+    if catalogo is not None and len(catalogo):
+        # Respuesta serializada una sola vez por versión del snapshot
+        return app.response_class(catalogo.json_api(), mimetype='application/json')
+    
     hoteles = Hoteles.query.all()
     if not hoteles:
         return jsonify({'error': 'No hay hoteles disponibles. El administrador debe ejecutar el scraping.'}), 404
@@ -354,6 +383,36 @@ def hotels():
     data = [h.to_dict() for h in hoteles]
     return jsonify(data)
 
+@app.route('/api/favoritos')
+@login_required
+def api_favoritos():
+    """
+    API ENDPOINT: IDS DE HOTELES FAVORITOS
+    
+    El listado de /api/hotels es el mismo para todos los usuarios; las
+    tarjetas marcan el corazón con este conjunto (en caché por usuario).
+    """
+    ids = servicio_favoritos.ids_favoritos(current_user.id_usuario)
+    return jsonify({'ids': sorted(ids)})
+
+@app.route('/api/trending')
+def trending():
+    """
+    API ENDPOINT: HOTELES EN TENDENCIA
+    
+    Hoteles con más vistas, favoritos y valoraciones recientes (contadores
+    con decaimiento en memoria, sin consultar las tablas de eventos).
+    Parámetro: limite (por defecto 10, máximo 100).
+    """
+    ranking = tendencias.hoteles_tendencia(request.args.get('limite', 10, type=int))
+    resumenes = obtener_resumenes(h['id_hotel'] for h in ranking)
+    hoteles = [
+        dict(h, nombre=resumenes[h['id_hotel']].nombre, slug=resumenes[h['id_hotel']].slug,
+             imagen_url=resumenes[h['id_hotel']].imagen_url)
+        for h in ranking if h['id_hotel'] in resumenes
+    ]
+    return jsonify({'hoteles': hoteles})
+
 @app.route('/api/recomendaciones')
 @login_required
 def recomendaciones():
@@ -368,15 +427,17 @@ def recomendaciones():
     Returns:
         JSON con hoteles recomendados ordenados por relevancia
     """
-    hoteles = Hoteles.query.all()
+    # Snapshot del catálogo (mmap) si existe; si no, la tabla completa
+    catalogo = obtener_catalogo()
+    hoteles = catalogo.hoteles() if catalogo is not None else Hoteles.query.all()
     if not hoteles:
         return jsonify({'error': 'No hay hoteles disponibles. El administrador debe ejecutar el scraping.'}), 404
     
     # Obtener valoraciones para análisis colaborativo
     valoraciones = Valoraciones.query.all()
     if not valoraciones:
-        # Sin valoraciones, mostrar hoteles aleatorios
-        return jsonify([h.to_dict() for h in hoteles[:10]])
+        # Sin valoraciones, mostrar los hoteles en tendencia
+        return jsonify([h.to_dict() for h in tendencias.ordenar_por_tendencia(hoteles, 10, catalogo)])
     
     # Crear matriz de valoraciones para análisis colaborativo
     data = [
@@ -390,7 +451,7 @@ def recomendaciones():
     
     # Si el usuario no tiene valoraciones, usar filtrado por preferencias
     if current_user.id_usuario not in matriz.index:
-        return jsonify([h.to_dict() for h in hoteles[:10]])
+        return jsonify([h.to_dict() for h in tendencias.ordenar_por_tendencia(hoteles, 10, catalogo)])
     
     # ===== FILTRADO POR PREFERENCIAS DEL USUARIO =====
     pref = current_user.preferencias
@@ -461,6 +522,7 @@ def valorar_hotel():
     # Guardar en base de datos
     db.session.add(valoracion)
     db.session.commit()
+    tendencias.registrar(hotel.id_hotel, 'valoracion', puntuacion=float(puntuacion))
     
     return jsonify({'success': True, 'message': 'Valoración registrada exitosamente'})
 
@@ -481,9 +543,9 @@ def admin_ajustes():
     PANEL DE ADMINISTRACIÓN - AJUSTES DEL SISTEMA
     
     Permite a los administradores:
-    - Ejecutar scraping de hoteles
+    - Lanzar el scraping de hoteles como trabajo en segundo plano
     - Configurar parámetros del sistema
-    - Monitorear el estado del sistema
+    - Monitorear el estado de los trabajos de scraping
     """
     if not is_admin():
         flash('Acceso denegado. Se requieren privilegios de administrador.', 'danger')
@@ -492,20 +554,73 @@ def admin_ajustes():
     scraping_form = ScrapingForm()
     
     if scraping_form.validate_on_submit():
+        destino = scraping_form.destino.data.strip()
+        parametros = {
+            'destino': destino,
+            'hotel_limit': scraping_form.hotel_limit.data or 20,
+            'checkin': scraping_form.checkin.data.isoformat() if scraping_form.checkin.data else None,
+            'checkout': scraping_form.checkout.data.isoformat() if scraping_form.checkout.data else None
+        }
         try:
-            # Ejecutar scraping con parámetros del formulario
-            resultado = scrape_booking_hotels(
-                hotel_limit=scraping_form.hotel_limit.data,
-                destino=scraping_form.destino.data,
-                checkin=scraping_form.checkin.data,
-                checkout=scraping_form.checkout.data
-            )
-            
-            flash(f'Scraping completado. {len(resultado)} hoteles procesados.', 'success')
+            # Encolar el scraping: un solo trabajo activo por destino
+            trabajo = encolar_trabajo('scraping', parametros, clave=f'scraping:{slugify(destino)}',
+                                      id_usuario=current_user.id_usuario)
+            flash(f'Scraping de {destino} iniciado en segundo plano (trabajo #{trabajo.id_trabajo}).', 'success')
+        except TrabajoEnCurso as e:
+            flash(f'Ya hay un scraping en curso para {destino} (trabajo #{e.trabajo_activo.id_trabajo}).', 'warning')
         except Exception as e:
-            flash(f'Error durante el scraping: {str(e)}', 'danger')
+            flash(f'Error al iniciar el scraping: {str(e)}', 'danger')
+        return redirect(url_for('admin_ajustes'))
     
-    return render_template('admin_ajustes.html', formulario=scraping_form)
+    trabajos = trabajos_recientes(tipo='scraping')
+    return render_template('admin_ajustes.html', formulario=scraping_form, trabajos=trabajos)
+
+@app.route('/admin/trabajos/<int:id_trabajo>')
+@login_required
+def admin_trabajo_estado(id_trabajo):
+    """
+    API ENDPOINT: ESTADO DE UN TRABAJO EN SEGUNDO PLANO
+    
+    Retorna estado, progreso y resultado del trabajo. El panel de ajustes
+    lo consulta periódicamente mientras el trabajo está activo.
+    """
+    if not is_admin():
+        return jsonify({'error': 'Acceso denegado'}), 403
+    
+    trabajo = obtener_trabajo(id_trabajo)
+    if not trabajo:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(trabajo.to_dict())
+
+@app.route('/admin/trabajos/<int:id_trabajo>/cancelar', methods=['POST'])
+@login_required
+def admin_trabajo_cancelar(id_trabajo):
+    """
+    API ENDPOINT: CANCELAR UN TRABAJO EN SEGUNDO PLANO
+    """
+    if not is_admin():
+        return jsonify({'error': 'Acceso denegado'}), 403
+    
+    if not cancelar_trabajo(id_trabajo):
+        return jsonify({'error': 'El trabajo no está activo'}), 409
+    return jsonify({'success': True, 'message': 'Cancelación solicitada'})
+
+@app.route('/metrics')
+def metricas_prometheus():
+    """
+    API ENDPOINT: MÉTRICAS DEL SCRAPING EN FORMATO PROMETHEUS
+    
+    Latencia por etapa, bytes, reintentos, códigos HTTP y aciertos por campo
+    de los trabajos que corrieron en este proceso. Acceso para administradores
+    o con la cabecera `Authorization: Bearer <METRICAS_TOKEN>`. Los trabajos
+    de `flask trabajador` se exportan a METRICAS_ARCHIVO.
+    """
+    token = app.config.get('METRICAS_TOKEN')
+    autorizacion = request.headers.get('Authorization', '')
+    con_token = bool(token) and hmac.compare_digest(autorizacion, f'Bearer {token}')
+    if not con_token and not is_admin():
+        abort(403)
+    return app.response_class(texto_prometheus(), mimetype='text/plain; version=0.0.4')
 
 # =============================================================================
 # CONFIGURACIÓN DE USUARIO
@@ -571,24 +686,26 @@ def historial():
     - Hoteles visitados
     - Hoteles marcados como favoritos
     - Valoraciones realizadas
-    """
-    # Unificar eventos de historial: visitados y favoritos
-    interacciones = InteraccionesUsuario.query.filter_by(
-        id_usuario=current_user.id_usuario
-    ).order_by(InteraccionesUsuario.fecha_interaccion.desc()).all()
     
-    # Agrupar por fecha
-    eventos_por_fecha = defaultdict(list)
-    for interaccion in interacciones:
-        fecha = interaccion.fecha_interaccion.strftime('%Y-%m-%d')
-        eventos_por_fecha[fecha].append(interaccion)
-    
-    # Obtener información de hoteles
-    hoteles_dict = {h.id_hotel: h for h in Hoteles.query.all()}
+    Solo se pinta la primera página; los días anteriores se piden a
+    /api/historial al hacer scroll.
+    """
+    pagina = pagina_historial(current_user.id_usuario,
+                              limite=app.config.get('HISTORIAL_POR_PAGINA', 50))
+    return render_template('historial.html', pagina=pagina)
+
+@app.route('/api/historial')
+@login_required
+def api_historial():
+    """
+    API ENDPOINT: PÁGINA DEL HISTORIAL
     
-    return render_template('historial.html', 
-                         eventos_por_fecha=eventos_por_fecha,
-                         hoteles_dict=hoteles_dict)
+    Parámetros: antes (cursor de la página anterior) y limite.
+    """
+    limite = request.args.get('limite', app.config.get('HISTORIAL_POR_PAGINA', 50), type=int)
+    return jsonify(pagina_historial(current_user.id_usuario,
+                                    antes=request.args.get('antes'),
+                                    limite=limite))
 
 @app.route('/historial/borrar_visto/<int:hotel_id>', methods=['POST'])
 @login_required
@@ -616,6 +733,7 @@ def borrar_favorito_historial(hotel_id):
         tipo_interaccion='favorito'
     ).delete()
     db.session.commit()
+    servicio_favoritos.invalidar(current_user.id_usuario)
     return redirect(url_for('historial'))
 
 @app.route('/historial/borrar_evento/<int:id_interaccion>', methods=['POST'])
@@ -628,6 +746,8 @@ def borrar_evento_historial(id_interaccion):
     if interaccion and interaccion.id_usuario == current_user.id_usuario:
         db.session.delete(interaccion)
         db.session.commit()
+        if interaccion.tipo_interaccion == 'favorito':
+            servicio_favoritos.invalidar(current_user.id_usuario)
     return redirect(url_for('historial'))
 
 @app.route('/historial/borrar_todo', methods=['POST'])
@@ -636,9 +756,12 @@ def borrar_historial_completo():
     """
     BORRAR TODO EL HISTORIAL DEL USUARIO
     """
-    InteraccionesUsuario.query.filter_by(id_usuario=current_user.id_usuario).delete()
-    db.session.commit()
-    flash('Historial borrado completamente.', 'success')
+    id_trabajo, _ = solicitar_borrado(current_user.id_usuario, id_solicitante=current_user.id_usuario,
+                                      tablas=['interacciones'])
+    if id_trabajo:
+        flash('Tu historial se está borrando en segundo plano.', 'info')
+    else:
+        flash('Historial borrado completamente.', 'success')
     return redirect(url_for('historial'))
 
 # =============================================================================
@@ -651,15 +774,68 @@ def admin_usuarios():
     """
     PANEL DE ADMINISTRACIÓN - GESTIÓN DE USUARIOS
     
-    Lista todos los usuarios del sistema para administración.
+    Lista los usuarios del sistema para administración, por páginas y
+    con búsqueda por prefijo de email o nombre (?q=, ?despues=).
     Solo accesible por administradores.
     """
     if not is_admin():
         flash('Acceso denegado. Se requieren privilegios de administrador.', 'danger')
         return redirect(url_for('home'))
     
-    usuarios = Usuario.query.all()
-    return render_template('admin_usuarios.html', usuarios=usuarios)
+    buscar = request.args.get('q', '')
+    pagina = directorio_usuarios(buscar=buscar, despues=request.args.get('despues'))
+    return render_template('admin_usuarios.html', usuarios=pagina['usuarios'],
+                           siguiente=pagina['siguiente'], buscar=buscar)
+
+@app.route('/admin/api/usuarios')
+@login_required
+def admin_api_usuarios():
+    """
+    API ENDPOINT: DIRECTORIO DE USUARIOS (ADMIN)
+    
+    Parámetros: q (prefijo de email o nombre), despues (cursor) y limite.
+    """
+    if not is_admin():
+        return jsonify({'error': 'Acceso denegado'}), 403
+    
+    pagina = directorio_usuarios(buscar=request.args.get('q'),
+                                 despues=request.args.get('despues'),
+                                 limite=request.args.get('limite', 50, type=int))
+    return jsonify(pagina)
+
+@app.route('/admin/analitica')
+@login_required
+def admin_analitica():
+    """
+    PANEL DE ANALÍTICA (ADMIN)
+    
+    Vistas, favoritos y valoraciones por día y por hora, distribución de
+    puntuaciones y hoteles más vistos (?dias=). Lee solo las tablas de
+    agregados (analitica_dia y analitica_hora).
+    """
+    if not is_admin():
+        flash('Acceso denegado. Se requieren privilegios de administrador.', 'danger')
+        return redirect(url_for('home'))
+    
+    dias = max(1, min(request.args.get('dias', 30, type=int), 365))
+    return render_template('admin_analitica.html', dias=dias,
+                           resumen=resumen_analitica(dias=dias), horas=ultimas_horas())
+
+@app.route('/admin/api/analitica')
+@login_required
+def admin_api_analitica():
+    """
+    API ENDPOINT: ANALÍTICA (ADMIN)
+    
+    Parámetros: dias (por defecto 30) e id_hotel (opcional).
+    """
+    if not is_admin():
+        return jsonify({'error': 'Acceso denegado'}), 403
+    
+    dias = max(1, min(request.args.get('dias', 30, type=int), 365))
+    resumen = resumen_analitica(dias=dias, id_hotel=request.args.get('id_hotel', type=int))
+    resumen['ultimas_horas'] = ultimas_horas()
+    return jsonify(resumen)
 
 @app.route('/admin/usuario/<int:user_id>/detalle')
 @login_required
@@ -682,8 +858,9 @@ def admin_usuario_detalle(user_id):
     valoraciones = Valoraciones.query.filter_by(id_usuario=user_id).all()
     interacciones = InteraccionesUsuario.query.filter_by(id_usuario=user_id).all()
     
-    # Obtener información de hoteles
-    hoteles_dict = {h.id_hotel: h for h in Hoteles.query.all()}
+    # Obtener información de los hoteles que aparecen en la página
+    # Las valoraciones guardan el nombre del hotel en id_hotel y se muestran tal cual
+    hoteles_dict = obtener_resumenes(i.id_hotel for i in interacciones)
     
     return render_template('admin_usuario_detalle.html',
                          usuario=usuario,
@@ -702,14 +879,12 @@ def admin_borrar_historial_usuario(user_id):
         flash('Acceso denegado. Se requieren privilegios de administrador.', 'danger')
         return redirect(url_for('admin_usuarios'))
     
-    # Eliminar valoraciones
-    Valoraciones.query.filter_by(id_usuario=user_id).delete()
-    
-    # Eliminar interacciones
-    InteraccionesUsuario.query.filter_by(id_usuario=user_id).delete()
-    
-    db.session.commit()
-    flash('Historial del usuario borrado exitosamente.', 'success')
+    # Valoraciones e interacciones por lotes (en segundo plano si son muchas)
+    id_trabajo, _ = solicitar_borrado(user_id, id_solicitante=current_user.id_usuario)
+    if id_trabajo:
+        flash(f'El historial del usuario se está borrando en segundo plano (trabajo #{id_trabajo}).', 'info')
+    else:
+        flash('Historial del usuario borrado exitosamente.', 'success')
     return redirect(url_for('admin_usuario_detalle', user_id=user_id))
 
 @app.route('/admin/usuario/<int:user_id>/eliminar', methods=['POST'])
@@ -729,37 +904,15 @@ def admin_usuario_eliminar(user_id):
         flash('No se puede eliminar al administrador principal.', 'danger')
         return redirect(url_for('admin_usuario_detalle', user_id=user_id))
     
-    # Eliminar preferencias
-    if usuario.preferencias:
-        db.session.delete(usuario.preferencias)
-    
-    # Eliminar valoraciones
-    Valoraciones.query.filter_by(id_usuario=user_id).delete()
-    
-    # Eliminar interacciones
-    InteraccionesUsuario.query.filter_by(id_usuario=user_id).delete()
-    
-    # Eliminar usuario
-    db.session.delete(usuario)
-    db.session.commit()
-    
-    flash('Usuario eliminado exitosamente.', 'success')
+    # Historial por lotes y después preferencias y usuario (en segundo
+    # plano si el historial es grande)
+    id_trabajo, _ = solicitar_borrado(user_id, eliminar_cuenta=True, id_solicitante=current_user.id_usuario)
+    if id_trabajo:
+        flash(f'El usuario se está eliminando en segundo plano (trabajo #{id_trabajo}).', 'info')
+    else:
+        flash('Usuario eliminado exitosamente.', 'success')
     return redirect(url_for('admin_usuarios'))
 
-# =============================================================================
-# FUNCIONES AUXILIARES
-# =============================================================================
-
-def slugify(value):
-    """
-    Convierte un string en un slug para URLs amigables
-    Ejemplo: "Hotel Cartagena" -> "hotel-cartagena"
-    """
-    value = unicodedata.normalize('NFD', value).encode('ascii', 'ignore').decode('utf-8')
-    value = re.sub(r'[^\w\s-]', '', value).strip().lower()
-    value = re.sub(r'[-\s]+', '-', value)
-    return value
-
 # =============================================================================
 # RUTAS DE HOTELES
 # =============================================================================
@@ -778,19 +931,14 @@ def hotel_detalle(slug):
     """
     hotel = Hoteles.query.filter_by(slug=slug).first_or_404()
     
-    # Registrar vista si el usuario está autenticado
+    # Registrar vista si el usuario está autenticado (se guarda en segundo plano)
     if current_user.is_authenticated:
-        vista = InteraccionesUsuario(
-            id_usuario=current_user.id_usuario,
-            id_hotel=hotel.id_hotel,
-            tipo_interaccion='vista',
-            valor=1.0,
-            fecha_interaccion=datetime.now()
-        )
-        db.session.add(vista)
-        db.session.commit()
+        registrar_vista(current_user.id_usuario, hotel.id_hotel)
+        tendencias.registrar(hotel.id_hotel, 'vista')
     
-    return render_template('hotel_detalle.html', hotel=hotel)
+    es_favorito = (current_user.is_authenticated and
+                   servicio_favoritos.es_favorito(current_user.id_usuario, hotel.id_hotel))
+    return render_template('hotel_detalle.html', hotel=hotel, es_favorito=es_favorito)
 
 @app.route('/opinar/<nombre>', methods=['POST'])
 @login_required
@@ -820,6 +968,7 @@ def opinar(nombre):
     
     db.session.add(valoracion)
     db.session.commit()
+    tendencias.registrar(hotel.id_hotel, 'valoracion', puntuacion=puntuacion)
     
     flash('Valoración registrada exitosamente.', 'success')
     return redirect(url_for('hotel_detalle', slug=hotel.slug))
@@ -831,35 +980,29 @@ def marcar_favorito(slug):
     MARCAR/DESMARCAR HOTEL COMO FAVORITO
     
     Permite a los usuarios marcar hoteles como favoritos o quitar
-    la marca de favorito.
+    la marca de favorito. Sin 'accion' (botón del corazón, fetch) alterna
+    el estado y responde JSON: success=True si quedó como favorito.
     """
     hotel = Hoteles.query.filter_by(slug=slug).first_or_404()
-    accion = request.form.get('accion', 'marcar')
-    
-    # Buscar favorito existente
-    favorito_existente = InteraccionesUsuario.query.filter_by(
-        id_usuario=current_user.id_usuario,
-        id_hotel=hotel.id_hotel,
-        tipo_interaccion='favorito'
-    ).first()
-    
-    if accion == 'marcar' and not favorito_existente:
-        # Marcar como favorito
-        favorito = InteraccionesUsuario(
-            id_usuario=current_user.id_usuario,
-            id_hotel=hotel.id_hotel,
-            tipo_interaccion='favorito',
-            valor=1.0,
-            fecha_interaccion=datetime.now()
-        )
-        db.session.add(favorito)
+    accion = request.form.get('accion')
+    id_usuario = current_user.id_usuario
+    
+    if accion is None:
+        if servicio_favoritos.es_favorito(id_usuario, hotel.id_hotel):
+            if servicio_favoritos.quitar_favorito(id_usuario, hotel.id_hotel):
+                tendencias.registrar(hotel.id_hotel, 'favorito', signo=-1)
+            return jsonify({'success': False, 'es_favorito': False})
+        if servicio_favoritos.agregar_favorito(id_usuario, hotel.id_hotel):
+            tendencias.registrar(hotel.id_hotel, 'favorito')
+        return jsonify({'success': True, 'es_favorito': True})
+    
+    if accion == 'marcar' and servicio_favoritos.agregar_favorito(id_usuario, hotel.id_hotel):
+        tendencias.registrar(hotel.id_hotel, 'favorito')
         flash('Hotel marcado como favorito.', 'success')
-    elif accion == 'desmarcar' and favorito_existente:
-        # Quitar de favoritos
-        db.session.delete(favorito_existente)
+    elif accion == 'desmarcar' and servicio_favoritos.quitar_favorito(id_usuario, hotel.id_hotel):
+        tendencias.registrar(hotel.id_hotel, 'favorito', signo=-1)
         flash('Hotel quitado de favoritos.', 'info')
     
-    db.session.commit()
     return redirect(url_for('hotel_detalle', slug=slug))
 
 @app.route('/favoritos')
@@ -868,22 +1011,11 @@ def favoritos():
     """
     PÁGINA DE FAVORITOS DEL USUARIO
     
-    Muestra todos los hoteles marcados como favoritos por el usuario.
+    Muestra todos los hoteles marcados como favoritos por el usuario,
+    del más reciente al más antiguo (una sola consulta con JOIN).
     """
-    # Obtener favoritos del usuario
-    favoritos = InteraccionesUsuario.query.filter_by(
-        id_usuario=current_user.id_usuario,
-        tipo_interaccion='favorito'
-    ).all()
-    
-    # Obtener información de hoteles
-    hoteles_favoritos = []
-    for favorito in favoritos:
-        hotel = Hoteles.query.get(favorito.id_hotel)
-        if hotel:
-            hoteles_favoritos.append(hotel)
-    
-    return render_template('favoritos.html', hoteles=hoteles_favoritos)
+    fav_hoteles = servicio_favoritos.hoteles_favoritos(current_user.id_usuario)
+    return render_template('favoritos.html', fav_hoteles=fav_hoteles)
 
 @app.route('/hoteles')
 @login_required
@@ -960,6 +1092,208 @@ def crear_admin(email, password):
     
     click.echo(f'Usuario administrador creado exitosamente: {email}')
 
+@app.cli.command('trabajador')
+@click.option('--intervalo', default=2.0, help='Segundos de espera cuando no hay trabajos')
+@click.option('--una-vez', is_flag=True, help='Procesar los trabajos pendientes y terminar')
+def trabajador(intervalo, una_vez):
+    """
+    COMANDO CLI: PROCESO TRABAJADOR DE TRABAJOS EN SEGUNDO PLANO
+    
+    Ejecuta los trabajos pendientes (scraping, etc.) fuera de los workers web.
+    Necesario cuando TRABAJOS_MODO=proceso.
+    
+    Uso:
+        flask trabajador
+    """
+    click.echo('Trabajador iniciado. Esperando trabajos...')
+    bucle_trabajador(intervalo=intervalo, una_vez=una_vez)
+
+@app.cli.command('programador')
+@click.option('--intervalo', default=300, help='Segundos entre pasadas del programador')
+@click.option('--una-vez', is_flag=True, help='Ejecutar una sola pasada y terminar')
+def programador(intervalo, una_vez):
+    """
+    COMANDO CLI: PROGRAMADOR DE SCRAPING
+    
+    Encola el scraping completo semanal y el refresco de precios por ventana
+    de fechas para los destinos de SCRAPING_DESTINOS. Los trabajos los ejecuta
+    el pool del proceso web o `flask trabajador`.
+    
+    Uso:
+        flask programador
+    """
+    click.echo('Programador de scraping iniciado.')
+    bucle_programador(intervalo=intervalo, una_vez=una_vez)
+
+@app.cli.command('enriquecer')
+@click.option('--limite', default=100, help='Número máximo de hoteles a visitar')
+@click.option('--trabajadores', default=4, help='Hilos de descarga')
+def enriquecer(limite, trabajadores):
+    """
+    COMANDO CLI: ENRIQUECIMIENTO DE HOTELES
+    
+    Visita la página de detalle de los hoteles pendientes y completa imágenes,
+    coordenadas, contacto y puntuaciones detalladas. Se puede interrumpir y
+    relanzar: continúa con los hoteles que faltan.
+    
+    Uso:
+        flask enriquecer --limite 50
+    """
+    resumen = enriquecer_hoteles(limite=limite, trabajadores=trabajadores)
+    click.echo(f"Enriquecidos: {resumen['enriquecidos']}, sin cambios: {resumen['sin_cambios']}, "
+               f"fallidos: {resumen['fallidos']}")
+
+@app.cli.command('snapshot_catalogo')
+def snapshot_catalogo():
+    """
+    COMANDO CLI: SNAPSHOT DEL CATÁLOGO
+    
+    Escribe y publica un snapshot columnar de la tabla hoteles. Se hace solo
+    después de cada ingesta; este comando sirve para la primera vez o tras
+    cambios manuales en la base de datos.
+    
+    Uso:
+        flask snapshot_catalogo
+    """
+    version = escribir_snapshot()
+    click.echo(f'Snapshot del catálogo publicado: {version}')
+
+@app.cli.command('exportar_catalogo')
+@click.argument('ruta')
+@click.option('--lote', default=1000, help='Hoteles por consulta')
+def exportar_catalogo_cli(ruta, lote):
+    """
+    COMANDO CLI: EXPORTAR EL CATÁLOGO A JSON
+    
+    Escribe la tabla hoteles en el formato del scraper, en streaming.
+    Con extensión .jsonl se escribe un hotel por línea; con otra, un array JSON.
+    
+    Uso:
+        flask exportar_catalogo catalogo.jsonl
+    """
+    exportados = exportar_catalogo(ruta, tamano_lote=lote)
+    click.echo(f'Hoteles exportados: {exportados}')
+
+@app.cli.command('importar_catalogo')
+@click.argument('ruta')
+@click.option('--lote', default=100, help='Hoteles por lote de ingesta')
+def importar_catalogo_cli(ruta, lote):
+    """
+    COMANDO CLI: IMPORTAR HOTELES DESDE JSON
+    
+    Lee un archivo JSON Lines o un array JSON (hoteles_scrapeados.json, una
+    exportación...) sin cargarlo entero y lo ingesta por lotes.
+    
+    Uso:
+        flask importar_catalogo hoteles_scrapeados.json
+    """
+    resumen = importar_catalogo(ruta, tamano_lote=lote)
+    click.echo(f"Leídos: {resumen['leidos']}, insertados: {resumen['insertados']}, "
+               f"actualizados: {resumen['actualizados']}, sin cambios: {resumen['sin_cambios']}, "
+               f"descartados: {resumen['descartados']}")
+
+@app.cli.command('migrar')
+@click.argument('nombre', required=False)
+@click.option('--lote', default=500, help='Filas por lote (una transacción por lote)')
+@click.option('--dry-run', is_flag=True, help='Simular sin guardar cambios')
+@click.option('--reiniciar', is_flag=True, help='Empezar desde el principio aunque haya punto de control')
+def migrar(nombre, lote, dry_run, reiniciar):
+    """
+    COMANDO CLI: MIGRACIONES DE DATOS POR LOTES
+    
+    Sin nombre, lista las migraciones y su estado. Con nombre, la ejecuta
+    o la reanuda desde el último lote confirmado.
+    
+    Uso:
+        flask migrar
+        flask migrar hoteles_estructura_v2 --dry-run
+    """
+    if not nombre:
+        for registrada in migraciones_registradas():
+            estado = estado_migracion(registrada)
+            if estado is None:
+                click.echo(f'{registrada}: pendiente')
+            else:
+                click.echo(f"{registrada}: {estado['estado']} ({estado['procesados']} filas, "
+                           f"último id {estado['ultimo_id']})")
+        return
+    resumen = ejecutar_migracion(nombre, tamano_lote=lote, dry_run=dry_run, reiniciar=reiniciar)
+    click.echo(f"{'Simulación' if dry_run else 'Migración'} {resumen['estado']}: "
+               f"{resumen['procesados']} filas, {resumen['modificados']} modificadas, "
+               f"{resumen['filas_por_segundo']} filas/s")
+
+@app.cli.command('compactar_vistas')
+@click.option('--dias', default=VISTAS_DIAS_DETALLE, help='Compactar las vistas de hace más de estos días')
+def compactar_vistas_cli(dias):
+    """
+    COMANDO CLI: COMPACTACIÓN DE VISTAS
+    
+    Deja una fila por usuario, hotel y día para las vistas antiguas. El
+    programador la encola una vez al día; este comando la ejecuta ya.
+    
+    Uso:
+        flask compactar_vistas --dias 7
+    """
+    resumen = compactar_vistas(dias=dias)
+    click.echo(f"Vistas compactadas: {resumen['grupos']} grupos, {resumen['filas_eliminadas']} filas eliminadas")
+
+@app.cli.command('particiones')
+@click.option('--crear', is_flag=True, help='Particionar la tabla o agregar los meses que faltan (MySQL)')
+@click.option('--meses', default=MESES_ADELANTE, help='Meses futuros con partición propia')
+def particiones_cli(crear, meses):
+    """
+    COMANDO CLI: PARTICIONES MENSUALES DE INTERACCIONES
+    
+    Sin opciones, muestra las filas por mes y tipo y los meses archivados.
+    
+    Uso:
+        flask particiones
+        flask particiones --crear --meses 3
+    """
+    if crear:
+        creadas = crear_particiones(meses_adelante=meses)
+        click.echo(f"Particiones creadas: {', '.join(creadas) or 'ninguna'}")
+    estado = estado_meses()
+    click.echo(f"Tabla particionada: {'sí' if estado['particionada'] else 'no'}")
+    for mes, tipos in estado['meses'].items():
+        click.echo(f"{mes}: " + ', '.join(f'{tipo} {filas}' for tipo, filas in sorted(tipos.items())))
+    if estado['archivados']:
+        click.echo(f"Archivados: {', '.join(estado['archivados'])}")
+
+@app.cli.command('retencion')
+@click.option('--dry-run', is_flag=True, help='Mostrar lo que se eliminaría sin tocar nada')
+@click.option('--sin-archivo', is_flag=True, help='Eliminar sin archivar aunque haya INTERACCIONES_ARCHIVO_DIR')
+def retencion_cli(dry_run, sin_archivo):
+    """
+    COMANDO CLI: RETENCIÓN DE INTERACCIONES
+    
+    Archiva y elimina los meses vencidos según INTERACCIONES_RETENCION; en
+    MySQL particionado, un mes vencido entero se elimina con DROP PARTITION.
+    
+    Uso:
+        flask retencion --dry-run
+    """
+    acciones = aplicar_retencion(archivar='' if sin_archivo else None, dry_run=dry_run)
+    for accion in acciones:
+        click.echo(f"{accion['mes']}: {accion['accion']} {', '.join(accion['tipos']) or '(vacía)'} "
+                   f"{accion['filas']} filas" + (f" -> {accion['archivo']}" if accion['archivo'] else ''))
+    click.echo(f"{'Simulación: ' if dry_run else ''}{len(acciones)} meses con interacciones vencidas")
+
+@app.cli.command('analitica')
+def analitica_cli():
+    """
+    COMANDO CLI: AGREGADOS DE ANALÍTICA
+    
+    Recalcula las horas y días pendientes del panel de analítica. El
+    programador la encola cada 15 minutos; este comando la ejecuta ya.
+    
+    Uso:
+        flask analitica
+    """
+    resumen = actualizar_agregados()
+    click.echo(f"Analítica desde {resumen['desde'] or '(sin eventos)'}: {resumen['horas']} horas, "
+               f"{resumen['dias']} días, {resumen['horas_borradas']} horas antiguas borradas")
+
 # =============================================================================
 # SISTEMA DE RECUPERACIÓN DE CONTRASEÑA
 # =============================================================================
@@ -0,0 +1,355 @@
+"""
+ARCHIVO DE PÁGINAS CRUDAS - SISTEMA RECOMENDADOR DE HOTELES
+===========================================================
+
+Este archivo contiene el almacén de capturas HTML del scraping. Reemplaza
+los volcados sueltos (debug_no_price_<hotel>.html, prueba.txt) por blobs
+comprimidos y un índice consultable.
+
+CARACTERÍSTICAS:
+- Blobs direccionados por contenido (sha256): una página repetida se guarda una vez
+- Compresión zstd si está instalado `zstandard`, zlib en su defecto
+- Índice SQLite por URL, hotel, tipo de captura y fecha
+- Escritura asíncrona en un hilo aparte: el scraping solo calcula el hash
+- Importación de los volcados debug_*.html existentes
+  (python archivo_raw.py importar debug_*.html --borrar)
+
+El directorio se configura con la variable de entorno ARCHIVO_RAW_DIR
+(por defecto 'archivo_raw'); con ARCHIVO_RAW_DIR vacío no se archiva nada.
+
+VERSIÓN: 2.0
+"""
+
+import argparse
+import atexit
+import glob
+import hashlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+DIRECTORIO_POR_DEFECTO = 'archivo_raw'
+
+# Capturas pendientes de escribir antes de que guardar() tenga que esperar
+MAX_PENDIENTES = 1000
+
+# Filas del índice por commit
+LOTE_INDICE = 50
+
+NIVEL_ZSTD = 10
+NIVEL_ZLIB = 9
+
+_EXTENSIONES = {'zstd': '.zst', 'zlib': '.zz'}
+
+# =============================================================================
+# ALMACÉN DE CAPTURAS
+# =============================================================================
+
+class ArchivoRaw:
+    """
+    Almacén de capturas HTML comprimidas y deduplicadas
+
+    guardar() devuelve el hash al instante; la compresión, la escritura del
+    blob y la fila del índice las hace un hilo en segundo plano.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_POR_DEFECTO):
+        self.directorio = directorio
+        self.codec = 'zstd' if zstandard is not None else 'zlib'
+        os.makedirs(os.path.join(directorio, 'blobs'), exist_ok=True)
+        self._ruta_indice = os.path.join(directorio, 'indice.sqlite')
+        self._crear_indice()
+        self._cola = queue.Queue(maxsize=MAX_PENDIENTES)
+        self._hilo = threading.Thread(target=self._escritor, name='archivo-raw', daemon=True)
+        self._hilo.start()
+
+    def _conectar(self):
+        return sqlite3.connect(self._ruta_indice, timeout=30)
+
+    def _crear_indice(self):
+        with self._conectar() as conexion:
+            conexion.executescript('''
+                CREATE TABLE IF NOT EXISTS capturas (
+                    id INTEGER PRIMARY KEY,
+                    hash TEXT NOT NULL,
+                    codec TEXT NOT NULL,
+                    url TEXT,
+                    hotel TEXT,
+                    tipo TEXT,
+                    motivo TEXT,
+                    fecha TEXT NOT NULL,
+                    tamano INTEGER,
+                    tamano_comprimido INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS idx_capturas_hash ON capturas(hash);
+                CREATE INDEX IF NOT EXISTS idx_capturas_url ON capturas(url);
+                CREATE INDEX IF NOT EXISTS idx_capturas_hotel ON capturas(hotel);
+                CREATE INDEX IF NOT EXISTS idx_capturas_fecha ON capturas(fecha);
+            ''')
+
+    def _ruta_blob(self, hash_contenido, codec):
+        return os.path.join(self.directorio, 'blobs', hash_contenido[:2],
+                            hash_contenido[2:] + _EXTENSIONES[codec])
+
+    def guardar(self, contenido, url=None, hotel=None, tipo='pagina', motivo=None):
+        """
+        Encola una captura para archivarla
+
+        Args:
+            contenido: HTML (str o bytes)
+            url: URL de la que proviene
+            hotel: Nombre o id del hotel, si la captura es de un hotel
+            tipo: 'busqueda', 'detalle', 'tarjeta', ...
+            motivo: Por qué se archiva (por ejemplo 'sin_precio')
+
+        Returns:
+            Hash sha256 del contenido, para referenciarlo en logs y errores
+        """
+        if isinstance(contenido, str):
+            contenido = contenido.encode('utf-8')
+        hash_contenido = hashlib.sha256(contenido).hexdigest()
+        self._cola.put((hash_contenido, contenido, {
+            'url': url,
+            'hotel': None if hotel is None else str(hotel),
+            'tipo': tipo,
+            'motivo': motivo,
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+        }))
+        return hash_contenido
+
+    def _escribir_blob(self, hash_contenido, contenido, compresor):
+        """Escribe el blob si no existe; devuelve (codec, tamaño comprimido)"""
+        for codec in (self.codec, 'zstd' if self.codec == 'zlib' else 'zlib'):
+            ruta = self._ruta_blob(hash_contenido, codec)
+            if os.path.exists(ruta):
+                return codec, os.path.getsize(ruta)
+
+        ruta = self._ruta_blob(hash_contenido, self.codec)
+        if compresor is not None:
+            comprimido = compresor.compress(contenido)
+        else:
+            comprimido = zlib.compress(contenido, NIVEL_ZLIB)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f'{ruta}.{threading.get_ident()}.tmp'
+        with open(temporal, 'wb') as f:
+            f.write(comprimido)
+        os.replace(temporal, ruta)
+        return self.codec, len(comprimido)
+
+    def _escritor(self):
+        """Hilo que comprime, escribe blobs y agrega filas al índice por lotes"""
+        compresor = zstandard.ZstdCompressor(level=NIVEL_ZSTD) if self.codec == 'zstd' else None
+        conexion = self._conectar()
+        filas = []
+        while True:
+            elemento = self._cola.get()
+            try:
+                if elemento is not None:
+                    hash_contenido, contenido, meta = elemento
+                    try:
+                        codec, tamano_comprimido = self._escribir_blob(hash_contenido, contenido, compresor)
+                        filas.append((hash_contenido, codec, meta['url'], meta['hotel'], meta['tipo'],
+                                      meta['motivo'], meta['fecha'], len(contenido), tamano_comprimido))
+                    except Exception as e:
+                        logger.error(f"No se pudo archivar la captura {hash_contenido}: {e}")
+
+                if filas and (elemento is None or len(filas) >= LOTE_INDICE or self._cola.empty()):
+                    conexion.executemany(
+                        'INSERT INTO capturas (hash, codec, url, hotel, tipo, motivo, fecha, '
+                        'tamano, tamano_comprimido) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', filas)
+                    conexion.commit()
+                    filas = []
+            except sqlite3.Error as e:
+                logger.error(f"Error escribiendo el índice del archivo raw: {e}")
+                filas = []
+            finally:
+                self._cola.task_done()
+
+            if elemento is None:
+                conexion.close()
+                return
+
+    def esperar(self):
+        """Bloquea hasta que todas las capturas encoladas estén escritas"""
+        self._cola.join()
+
+    def cerrar(self):
+        """Escribe lo pendiente y detiene el hilo escritor"""
+        if self._hilo.is_alive():
+            self._cola.put(None)
+            self._hilo.join()
+
+    def leer(self, hash_contenido):
+        """
+        Devuelve el contenido original de un blob
+
+        Raises:
+            FileNotFoundError: Si el hash no está archivado
+        """
+        for codec in _EXTENSIONES:
+            ruta = self._ruta_blob(hash_contenido, codec)
+            if os.path.exists(ruta):
+                with open(ruta, 'rb') as f:
+                    datos = f.read()
+                if codec == 'zlib':
+                    return zlib.decompress(datos)
+                if zstandard is None:
+                    raise RuntimeError("El blob está en zstd y el paquete zstandard no está instalado")
+                return zstandard.ZstdDecompressor().decompress(datos)
+        raise FileNotFoundError(f"Captura no archivada: {hash_contenido}")
+
+    def buscar(self, url=None, hotel=None, tipo=None, desde=None, limite=100):
+        """
+        Busca capturas en el índice (más recientes primero)
+
+        Returns:
+            Lista de diccionarios con las columnas del índice
+        """
+        condiciones, valores = [], []
+        for columna, valor in (('url', url), ('hotel', hotel), ('tipo', tipo)):
+            if valor is not None:
+                condiciones.append(f'{columna} = ?')
+                valores.append(str(valor))
+        if desde is not None:
+            condiciones.append('fecha >= ?')
+            valores.append(desde.isoformat(timespec='seconds') if isinstance(desde, datetime) else desde)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        with self._conectar() as conexion:
+            conexion.row_factory = sqlite3.Row
+            filas = conexion.execute(
+                f'SELECT * FROM capturas {where} ORDER BY fecha DESC, id DESC LIMIT ?', valores + [limite]
+            ).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def estadisticas(self):
+        """Número de capturas, blobs únicos y bytes originales/comprimidos"""
+        with self._conectar() as conexion:
+            capturas, blobs, original = conexion.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT hash), COALESCE(SUM(tamano), 0) FROM capturas'
+            ).fetchone()
+            comprimido = conexion.execute(
+                'SELECT COALESCE(SUM(tamano_comprimido), 0) FROM '
+                '(SELECT hash, MAX(tamano_comprimido) AS tamano_comprimido FROM capturas GROUP BY hash)'
+            ).fetchone()[0]
+        return {
+            'capturas': capturas,
+            'blobs': blobs,
+            'bytes_originales': original,
+            'bytes_en_disco': comprimido,
+            'codec': self.codec,
+        }
+
+# =============================================================================
+# ARCHIVO COMPARTIDO DEL PROCESO
+# =============================================================================
+
+_archivo = None
+_lock = threading.Lock()
+
+
+def obtener_archivo():
+    """
+    Devuelve el archivo del proceso según ARCHIVO_RAW_DIR, o None si está desactivado
+    """
+    global _archivo
+    directorio = os.environ.get('ARCHIVO_RAW_DIR', DIRECTORIO_POR_DEFECTO)
+    with _lock:
+        if _archivo is not None and _archivo.directorio != directorio:
+            _archivo.cerrar()
+            _archivo = None
+        if _archivo is None and directorio:
+            _archivo = ArchivoRaw(directorio)
+        return _archivo
+
+
+def archivar(contenido, **meta):
+    """
+    Archiva una captura en el archivo del proceso sin interrumpir el scraping
+
+    Returns:
+        Hash de la captura, o None si el archivo está desactivado o falló
+    """
+    try:
+        archivo = obtener_archivo()
+        return archivo.guardar(contenido, **meta) if archivo is not None else None
+    except Exception as e:
+        logger.error(f"No se pudo archivar la captura: {e}")
+        return None
+
+
+@atexit.register
+def _cerrar_al_salir():
+    if _archivo is not None:
+        _archivo.cerrar()
+
+# =============================================================================
+# LÍNEA DE COMANDOS
+# =============================================================================
+
+def importar_volcados(archivo, rutas, borrar=False):
+    """
+    Importa volcados HTML sueltos (debug_no_price_<hotel>.html) al archivo
+
+    Con borrar=True solo se borran los archivos cuyo blob se puede leer del
+    archivo después de escribirlo (los errores del escritor solo se registran).
+
+    Returns:
+        Número de archivos importados
+    """
+    importados = 0
+    hashes = {}
+    for ruta in rutas:
+        nombre = os.path.splitext(os.path.basename(ruta))[0]
+        hotel = nombre.split('debug_no_price_', 1)[-1] if nombre.startswith('debug_no_price_') else None
+        with open(ruta, 'rb') as f:
+            hashes[ruta] = archivo.guardar(f.read(), url=f'file:{os.path.basename(ruta)}', hotel=hotel,
+                                           tipo='tarjeta', motivo='sin_precio' if hotel else 'volcado')
+        importados += 1
+    archivo.esperar()
+    if borrar:
+        for ruta, hash_contenido in hashes.items():
+            try:
+                archivado = hashlib.sha256(archivo.leer(hash_contenido)).hexdigest() == hash_contenido
+            except Exception:
+                archivado = False
+            if archivado:
+                os.remove(ruta)
+            else:
+                logger.error(f"{ruta} no se borra: su captura {hash_contenido} no quedó archivada")
+    return importados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Archivo de páginas crudas del scraping')
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    importar = subcomandos.add_parser('importar', help='Importar volcados HTML sueltos')
+    importar.add_argument('rutas', nargs='+')
+    importar.add_argument('--borrar', action='store_true', help='Borrar los archivos importados')
+    subcomandos.add_parser('estadisticas', help='Tamaño del archivo')
+    args = parser.parse_args()
+
+    archivo = obtener_archivo()
+    if archivo is None:
+        parser.error('ARCHIVO_RAW_DIR está vacío: el archivo está desactivado')
+    if args.comando == 'importar':
+        rutas = [r for patron in args.rutas for r in (glob.glob(patron) or [patron])]
+        print(f"Importados: {importar_volcados(archivo, rutas, borrar=args.borrar)}")
+    else:
+        for clave, valor in archivo.estadisticas().items():
+            print(f"{clave}: {valor}")
+    archivo.cerrar()
@@ -0,0 +1,369 @@
+"""
+BENCHMARK DEL SCRAPER - SISTEMA RECOMENDADOR DE HOTELES
+=======================================================
+
+Este archivo mide el scraper sin red usando los HTML reales de Booking.com
+que ya están en el repositorio (prueba.txt y debug_no_price_*.html).
+
+CARACTERÍSTICAS:
+- Servidor HTTP local que reproduce la búsqueda de Booking.com
+  (searchresults.html con offset/rows) a partir de las tarjetas guardadas
+- Rendimiento del parseo de una página completa (páginas/s, MB/s) y de la
+  extracción por tarjeta (tarjetas/s)
+- Tiempo de punta a punta de scrape_booking_hotels contra el servidor local
+  y pico de memoria con tracemalloc
+- Precisión de la extracción contra los valores esperados de cada tarjeta,
+  revisados a mano contra el HTML (no contra la salida del extractor)
+- Comparación con una referencia guardada (benchmark_referencia.json):
+  marca como regresión lo que empeore más que la tolerancia
+
+USO:
+    python benchmark_scraper.py                  # medir y comparar
+    python benchmark_scraper.py --guardar        # guardar como nueva referencia
+    python benchmark_scraper.py --generar-esperado   # proponer esperados de tarjetas nuevas
+
+Los tiempos dependen de la máquina: la referencia se guarda en la misma
+máquina donde se compara. Los valores esperados que propone --generar-esperado
+salen del extractor actual: hay que revisarlos contra la tarjeta antes de
+confiar en la precisión, y los ya existentes no se sobrescriben.
+
+VERSIÓN: 2.0
+"""
+
+import argparse
+from contextlib import contextmanager
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from bs4 import BeautifulSoup
+
+import scraper
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+PAGINA_COMPLETA = 'prueba.txt'
+PATRON_TARJETAS = 'debug_no_price_*.html'
+ARCHIVO_REFERENCIA = 'benchmark_referencia.json'
+
+# Campos cuya extracción se compara con los valores esperados
+CAMPOS_PRECISION = ('name', 'price_amount', 'rating_score', 'reviews_count', 'stars_count', 'location')
+
+# Métricas comparadas con la referencia: nombre -> True si más es mejor
+METRICAS_REFERENCIA = {
+    'parseo_paginas_por_segundo': True,
+    'extraccion_tarjetas_por_segundo': True,
+    'scraping_hoteles_por_segundo': True,
+    'scraping_pico_memoria_mb': False,
+    'precision': True,
+}
+
+# Empeoramiento relativo tolerado antes de marcar una regresión
+TOLERANCIA = 0.25
+
+# Sin esperas entre peticiones ni archivo raw: se mide el scraper, no la cortesía
+ENTORNO_BENCHMARK = {'SCRAPING_DELAY_MIN': '0', 'SCRAPING_DELAY_MAX': '0', 'ARCHIVO_RAW_DIR': ''}
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+def cargar_tarjetas(pagina=PAGINA_COMPLETA, patron=PATRON_TARJETAS):
+    """
+    Tarjetas de hotel guardadas en el repositorio
+
+    Returns:
+        Lista de (clave, html) con clave '<archivo>#<n>'
+    """
+    tarjetas = []
+    if os.path.exists(pagina):
+        with open(pagina, encoding='utf-8', errors='replace') as f:
+            soup = BeautifulSoup(f.read(), 'html.parser')
+        for i, tarjeta in enumerate(soup.find_all('div', {'data-testid': 'property-card'})):
+            tarjetas.append((f'{os.path.basename(pagina)}#{i}', str(tarjeta)))
+    for ruta in sorted(glob.glob(patron)):
+        with open(ruta, encoding='utf-8', errors='replace') as f:
+            contenido = f.read()
+        if 'property-card' in contenido:
+            tarjetas.append((f'{os.path.basename(ruta)}#0', contenido))
+    return tarjetas
+
+
+class ServidorReplay:
+    """
+    Servidor HTTP local que responde searchresults.html con las tarjetas
+    guardadas, paginadas con los parámetros offset y rows de Booking.com
+
+    Uso:
+        with ServidorReplay(tarjetas) as servidor:
+            scraper.BOOKING_BASE_URL = servidor.url
+    """
+
+    def __init__(self, tarjetas):
+        self.tarjetas = [html for _, html in tarjetas]
+        self.peticiones = 0
+        self._servidor = None
+        self._hilo = None
+
+    def pagina(self, offset, rows):
+        cuerpo = ''.join(self.tarjetas[offset:offset + rows])
+        return f'<html><body><div id="search_results_table">{cuerpo}</div></body></html>'.encode('utf-8')
+
+    def __enter__(self):
+        replay = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != '/searchresults.html':
+                    self.send_error(404)
+                    return
+                parametros = parse_qs(url.query)
+                offset = int(parametros.get('offset', ['0'])[0])
+                rows = int(parametros.get('rows', [str(scraper.BOOKING_RESULTS_PER_PAGE)])[0])
+                cuerpo = replay.pagina(offset, rows)
+                replay.peticiones += 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    @property
+    def url(self):
+        host, puerto = self._servidor.server_address[:2]
+        return f'http://{host}:{puerto}'
+
+# =============================================================================
+# MEDICIONES
+# =============================================================================
+
+@contextmanager
+def _entorno(variables):
+    anteriores = {clave: os.environ.get(clave) for clave in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for clave, valor in anteriores.items():
+            if valor is None:
+                os.environ.pop(clave, None)
+            else:
+                os.environ[clave] = valor
+
+
+def medir_parseo(pagina=PAGINA_COMPLETA, repeticiones=5):
+    """
+    Parseo de una página de resultados completa y extracción de sus tarjetas
+
+    Returns:
+        Diccionario con parseo_paginas_por_segundo, parseo_mb_por_segundo,
+        extraccion_tarjetas_por_segundo y tarjetas_por_pagina
+    """
+    with open(pagina, 'rb') as f:
+        contenido = f.read()
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        tarjetas = scraper.parse_booking_results(contenido)
+    parseo = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for tarjeta in tarjetas:
+            scraper.extract_hotel_info_booking(tarjeta)
+    extraccion = time.perf_counter() - inicio
+
+    return {
+        'tarjetas_por_pagina': len(tarjetas),
+        'parseo_paginas_por_segundo': round(repeticiones / parseo, 2),
+        'parseo_mb_por_segundo': round(len(contenido) * repeticiones / parseo / 1e6, 2),
+        'extraccion_tarjetas_por_segundo': round(len(tarjetas) * repeticiones / extraccion, 1),
+    }
+
+
+def medir_scraping(tarjetas):
+    """
+    scrape_booking_hotels de punta a punta contra el servidor local
+
+    Returns:
+        Diccionario con scraping_hoteles, scraping_paginas, scraping_segundos,
+        scraping_hoteles_por_segundo y scraping_pico_memoria_mb
+    """
+    base_original = scraper.BOOKING_BASE_URL
+    with _entorno(ENTORNO_BENCHMARK), ServidorReplay(tarjetas) as servidor:
+        scraper.BOOKING_BASE_URL = servidor.url
+        tracemalloc.start()
+        try:
+            inicio = time.perf_counter()
+            hoteles = scraper.scrape_booking_hotels(destino='Cartagena', hotel_limit=len(tarjetas))
+            segundos = time.perf_counter() - inicio
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            scraper.BOOKING_BASE_URL = base_original
+
+    return {
+        'scraping_hoteles': len(hoteles),
+        'scraping_paginas': servidor.peticiones,
+        'scraping_segundos': round(segundos, 3),
+        'scraping_hoteles_por_segundo': round(len(hoteles) / segundos, 1) if segundos else 0.0,
+        'scraping_pico_memoria_mb': round(pico / 1e6, 2),
+    }
+
+
+def extraer_tarjetas(tarjetas):
+    """Campos de CAMPOS_PRECISION extraídos de cada tarjeta: clave -> dict"""
+    extraidos = {}
+    for clave, html in tarjetas:
+        tarjeta = BeautifulSoup(html, 'html.parser').find('div', {'data-testid': 'property-card'})
+        hotel = scraper.extract_hotel_info_booking(tarjeta) or {}
+        extraidos[clave] = {campo: hotel.get(campo) for campo in CAMPOS_PRECISION}
+    return extraidos
+
+
+def medir_precision(tarjetas, esperado):
+    """
+    Compara la extracción de cada tarjeta con los valores esperados
+
+    Returns:
+        Diccionario con precision (global), precision_por_campo y fallos
+        (lista de 'clave: campo extraído != esperado')
+    """
+    extraidos = extraer_tarjetas(tarjetas)
+    aciertos = {campo: 0 for campo in CAMPOS_PRECISION}
+    totales = {campo: 0 for campo in CAMPOS_PRECISION}
+    fallos = []
+    for clave, campos in esperado.items():
+        obtenidos = extraidos.get(clave, {})
+        for campo, valor in campos.items():
+            totales[campo] += 1
+            if obtenidos.get(campo) == valor:
+                aciertos[campo] += 1
+            else:
+                fallos.append(f'{clave}: {campo} {obtenidos.get(campo)!r} != {valor!r}')
+
+    total = sum(totales.values())
+    return {
+        'precision': round(sum(aciertos.values()) / total, 4) if total else 0.0,
+        'precision_por_campo': {c: round(aciertos[c] / totales[c], 4) for c in CAMPOS_PRECISION if totales[c]},
+        'fallos': fallos,
+    }
+
+# =============================================================================
+# REFERENCIA
+# =============================================================================
+
+def cargar_referencia(ruta=ARCHIVO_REFERENCIA):
+    if not os.path.exists(ruta):
+        return {'metricas': {}, 'esperado': {}}
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def guardar_referencia(referencia, ruta=ARCHIVO_REFERENCIA):
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(referencia, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def comparar(resultados, metricas_referencia, tolerancia=TOLERANCIA):
+    """
+    Compara los resultados con la referencia
+
+    Returns:
+        Lista de (metrica, referencia, actual, cambio_relativo, es_regresion)
+    """
+    comparacion = []
+    for metrica, mas_es_mejor in METRICAS_REFERENCIA.items():
+        if metrica not in resultados or not metricas_referencia.get(metrica):
+            continue
+        referencia, actual = metricas_referencia[metrica], resultados[metrica]
+        cambio = (actual - referencia) / referencia
+        empeora = -cambio if mas_es_mejor else cambio
+        comparacion.append((metrica, referencia, actual, round(cambio, 4), empeora > tolerancia))
+    return comparacion
+
+
+def ejecutar_benchmarks(repeticiones=5, esperado=None):
+    """
+    Ejecuta todas las mediciones
+
+    Returns:
+        Diccionario plano con todas las métricas (más precision_por_campo y fallos)
+    """
+    tarjetas = cargar_tarjetas()
+    if not tarjetas:
+        raise FileNotFoundError(f"No hay tarjetas en {PAGINA_COMPLETA} ni en {PATRON_TARJETAS}")
+    resultados = {'tarjetas_fixture': len(tarjetas)}
+    if os.path.exists(PAGINA_COMPLETA):
+        resultados.update(medir_parseo(repeticiones=repeticiones))
+    resultados.update(medir_scraping(tarjetas))
+    if esperado:
+        resultados.update(medir_precision(tarjetas, esperado))
+    return resultados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark del scraper con los HTML guardados de Booking.com')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Repeticiones del parseo')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA, help='Empeoramiento relativo tolerado')
+    parser.add_argument('--guardar', action='store_true', help='Guardar los resultados como nueva referencia')
+    parser.add_argument('--generar-esperado', action='store_true',
+                        help='Añadir los valores esperados de tarjetas nuevas con el extractor actual '
+                             '(revisarlos a mano)')
+    args = parser.parse_args()
+
+    referencia = cargar_referencia()
+    if args.generar_esperado:
+        esperado = referencia.setdefault('esperado', {})
+        nuevas = {clave: campos for clave, campos in extraer_tarjetas(cargar_tarjetas()).items()
+                  if clave not in esperado}
+        esperado.update(nuevas)
+        guardar_referencia(referencia)
+        print(f"Valores esperados de {len(nuevas)} tarjetas nuevas guardados en {ARCHIVO_REFERENCIA}: "
+              f"revisarlos a mano")
+        sys.exit(0)
+
+    resultados = ejecutar_benchmarks(args.repeticiones, referencia.get('esperado'))
+    for clave, valor in resultados.items():
+        if clave not in ('fallos', 'precision_por_campo'):
+            print(f"{clave}: {valor}")
+    for campo, valor in resultados.get('precision_por_campo', {}).items():
+        print(f"  precisión {campo}: {valor}")
+    for fallo in resultados.get('fallos', [])[:20]:
+        print(f"  fallo {fallo}")
+
+    regresiones = []
+    for metrica, anterior, actual, cambio, regresion in comparar(resultados, referencia.get('metricas', {}),
+                                                                   args.tolerancia):
+        marca = 'REGRESIÓN' if regresion else 'ok'
+        print(f"{metrica}: {anterior} -> {actual} ({cambio:+.1%}) {marca}")
+        if regresion:
+            regresiones.append(metrica)
+
+    if args.guardar:
+        referencia['metricas'] = {m: resultados[m] for m in METRICAS_REFERENCIA if m in resultados}
+        guardar_referencia(referencia)
+        print(f"Referencia guardada en {ARCHIVO_REFERENCIA}")
+    sys.exit(1 if regresiones else 0)
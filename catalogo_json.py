@@ -0,0 +1,368 @@
+"""
+IMPORTACIÓN Y EXPORTACIÓN JSON DEL CATÁLOGO - SISTEMA RECOMENDADOR DE HOTELES
+=============================================================================
+
+Este archivo contiene la lectura y escritura en streaming de archivos de
+hoteles (hoteles_scrapeados.json, exportaciones del catálogo) y su paso
+desde y hacia la tabla `hoteles`.
+
+CARACTERÍSTICAS:
+- Lee JSON Lines (un hotel por línea) y arrays JSON sin cargar el archivo
+  completo: ijson si está instalado, JSONDecoder.raw_decode por bloques si no
+- Escribe JSON Lines (.jsonl) o un array JSON hotel a hotel, en un archivo
+  temporal que reemplaza al destino al terminar
+- Normaliza 'nombre' -> 'name' al vuelo (antes fix_amenities_json.py)
+- Exporta la tabla `hoteles` con paginación por clave (id_hotel) en el
+  formato del scraper, así que la exportación se vuelve a importar tal cual
+- La importación usa la ingesta por lotes (upsert con huella de contenido)
+- Memoria constante: nunca hay más de un lote de hoteles en memoria
+
+VERSIÓN: 2.0
+"""
+
+import argparse
+import json
+import logging
+import os
+
+from sqlalchemy import select
+
+from models import db, Hoteles
+from ingesta import ingestar_hoteles, LOTE_INGESTA
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Caracteres leídos por bloque cuando no está ijson
+TAMANO_BLOQUE = 64 * 1024
+
+# Hoteles por consulta al exportar
+LOTE_EXPORTACION = 1000
+
+# =============================================================================
+# NORMALIZACIÓN
+# =============================================================================
+
+def normalizar_nombre(hotel):
+    """
+    Deja el nombre del hotel solo en la clave 'name'
+
+    Returns:
+        True si el hotel se modificó
+    """
+    if 'name' not in hotel:
+        if 'nombre' in hotel:
+            hotel['name'] = hotel.pop('nombre')
+            return True
+        return False
+    if 'nombre' in hotel:
+        # Si existen ambos, gana 'name'
+        hotel.pop('nombre')
+        return True
+    return False
+
+# =============================================================================
+# LECTURA EN STREAMING
+# =============================================================================
+
+def _iterar_array(f):
+    """Elementos de un array JSON leyendo el archivo por bloques"""
+    decoder = json.JSONDecoder()
+    buffer, fin = '', False
+
+    def leer():
+        nonlocal buffer, fin
+        bloque = f.read(TAMANO_BLOQUE)
+        fin = not bloque
+        buffer += bloque
+
+    while not buffer.lstrip() and not fin:
+        leer()
+    buffer = buffer.lstrip()
+    if not buffer.startswith('['):
+        raise ValueError("Se esperaba un array JSON")
+    buffer = buffer[1:]
+
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            if fin:
+                raise ValueError("Array JSON incompleto")
+            leer()
+            continue
+        if buffer[0] == ']':
+            return
+        if buffer[0] == ',':
+            buffer = buffer[1:]
+            continue
+        try:
+            hotel, pos = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if fin:
+                raise
+            leer()
+            continue
+        if pos == len(buffer) and not fin:
+            # Un número o literal puede seguir en el bloque siguiente
+            leer()
+            continue
+        buffer = buffer[pos:]
+        yield hotel
+
+
+def _iterar_lineas(f, ruta):
+    for numero, linea in enumerate(f, 1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            yield json.loads(linea)
+        except json.JSONDecodeError as e:
+            logger.warning(f"{ruta}:{numero}: línea JSON inválida, se omite ({e})")
+
+
+def _es_array(ruta):
+    """True si el primer carácter no blanco del archivo es '['"""
+    with open(ruta, 'r', encoding='utf-8-sig') as f:
+        while True:
+            caracter = f.read(1)
+            if not caracter or not caracter.isspace():
+                return caracter == '['
+
+
+def iterar_hoteles(ruta, resumen=None):
+    """
+    Recorre los hoteles de un archivo JSON Lines o de un array JSON
+
+    Args:
+        ruta: Archivo a leer
+        resumen: Diccionario opcional donde se acumulan los contadores
+            leidos, corregidos (nombre -> name) y sin_nombre
+
+    Yields:
+        Diccionarios de hoteles con el nombre normalizado
+    """
+    if resumen is not None:
+        for clave in ('leidos', 'corregidos', 'sin_nombre'):
+            resumen.setdefault(clave, 0)
+
+    array = _es_array(ruta)
+    if array and ijson is not None:
+        f = open(ruta, 'rb')
+        hoteles = ijson.items(f, 'item', use_float=True)
+    else:
+        f = open(ruta, 'r', encoding='utf-8-sig')
+        hoteles = _iterar_array(f) if array else _iterar_lineas(f, ruta)
+
+    try:
+        for hotel in hoteles:
+            if not isinstance(hotel, dict):
+                logger.warning(f"{ruta}: elemento que no es un hotel, se omite")
+                continue
+            corregido = normalizar_nombre(hotel)
+            if resumen is not None:
+                resumen['leidos'] += 1
+                resumen['corregidos'] += corregido
+                resumen['sin_nombre'] += 'name' not in hotel
+            yield hotel
+    finally:
+        f.close()
+
+# =============================================================================
+# ESCRITURA EN STREAMING
+# =============================================================================
+
+def escribir_hoteles(hoteles, ruta):
+    """
+    Escribe hoteles en JSON Lines (.jsonl) o como array JSON (otra extensión)
+
+    Se escribe en un temporal que reemplaza a `ruta` al terminar, así que se
+    puede leer y escribir el mismo archivo (iterar_hoteles -> escribir_hoteles).
+
+    Args:
+        hoteles: Iterable de diccionarios de hoteles
+        ruta: Archivo de destino
+
+    Returns:
+        Número de hoteles escritos
+    """
+    lineas = ruta.endswith('.jsonl')
+    temporal = f'{ruta}.tmp'
+    escritos = 0
+    try:
+        with open(temporal, 'w', encoding='utf-8') as f:
+            if not lineas:
+                f.write('[')
+            for hotel in hoteles:
+                if lineas:
+                    f.write(json.dumps(hotel, ensure_ascii=False))
+                    f.write('\n')
+                else:
+                    f.write(',\n' if escritos else '\n')
+                    f.write(json.dumps(hotel, ensure_ascii=False))
+                escritos += 1
+            if not lineas:
+                f.write('\n]\n')
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return escritos
+
+
+def normalizar_archivo(entrada, salida=None):
+    """
+    Normaliza 'nombre' -> 'name' en un archivo de hoteles sin cargarlo entero
+
+    Args:
+        entrada: Archivo a leer
+        salida: Archivo a escribir (por defecto se reescribe la entrada)
+
+    Returns:
+        Diccionario con los contadores leidos, corregidos y sin_nombre
+    """
+    resumen = {}
+    hoteles = iterar_hoteles(entrada, resumen)
+    if salida is None:
+        # Solo se reescribe la entrada si hace falta: primero se recorre una vez
+        for hotel in hoteles:
+            pass
+        if resumen['corregidos']:
+            escribir_hoteles(iterar_hoteles(entrada), entrada)
+    else:
+        escribir_hoteles(hoteles, salida)
+    return resumen
+
+# =============================================================================
+# TABLA HOTELES
+# =============================================================================
+
+# Columnas que se exportan (las que la ingesta sabe volver a leer)
+COLUMNAS_EXPORTACION = [
+    'id_hotel', 'nombre', 'slug', 'descripcion', 'ubicacion',
+    'precio_amount', 'precio_currency', 'precio_formatted',
+    'rating_score', 'rating_max_score', 'rating_formatted',
+    'stars_count', 'stars_formatted', 'reviews_count',
+    'amenities', 'amenities_raw', 'imagen_url', 'imagenes',
+    'link_booking', 'link_trivago', 'fuente_principal',
+]
+
+
+def fila_a_hotel(fila):
+    """
+    Convierte una fila de `hoteles` al formato del scraper (inverso de hotel_a_fila)
+
+    Returns:
+        Diccionario de hotel sin las claves vacías
+    """
+    amenities = fila['amenities']
+    if fila['amenities_raw'] and fila['amenities_raw'].lstrip().startswith('['):
+        try:
+            amenities = json.loads(fila['amenities_raw'])
+        except ValueError:
+            pass
+    imagenes = None
+    if fila['imagenes']:
+        try:
+            imagenes = json.loads(fila['imagenes'])
+        except ValueError:
+            imagenes = None
+
+    fuente = fila['fuente_principal'] or 'booking'
+    hotel = {
+        'name': fila['nombre'],
+        'slug': fila['slug'],
+        'description': fila['descripcion'],
+        'location': fila['ubicacion'],
+        'price': fila['precio_formatted'],
+        'price_amount': float(fila['precio_amount']) if fila['precio_amount'] is not None else None,
+        'price_currency': fila['precio_currency'],
+        'rating': fila['rating_formatted'],
+        'rating_score': float(fila['rating_score']) if fila['rating_score'] is not None else None,
+        'rating_max_score': fila['rating_max_score'],
+        'stars': fila['stars_formatted'],
+        'stars_count': fila['stars_count'],
+        'reviews_count': fila['reviews_count'],
+        'amenities': amenities,
+        'image': fila['imagen_url'],
+        'images': imagenes,
+        'link': fila['link_trivago'] if fuente == 'trivago' else fila['link_booking'],
+        'link_booking': fila['link_booking'] if fuente == 'trivago' else None,
+        'link_trivago': fila['link_trivago'] if fuente != 'trivago' else None,
+        'source': fuente,
+    }
+    return {clave: valor for clave, valor in hotel.items() if valor not in (None, '', [])}
+
+
+def iterar_catalogo(tamano_lote=LOTE_EXPORTACION):
+    """
+    Recorre la tabla `hoteles` por lotes ordenados por id_hotel
+
+    Cada lote es una consulta independiente (WHERE id_hotel > último), así que
+    no se mantiene abierto un cursor durante toda la exportación.
+
+    Yields:
+        Diccionarios de hotel en el formato del scraper
+    """
+    columnas = [getattr(Hoteles, c) for c in COLUMNAS_EXPORTACION]
+    ultimo = 0
+    while True:
+        filas = db.session.execute(
+            select(*columnas)
+            .where(Hoteles.id_hotel > ultimo)
+            .order_by(Hoteles.id_hotel)
+            .limit(tamano_lote)
+        ).mappings().all()
+        if not filas:
+            return
+        for fila in filas:
+            yield fila_a_hotel(fila)
+        ultimo = filas[-1]['id_hotel']
+
+
+def exportar_catalogo(ruta, tamano_lote=LOTE_EXPORTACION):
+    """
+    Exporta la tabla `hoteles` a un archivo (JSON Lines si termina en .jsonl)
+
+    Returns:
+        Número de hoteles exportados
+    """
+    exportados = escribir_hoteles(iterar_catalogo(tamano_lote), ruta)
+    logger.info(f"Catálogo exportado a {ruta}: {exportados} hoteles")
+    return exportados
+
+
+def importar_catalogo(ruta, tamano_lote=LOTE_INGESTA):
+    """
+    Importa un archivo de hoteles a la tabla `hoteles` mediante la ingesta por lotes
+
+    Returns:
+        Resumen de la ingesta más los contadores de lectura
+        (leidos, corregidos, sin_nombre)
+    """
+    lectura = {}
+    resumen = ingestar_hoteles(iterar_hoteles(ruta, lectura), tamano_lote=tamano_lote)
+    resumen.update(lectura)
+    return resumen
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Archivos JSON de hoteles')
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    normalizar = subcomandos.add_parser('normalizar', help="Normalizar 'nombre' -> 'name'")
+    normalizar.add_argument('entrada')
+    normalizar.add_argument('salida', nargs='?', help='Por defecto se reescribe la entrada')
+    args = parser.parse_args()
+
+    resumen = normalizar_archivo(args.entrada, args.salida)
+    print(f"Hoteles leídos: {resumen['leidos']}. Corregidos: {resumen['corregidos']}. "
+          f"Sin 'name' ni 'nombre': {resumen['sin_nombre']}.")
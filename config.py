@@ -85,6 +85,59 @@ class Config:
     SCRAPING_DELAY_MIN = float(os.environ.get('SCRAPING_DELAY_MIN') or 1.0)
     SCRAPING_DELAY_MAX = float(os.environ.get('SCRAPING_DELAY_MAX') or 3.0)
     
+    # Trabajos en segundo plano: 'hilo' (pool dentro del proceso web) o
+    # 'proceso' (solo se encolan; los ejecuta `flask trabajador`)
+    TRABAJOS_MODO = os.environ.get('TRABAJOS_MODO') or 'hilo'
+    TRABAJOS_MAX_WORKERS = int(os.environ.get('TRABAJOS_MAX_WORKERS') or 2)
+    
+    # Programador de scraping: destinos separados por coma, ventanas de
+    # llegada en días desde hoy y noches de estadía por ventana
+    SCRAPING_DESTINOS = os.environ.get('SCRAPING_DESTINOS') or 'Cartagena'
+    SCRAPING_VENTANAS = os.environ.get('SCRAPING_VENTANAS') or '3,14,45'
+    SCRAPING_NOCHES = int(os.environ.get('SCRAPING_NOCHES') or 1)
+    
+    # Snapshot columnar del catálogo (mmap compartido entre workers);
+    # vacío para leer siempre de la base de datos
+    CATALOGO_SNAPSHOT_DIR = os.environ.get('CATALOGO_SNAPSHOT_DIR', 'catalogo_snapshot')
+    
+    # Métricas del scraping: archivo .prom que se reescribe al terminar cada
+    # trabajo (vacío para no escribirlo) y token para leer /metrics sin sesión
+    METRICAS_ARCHIVO = os.environ.get('METRICAS_ARCHIVO') or ''
+    METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN') or ''
+    
+    # Eventos de interacción (vistas): 'buffer' (cola en memoria y escritor
+    # en segundo plano) o 'sincrono' (se escriben en la misma petición)
+    EVENTOS_MODO = os.environ.get('EVENTOS_MODO') or 'buffer'
+    EVENTOS_LOTE = int(os.environ.get('EVENTOS_LOTE') or 200)
+    EVENTOS_INTERVALO_MS = int(os.environ.get('EVENTOS_INTERVALO_MS') or 1000)
+    EVENTOS_COLA_MAX = int(os.environ.get('EVENTOS_COLA_MAX') or 10000)
+    # Minutos en los que las vistas repetidas de un hotel cuentan como una fila
+    EVENTOS_VENTANA_VISTAS = int(os.environ.get('EVENTOS_VENTANA_VISTAS') or 30)
+    
+    # Retención de interacciones por tipo en días ('vista:365,valoracion:0';
+    # los tipos que no aparecen o con 0 no vencen) y directorio donde se
+    # archivan los meses vencidos antes de borrarlos (vacío para no archivar)
+    INTERACCIONES_RETENCION = os.environ.get('INTERACCIONES_RETENCION') or 'vista:365'
+    INTERACCIONES_ARCHIVO_DIR = os.environ.get('INTERACCIONES_ARCHIVO_DIR', 'archivo_interacciones')
+    
+    # Eventos por página del historial (el resto se pide al hacer scroll)
+    HISTORIAL_POR_PAGINA = int(os.environ.get('HISTORIAL_POR_PAGINA') or 50)
+    
+    # Borrado de historial y cuentas: filas por transacción y filas a partir
+    # de las cuales el borrado se hace en un trabajo en segundo plano
+    BORRADO_LOTE = int(os.environ.get('BORRADO_LOTE') or 1000)
+    BORRADO_UMBRAL_TRABAJO = int(os.environ.get('BORRADO_UMBRAL_TRABAJO') or 5000)
+    
+    # Días que se conservan los agregados por hora del panel de analítica
+    # (los agregados por día no se borran)
+    ANALITICA_DIAS_HORAS = int(os.environ.get('ANALITICA_DIAS_HORAS') or 30)
+    
+    # Hoteles en tendencia: vida media (horas) de los contadores de vistas,
+    # favoritos y valoraciones, y segundos entre snapshots a la base de
+    # datos (0 para no sincronizar en segundo plano)
+    TENDENCIAS_VIDA_MEDIA_HORAS = float(os.environ.get('TENDENCIAS_VIDA_MEDIA_HORAS') or 24)
+    TENDENCIAS_INTERVALO_SNAPSHOT = int(os.environ.get('TENDENCIAS_INTERVALO_SNAPSHOT') or 60)
+    
     # URLs de scraping
     BOOKING_BASE_URL = 'https://www.booking.com'
     TRIVAGO_BASE_URL = 'https://www.trivago.com'
@@ -211,6 +264,9 @@ class TestingConfig(Config):
     
     # Configuración de caché para testing
     CACHE_TYPE = 'simple'
+    
+    # Vistas escritas en la misma petición (la base en memoria no se comparte entre hilos)
+    EVENTOS_MODO = 'sincrono'
 
 # =============================================================================
 # DICCIONARIO DE CONFIGURACIONES
@@ -303,6 +359,27 @@ ENVIRONMENT_VARIABLES = {
     'SCRAPING_HOTEL_LIMIT': '50',
     'SCRAPING_DELAY_MIN': '1.0',
     'SCRAPING_DELAY_MAX': '3.0',
+    'TRABAJOS_MODO': 'hilo',
+    'TRABAJOS_MAX_WORKERS': '2',
+    'SCRAPING_DESTINOS': 'Cartagena',
+    'SCRAPING_VENTANAS': '3,14,45',
+    'SCRAPING_NOCHES': '1',
+    'CATALOGO_SNAPSHOT_DIR': 'catalogo_snapshot',
+    'METRICAS_ARCHIVO': '',
+    'METRICAS_TOKEN': '',
+    'EVENTOS_MODO': 'buffer',
+    'EVENTOS_LOTE': '200',
+    'EVENTOS_INTERVALO_MS': '1000',
+    'EVENTOS_COLA_MAX': '10000',
+    'EVENTOS_VENTANA_VISTAS': '30',
+    'INTERACCIONES_RETENCION': 'vista:365',
+    'INTERACCIONES_ARCHIVO_DIR': 'archivo_interacciones',
+    'HISTORIAL_POR_PAGINA': '50',
+    'BORRADO_LOTE': '1000',
+    'BORRADO_UMBRAL_TRABAJO': '5000',
+    'ANALITICA_DIAS_HORAS': '30',
+    'TENDENCIAS_VIDA_MEDIA_HORAS': '24',
+    'TENDENCIAS_INTERVALO_SNAPSHOT': '60',
     
     # Recomendaciones
     'RECOMMENDATION_ALGORITHM': 'collaborative',
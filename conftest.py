@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Fixtures compartidas de las pruebas
+
+app_db: aplicación Flask mínima con una base SQLite en memoria, dentro de
+su contexto, con las tablas creadas. La configuración se ajusta
+sobrescribiendo config_app en el módulo de pruebas (o parametrizándola);
+los datos y la inicialización propios de cada módulo van en un app_db local
+que recibe este:
+
+    @pytest.fixture
+    def config_app():
+        return {'TRABAJOS_MODO': 'proceso'}
+
+    @pytest.fixture
+    def app_db(app_db):
+        db.session.add(Hoteles(nombre='Hotel 1', slug='hotel-1'))
+        db.session.commit()
+        return app_db
+"""
+
+import pytest
+from flask import Flask
+from models import db
+
+
+@pytest.fixture
+def config_app():
+    """Claves de configuración que se añaden a la aplicación de pruebas"""
+    return {}
+
+
+@pytest.fixture
+def app_db(config_app):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config.update(config_app)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
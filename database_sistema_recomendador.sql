@@ -4,6 +4,12 @@ USE sistema_recomendador_hoteles;
 drop database sistema_recomendador_hoteles;
 
 -- Borrar tablas en el orden correcto para evitar problemas con las claves foráneas, bueno si ellas existen, sino puedes crearlas sin problemas, pero mejor ejecutalo
+DROP TABLE IF EXISTS tendencias_hotel;
+DROP TABLE IF EXISTS analitica_dia;
+DROP TABLE IF EXISTS analitica_hora;
+DROP TABLE IF EXISTS migraciones;
+DROP TABLE IF EXISTS precios_ventana;
+DROP TABLE IF EXISTS trabajos;
 DROP TABLE IF EXISTS reviews_scraping;
 DROP TABLE IF EXISTS interacciones_usuario;
 DROP TABLE IF EXISTS valoraciones;
@@ -25,9 +31,13 @@ CREATE TABLE usuario (
     
     -- Índices para optimizar consultas
     INDEX idx_usuario_email (email),
+    INDEX idx_usuario_nombre (nombre_usuario),  -- Búsqueda por prefijo en el admin
     INDEX idx_usuario_admin (es_admin),
     INDEX idx_usuario_fecha_registro (fecha_registro)
 );
+-- Actualización de una base existente (no se ejecuta con el script completo,
+-- que ya crea el índice): quitar el comentario y ejecutar a mano
+-- CREATE INDEX idx_usuario_nombre ON usuario (nombre_usuario);
 
 
 -- 2. Crear la tabla 'hoteles' 
@@ -86,6 +96,7 @@ CREATE TABLE hoteles (
     fecha_scraping DATETIME DEFAULT CURRENT_TIMESTAMP,
     version_scraping VARCHAR(20) DEFAULT '2.0',
     metadata_scraping TEXT NULL,  -- JSON con metadatos adicionales
+    fecha_enriquecimiento DATETIME NULL,  -- Última visita a la página de detalle
     
     -- Campos legacy para compatibilidad (migración suave)
     rating FLOAT NULL,  -- Campo legacy
@@ -105,6 +116,10 @@ CREATE TABLE hoteles (
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
+-- Actualización de una base existente (no se ejecuta con el script completo,
+-- que ya crea la columna): quitar el comentario y ejecutar a mano, junto con
+-- el CREATE INDEX idx_hoteles_fecha_enriquecimiento de la sección 7
+-- ALTER TABLE hoteles ADD COLUMN fecha_enriquecimiento DATETIME NULL;
 
 -- 3. Crear la tabla 'preferencias_usuario' (Sistema de personalización)
 CREATE TABLE preferencias_usuario (
@@ -159,20 +174,37 @@ CREATE TABLE interacciones_usuario (
     tipo_interaccion ENUM('vista', 'valoracion', 'favorito') NOT NULL,
     valor DECIMAL(3,2) NOT NULL,
     fecha_interaccion DATETIME DEFAULT CURRENT_TIMESTAMP,
+    conteo INT NOT NULL DEFAULT 1,  -- Vistas agrupadas en esta fila (misma ventana o mismo día)
     
     -- Relaciones
     FOREIGN KEY (id_usuario) REFERENCES usuario(id_usuario) ON DELETE CASCADE,
     FOREIGN KEY (id_hotel) REFERENCES hoteles(id_hotel) ON DELETE CASCADE,
     
-    -- Índices para análisis de comportamiento
-    INDEX idx_interacciones_usuario (id_usuario),
+    -- Índices para análisis de comportamiento (las búsquedas por usuario
+    -- usan los compuestos; menos índices, inserciones más baratas)
     INDEX idx_interacciones_hotel (id_hotel),
-    INDEX idx_interacciones_tipo (tipo_interaccion),
     INDEX idx_interacciones_fecha (fecha_interaccion),
     
     -- Índice compuesto para consultas frecuentes
-    INDEX idx_interacciones_usuario_tipo (id_usuario, tipo_interaccion)
+    INDEX idx_interacciones_usuario_tipo (id_usuario, tipo_interaccion),
+    
+    -- Agrupación de vistas repetidas (eventos.py)
+    INDEX idx_interacciones_usuario_hotel_fecha (id_usuario, id_hotel, tipo_interaccion, fecha_interaccion),
+    
+    -- Historial paginado por cursor (servicio_historial.py)
+    INDEX idx_interacciones_usuario_fecha (id_usuario, fecha_interaccion)
 );
+-- Actualización de una base existente (no se ejecuta con el script completo,
+-- que ya crea la tabla así): quitar el comentario y ejecutar a mano
+-- ALTER TABLE interacciones_usuario ADD COLUMN conteo INT NOT NULL DEFAULT 1;
+-- CREATE INDEX idx_interacciones_usuario_hotel_fecha ON interacciones_usuario (id_usuario, id_hotel, tipo_interaccion, fecha_interaccion);
+-- DROP INDEX idx_interacciones_usuario ON interacciones_usuario;
+-- DROP INDEX idx_interacciones_tipo ON interacciones_usuario;
+-- CREATE INDEX idx_interacciones_usuario_fecha ON interacciones_usuario (id_usuario, fecha_interaccion);
+-- Particionado mensual por fecha_interaccion (opcional): lo hace `flask particiones --crear`,
+-- que quita las claves foráneas (MySQL no las admite en tablas particionadas),
+-- cambia la clave primaria a (id_interaccion, fecha_interaccion) y crea una
+-- partición por mes (pAAAAMM) más pfuturo. Ver particiones.py.
 
 -- 6. Crear la tabla 'reviews_scraping' (Sistema de reviews externos)
 CREATE TABLE reviews_scraping (
@@ -205,6 +237,95 @@ CREATE TABLE codigo_verificacion (
     FOREIGN KEY (id_usuario) REFERENCES usuario(id_usuario) ON DELETE CASCADE
 );
 
+-- 6b. Crear la tabla 'trabajos' (Trabajos en segundo plano: scraping desde el panel admin)
+CREATE TABLE trabajos (
+    id_trabajo INT AUTO_INCREMENT PRIMARY KEY,
+    tipo VARCHAR(50) NOT NULL,
+    clave VARCHAR(255) NULL,
+    clave_activa VARCHAR(255) NULL UNIQUE,  -- = clave mientras el trabajo está activo (un trabajo activo por clave)
+    estado ENUM('pendiente', 'en_curso', 'completado', 'fallido', 'cancelado') NOT NULL DEFAULT 'pendiente',
+    parametros TEXT NULL,
+    resultado TEXT NULL,
+    progreso INT DEFAULT 0,
+    total INT NULL,
+    mensaje VARCHAR(255) NULL,
+    cancelar BOOLEAN DEFAULT FALSE,
+    id_usuario INT NULL,
+    fecha_creacion DATETIME NULL,
+    fecha_inicio DATETIME NULL,
+    fecha_fin DATETIME NULL,
+    fecha_actualizacion DATETIME NULL,
+    
+    FOREIGN KEY (id_usuario) REFERENCES usuario(id_usuario) ON DELETE SET NULL,
+    
+    INDEX idx_trabajos_tipo (tipo),
+    INDEX idx_trabajos_clave (clave),
+    INDEX idx_trabajos_estado (estado)
+);
+
+-- 6c. Crear la tabla 'precios_ventana' (Precio por hotel y fechas de estadía, mantenida por el programador)
+CREATE TABLE precios_ventana (
+    id_precio INT AUTO_INCREMENT PRIMARY KEY,
+    id_hotel INT NOT NULL,
+    checkin DATE NOT NULL,
+    checkout DATE NOT NULL,
+    precio_amount INT NULL,
+    precio_currency VARCHAR(10) DEFAULT 'COP',
+    precio_formatted VARCHAR(50) NULL,
+    fecha_scraping DATETIME NULL,
+    
+    FOREIGN KEY (id_hotel) REFERENCES hoteles(id_hotel) ON DELETE CASCADE,
+    
+    UNIQUE KEY uq_precios_ventana (id_hotel, checkin, checkout),
+    INDEX idx_precios_ventana_hotel (id_hotel)
+);
+
+-- 6d. Crear la tabla 'migraciones' (Punto de control de las migraciones de datos por lotes)
+CREATE TABLE migraciones (
+    nombre VARCHAR(100) PRIMARY KEY,
+    estado ENUM('en_curso', 'completada') NOT NULL DEFAULT 'en_curso',
+    ultimo_id INT NOT NULL DEFAULT 0,  -- Último id confirmado (se reanuda desde aquí)
+    procesados INT NOT NULL DEFAULT 0,
+    modificados INT NOT NULL DEFAULT 0,
+    fecha_inicio DATETIME NULL,
+    fecha_actualizacion DATETIME NULL,
+    fecha_fin DATETIME NULL
+);
+
+-- 6e. Crear las tablas de analítica (agregados por hora y por día, mantenidos por analitica.py)
+CREATE TABLE analitica_hora (
+    periodo DATETIME NOT NULL,  -- Inicio de la hora
+    id_hotel INT NOT NULL,
+    tipo ENUM('vista', 'favorito', 'valoracion') NOT NULL,
+    puntuacion SMALLINT NOT NULL DEFAULT 0,  -- Puntuación redondeada (solo valoraciones)
+    eventos INT NOT NULL DEFAULT 0,
+    suma_puntuacion FLOAT NOT NULL DEFAULT 0,
+    
+    PRIMARY KEY (periodo, id_hotel, tipo, puntuacion)
+);
+
+CREATE TABLE analitica_dia (
+    fecha DATE NOT NULL,
+    id_hotel INT NOT NULL,
+    tipo ENUM('vista', 'favorito', 'valoracion') NOT NULL,
+    puntuacion SMALLINT NOT NULL DEFAULT 0,
+    eventos INT NOT NULL DEFAULT 0,
+    suma_puntuacion FLOAT NOT NULL DEFAULT 0,
+    
+    PRIMARY KEY (fecha, id_hotel, tipo, puntuacion),
+    INDEX idx_analitica_dia_hotel (id_hotel, fecha)
+);
+
+-- 6f. Crear la tabla de tendencias (contadores con decaimiento de tendencias.py)
+CREATE TABLE tendencias_hotel (
+    id_hotel INT PRIMARY KEY,
+    vistas FLOAT NOT NULL DEFAULT 0,
+    favoritos FLOAT NOT NULL DEFAULT 0,
+    valoraciones FLOAT NOT NULL DEFAULT 0,
+    suma_puntuacion FLOAT NOT NULL DEFAULT 0,
+    actualizado DATETIME NOT NULL  -- Fecha a la que están decaídos los valores
+);
+
 -- 7. Crear índices avanzados para optimizar rendimiento
 -- Índices para hoteles (consultas frecuentes)
 CREATE INDEX idx_hoteles_slug ON hoteles(slug);
@@ -213,6 +334,7 @@ CREATE INDEX idx_hoteles_rating_score ON hoteles(rating_score);
 CREATE INDEX idx_hoteles_stars_count ON hoteles(stars_count);
 CREATE INDEX idx_hoteles_fuente_principal ON hoteles(fuente_principal);
 CREATE INDEX idx_hoteles_fecha_scraping ON hoteles(fecha_scraping);
+CREATE INDEX idx_hoteles_fecha_enriquecimiento ON hoteles(fecha_enriquecimiento);
 CREATE INDEX idx_hoteles_ubicacion ON hoteles(ubicacion);
 
 -- Índices compuestos para consultas complejas
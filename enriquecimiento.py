@@ -0,0 +1,342 @@
+"""
+ENRIQUECIMIENTO DE HOTELES - SISTEMA RECOMENDADOR DE HOTELES
+============================================================
+
+Este archivo contiene la segunda etapa del scraping: visita la página de
+detalle de Booking.com de cada hotel (link_booking) y completa las columnas
+que la tarjeta de búsqueda no trae.
+
+CARACTERÍSTICAS:
+- Completa imagenes, latitud/longitud, telefono, website y las seis
+  puntuaciones detalladas (puntuacion_*)
+- Descargas concurrentes limitadas por el presupuesto por host del scraper
+- Solo escribe las columnas que cambiaron (un UPDATE por hotel)
+- Reanudable: el avance queda en hoteles.fecha_enriquecimiento, que la
+  ingesta no toca, así que se puede cortar y relanzar en cualquier momento
+- Prioriza hoteles nunca visitados y los que tienen más datos faltantes
+- Las páginas descargadas quedan en el archivo raw (archivo_raw.py)
+
+VERSIÓN: 2.0
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import json
+import logging
+import re
+import unicodedata
+
+from bs4 import BeautifulSoup
+from sqlalchemy import case, or_, select, update
+
+from models import db, Hoteles
+from extraccion import parsear_numero
+from ingesta import invalidar_hoteles, truncar_columna
+from archivo_raw import archivar
+from metricas import medir
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Hilos de descarga (la concurrencia real por host la limita HOST_BUDGET)
+TRABAJADORES_ENRIQUECIMIENTO = 4
+
+# Cada cuánto se vuelve a visitar la página de detalle de un hotel
+REENRIQUECER_CADA = timedelta(days=30)
+
+# Máximo de imágenes guardadas por hotel
+MAX_IMAGENES = 20
+
+# Etiqueta de la subpuntuación en Booking.com (normalizada, español o inglés) -> columna
+SUBPUNTUACIONES = [
+    ('personal', 'puntuacion_personal'),
+    ('instalaciones', 'puntuacion_instalaciones'),
+    ('limpieza', 'puntuacion_limpieza'),
+    ('confort', 'puntuacion_confort'),
+    ('calidad', 'puntuacion_calidad_precio'),
+    ('ubicacion', 'puntuacion_ubicacion'),
+    ('staff', 'puntuacion_personal'),
+    ('facilities', 'puntuacion_instalaciones'),
+    ('cleanliness', 'puntuacion_limpieza'),
+    ('comfort', 'puntuacion_confort'),
+    ('value', 'puntuacion_calidad_precio'),
+    ('location', 'puntuacion_ubicacion'),
+]
+
+COLUMNAS_PUNTUACION = list(dict.fromkeys(columna for _, columna in SUBPUNTUACIONES))
+
+COLUMNAS_ENRIQUECIMIENTO = ['imagenes', 'latitud', 'longitud', 'telefono', 'website'] + COLUMNAS_PUNTUACION
+
+_LATLNG = re.compile(r'data-atlas-latlng="(-?\d+\.\d+),(-?\d+\.\d+)"')
+_CENTRO_MAPA = re.compile(r'center=(-?\d+\.\d+),(-?\d+\.\d+)')
+_IMAGEN = re.compile(r'https://cf\.bstatic\.com/xdata/images/hotel/[\w/]+?/(\d+)\.jpe?g[^"\'\s<>]*')
+_SUBPUNTUACION = re.compile(r'(\d{1,2}(?:[.,]\d)?)\s*$')
+
+# =============================================================================
+# EXTRACCIÓN DE LA PÁGINA DE DETALLE
+# =============================================================================
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return texto.lower().strip()
+
+
+def _datos_jsonld(soup):
+    """Devuelve el bloque JSON-LD de tipo Hotel de la página, o {}"""
+    for script in soup.find_all('script', {'type': 'application/ld+json'}):
+        try:
+            datos = json.loads(script.string or '')
+        except ValueError:
+            continue
+        for bloque in datos if isinstance(datos, list) else [datos]:
+            if isinstance(bloque, dict) and bloque.get('@type') in ('Hotel', 'LodgingBusiness'):
+                return bloque
+    return {}
+
+
+def _coordenadas(html, jsonld):
+    geo = jsonld.get('geo') or {}
+    if geo.get('latitude') is not None and geo.get('longitude') is not None:
+        try:
+            return float(geo['latitude']), float(geo['longitude'])
+        except (TypeError, ValueError):
+            pass
+    for patron, texto in ((_LATLNG, html), (_CENTRO_MAPA, jsonld.get('hasMap') or ''), (_CENTRO_MAPA, html)):
+        match = patron.search(texto)
+        if match:
+            return float(match.group(1)), float(match.group(2))
+    return None, None
+
+
+def _imagenes(html):
+    """URLs de las fotos del hotel, una por foto (sin repetir tamaños)"""
+    vistas = set()
+    imagenes = []
+    for match in _IMAGEN.finditer(html):
+        if match.group(1) in vistas:
+            continue
+        vistas.add(match.group(1))
+        imagenes.append(match.group(0).replace('&amp;', '&'))
+        if len(imagenes) >= MAX_IMAGENES:
+            break
+    return imagenes
+
+
+def _subpuntuaciones(soup):
+    puntuaciones = {}
+    for elemento in soup.find_all(attrs={'data-testid': 'review-subscore'}):
+        texto = ' '.join(elemento.get_text(' ').split())
+        match = _SUBPUNTUACION.search(texto)
+        if not match:
+            continue
+        etiqueta = _normalizar(texto[:match.start()])
+        for clave, columna in SUBPUNTUACIONES:
+            if clave in etiqueta:
+                puntuaciones.setdefault(columna, parsear_numero(match.group(1)))
+                break
+    return puntuaciones
+
+
+def _website(jsonld):
+    enlaces = jsonld.get('sameAs') or []
+    for enlace in [enlaces] if isinstance(enlaces, str) else enlaces:
+        if enlace and 'booking.com' not in enlace:
+            return enlace
+    return None
+
+
+def parse_detalle(html):
+    """
+    Extrae los datos de enriquecimiento de la página de detalle de un hotel
+
+    Booking.com no siempre publica teléfono ni sitio web; los campos que la
+    página no trae simplemente no aparecen en el resultado.
+
+    Args:
+        html: HTML de la página de detalle
+
+    Returns:
+        Diccionario columna -> valor solo con los campos encontrados
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    jsonld = _datos_jsonld(soup)
+    datos = {}
+
+    latitud, longitud = _coordenadas(html, jsonld)
+    if latitud is not None:
+        datos['latitud'], datos['longitud'] = latitud, longitud
+
+    imagenes = _imagenes(html)
+    if imagenes:
+        datos['imagenes'] = json.dumps(imagenes, ensure_ascii=False)
+
+    telefono = jsonld.get('telephone')
+    if not telefono:
+        enlace_tel = soup.find('a', href=re.compile(r'^tel:'))
+        telefono = enlace_tel['href'][4:] if enlace_tel else None
+    if telefono:
+        datos['telefono'] = telefono.strip()
+
+    website = _website(jsonld)
+    if website:
+        datos['website'] = website
+
+    datos.update(_subpuntuaciones(soup))
+    return {columna: truncar_columna(columna, valor) for columna, valor in datos.items()}
+
+# =============================================================================
+# SELECCIÓN Y ESCRITURA
+# =============================================================================
+
+def _faltantes():
+    """Expresión SQL con el número de columnas de enriquecimiento sin datos"""
+    condiciones = [
+        or_(Hoteles.imagenes.is_(None), Hoteles.imagenes.in_(['', '[]'])),
+        Hoteles.latitud.is_(None),
+        Hoteles.telefono.is_(None),
+        Hoteles.website.is_(None),
+    ] + [
+        or_(getattr(Hoteles, columna).is_(None), getattr(Hoteles, columna) == 0)
+        for columna in COLUMNAS_PUNTUACION
+    ]
+    return sum(case((condicion, 1), else_=0) for condicion in condiciones)
+
+
+def hoteles_pendientes(limite=100, ahora=None):
+    """
+    Hoteles a enriquecer, en orden de prioridad
+
+    Primero los nunca visitados, luego los que tienen más datos faltantes
+    y, a igualdad, los visitados hace más tiempo.
+
+    Returns:
+        Lista de tuplas (id_hotel, link_booking)
+    """
+    ahora = ahora or datetime.now()
+    return db.session.execute(
+        select(Hoteles.id_hotel, Hoteles.link_booking)
+        .where(
+            Hoteles.link_booking.isnot(None),
+            Hoteles.link_booking != '',
+            or_(Hoteles.fecha_enriquecimiento.is_(None),
+                Hoteles.fecha_enriquecimiento < ahora - REENRIQUECER_CADA)
+        )
+        .order_by(
+            Hoteles.fecha_enriquecimiento.is_(None).desc(),
+            _faltantes().desc(),
+            Hoteles.fecha_enriquecimiento.asc()
+        )
+        .limit(limite)
+    ).all()
+
+
+def columnas_cambiadas(hotel, datos):
+    """
+    Compara los datos extraídos con el hotel guardado
+
+    Nunca borra un dato existente: un campo ausente en la página no se escribe.
+
+    Returns:
+        Diccionario columna -> valor nuevo solo con lo que cambió
+    """
+    cambios = {}
+    for columna, valor in datos.items():
+        if valor is None:
+            continue
+        actual = getattr(hotel, columna)
+        if isinstance(valor, float) and actual is not None:
+            if abs(valor - actual) < 1e-6:
+                continue
+        elif valor == actual:
+            continue
+        cambios[columna] = valor
+    return cambios
+
+
+def _descargar(link, id_hotel=None):
+    """Descarga y archiva la página de detalle (sin los parámetros de búsqueda de la URL)"""
+    from scraper import make_request
+
+    url = link.split('?')[0]
+    response = make_request(url)
+    if response is None:
+        return None
+    archivar(response.content, url=url, hotel=id_hotel, tipo='detalle')
+    return response.text
+
+
+def enriquecer_hoteles(limite=100, trabajadores=TRABAJADORES_ENRIQUECIMIENTO, contexto=None, ahora=None):
+    """
+    ENRIQUECIMIENTO DE HOTELES CON LA PÁGINA DE DETALLE
+
+    Descarga en paralelo las páginas de detalle de los hoteles pendientes y
+    guarda cada hotel en cuanto llega su página (un commit por hotel), así
+    que un corte a mitad de camino no pierde lo ya procesado.
+
+    Args:
+        limite: Número máximo de hoteles a visitar en esta pasada
+        trabajadores: Hilos de descarga
+        contexto: ContextoTrabajo para reportar progreso (opcional)
+        ahora: Fecha de referencia (por defecto datetime.now())
+
+    Returns:
+        Diccionario con los contadores enriquecidos, sin_cambios y fallidos
+    """
+    ahora = ahora or datetime.now()
+    pendientes = hoteles_pendientes(limite, ahora)
+    resumen = {'enriquecidos': 0, 'sin_cambios': 0, 'fallidos': 0}
+    if not pendientes:
+        return resumen
+
+    ejecutor = ThreadPoolExecutor(max_workers=trabajadores)
+    try:
+        futuros = {ejecutor.submit(_descargar, link, id_hotel): id_hotel for id_hotel, link in pendientes}
+        for hecho, futuro in enumerate(as_completed(futuros), start=1):
+            id_hotel = futuros[futuro]
+            with medir('enrich'):
+                try:
+                    html = futuro.result()
+                    datos = parse_detalle(html) if html else None
+                except Exception as e:
+                    logger.error(f"Error procesando la página de detalle del hotel {id_hotel}: {e}")
+                    datos = None
+
+                hotel = db.session.get(Hoteles, id_hotel)
+                if hotel is None:
+                    # Borrado mientras se descargaba su página
+                    logger.warning(f"El hotel {id_hotel} ya no existe; no se enriquece")
+                    resumen['fallidos'] += 1
+                    if contexto is not None:
+                        contexto.reportar(hecho, total=len(pendientes))
+                    continue
+                cambios = columnas_cambiadas(hotel, datos) if datos is not None else {}
+                if datos is None:
+                    resumen['fallidos'] += 1
+                elif cambios:
+                    resumen['enriquecidos'] += 1
+                else:
+                    resumen['sin_cambios'] += 1
+
+                # La fecha se marca también en los fallidos para no reintentarlos
+                # en cada pasada; se vuelven a intentar en REENRIQUECER_CADA
+                valores = dict(cambios, fecha_enriquecimiento=datetime.now())
+                if cambios:
+                    valores['updated_at'] = valores['fecha_enriquecimiento']
+                db.session.execute(update(Hoteles).where(Hoteles.id_hotel == id_hotel).values(**valores))
+                db.session.commit()
+            if cambios:
+                invalidar_hoteles([id_hotel])
+
+            if contexto is not None:
+                contexto.reportar(hecho, total=len(pendientes), mensaje=hotel.nombre)
+    finally:
+        ejecutor.shutdown(wait=True, cancel_futures=True)
+
+    logger.info(
+        f"Enriquecimiento: {resumen['enriquecidos']} hoteles actualizados, "
+        f"{resumen['sin_cambios']} sin cambios, {resumen['fallidos']} fallidos"
+    )
+    return resumen
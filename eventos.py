@@ -0,0 +1,390 @@
+"""
+EVENTOS DE INTERACCIÓN EN SEGUNDO PLANO - SISTEMA RECOMENDADOR DE HOTELES
+=========================================================================
+
+Este archivo contiene la ingesta de eventos de interacción (las vistas de la
+página de detalle) fuera de la petición HTTP. La ruta solo encola el evento
+y un hilo escritor los guarda por lotes en `interacciones_usuario`, así la
+latencia de /hotel/<slug> no depende de la contención de escritura.
+
+CARACTERÍSTICAS:
+- Cola en memoria acotada (EVENTOS_COLA_MAX): si se llena, el evento se
+  descarta y se cuenta, nunca se bloquea la petición
+- Hilo escritor que vacía la cola cada EVENTOS_LOTE eventos o cada
+  EVENTOS_INTERVALO_MS milisegundos, lo que ocurra primero
+- Un INSERT de varias filas por lote (una transacción por lote)
+- Vistas repetidas agrupadas: una fila por usuario, hotel y ventana de
+  EVENTOS_VENTANA_VISTAS minutos con su conteo, en el lote y contra las
+  filas ya guardadas
+- Compactación periódica (compactar_vistas): las vistas de más de
+  VISTAS_DIAS_DETALLE días quedan en una fila por usuario, hotel y día
+- Al terminar el proceso se vacía lo pendiente (atexit)
+- Modo 'sincrono' (EVENTOS_MODO) que escribe en la misma petición, para
+  pruebas y comandos de consola
+- El hilo arranca con el primer evento de cada proceso, así que funciona
+  igual con los workers de gunicorn creados por fork
+
+USO:
+    registrar_vista(current_user.id_usuario, hotel.id_hotel)
+    compactar_vistas()      # o `flask compactar_vistas`, o la tarea del programador
+
+VERSIÓN: 2.0
+"""
+
+import atexit
+from datetime import date, datetime, timedelta
+import logging
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy import bindparam, func, insert, select
+
+from models import db, InteraccionesUsuario
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Valores por defecto (se configuran con init_eventos)
+MODO = 'buffer'
+LOTE = 200
+INTERVALO_MS = 1000
+COLA_MAX = 10000
+VENTANA_VISTAS = 30  # minutos
+
+
+# Vistas más antiguas que esto (días) se compactan a una fila por día
+VISTAS_DIAS_DETALLE = 7
+
+# Grupos (usuario, hotel, día) por transacción al compactar
+LOTE_COMPACTACION = 500
+
+# Segundos que se espera al hilo escritor al cerrar el proceso
+ESPERA_CIERRE = 5.0
+
+# Estado del módulo
+_app = None
+_modo = MODO
+_lote = LOTE
+_intervalo = INTERVALO_MS / 1000
+_ventana = timedelta(minutes=VENTANA_VISTAS)
+_cola = queue.Queue(maxsize=COLA_MAX)
+_hilo = None
+_pid = None
+_detener = threading.Event()
+_lock = threading.Lock()
+_contadores = {'encolados': 0, 'escritos': 0, 'descartados': 0, 'fallidos': 0, 'lotes': 0}
+
+
+def init_eventos(app):
+    """
+    Configura la ingesta de eventos para la aplicación Flask
+
+    Args:
+        app: Aplicación Flask (el escritor corre dentro de su app_context)
+    """
+    global _app, _modo, _lote, _intervalo, _cola, _ventana
+    _app = app
+    _modo = app.config.get('EVENTOS_MODO', MODO)
+    _lote = int(app.config.get('EVENTOS_LOTE', LOTE))
+    _intervalo = int(app.config.get('EVENTOS_INTERVALO_MS', INTERVALO_MS)) / 1000
+    _ventana = timedelta(minutes=int(app.config.get('EVENTOS_VENTANA_VISTAS', VENTANA_VISTAS)))
+    cola_max = int(app.config.get('EVENTOS_COLA_MAX', COLA_MAX))
+    if _cola.maxsize != cola_max and _cola.empty():
+        _cola = queue.Queue(maxsize=cola_max)
+
+# =============================================================================
+# ENCOLADO
+# =============================================================================
+
+def registrar_evento(id_usuario, id_hotel, tipo_interaccion, valor=1.0, fecha=None):
+    """
+    Encola una interacción para guardarla en segundo plano
+
+    Returns:
+        True si el evento se encoló (o se escribió, en modo sincrono),
+        False si la cola estaba llena y se descartó
+    """
+    fila = {
+        'id_usuario': id_usuario,
+        'id_hotel': id_hotel,
+        'tipo_interaccion': tipo_interaccion,
+        'valor': valor,
+        'fecha_interaccion': fecha or datetime.now(),
+    }
+    if _modo == 'sincrono':
+        _escribir([fila])
+        return True
+
+    _asegurar_hilo()
+    try:
+        _cola.put_nowait(fila)
+    except queue.Full:
+        with _lock:
+            _contadores['descartados'] += 1
+            descartados = _contadores['descartados']
+        if descartados == 1 or descartados % 1000 == 0:
+            logger.warning(f"Cola de eventos llena: {descartados} eventos descartados")
+        return False
+    with _lock:
+        _contadores['encolados'] += 1
+    return True
+
+
+def registrar_vista(id_usuario, id_hotel, fecha=None):
+    """Encola la vista de la página de detalle de un hotel"""
+    return registrar_evento(id_usuario, id_hotel, 'vista', 1.0, fecha)
+
+
+def estadisticas():
+    """Contadores del proceso: encolados, escritos, descartados, fallidos, lotes y pendientes"""
+    with _lock:
+        resumen = dict(_contadores)
+    resumen['pendientes'] = _cola.qsize()
+    return resumen
+
+# =============================================================================
+# ESCRITOR
+# =============================================================================
+
+def _periodo(fecha):
+    """Inicio de la ventana de agrupación de vistas a la que pertenece la fecha"""
+    return datetime.min + (fecha - datetime.min) // _ventana * _ventana
+
+
+def _agrupar_vistas(filas):
+    """
+    Agrupa las vistas del lote por (usuario, hotel, ventana)
+
+    Returns:
+        (grupos, otras): grupos es clave -> fila con conteo y la última fecha;
+        otras son las interacciones que no son vistas
+    """
+    grupos, otras = {}, []
+    for fila in filas:
+        if fila['tipo_interaccion'] != 'vista':
+            otras.append(fila)
+            continue
+        clave = (fila['id_usuario'], fila['id_hotel'], _periodo(fila['fecha_interaccion']))
+        grupo = grupos.get(clave)
+        if grupo is None:
+            grupos[clave] = dict(fila, conteo=fila.get('conteo', 1))
+        else:
+            grupo['conteo'] += fila.get('conteo', 1)
+            grupo['fecha_interaccion'] = max(grupo['fecha_interaccion'], fila['fecha_interaccion'])
+    return grupos, otras
+
+
+def _sumar_a_existentes(grupos):
+    """
+    Suma las vistas del lote a las filas ya guardadas de la misma ventana
+
+    Returns:
+        Los grupos que no tenían fila y hay que insertar
+    """
+    tabla = InteraccionesUsuario.__table__
+    desde = min(clave[2] for clave in grupos)
+    existentes = db.session.execute(
+        select(tabla.c.id_interaccion, tabla.c.id_usuario, tabla.c.id_hotel, tabla.c.fecha_interaccion)
+        .where(
+            tabla.c.tipo_interaccion == 'vista',
+            tabla.c.fecha_interaccion >= desde,
+            tabla.c.id_usuario.in_(sorted({clave[0] for clave in grupos})),
+            tabla.c.id_hotel.in_(sorted({clave[1] for clave in grupos})),
+        )
+    ).all()
+
+    actualizaciones = []
+    for fila in existentes:
+        grupo = grupos.pop((fila.id_usuario, fila.id_hotel, _periodo(fila.fecha_interaccion)), None)
+        if grupo is not None:
+            actualizaciones.append({
+                'b_id': fila.id_interaccion,
+                'b_conteo': grupo['conteo'],
+                'b_fecha': max(fila.fecha_interaccion, grupo['fecha_interaccion']),
+            })
+    if actualizaciones:
+        db.session.execute(
+            tabla.update()
+            .where(tabla.c.id_interaccion == bindparam('b_id'))
+            .values(conteo=tabla.c.conteo + bindparam('b_conteo'), fecha_interaccion=bindparam('b_fecha')),
+            actualizaciones
+        )
+    return list(grupos.values())
+
+
+def _escribir(filas):
+    """Guarda un lote: suma las vistas repetidas y un solo INSERT de varias filas para el resto"""
+    contexto = _app.app_context() if _app is not None else None
+    if contexto is not None:
+        contexto.push()
+    try:
+        grupos, nuevas = _agrupar_vistas(filas)
+        if grupos:
+            nuevas.extend(_sumar_a_existentes(grupos))
+        if nuevas:
+            # Todas las filas con las mismas columnas: solo las vistas agrupadas traen conteo
+            nuevas = [dict(fila, conteo=fila.get('conteo', 1)) for fila in nuevas]
+            db.session.execute(insert(InteraccionesUsuario).values(nuevas))
+        db.session.commit()
+        with _lock:
+            _contadores['escritos'] += len(filas)
+            _contadores['lotes'] += 1
+    except Exception as e:
+        db.session.rollback()
+        with _lock:
+            _contadores['fallidos'] += len(filas)
+        logger.error(f"No se pudieron guardar {len(filas)} eventos de interacción: {e}")
+    finally:
+        if contexto is not None:
+            db.session.remove()
+            contexto.pop()
+
+
+def _tomar_lote(espera):
+    """Espera hasta `espera` segundos por el primer evento y completa el lote sin esperar más"""
+    try:
+        filas = [_cola.get(timeout=espera)]
+    except queue.Empty:
+        return []
+    while len(filas) < _lote:
+        try:
+            filas.append(_cola.get_nowait())
+        except queue.Empty:
+            break
+    return filas
+
+
+def _bucle_escritor():
+    pendientes = []
+    limite = None
+    while not _detener.is_set():
+        espera = _intervalo if limite is None else max(limite - time.monotonic(), 0)
+        nuevas = _tomar_lote(min(espera, _intervalo))
+        if nuevas and limite is None:
+            limite = time.monotonic() + _intervalo
+        pendientes.extend(nuevas)
+        if pendientes and (len(pendientes) >= _lote or time.monotonic() >= limite):
+            _escribir(pendientes[:_lote])
+            pendientes = pendientes[_lote:]
+            limite = time.monotonic() + _intervalo if pendientes else None
+
+    # Cierre: vaciar lo pendiente y lo que quede en la cola
+    while True:
+        pendientes.extend(_tomar_lote(0))
+        if not pendientes:
+            return
+        _escribir(pendientes[:_lote])
+        pendientes = pendientes[_lote:]
+
+
+def _asegurar_hilo():
+    global _hilo, _pid
+    if _hilo is not None and _pid == os.getpid() and _hilo.is_alive():
+        return
+    with _lock:
+        if _hilo is not None and _pid == os.getpid() and _hilo.is_alive():
+            return
+        _detener.clear()
+        _pid = os.getpid()
+        _hilo = threading.Thread(target=_bucle_escritor, name='eventos', daemon=True)
+        _hilo.start()
+
+
+def vaciar(espera=ESPERA_CIERRE):
+    """
+    Detiene el escritor después de guardar todo lo encolado
+
+    Se llama al cerrar el proceso; el siguiente evento vuelve a arrancar el hilo.
+
+    Returns:
+        True si el escritor terminó dentro de `espera` segundos
+    """
+    hilo = _hilo
+    if hilo is None or _pid != os.getpid() or not hilo.is_alive():
+        return True
+    _detener.set()
+    hilo.join(espera)
+    return not hilo.is_alive()
+
+
+atexit.register(vaciar)
+
+# =============================================================================
+# COMPACTACIÓN DE VISTAS ANTIGUAS
+# =============================================================================
+
+def _como_fecha(valor):
+    # func.date() devuelve str en SQLite y date en MySQL
+    return date.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+def compactar_vistas(dias=VISTAS_DIAS_DETALLE, ahora=None, tamano_lote=LOTE_COMPACTACION):
+    """
+    Deja una sola fila por usuario, hotel y día para las vistas antiguas
+
+    La fila que queda es la más reciente del día: acumula el conteo de las
+    demás y conserva la fecha de la última vista. Cada lote de grupos es una
+    transacción, así que se puede interrumpir y volver a lanzar.
+
+    Args:
+        dias: Se compactan las vistas anteriores a hoy - dias (a medianoche)
+        ahora: Fecha de referencia (por defecto datetime.now())
+        tamano_lote: Grupos (usuario, hotel, día) por transacción
+
+    Returns:
+        Diccionario con grupos compactados y filas_eliminadas
+    """
+    tabla = InteraccionesUsuario.__table__
+    hasta = datetime.combine((ahora or datetime.now()).date() - timedelta(days=dias), datetime.min.time())
+    dia = func.date(tabla.c.fecha_interaccion)
+    resumen = {'grupos': 0, 'filas_eliminadas': 0}
+
+    while True:
+        grupos = db.session.execute(
+            select(tabla.c.id_usuario, tabla.c.id_hotel, dia.label('dia'),
+                   func.max(tabla.c.id_interaccion).label('id_final'),
+                   func.sum(tabla.c.conteo).label('conteo'),
+                   func.max(tabla.c.fecha_interaccion).label('fecha'))
+            .where(tabla.c.tipo_interaccion == 'vista', tabla.c.fecha_interaccion < hasta)
+            .group_by(tabla.c.id_usuario, tabla.c.id_hotel, dia)
+            .having(func.count() > 1)
+            .limit(tamano_lote)
+        ).all()
+        if not grupos:
+            break
+
+        try:
+            db.session.execute(
+                tabla.update()
+                .where(tabla.c.id_interaccion == bindparam('b_id'))
+                .values(conteo=bindparam('b_conteo'), fecha_interaccion=bindparam('b_fecha')),
+                [{'b_id': g.id_final, 'b_conteo': int(g.conteo), 'b_fecha': g.fecha} for g in grupos]
+            )
+            eliminadas = db.session.execute(
+                tabla.delete().where(
+                    tabla.c.tipo_interaccion == 'vista',
+                    tabla.c.id_usuario == bindparam('b_usuario'),
+                    tabla.c.id_hotel == bindparam('b_hotel'),
+                    tabla.c.fecha_interaccion >= bindparam('b_desde'),
+                    tabla.c.fecha_interaccion < bindparam('b_hasta'),
+                    tabla.c.id_interaccion != bindparam('b_id'),
+                ),
+                [{'b_usuario': g.id_usuario, 'b_hotel': g.id_hotel, 'b_id': g.id_final,
+                  'b_desde': datetime.combine(_como_fecha(g.dia), datetime.min.time()),
+                  'b_hasta': datetime.combine(_como_fecha(g.dia) + timedelta(days=1), datetime.min.time())}
+                 for g in grupos]
+            ).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        resumen['grupos'] += len(grupos)
+        resumen['filas_eliminadas'] += eliminadas
+        logger.info(f"Compactación de vistas: {resumen['grupos']} grupos, {resumen['filas_eliminadas']} filas eliminadas")
+
+    return resumen
@@ -0,0 +1,254 @@
+"""
+MOTOR DE EXTRACCIÓN DE CAMPOS - SISTEMA RECOMENDADOR DE HOTELES
+===============================================================
+
+Este archivo contiene el motor de reglas que saca precio, puntuación,
+número de comentarios y estrellas del texto de una tarjeta de hotel.
+
+CARACTERÍSTICAS:
+- Reglas declarativas (campo, patrón, conversor, prioridad)
+- Todas las reglas se compilan una sola vez en una única expresión regular
+- Una sola pasada sobre el texto de la tarjeta para todos los campos
+- Números con formato regional: "COP 1.292.000", "8,7", "1.586 comentarios"
+- Benchmark sobre las tarjetas de prueba.txt (python extraccion.py)
+
+VERSIÓN: 2.0
+"""
+
+import re
+import sys
+import time
+
+# =============================================================================
+# CONVERSIÓN DE NÚMEROS CON FORMATO REGIONAL
+# =============================================================================
+
+# Separador decimal por defecto (Booking.com en español / pesos colombianos)
+SEPARADOR_DECIMAL = ','
+
+_SEPARADORES = re.compile(r'[.,]')
+
+
+def parsear_numero(texto, entero=False, separador_decimal=SEPARADOR_DECIMAL):
+    """
+    Convierte un número con separadores regionales en int o float
+
+    Con los dos separadores presentes, el último es el decimal. Con uno solo,
+    se considera de miles si se repite o si va seguido de exactamente tres
+    dígitos en un valor entero (precios, comentarios); si no, es decimal.
+
+    Args:
+        texto: Número como texto ("154.700", "8,7", "1,586")
+        entero: El valor esperado es entero (precio, conteo)
+        separador_decimal: Separador decimal de la región
+
+    Returns:
+        int si entero=True, float en otro caso; None si no se puede convertir
+    """
+    if not texto:
+        return None
+    texto = texto.replace('\xa0', '').replace(' ', '')
+    separadores = _SEPARADORES.findall(texto)
+
+    if not separadores:
+        limpio = texto
+    elif len(set(separadores)) == 2:
+        decimal = separadores[-1]
+        miles = ',' if decimal == '.' else '.'
+        limpio = texto.replace(miles, '').replace(decimal, '.')
+    else:
+        separador = separadores[0]
+        tres_digitos = len(texto) - texto.rfind(separador) - 1 == 3
+        if len(separadores) > 1 or (tres_digitos and (entero or separador != separador_decimal)):
+            limpio = texto.replace(separador, '')
+        else:
+            limpio = texto.replace(separador, '.')
+
+    try:
+        valor = float(limpio)
+    except ValueError:
+        return None
+    return int(round(valor)) if entero else valor
+
+
+def _entero(texto):
+    return parsear_numero(texto, entero=True)
+
+
+def _decimal(texto):
+    return parsear_numero(texto)
+
+
+_MONEDAS = {'COP': 'COP', 'USD': 'USD', 'US$': 'USD', '$': 'USD', 'EUR': 'EUR', '€': 'EUR'}
+
+
+def _moneda(texto):
+    return _MONEDAS.get(texto.upper(), 'COP')
+
+
+# =============================================================================
+# REGLAS DE EXTRACCIÓN
+# =============================================================================
+
+class Regla:
+    """
+    Regla de extracción declarativa
+
+    Args:
+        patron: Expresión regular sin grupos con nombre; cada grupo de
+            captura corresponde, en orden, a un elemento de campos
+        campos: Tupla de (campo, conversor) por grupo de captura
+        prioridad: Cuando varias reglas dan el mismo campo gana la de
+            menor prioridad; a igual prioridad, la primera en el texto
+    """
+    __slots__ = ('patron', 'campos', 'prioridad')
+
+    def __init__(self, patron, campos, prioridad=0):
+        self.patron = patron
+        self.campos = campos
+        self.prioridad = prioridad
+
+
+_NUMERO = r'(\d{1,3}(?:[.,]\d{3})+|\d+(?:[.,]\d+)?)'
+_MONEDA = r'(COP|USD|US\$|EUR|\$|€)'
+
+# El orden importa: en una misma posición del texto gana la primera regla
+REGLAS_TARJETA = [
+    # "Precio actual COP 154.700" (texto accesible del precio con descuento)
+    Regla(r'Precio actual\s*' + _MONEDA + r'\s*' + _NUMERO,
+          (('precio_moneda', _moneda), ('precio', _entero)), prioridad=0),
+    # "+ COP 29.400 de impuestos y cargos" (no es el precio de la estadía)
+    Regla(r'\+\s*' + _MONEDA + r'\s*' + _NUMERO + r'\s*de impuestos',
+          (('impuestos_moneda', _moneda), ('impuestos', _entero))),
+    # "COP 154.700"
+    Regla(_MONEDA + r'\s*' + _NUMERO,
+          (('precio_moneda', _moneda), ('precio', _entero)), prioridad=1),
+    # "Puntuación: 8,7"
+    Regla(r'Puntuaci[oó]n:?\s*(\d{1,2}(?:[.,]\d)?)',
+          (('puntuacion', _decimal),), prioridad=0),
+    # "8.5/10", "8,5 de 10" (con decimal: "2 de 5 noches" no es una puntuación)
+    Regla(r'(\d{1,2}[.,]\d)\s*(?:/|de)\s*(10|5)\b',
+          (('puntuacion', _decimal), ('puntuacion_maxima', _entero)), prioridad=1),
+    # "1.586 comentarios", "194 reviews"
+    Regla(r'(\d{1,3}(?:[.,]\d{3})+|\d+)\s*(?:comentarios?|opiniones|reviews?)',
+          (('comentarios', _entero),)),
+    # "4 estrellas"
+    Regla(r'(\d)\s*estrellas?',
+          (('estrellas', _entero),)),
+]
+
+
+class MotorExtraccion:
+    """
+    Motor que aplica un conjunto de reglas en una sola pasada
+
+    Las reglas se unen en una única expresión regular con una alternativa
+    con nombre por regla; cada coincidencia se asigna a su regla por el
+    nombre del grupo y los valores se leen por posición de grupo.
+    """
+
+    def __init__(self, reglas, flags=re.IGNORECASE):
+        alternativas = []
+        self._reglas = {}
+        grupo = 1
+        for i, regla in enumerate(reglas):
+            nombre = f'r{i}'
+            n_grupos = re.compile(regla.patron).groups
+            if n_grupos != len(regla.campos):
+                raise ValueError(f"La regla {regla.patron!r} tiene {n_grupos} grupos "
+                                 f"y {len(regla.campos)} campos")
+            alternativas.append(f'(?P<{nombre}>{regla.patron})')
+            self._reglas[nombre] = (regla, grupo + 1)
+            grupo += n_grupos + 1
+        self._patron = re.compile('|'.join(alternativas), flags)
+
+    def extraer(self, texto):
+        """
+        Extrae todos los campos del texto
+
+        Args:
+            texto: Texto de la tarjeta (o de un elemento)
+
+        Returns:
+            Diccionario campo -> valor con los campos encontrados
+        """
+        resultado = {}
+        prioridades = {}
+        if not texto:
+            return resultado
+
+        for match in self._patron.finditer(texto):
+            regla, inicio = self._reglas[match.lastgroup]
+            # La primera coincidencia de cada campo gana salvo que llegue
+            # otra de mejor prioridad
+            campo_principal = regla.campos[0][0]
+            if prioridades.get(campo_principal, regla.prioridad + 1) <= regla.prioridad:
+                continue
+            for desplazamiento, (campo, conversor) in enumerate(regla.campos):
+                valor = conversor(match.group(inicio + desplazamiento))
+                if valor is not None:
+                    resultado[campo] = valor
+                    prioridades[campo] = regla.prioridad
+        return resultado
+
+
+MOTOR_TARJETA = MotorExtraccion(REGLAS_TARJETA)
+
+
+def extraer_campos(texto):
+    """
+    Extrae precio, puntuación, comentarios y estrellas del texto de una tarjeta
+
+    Returns:
+        Diccionario con las claves encontradas entre precio, precio_moneda,
+        impuestos, impuestos_moneda, puntuacion, puntuacion_maxima,
+        comentarios y estrellas
+    """
+    return MOTOR_TARJETA.extraer(texto)
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def benchmark(archivo='prueba.txt', repeticiones=200):
+    """
+    Mide el rendimiento del motor sobre las tarjetas de un HTML de Booking.com
+
+    El parseo del HTML y el get_text de cada tarjeta quedan fuera de la
+    medición; solo se mide la extracción de campos.
+
+    Returns:
+        Diccionario con tarjetas, tarjetas por segundo y cobertura por campo
+    """
+    from bs4 import BeautifulSoup
+
+    with open(archivo, encoding='utf-8', errors='replace') as f:
+        soup = BeautifulSoup(f.read(), 'html.parser')
+    textos = [c.get_text(' ') for c in soup.find_all('div', {'data-testid': 'property-card'})]
+    if not textos:
+        raise ValueError(f"No hay tarjetas de hotel en {archivo}")
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultados = [extraer_campos(texto) for texto in textos]
+    duracion = time.perf_counter() - inicio
+
+    cobertura = {}
+    for campos in resultados:
+        for campo in campos:
+            cobertura[campo] = cobertura.get(campo, 0) + 1
+
+    return {
+        'tarjetas': len(textos),
+        'tarjetas_por_segundo': round(len(textos) * repeticiones / duracion),
+        'cobertura': cobertura,
+    }
+
+
+if __name__ == '__main__':
+    resultado = benchmark(*sys.argv[1:2])
+    print(f"Tarjetas: {resultado['tarjetas']}")
+    print(f"Tarjetas por segundo: {resultado['tarjetas_por_segundo']}")
+    for campo, total in sorted(resultado['cobertura'].items()):
+        print(f"  {campo}: {total}/{resultado['tarjetas']}")
@@ -0,0 +1,520 @@
+"""
+INGESTA DE HOTELES SCRAPEADOS - SISTEMA RECOMENDADOR DE HOTELES
+===============================================================
+
+Este archivo contiene la etapa que persiste en la tabla `hoteles` los
+diccionarios que produce el scraper.
+
+CARACTERÍSTICAS:
+- Consume cualquier iterable de hoteles (lista o generador del scraper)
+- Agrupa los hoteles en lotes y hace upsert por `slug`
+  (INSERT ... ON DUPLICATE KEY UPDATE en MySQL, ON CONFLICT en SQLite)
+- Un solo SELECT, un executemany y un commit por lote
+- Huella de contenido (hash) por hotel para no reescribir hoteles sin cambios
+- Invalidación de cachés dependientes solo para los hoteles que cambiaron
+- Resumen con hoteles insertados, actualizados y sin cambios
+- Precios por ventana de fechas (tabla `precios_ventana`) para el programador
+
+VERSIÓN: 2.0
+"""
+
+import hashlib
+import json
+import re
+import unicodedata
+from datetime import datetime
+from itertools import islice
+import logging
+
+from sqlalchemy import select
+from models import db, Hoteles, PreciosVentana
+from extraccion import extraer_campos
+from metricas import METRICAS, medir
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Hoteles por lote (un commit por lote)
+LOTE_INGESTA = 100
+
+# Columnas que provienen de la tarjeta de búsqueda y se actualizan en cada re-scraping.
+# Las columnas que no están aquí (imagenes, coordenadas, contacto, puntuaciones
+# detalladas...) no se tocan al actualizar un hotel existente.
+COLUMNAS_SCRAPING = [
+    'nombre', 'descripcion', 'ubicacion',
+    'precio_amount', 'precio_currency', 'precio_formatted', 'precio_source',
+    'rating_score', 'rating_max_score', 'rating_formatted',
+    'stars_count', 'stars_formatted', 'reviews_count',
+    'amenities', 'amenities_raw', 'imagen_url',
+    'link_booking', 'link_trivago', 'fuente_principal',
+    'rating', 'precio_promedio', 'imagen_url_legacy', 'fuente',
+]
+
+# Columnas que se escriben en cada upsert pero no cuentan como cambio de contenido
+COLUMNAS_CONTROL = ['fecha_scraping', 'version_scraping', 'metadata_scraping', 'updated_at']
+
+# Columnas que forman la huella de contenido de un hotel. Los enlaces no entran:
+# Booking agrega parámetros de sesión (sid, srpvid...) que cambian en cada búsqueda.
+COLUMNAS_HUELLA = [
+    'nombre', 'ubicacion', 'descripcion',
+    'precio_amount', 'precio_currency', 'precio_formatted',
+    'rating_score', 'rating_formatted', 'stars_count', 'reviews_count',
+    'amenities', 'imagen_url', 'imagenes',
+]
+
+# Funciones que se llaman con los ids de los hoteles modificados en cada lote
+_invalidadores = []
+
+# =============================================================================
+# FUNCIONES AUXILIARES
+# =============================================================================
+
+def slugify(value):
+    """
+    Convierte un string en un slug para URLs amigables
+    Ejemplo: "Hotel Cartagena" -> "hotel-cartagena"
+    """
+    value = unicodedata.normalize('NFD', value).encode('ascii', 'ignore').decode('utf-8')
+    value = re.sub(r'[^\w\s-]', '', value).strip().lower()
+    value = re.sub(r'[-\s]+', '-', value)
+    return value
+
+def truncar_columna(columna, valor):
+    """
+    Recorta un string a la longitud de su columna VARCHAR
+
+    Booking entrega textos como "Puntuación: 8,1\\n8,1\\nMuy bien\\n194 comentarios"
+    que no caben en rating_formatted (20 caracteres) y MySQL en modo estricto
+    rechazaría el lote completo.
+    """
+    if not isinstance(valor, str):
+        return valor
+    longitud = getattr(Hoteles.__table__.c[columna].type, 'length', None)
+    if longitud and len(valor) > longitud:
+        return valor[:longitud]
+    return valor
+
+def _valor_o_campo(hotel_data, clave, campo):
+    """
+    Obtiene un campo que puede venir como diccionario (formato del scraper
+    avanzado: {'amount': ..., 'formatted': ...}) o como valor plano (formato legacy)
+    """
+    valor = hotel_data.get(clave)
+    if isinstance(valor, dict):
+        return valor.get(campo)
+    return None
+
+def hotel_a_fila(hotel_data, ahora=None):
+    """
+    Convierte un hotel scrapeado en una fila de la tabla hoteles
+
+    Acepta tanto el formato del scraper (price/price_amount/rating_score...)
+    como el formato legacy de hoteles_scrapeados.json y el formato con
+    diccionarios anidados de update_app_for_new_db.py.
+
+    Args:
+        hotel_data: Diccionario con la información del hotel
+        ahora: Fecha de la ingesta (por defecto datetime.now())
+
+    Returns:
+        Diccionario columna -> valor, o None si el hotel no tiene nombre
+    """
+    ahora = ahora or datetime.now()
+    nombre = hotel_data.get('name') or hotel_data.get('nombre')
+    if not nombre:
+        return None
+
+    fuente = hotel_data.get('source') or 'booking'
+
+    # ===== PRECIO =====
+    if isinstance(hotel_data.get('price'), dict):
+        precio_amount = _valor_o_campo(hotel_data, 'price', 'amount')
+        precio_currency = _valor_o_campo(hotel_data, 'price', 'currency') or 'COP'
+        precio_formatted = _valor_o_campo(hotel_data, 'price', 'formatted')
+    else:
+        precio_amount = hotel_data.get('price_amount')
+        precio_currency = hotel_data.get('price_currency') or 'COP'
+        precio_formatted = hotel_data.get('price')
+
+    # ===== RATING =====
+    if isinstance(hotel_data.get('rating'), dict):
+        rating_score = _valor_o_campo(hotel_data, 'rating', 'score')
+        rating_max_score = _valor_o_campo(hotel_data, 'rating', 'max_score') or 10
+        rating_formatted = _valor_o_campo(hotel_data, 'rating', 'formatted')
+    else:
+        rating_score = hotel_data.get('rating_score')
+        rating_max_score = hotel_data.get('rating_max_score') or 10
+        rating_formatted = hotel_data.get('rating')
+
+    # Formato legacy: solo el texto ("Puntuación: 8,1 ... 194 comentarios", "COP 154.700")
+    texto_campos = {}
+    if rating_score is None and isinstance(rating_formatted, str):
+        texto_campos.update(extraer_campos(rating_formatted))
+        rating_score = texto_campos.get('puntuacion')
+    if precio_amount is None and isinstance(precio_formatted, str):
+        precio_campos = extraer_campos(precio_formatted)
+        precio_amount = precio_campos.get('precio')
+        precio_currency = precio_campos.get('precio_moneda', precio_currency)
+
+    # ===== ESTRELLAS =====
+    if isinstance(hotel_data.get('stars'), dict):
+        stars_count = _valor_o_campo(hotel_data, 'stars', 'count')
+        stars_formatted = _valor_o_campo(hotel_data, 'stars', 'formatted')
+    else:
+        stars_count = hotel_data.get('stars_count')
+        stars_formatted = hotel_data.get('stars')
+
+    # ===== AMENITIES =====
+    amenities = hotel_data.get('amenities')
+    if isinstance(amenities, list):
+        amenities_raw = json.dumps(amenities, ensure_ascii=False)
+        amenities = ', '.join(amenities)
+    else:
+        amenities_raw = amenities or None
+
+    # ===== METADATOS =====
+    metadata = {
+        'scraped_at': hotel_data.get('scraped_at'),
+        'destination': hotel_data.get('destination'),
+        'page_offset': hotel_data.get('page_offset'),
+    }
+    if hotel_data.get('prices_by_source'):
+        # Hotel combinado de varias fuentes (resolucion_entidades)
+        metadata['prices_by_source'] = hotel_data['prices_by_source']
+    imagenes = hotel_data.get('images')
+
+    fila = {
+        'nombre': nombre,
+        'slug': hotel_data.get('slug') or slugify(nombre),
+        'descripcion': hotel_data.get('description') or None,
+        'ubicacion': hotel_data.get('location') or None,
+        'precio_amount': precio_amount,
+        'precio_currency': precio_currency,
+        'precio_formatted': precio_formatted or None,
+        'precio_source': fuente,
+        'rating_score': rating_score,
+        'rating_max_score': rating_max_score,
+        'rating_formatted': rating_formatted or None,
+        'stars_count': stars_count,
+        'stars_formatted': stars_formatted or None,
+        'reviews_count': hotel_data.get('reviews_count') or texto_campos.get('comentarios') or 0,
+        'amenities': amenities or None,
+        'amenities_raw': amenities_raw,
+        'imagen_url': hotel_data.get('image') or None,
+        'imagenes': json.dumps(imagenes, ensure_ascii=False) if imagenes else None,
+        'link_booking': hotel_data.get('link') if fuente == 'booking' else hotel_data.get('link_booking'),
+        'link_trivago': hotel_data.get('link') if fuente == 'trivago' else hotel_data.get('link_trivago'),
+        'fuente_principal': fuente,
+        'fecha_scraping': ahora,
+        'version_scraping': '2.0',
+        'metadata_scraping': None,
+        'created_at': ahora,
+        'updated_at': ahora,
+    }
+
+    # Campos legacy para compatibilidad
+    fila['rating'] = fila['rating_score']
+    fila['precio_promedio'] = fila['precio_amount']
+    fila['imagen_url_legacy'] = fila['imagen_url']
+    fila['fuente'] = fuente
+
+    metadata['content_hash'] = calcular_huella(fila)
+    fila['metadata_scraping'] = json.dumps(metadata, ensure_ascii=False)
+
+    return {columna: truncar_columna(columna, valor) for columna, valor in fila.items()}
+
+def _normalizar_huella(valor):
+    """
+    Normaliza un valor para la huella: espacios colapsados y minúsculas en
+    textos, listas de amenities ordenadas, números como float
+    """
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = re.sub(r'\s+', ' ', str(valor).replace('\xa0', ' ')).strip().lower()
+    return texto or None
+
+def calcular_huella(fila):
+    """
+    Calcula la huella de contenido estable de un hotel
+
+    Args:
+        fila: Fila producida por hotel_a_fila()
+
+    Returns:
+        Hash SHA-256 (hexadecimal) del contenido normalizado
+    """
+    contenido = {columna: _normalizar_huella(fila.get(columna)) for columna in COLUMNAS_HUELLA}
+    if contenido['amenities']:
+        contenido['amenities'] = sorted(a.strip() for a in contenido['amenities'].split(','))
+    serializado = json.dumps(contenido, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serializado.encode('utf-8')).hexdigest()
+
+def huella_guardada(metadata_scraping):
+    """
+    Obtiene la huella de contenido guardada en metadata_scraping
+
+    Returns:
+        El hash guardado o None si el hotel no tiene huella (datos legacy)
+    """
+    if not metadata_scraping:
+        return None
+    try:
+        return json.loads(metadata_scraping).get('content_hash')
+    except (ValueError, AttributeError):
+        return None
+
+def registrar_invalidador(funcion):
+    """
+    Registra una función que invalida cachés dependientes de la tabla hoteles
+
+    La función recibe la lista de id_hotel modificados en cada lote. Se puede
+    usar como decorador.
+    """
+    _invalidadores.append(funcion)
+    return funcion
+
+def _invalidar_cambiados(slugs):
+    """
+    Notifica a los invalidadores registrados los hoteles que cambiaron
+    """
+    if not _invalidadores or not slugs:
+        return
+    ids = list(db.session.execute(select(Hoteles.id_hotel).where(Hoteles.slug.in_(slugs))).scalars())
+    invalidar_hoteles(ids)
+
+def invalidar_hoteles(ids):
+    """
+    Notifica a los invalidadores registrados una lista de id_hotel modificados
+
+    La usan las etapas que escriben en hoteles fuera de la ingesta
+    (por ejemplo, el enriquecimiento con la página de detalle).
+    """
+    if not ids:
+        return
+    for funcion in _invalidadores:
+        try:
+            funcion(ids)
+        except Exception as e:
+            logger.error(f"Error invalidando caché de hoteles: {e}")
+
+def _lotes(iterable, tamano):
+    """
+    Agrupa un iterable (posiblemente un generador) en listas de `tamano` elementos
+    """
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+def _sentencia_upsert(tabla, columnas_update, columnas_unicas):
+    """
+    Construye el INSERT ... ON DUPLICATE KEY UPDATE adecuado al motor de base de datos
+
+    Args:
+        tabla: Tabla de SQLAlchemy
+        columnas_update: Columnas que se actualizan cuando la fila ya existe
+        columnas_unicas: Columnas del índice único (para ON CONFLICT)
+
+    Returns:
+        Sentencia de SQLAlchemy lista para ejecutarse con una lista de filas (executemany)
+    """
+    dialecto = db.engine.dialect.name
+
+    if dialecto == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(tabla)
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in columnas_update})
+
+    if dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialecto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise ValueError(f"Motor de base de datos no soportado para upsert: {dialecto}")
+
+    stmt = insert(tabla)
+    return stmt.on_conflict_do_update(
+        index_elements=columnas_unicas,
+        set_={c: stmt.excluded[c] for c in columnas_update}
+    )
+
+def _fila_cambio(previa, fila):
+    """
+    Compara la huella guardada de un hotel existente con la de la fila nueva
+    """
+    return huella_guardada(previa.metadata_scraping) != json.loads(fila['metadata_scraping'])['content_hash']
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL DE INGESTA
+# =============================================================================
+
+def ingestar_hoteles(hoteles, tamano_lote=LOTE_INGESTA):
+    """
+    INGESTA POR LOTES DE HOTELES SCRAPEADOS
+
+    Consume los hoteles (puede ser el generador iter_booking_hotels, de modo
+    que se persisten mientras el crawl sigue) y los guarda en lotes:
+    un SELECT de los slugs del lote, un upsert con executemany y un commit.
+    Los hoteles cuya huella de contenido no cambió no se reescriben; solo los
+    modificados reciben un nuevo updated_at y se notifican a los invalidadores
+    de caché registrados.
+
+    Args:
+        hoteles: Iterable de diccionarios de hoteles scrapeados
+        tamano_lote: Número de hoteles por lote
+
+    Returns:
+        Diccionario con los contadores insertados, actualizados, sin_cambios y descartados
+    """
+    resumen = {'insertados': 0, 'actualizados': 0, 'sin_cambios': 0, 'descartados': 0}
+    stmt = _sentencia_upsert(Hoteles.__table__, COLUMNAS_SCRAPING + COLUMNAS_CONTROL, ['slug'])
+
+    for lote in _lotes(hoteles, tamano_lote):
+        ahora = datetime.now()
+
+        # Convertir y eliminar slugs repetidos dentro del lote (gana el último)
+        filas = {}
+        for hotel_data in lote:
+            fila = hotel_a_fila(hotel_data, ahora)
+            if fila is None:
+                resumen['descartados'] += 1
+                continue
+            filas[fila['slug']] = fila
+
+        if not filas:
+            continue
+
+        existentes = {
+            previa.slug: previa
+            for previa in db.session.execute(
+                select(Hoteles.slug, Hoteles.metadata_scraping).where(Hoteles.slug.in_(list(filas)))
+            )
+        }
+
+        a_escribir = []
+        for slug, fila in filas.items():
+            previa = existentes.get(slug)
+            if previa is None:
+                resumen['insertados'] += 1
+            elif _fila_cambio(previa, fila):
+                resumen['actualizados'] += 1
+            else:
+                resumen['sin_cambios'] += 1
+                continue
+            a_escribir.append(fila)
+
+        try:
+            with medir('persist'):
+                if a_escribir:
+                    db.session.execute(stmt, a_escribir)
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        insertados = sum(1 for slug in filas if slug not in existentes)
+        METRICAS.incrementar('scraper_persisted_hotels_total', insertados, result='inserted')
+        METRICAS.incrementar('scraper_persisted_hotels_total', len(a_escribir) - insertados, result='updated')
+        METRICAS.incrementar('scraper_persisted_hotels_total', len(filas) - len(a_escribir), result='unchanged')
+
+        _invalidar_cambiados([fila['slug'] for fila in a_escribir])
+
+        logger.info(f"Lote ingestado: {len(a_escribir)} escritos de {len(filas)} hoteles")
+
+    logger.info(
+        f"Ingesta completada. Insertados: {resumen['insertados']}, "
+        f"actualizados: {resumen['actualizados']}, sin cambios: {resumen['sin_cambios']}"
+    )
+    return resumen
+
+# =============================================================================
+# INGESTA DE PRECIOS POR VENTANA DE FECHAS
+# =============================================================================
+
+def ingestar_precios_ventana(hoteles, checkin, checkout, tamano_lote=LOTE_INGESTA):
+    """
+    INGESTA DE PRECIOS PARA UNA VENTANA DE FECHAS
+
+    Guarda en precios_ventana el precio de cada hotel para la estadía
+    checkin-checkout, sin tocar la fila de hoteles (el precio principal lo
+    mantiene el scraping completo). Los hoteles que todavía no existen en
+    la tabla hoteles se omiten.
+
+    Args:
+        hoteles: Iterable de diccionarios de hoteles scrapeados
+        checkin: Fecha de llegada de la ventana (date o YYYY-MM-DD)
+        checkout: Fecha de salida de la ventana (date o YYYY-MM-DD)
+        tamano_lote: Número de hoteles por lote
+
+    Returns:
+        Diccionario con los contadores actualizados, sin_cambios y desconocidos
+    """
+    if isinstance(checkin, str):
+        checkin = datetime.strptime(checkin, '%Y-%m-%d').date()
+    if isinstance(checkout, str):
+        checkout = datetime.strptime(checkout, '%Y-%m-%d').date()
+
+    resumen = {'actualizados': 0, 'sin_cambios': 0, 'desconocidos': 0}
+    stmt = _sentencia_upsert(
+        PreciosVentana.__table__,
+        ['precio_amount', 'precio_currency', 'precio_formatted', 'fecha_scraping'],
+        ['id_hotel', 'checkin', 'checkout']
+    )
+
+    for lote in _lotes(hoteles, tamano_lote):
+        ahora = datetime.now()
+        filas = {}
+        for hotel_data in lote:
+            fila = hotel_a_fila(hotel_data, ahora)
+            if fila is not None:
+                filas[fila['slug']] = fila
+
+        ids = dict(db.session.execute(
+            select(Hoteles.slug, Hoteles.id_hotel).where(Hoteles.slug.in_(list(filas)))
+        ).all()) if filas else {}
+        previos = dict(db.session.execute(
+            select(PreciosVentana.id_hotel, PreciosVentana.precio_amount).where(
+                PreciosVentana.id_hotel.in_(list(ids.values())),
+                PreciosVentana.checkin == checkin,
+                PreciosVentana.checkout == checkout
+            )
+        ).all()) if ids else {}
+
+        resumen['desconocidos'] += len(lote) - len(ids)
+        a_escribir = []
+        for slug, id_hotel in ids.items():
+            fila = filas[slug]
+            if id_hotel in previos and previos[id_hotel] == fila['precio_amount']:
+                resumen['sin_cambios'] += 1
+                continue
+            resumen['actualizados'] += 1
+            a_escribir.append({
+                'id_hotel': id_hotel,
+                'checkin': checkin,
+                'checkout': checkout,
+                'precio_amount': fila['precio_amount'],
+                'precio_currency': fila['precio_currency'],
+                'precio_formatted': fila['precio_formatted'],
+                'fecha_scraping': ahora,
+            })
+
+        try:
+            if a_escribir:
+                db.session.execute(stmt, a_escribir)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    logger.info(
+        f"Precios {checkin} - {checkout}: {resumen['actualizados']} actualizados, "
+        f"{resumen['sin_cambios']} sin cambios, {resumen['desconocidos']} hoteles desconocidos"
+    )
+    return resumen
@@ -31,11 +31,27 @@ function mostrarError(containerId, mensaje) {
 }
 
 document.addEventListener('DOMContentLoaded', () => {
-    cargarRecomendaciones();
-    cargarHoteles();
+    cargarFavoritos().then(() => {
+        cargarRecomendaciones();
+        cargarHoteles();
+    });
     AOS.init({ duration: 900, once: true });
 });
 
+// --- Ids de hoteles favoritos del usuario (para el corazón de cada tarjeta) ---
+let _favoritos = new Set();
+function cargarFavoritos() {
+    return fetch('/api/favoritos')
+        .then(res => res.json())
+        .then(data => {
+            _favoritos = new Set(data.ids || []);
+        })
+        .catch(() => {
+            // Sin sesión iniciada: ninguna tarjeta se marca
+            _favoritos = new Set();
+        });
+}
+
 // --- Cargar y renderizar recomendaciones ---
 function cargarRecomendaciones() {
     fetch('/api/recomendaciones')
@@ -85,6 +101,7 @@ function renderHotelCards(hotels, containerId) {
         const slug = hotel.slug || slugify(hotel.name);
         col.innerHTML = `
             <div class="card h-100 shadow-lg border-0 hotel-card position-relative" style="cursor:pointer; overflow:hidden;" data-hotel-slug="${slug}">
+                ${_favoritos.has(hotel.id) ? '<i class="bi bi-heart-fill position-absolute top-0 end-0 m-3" style="color:#0d6efd; font-size:1.6rem;" title="Favorito"></i>' : ''}
                 <img src="${hotel.image || '/static/img/hotel_default.jpg'}" class="card-img-top" alt="${hotel.name}" style="height:260px; object-fit:cover;">
                 <div class="card-body bg-white p-4 d-flex flex-column justify-content-between">
                   <div>
@@ -0,0 +1,311 @@
+"""
+MÉTRICAS DEL SCRAPING - SISTEMA RECOMENDADOR DE HOTELES
+=======================================================
+
+Este archivo contiene las métricas por etapa del pipeline de scraping
+(fetch, parse, extract, enrich, persist) y su exportación en el formato
+de texto de Prometheus.
+
+CARACTERÍSTICAS:
+- Histogramas de latencia por etapa
+- Bytes descargados, reintentos y respuestas HTTP por código de estado
+- Clasificación de las respuestas (ok, throttled, blocked, captcha...) y
+  concurrencia y espera actuales por host (cortesía adaptativa del scraper)
+- Tasa de acierto por campo de la tarjeta (precio, puntuación, estrellas...)
+- Tarjetas extraídas y hoteles persistidos (insertados, actualizados...)
+- Registro en memoria seguro entre hilos, sin dependencias externas
+- Exportación por la ruta /metrics o a un archivo .prom (textfile collector
+  de node_exporter) al terminar cada trabajo
+- Resumen de cada ejecución en el log: tiempo por etapa y tarjetas por segundo
+
+VERSIÓN: 2.0
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Límites superiores (segundos) de los buckets de los histogramas de latencia
+BUCKETS_LATENCIA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Métricas conocidas: nombre -> (tipo, ayuda)
+DEFINICIONES = {
+    'scraper_stage_seconds': ('histogram', 'Duración de cada etapa del scraping'),
+    'scraper_bytes_total': ('counter', 'Bytes descargados'),
+    'scraper_http_responses_total': ('counter', 'Respuestas HTTP por código de estado'),
+    'scraper_retries_total': ('counter', 'Reintentos de peticiones HTTP'),
+    'scraper_fetch_outcomes_total': ('counter', 'Respuestas según su clasificación (ok, throttled, blocked, captcha...)'),
+    'scraper_host_concurrency_limit': ('gauge', 'Peticiones simultáneas permitidas por host'),
+    'scraper_host_backoff_factor': ('gauge', 'Multiplicador actual del delay entre peticiones por host'),
+    'scraper_cards_total': ('counter', 'Tarjetas de hotel extraídas'),
+    'scraper_field_extractions_total': ('counter', 'Campos de la tarjeta encontrados (hit) o vacíos (miss)'),
+    'scraper_persisted_hotels_total': ('counter', 'Hoteles procesados por la ingesta según el resultado'),
+}
+
+# Etapas del pipeline, en orden
+ETAPAS = ('fetch', 'parse', 'extract', 'enrich', 'persist')
+
+# Campos de la tarjeta cuya tasa de acierto se mide
+CAMPOS_TARJETA = (
+    'price_amount', 'rating_score', 'reviews_count', 'stars_count',
+    'location', 'description', 'image', 'amenities', 'link',
+)
+
+# =============================================================================
+# REGISTRO DE MÉTRICAS
+# =============================================================================
+
+class Metricas:
+    """
+    Registro en memoria de contadores, medidores e histogramas con etiquetas
+
+    Uso:
+        METRICAS.incrementar('scraper_bytes_total', len(contenido))
+        METRICAS.fijar('scraper_host_concurrency_limit', 1.5, host='www.booking.com')
+        METRICAS.observar('scraper_stage_seconds', 0.2, stage='parse')
+    """
+
+    def __init__(self, buckets=BUCKETS_LATENCIA):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._contadores = defaultdict(float)
+        # (nombre, etiquetas) -> [conteos por bucket..., suma, cuenta]
+        self._histogramas = {}
+
+    @staticmethod
+    def _clave(nombre, etiquetas):
+        return nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        with self._lock:
+            self._contadores[self._clave(nombre, etiquetas)] += valor
+
+    def fijar(self, nombre, valor, **etiquetas):
+        """Fija el valor de un medidor (gauge)"""
+        with self._lock:
+            self._contadores[self._clave(nombre, etiquetas)] = valor
+
+    def observar(self, nombre, valor, **etiquetas):
+        clave = self._clave(nombre, etiquetas)
+        with self._lock:
+            datos = self._histogramas.get(clave)
+            if datos is None:
+                datos = self._histogramas[clave] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    datos[i] += 1
+            datos[-2] += valor
+            datos[-1] += 1
+
+    def instantanea(self):
+        """Copia de los valores actuales (para calcular diferencias)"""
+        with self._lock:
+            return dict(self._contadores), {c: list(d) for c, d in self._histogramas.items()}
+
+    def reiniciar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._histogramas.clear()
+
+    def texto_prometheus(self):
+        """
+        Todas las métricas en el formato de texto de Prometheus (versión 0.0.4)
+
+        Returns:
+            String listo para servir con Content-Type text/plain; version=0.0.4
+        """
+        contadores, histogramas = self.instantanea()
+        series = defaultdict(list)
+        for (nombre, etiquetas), valor in contadores.items():
+            series[nombre].append((etiquetas, valor))
+        for (nombre, etiquetas), datos in histogramas.items():
+            series[nombre].append((etiquetas, datos))
+
+        lineas = []
+        for nombre in sorted(series):
+            tipo, ayuda = DEFINICIONES.get(nombre, ('histogram' if nombre.endswith('_seconds') else 'counter', ''))
+            lineas.append(f'# HELP {nombre} {ayuda}')
+            lineas.append(f'# TYPE {nombre} {tipo}')
+            for etiquetas, valor in sorted(series[nombre]):
+                if tipo != 'histogram':
+                    lineas.append(f'{nombre}{_etiquetas(etiquetas)} {_numero(valor)}')
+                    continue
+                for limite, conteo in zip(self.buckets, valor):
+                    lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas + (("le", _numero(limite)),))} {conteo}')
+                lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas + (("le", "+Inf"),))} {valor[-1]}')
+                lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {_numero(valor[-2])}')
+                lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {valor[-1]}')
+        return '\n'.join(lineas) + '\n'
+
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in etiquetas) + '}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) and not valor.is_integer() else str(int(valor))
+
+
+# Registro compartido por todo el proceso
+METRICAS = Metricas()
+
+# =============================================================================
+# INSTRUMENTACIÓN
+# =============================================================================
+
+@contextmanager
+def medir(etapa):
+    """Mide la duración del bloque como una observación de la etapa"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICAS.observar('scraper_stage_seconds', time.perf_counter() - inicio, stage=etapa)
+
+
+def registrar_respuesta(estado, num_bytes=0):
+    """Cuenta una respuesta HTTP (o 'error' si no hubo respuesta) y sus bytes"""
+    METRICAS.incrementar('scraper_http_responses_total', status=estado)
+    if num_bytes:
+        METRICAS.incrementar('scraper_bytes_total', num_bytes)
+
+
+def registrar_tarjeta(hotel):
+    """Cuenta una tarjeta extraída y qué campos traía"""
+    METRICAS.incrementar('scraper_cards_total')
+    for campo in CAMPOS_TARJETA:
+        resultado = 'miss' if hotel.get(campo) in (None, '', []) else 'hit'
+        METRICAS.incrementar('scraper_field_extractions_total', field=campo, result=resultado)
+
+# =============================================================================
+# EXPORTACIÓN Y RESUMEN
+# =============================================================================
+
+def texto_prometheus():
+    """Métricas del proceso en formato de texto de Prometheus"""
+    return METRICAS.texto_prometheus()
+
+
+def escribir_archivo(ruta):
+    """
+    Escribe las métricas en un archivo .prom de forma atómica
+
+    Pensado para el textfile collector de node_exporter cuando el scraping
+    corre en `flask trabajador`, fuera de los workers web.
+    """
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    temporal = f'{ruta}.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write(texto_prometheus())
+    os.replace(temporal, ruta)
+
+
+def resumen_desde(previa, segundos):
+    """
+    Resumen de lo medido desde una instantánea anterior
+
+    Args:
+        previa: Resultado de METRICAS.instantanea() al empezar
+        segundos: Duración total de la ejecución
+
+    Returns:
+        Diccionario con segundos, etapas (llamadas y segundos por etapa),
+        tarjetas, tarjetas_por_segundo, bytes, reintentos, http, respuestas
+        (por clasificación) y campos (tasa de acierto por campo)
+    """
+    contadores_previos, histogramas_previos = previa
+    contadores, histogramas = METRICAS.instantanea()
+
+    def delta(nombre, **etiquetas):
+        clave = Metricas._clave(nombre, etiquetas)
+        return contadores.get(clave, 0) - contadores_previos.get(clave, 0)
+
+    etapas = {}
+    for (nombre, etiquetas), datos in histogramas.items():
+        if nombre != 'scraper_stage_seconds':
+            continue
+        previos = histogramas_previos.get((nombre, etiquetas), [0.0, 0])
+        llamadas = datos[-1] - previos[-1]
+        if llamadas:
+            etapas[dict(etiquetas)['stage']] = {'llamadas': llamadas, 'segundos': round(datos[-2] - previos[-2], 3)}
+
+    http, respuestas, campos = {}, {}, {}
+    for (nombre, etiquetas), valor in contadores.items():
+        etiquetas = dict(etiquetas)
+        if nombre == 'scraper_http_responses_total':
+            cambio = delta(nombre, **etiquetas)
+            if cambio:
+                http[etiquetas['status']] = int(cambio)
+        elif nombre == 'scraper_fetch_outcomes_total':
+            cambio = delta(nombre, **etiquetas)
+            if cambio:
+                respuestas[etiquetas['outcome']] = int(cambio)
+        elif nombre == 'scraper_field_extractions_total' and etiquetas['result'] == 'hit':
+            aciertos = delta(nombre, **etiquetas)
+            total = aciertos + delta(nombre, field=etiquetas['field'], result='miss')
+            if total:
+                campos[etiquetas['field']] = round(aciertos / total, 3)
+
+    tarjetas = int(delta('scraper_cards_total'))
+    return {
+        'segundos': round(segundos, 3),
+        'etapas': {etapa: etapas[etapa] for etapa in ETAPAS if etapa in etapas},
+        'tarjetas': tarjetas,
+        'tarjetas_por_segundo': round(tarjetas / segundos, 2) if segundos else 0.0,
+        'bytes': int(delta('scraper_bytes_total')),
+        'reintentos': int(delta('scraper_retries_total')),
+        'http': http,
+        'respuestas': respuestas,
+        'campos': campos,
+    }
+
+
+@contextmanager
+def ejecucion(nombre, archivo=None):
+    """
+    Mide una ejecución completa (un trabajo de scraping, una pasada de
+    enriquecimiento...) y al terminar deja el resumen en el log y, si se
+    indica, las métricas en un archivo .prom
+
+    Uso:
+        with ejecucion('scraping cartagena') as resumen:
+            ...
+        resumen['tarjetas_por_segundo']
+    """
+    previa = METRICAS.instantanea()
+    inicio = time.perf_counter()
+    resumen = {}
+    try:
+        yield resumen
+    finally:
+        resumen.update(resumen_desde(previa, time.perf_counter() - inicio))
+        etapas = ', '.join(f"{etapa} {datos['segundos']}s/{datos['llamadas']}"
+                           for etapa, datos in resumen['etapas'].items())
+        logger.info(f"Métricas de {nombre}: {resumen['segundos']}s, {resumen['tarjetas']} tarjetas "
+                    f"({resumen['tarjetas_por_segundo']}/s), {resumen['bytes']} bytes, "
+                    f"{resumen['reintentos']} reintentos, etapas: {etapas or '-'}")
+        bloqueos = {c: n for c, n in resumen['respuestas'].items() if c != 'ok'}
+        if bloqueos:
+            logger.warning(f"Respuestas con problemas en {nombre}: {bloqueos}")
+        if archivo:
+            try:
+                escribir_archivo(archivo)
+            except OSError as e:
+                logger.error(f"No se pudieron escribir las métricas en {archivo}: {e}")
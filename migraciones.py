@@ -0,0 +1,248 @@
+"""
+MIGRACIONES DE DATOS POR LOTES - SISTEMA RECOMENDADOR DE HOTELES
+================================================================
+
+Este archivo contiene el motor que aplica migraciones de datos fila a fila
+sobre tablas grandes sin bloquearlas durante toda la ejecución.
+
+CARACTERÍSTICAS:
+- Recorrido por clave primaria (WHERE id > último ORDER BY id LIMIT n):
+  cada lote es una consulta corta y una transacción corta
+- Punto de control en la tabla `migraciones`, confirmado en la misma
+  transacción que el lote: tras una caída se reanuda desde el último lote
+- Modo simulación (dry-run): recorre y transforma pero deshace cada lote
+- Informe de progreso con filas por segundo y tiempo restante estimado
+- Registro de migraciones con decorador, como las tareas del programador
+
+VERSIÓN: 2.0
+"""
+
+from datetime import datetime
+import logging
+import time
+
+from sqlalchemy import func, select
+
+from models import db, Hoteles, Migraciones
+from ingesta import slugify
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Filas por lote (una transacción por lote)
+LOTE_MIGRACION = 500
+
+# Migraciones registradas: nombre -> (modelo, función(objeto) -> bool modificado)
+_migraciones = {}
+
+
+def registrar_migracion(nombre, modelo):
+    """
+    Decorador que registra una migración de datos
+
+    La función recibe cada objeto del modelo, lo modifica en sitio y devuelve
+    True si cambió algo.
+    """
+    def decorador(funcion):
+        _migraciones[nombre] = (modelo, funcion)
+        return funcion
+    return decorador
+
+
+def migraciones_registradas():
+    """Nombres de las migraciones registradas"""
+    return list(_migraciones)
+
+# =============================================================================
+# MOTOR
+# =============================================================================
+
+def _formatear_segundos(segundos):
+    minutos, segundos = divmod(int(segundos), 60)
+    horas, minutos = divmod(minutos, 60)
+    return f"{horas}:{minutos:02d}:{segundos:02d}"
+
+
+def estado_migracion(nombre):
+    """
+    Estado guardado de una migración
+
+    Returns:
+        Diccionario con estado, ultimo_id, procesados, modificados y fechas,
+        o None si nunca se ejecutó
+    """
+    punto = db.session.get(Migraciones, nombre)
+    if punto is None:
+        return None
+    return {
+        'nombre': punto.nombre,
+        'estado': punto.estado,
+        'ultimo_id': punto.ultimo_id,
+        'procesados': punto.procesados,
+        'modificados': punto.modificados,
+        'fecha_inicio': punto.fecha_inicio,
+        'fecha_actualizacion': punto.fecha_actualizacion,
+        'fecha_fin': punto.fecha_fin,
+    }
+
+
+def ejecutar_migracion(nombre, tamano_lote=LOTE_MIGRACION, dry_run=False, reiniciar=False, max_lotes=None):
+    """
+    Ejecuta (o reanuda) una migración registrada
+
+    Args:
+        nombre: Nombre de la migración
+        tamano_lote: Filas por lote y por transacción
+        dry_run: Recorrer y contar los cambios sin guardar nada
+            (tampoco el punto de control)
+        reiniciar: Empezar desde el principio aunque haya punto de control
+        max_lotes: Detenerse tras este número de lotes (la migración queda en curso)
+
+    Returns:
+        Diccionario con estado, procesados, modificados, lotes, segundos y
+        filas_por_segundo de esta ejecución
+    """
+    if nombre not in _migraciones:
+        raise ValueError(f"Migración desconocida: {nombre}")
+    modelo, funcion = _migraciones[nombre]
+    clave = modelo.__mapper__.primary_key[0]
+
+    punto = db.session.get(Migraciones, nombre)
+    if punto is not None and punto.estado == 'completada' and not reiniciar:
+        logger.info(f"Migración {nombre}: ya completada")
+        return {'estado': 'completada', 'procesados': 0, 'modificados': 0, 'lotes': 0,
+                'segundos': 0.0, 'filas_por_segundo': 0.0}
+
+    if punto is None or reiniciar:
+        ultimo_id, procesados_previos, modificados_previos = 0, 0, 0
+    else:
+        ultimo_id, procesados_previos, modificados_previos = punto.ultimo_id, punto.procesados, punto.modificados
+        logger.info(f"Migración {nombre}: reanudando desde {clave.key} > {ultimo_id}")
+    fecha_inicio = punto.fecha_inicio if punto is not None and not reiniciar else datetime.now()
+
+    pendientes = db.session.execute(
+        select(func.count()).select_from(modelo).where(clave > ultimo_id)
+    ).scalar()
+    db.session.rollback()
+
+    resumen = {'estado': 'en_curso', 'procesados': 0, 'modificados': 0, 'lotes': 0}
+    inicio = time.monotonic()
+    while max_lotes is None or resumen['lotes'] < max_lotes:
+        objetos = db.session.execute(
+            select(modelo).where(clave > ultimo_id).order_by(clave).limit(tamano_lote)
+        ).scalars().all()
+        if not objetos:
+            resumen['estado'] = 'completada'
+            break
+
+        try:
+            modificados = sum(1 for objeto in objetos if funcion(objeto))
+            ultimo_id = getattr(objetos[-1], clave.key)
+            resumen['procesados'] += len(objetos)
+            resumen['modificados'] += modificados
+            if dry_run:
+                db.session.rollback()
+            else:
+                _guardar_punto(nombre, ultimo_id, procesados_previos + resumen['procesados'],
+                               modificados_previos + resumen['modificados'], fecha_inicio)
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.error(f"Migración {nombre}: error en el lote después de {clave.key} {ultimo_id}")
+            raise
+        db.session.expunge_all()
+        resumen['lotes'] += 1
+
+        transcurrido = time.monotonic() - inicio
+        velocidad = resumen['procesados'] / transcurrido if transcurrido else 0.0
+        restantes = max(pendientes - resumen['procesados'], 0)
+        eta = _formatear_segundos(restantes / velocidad) if velocidad else '?'
+        logger.info(
+            f"Migración {nombre}{' (simulación)' if dry_run else ''}: "
+            f"{resumen['procesados']}/{pendientes} filas, {resumen['modificados']} modificadas, "
+            f"{velocidad:.0f} filas/s, ETA {eta}"
+        )
+
+    if resumen['estado'] == 'completada' and not dry_run:
+        _guardar_punto(nombre, ultimo_id, procesados_previos + resumen['procesados'],
+                       modificados_previos + resumen['modificados'], fecha_inicio, completada=True)
+        db.session.commit()
+
+    resumen['segundos'] = round(time.monotonic() - inicio, 3)
+    resumen['filas_por_segundo'] = round(resumen['procesados'] / resumen['segundos'], 1) if resumen['segundos'] else 0.0
+    logger.info(f"Migración {nombre}: {resumen['estado']} en {_formatear_segundos(resumen['segundos'])} "
+                f"({resumen['procesados']} filas, {resumen['modificados']} modificadas)")
+    return resumen
+
+
+def _guardar_punto(nombre, ultimo_id, procesados, modificados, fecha_inicio, completada=False):
+    punto = db.session.get(Migraciones, nombre)
+    if punto is None:
+        punto = Migraciones(nombre=nombre)
+        db.session.add(punto)
+    ahora = datetime.now()
+    punto.ultimo_id = ultimo_id
+    punto.procesados = procesados
+    punto.modificados = modificados
+    punto.fecha_inicio = fecha_inicio
+    punto.fecha_actualizacion = ahora
+    punto.estado = 'completada' if completada else 'en_curso'
+    punto.fecha_fin = ahora if completada else None
+
+# =============================================================================
+# MIGRACIONES DE LA TABLA HOTELES
+# =============================================================================
+
+COLUMNAS_ESTRUCTURA_V2 = [
+    'slug', 'rating_score', 'rating_formatted', 'precio_amount', 'precio_formatted',
+    'precio_currency', 'stars_count', 'stars_formatted', 'fuente_principal', 'version_scraping',
+]
+
+
+@registrar_migracion('hoteles_estructura_v2', Hoteles)
+def migrar_hotel_estructura_v2(hotel):
+    """
+    Completa los campos de la estructura 2.0 a partir de los campos legacy
+    (antes migrate_existing_data en update_app_for_new_db.py)
+    """
+    antes = [getattr(hotel, c) for c in COLUMNAS_ESTRUCTURA_V2]
+
+    # Generar slug si no existe
+    if not hotel.slug:
+        hotel.slug = slugify(hotel.nombre) or f'hotel-{hotel.id_hotel}'
+
+    # Migrar rating si existe
+    if hotel.rating and not hotel.rating_score:
+        hotel.rating_score = hotel.rating
+        hotel.rating_formatted = f"{hotel.rating:.1f}/10"
+
+    # Migrar precio si existe
+    if hotel.precio_promedio and not hotel.precio_amount:
+        hotel.precio_amount = hotel.precio_promedio
+        hotel.precio_formatted = f"${hotel.precio_promedio:,}".replace(",", ".")
+        hotel.precio_currency = 'COP'
+
+    # Migrar estrellas si no existen
+    if not hotel.stars_count and hotel.nombre:
+        # Intentar extraer estrellas del nombre
+        nombre = hotel.nombre.lower()
+        hotel.stars_count = 0
+        for estrellas, palabra in ((5, 'cinco'), (4, 'cuatro'), (3, 'tres'), (2, 'dos'), (1, 'uno')):
+            if str(estrellas) in nombre or palabra in nombre:
+                hotel.stars_count = estrellas
+                break
+        if hotel.stars_count > 0:
+            hotel.stars_formatted = f"{hotel.stars_count} {'⭐' * hotel.stars_count}"
+        else:
+            hotel.stars_formatted = 'Sin clasificar'
+
+    # Establecer fuente principal y versión de scraping
+    if not hotel.fuente_principal:
+        hotel.fuente_principal = 'booking'
+    if not hotel.version_scraping:
+        hotel.version_scraping = '2.0'
+
+    return antes != [getattr(hotel, c) for c in COLUMNAS_ESTRUCTURA_V2]
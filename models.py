@@ -14,6 +14,9 @@ ESTRUCTURA DE LA BASE DE DATOS:
 - PreferenciasUsuario: Preferencias personalizadas de cada usuario
 - ReviewsScraping: Reviews scrapeados de sitios externos
 - CodigoVerificacion: Códigos para recuperación de contraseña
+- Trabajos: Trabajos en segundo plano (scraping lanzado desde el panel admin)
+- PreciosVentana: Precio de cada hotel por ventana de fechas (checkin/checkout)
+- Migraciones: Punto de control de las migraciones de datos por lotes
 
 AUTOR: Wilson Munoz Serrano
 FECHA: 1 mes jajaja y mucho desvelo
@@ -102,6 +105,7 @@ class Hoteles(db.Model):
     fecha_scraping = db.Column(db.DateTime)  # Fecha del scraping
     version_scraping = db.Column(db.String(20), default='2.0')  # Versión del scraper
     metadata_scraping = db.Column(db.Text)  # Metadatos adicionales
+    fecha_enriquecimiento = db.Column(db.DateTime, index=True)  # Última visita a la página de detalle
     
     # ===== CAMPOS LEGACY Y COMPATIBILIDAD =====
     rating = db.Column(db.Float)  # Rating legacy
@@ -213,6 +217,63 @@ class Hoteles(db.Model):
             except Exception:
                 return []
         return []
+    
+    def set_amenities_list(self, amenities):
+        """
+        Guarda una lista de amenities (texto separado por comas y JSON original)
+        
+        Args:
+            amenities: Lista de strings
+        """
+        self.amenities = ', '.join(amenities) if amenities else None
+        self.amenities_raw = json.dumps(amenities, ensure_ascii=False) if amenities else None
+    
+    def get_imagenes_list(self):
+        """
+        Obtiene la lista de URLs de imágenes
+        
+        Returns:
+            Lista de URLs guardada en JSON
+        """
+        if self.imagenes:
+            try:
+                return json.loads(self.imagenes)
+            except Exception:
+                return []
+        return []
+    
+    def set_imagenes_list(self, imagenes):
+        """Guarda la lista de URLs de imágenes en JSON"""
+        self.imagenes = json.dumps(imagenes, ensure_ascii=False) if imagenes else None
+    
+    def set_reviews_list(self, reviews):
+        """Guarda la lista de reviews en JSON"""
+        self.reviews = json.dumps(reviews, ensure_ascii=False) if reviews else None
+    
+    def get_metadata_dict(self):
+        """
+        Obtiene los metadatos de scraping como diccionario
+        
+        Returns:
+            Diccionario de metadatos (vacío si no hay o no es JSON válido)
+        """
+        if self.metadata_scraping:
+            try:
+                return json.loads(self.metadata_scraping)
+            except Exception:
+                return {}
+        return {}
+    
+    def set_metadata_dict(self, metadata):
+        """
+        Guarda los metadatos de scraping conservando la huella de contenido
+        de la ingesta (content_hash) si ya existía
+        """
+        metadata = dict(metadata or {})
+        huella = self.get_metadata_dict().get('content_hash')
+        if huella and 'content_hash' not in metadata:
+            metadata['content_hash'] = huella
+        self.metadata_scraping = json.dumps(metadata, ensure_ascii=False)
 
 # =============================================================================
 # MODELO VALORACIONES - OPINIONES DE USUARIOS
@@ -251,6 +312,9 @@ class InteraccionesUsuario(db.Model):
     - Valoraciones: Cuando un usuario valora un hotel
     - Favoritos: Cuando un usuario marca un hotel como favorito
     
+    Las vistas repetidas se agrupan: una fila por usuario, hotel y ventana de
+    EVENTOS_VENTANA_VISTAS minutos, y con el tiempo una por día (conteo).
+    
     RELACIONES:
     - Muchos a uno con Usuario (a través de id_usuario)
     - Muchos a uno con Hoteles (a través de id_hotel)
@@ -258,11 +322,21 @@ class InteraccionesUsuario(db.Model):
     __tablename__ = 'interacciones_usuario'
     
     id_interaccion = db.Column(db.Integer, primary_key=True)
-    id_usuario = db.Column(db.Integer, db.ForeignKey('usuario.id_usuario'), nullable=False, index=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuario.id_usuario'), nullable=False)
     id_hotel = db.Column(db.Integer, db.ForeignKey('hoteles.id_hotel'), nullable=False, index=True)
-    tipo_interaccion = db.Column(db.Enum('vista', 'valoracion', 'favorito'), nullable=False, index=True)
+    tipo_interaccion = db.Column(db.Enum('vista', 'valoracion', 'favorito'), nullable=False)
     valor = db.Column(db.Numeric(3,2), nullable=False)  # Valor numérico de la interacción
-    fecha_interaccion = db.Column(db.DateTime)  # Fecha y hora de la interacción
+    fecha_interaccion = db.Column(db.DateTime, index=True)  # Fecha y hora de la interacción (la última si conteo > 1)
+    conteo = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Vistas agrupadas en la fila
+    
+    # Los índices que empiezan por id_usuario cubren también las búsquedas
+    # por usuario; en MySQL la tabla se particiona por mes (particiones.py)
+    __table_args__ = (
+        db.Index('idx_interacciones_usuario_tipo', 'id_usuario', 'tipo_interaccion'),
+        db.Index('idx_interacciones_usuario_hotel_fecha', 'id_usuario', 'id_hotel', 'tipo_interaccion', 'fecha_interaccion'),
+        # Historial paginado por cursor (servicio_historial.py)
+        db.Index('idx_interacciones_usuario_fecha', 'id_usuario', 'fecha_interaccion'),
+    )
 
 # =============================================================================
 # MODELO PREFERENCIAS USUARIO - CONFIGURACIÓN PERSONAL
@@ -319,7 +393,7 @@ class Usuario(UserMixin, db.Model):
     
     # ===== CAMPOS PRINCIPALES =====
     id_usuario = db.Column(db.Integer, primary_key=True)
-    nombre_usuario = db.Column(db.String(100), nullable=False)
+    nombre_usuario = db.Column(db.String(100), nullable=False, index=True)  # Búsqueda por prefijo en el admin
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)  # Contraseña encriptada
     
@@ -395,4 +469,199 @@ class CodigoVerificacion(db.Model):
     codigo = db.Column(db.String(10), nullable=False)  # Código de verificación
     expiracion = db.Column(db.DateTime, nullable=False)  # Fecha de expiración
     usado = db.Column(db.Boolean, default=False)  # Si ya fue usado
-    fecha_envio = db.Column(db.DateTime, nullable=False) 
\ No newline at end of file
+    fecha_envio = db.Column(db.DateTime, nullable=False) 
+
+# =============================================================================
+# MODELO TRABAJOS - TRABAJOS EN SEGUNDO PLANO
+# =============================================================================
+
+class Trabajos(db.Model):
+    """
+    MODELO TRABAJOS
+    
+    Registra los trabajos que se ejecutan fuera de la petición HTTP
+    (por ejemplo el scraping lanzado desde el panel de administración).
+    La tabla es la cola persistente: guarda parámetros, estado, progreso,
+    resultado y la solicitud de cancelación.
+    
+    `clave_activa` tiene índice único y solo vale `clave` mientras el trabajo
+    está pendiente o en curso, así la base de datos garantiza un único
+    trabajo activo por clave (por ejemplo, un scraping por destino).
+    
+    RELACIONES:
+    - Muchos a uno con Usuario (a través de id_usuario, quien lo lanzó)
+    """
+    __tablename__ = 'trabajos'
+    
+    id_trabajo = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False, index=True)  # scraping, ...
+    clave = db.Column(db.String(255), index=True)  # Clave de concurrencia (ej: destino)
+    clave_activa = db.Column(db.String(255), unique=True)  # = clave mientras está activo
+    estado = db.Column(db.Enum('pendiente', 'en_curso', 'completado', 'fallido', 'cancelado'),
+                       nullable=False, default='pendiente', index=True)
+    parametros = db.Column(db.Text)  # Parámetros en JSON
+    resultado = db.Column(db.Text)  # Resultado en JSON
+    progreso = db.Column(db.Integer, default=0)  # Unidades procesadas
+    total = db.Column(db.Integer)  # Unidades esperadas (si se conocen)
+    mensaje = db.Column(db.String(255))  # Último mensaje o error
+    cancelar = db.Column(db.Boolean, default=False)  # Cancelación solicitada
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuario.id_usuario'))
+    
+    # ===== TIMESTAMPS =====
+    fecha_creacion = db.Column(db.DateTime)
+    fecha_inicio = db.Column(db.DateTime)
+    fecha_fin = db.Column(db.DateTime)
+    fecha_actualizacion = db.Column(db.DateTime)  # Latido del trabajador
+    
+    def get_parametros(self):
+        """
+        Obtiene los parámetros del trabajo como diccionario
+        """
+        if self.parametros:
+            try:
+                return json.loads(self.parametros)
+            except Exception:
+                return {}
+        return {}
+    
+    def to_dict(self):
+        """
+        Convierte el trabajo a un diccionario para la API JSON de estado
+        """
+        resultado = None
+        if self.resultado:
+            try:
+                resultado = json.loads(self.resultado)
+            except Exception:
+                resultado = None
+        
+        return {
+            'id': self.id_trabajo,
+            'tipo': self.tipo,
+            'clave': self.clave,
+            'estado': self.estado,
+            'parametros': self.get_parametros(),
+            'resultado': resultado,
+            'progreso': self.progreso or 0,
+            'total': self.total,
+            'mensaje': self.mensaje or '',
+            'cancelar': bool(self.cancelar),
+            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
+            'fecha_inicio': self.fecha_inicio.isoformat() if self.fecha_inicio else None,
+            'fecha_fin': self.fecha_fin.isoformat() if self.fecha_fin else None,
+        }
+
+# =============================================================================
+# MODELO PRECIOS VENTANA - PRECIOS POR FECHAS DE ESTADÍA
+# =============================================================================
+
+class PreciosVentana(db.Model):
+    """
+    MODELO PRECIOS VENTANA
+    
+    Guarda el precio de un hotel para una estadía concreta (checkin/checkout).
+    Lo mantiene el programador de scraping, que refresca los precios de
+    fechas cercanas con más frecuencia que los de fechas lejanas.
+    
+    RELACIONES:
+    - Muchos a uno con Hoteles (a través de id_hotel)
+    """
+    __tablename__ = 'precios_ventana'
+    __table_args__ = (
+        db.UniqueConstraint('id_hotel', 'checkin', 'checkout', name='uq_precios_ventana'),
+    )
+    
+    id_precio = db.Column(db.Integer, primary_key=True)
+    id_hotel = db.Column(db.Integer, db.ForeignKey('hoteles.id_hotel'), nullable=False, index=True)
+    checkin = db.Column(db.Date, nullable=False)
+    checkout = db.Column(db.Date, nullable=False)
+    precio_amount = db.Column(db.Integer)  # Precio en números
+    precio_currency = db.Column(db.String(10), default='COP')  # Moneda
+    precio_formatted = db.Column(db.String(50))  # Precio formateado
+    fecha_scraping = db.Column(db.DateTime)  # Fecha del scraping
+
+# =============================================================================
+# MODELOS ANALÍTICA - AGREGADOS POR HORA Y POR DÍA
+# =============================================================================
+
+class AnaliticaHora(db.Model):
+    """
+    MODELO ANALÍTICA HORA
+    
+    Eventos por hora, hotel y tipo (vista, favorito, valoracion), calculados
+    a partir de interacciones_usuario y valoraciones (ver analitica.py). Las
+    valoraciones se separan además por puntuación redondeada (0 en los
+    demás tipos). Las últimas horas se recalculan en cada pasada.
+    """
+    __tablename__ = 'analitica_hora'
+    
+    periodo = db.Column(db.DateTime, primary_key=True)  # Inicio de la hora
+    id_hotel = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.Enum('vista', 'favorito', 'valoracion'), primary_key=True)
+    puntuacion = db.Column(db.SmallInteger, primary_key=True, default=0)
+    eventos = db.Column(db.Integer, nullable=False, default=0)  # Vistas (con conteo), favoritos o valoraciones
+    suma_puntuacion = db.Column(db.Float, nullable=False, default=0)  # Para la puntuación media
+
+
+class AnaliticaDia(db.Model):
+    """
+    MODELO ANALÍTICA DÍA
+    
+    Los mismos agregados que AnaliticaHora sumados por día. El panel de
+    analítica solo lee estas dos tablas.
+    """
+    __tablename__ = 'analitica_dia'
+    __table_args__ = (
+        db.Index('idx_analitica_dia_hotel', 'id_hotel', 'fecha'),
+    )
+    
+    fecha = db.Column(db.Date, primary_key=True)
+    id_hotel = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.Enum('vista', 'favorito', 'valoracion'), primary_key=True)
+    puntuacion = db.Column(db.SmallInteger, primary_key=True, default=0)
+    eventos = db.Column(db.Integer, nullable=False, default=0)
+    suma_puntuacion = db.Column(db.Float, nullable=False, default=0)
+
+# =============================================================================
+# MODELO TENDENCIAS HOTEL - CONTADORES DE POPULARIDAD CON DECAIMIENTO
+# =============================================================================
+
+class TendenciasHotel(db.Model):
+    """
+    MODELO TENDENCIAS HOTEL
+    
+    Snapshot de los contadores de tendencias.py: vistas, favoritos y
+    valoraciones con decaimiento exponencial, valores a la fecha de
+    'actualizado'. Cada proceso suma aquí sus incrementos y relee la tabla.
+    """
+    __tablename__ = 'tendencias_hotel'
+    
+    id_hotel = db.Column(db.Integer, primary_key=True)
+    vistas = db.Column(db.Float, nullable=False, default=0)
+    favoritos = db.Column(db.Float, nullable=False, default=0)
+    valoraciones = db.Column(db.Float, nullable=False, default=0)
+    suma_puntuacion = db.Column(db.Float, nullable=False, default=0)
+    actualizado = db.Column(db.DateTime, nullable=False)
+
+# =============================================================================
+# MODELO MIGRACIONES - PUNTO DE CONTROL DE MIGRACIONES DE DATOS
+# =============================================================================
+
+class Migraciones(db.Model):
+    """
+    MODELO MIGRACIONES
+    
+    Una fila por migración de datos (ver migraciones.py). Guarda el último id
+    procesado, que se actualiza en la misma transacción que cada lote, así una
+    migración interrumpida continúa desde el último lote confirmado.
+    """
+    __tablename__ = 'migraciones'
+    
+    nombre = db.Column(db.String(100), primary_key=True)
+    estado = db.Column(db.Enum('en_curso', 'completada'), nullable=False, default='en_curso')
+    ultimo_id = db.Column(db.Integer, nullable=False, default=0)  # Último id confirmado
+    procesados = db.Column(db.Integer, nullable=False, default=0)  # Filas recorridas
+    modificados = db.Column(db.Integer, nullable=False, default=0)  # Filas cambiadas
+    fecha_inicio = db.Column(db.DateTime)
+    fecha_actualizacion = db.Column(db.DateTime)
+    fecha_fin = db.Column(db.DateTime)
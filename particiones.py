@@ -0,0 +1,395 @@
+"""
+PARTICIONES Y RETENCIÓN DE INTERACCIONES - SISTEMA RECOMENDADOR DE HOTELES
+==========================================================================
+
+Este archivo contiene el particionado mensual de `interacciones_usuario` por
+fecha_interaccion y la política de retención por tipo de interacción.
+
+CARACTERÍSTICAS:
+- MySQL: particiones RANGE por mes (pAAAAMM) más una partición pfuturo;
+  crear_particiones() particiona la tabla la primera vez y después agrega
+  los meses que faltan partiendo pfuturo (que está vacía, así que es rápido)
+- Retención por tipo (INTERACCIONES_RETENCION, p. ej. 'vista:365'); los
+  tipos sin retención se guardan para siempre. La unidad es el mes completo
+- Un mes vencido para todos sus tipos se elimina con DROP PARTITION, sin
+  borrar fila a fila; si solo vencen algunos tipos se borran por lotes
+  dentro del mes (MySQL solo recorre esa partición)
+- SQLite (y MySQL sin particionar): los meses vencidos se borran por lotes
+  usando el índice de fecha
+- Archivo opcional antes de borrar: un archivo SQLite por mes
+  (INTERACCIONES_ARCHIVO_DIR/interacciones_AAAAMM.db), que se consulta con
+  cualquier cliente SQLite y se elimina entero cuando ya no sirve
+- Modo simulación (dry-run) que solo informa qué se haría
+
+LIMITACIONES DE MYSQL:
+- Una tabla particionada no admite claves foráneas: crear_particiones()
+  quita las de id_usuario e id_hotel. Las rutas que eliminan usuarios ya
+  borran sus interacciones de forma explícita
+- Toda clave única debe incluir la columna de particionado: la clave
+  primaria pasa a ser (id_interaccion, fecha_interaccion), que deja de
+  admitir NULL
+
+USO:
+    crear_particiones(meses_adelante=3)     # `flask particiones --crear`
+    aplicar_retencion(archivar=True)         # `flask retencion`
+
+VERSIÓN: 2.0
+"""
+
+from datetime import date, datetime, timedelta
+import logging
+import os
+import sqlite3
+
+from flask import current_app
+from sqlalchemy import func, select, text
+
+from models import db, InteraccionesUsuario
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+TABLA = 'interacciones_usuario'
+
+# Retención por defecto: tipo -> días (los tipos que no aparecen no vencen)
+RETENCION = 'vista:365'
+
+# Meses futuros con partición propia
+MESES_ADELANTE = 3
+
+# Filas por lote en los borrados y en el archivo
+LOTE_RETENCION = 1000
+
+# Columnas que se copian al archivo mensual
+COLUMNAS_ARCHIVO = ('id_interaccion', 'id_usuario', 'id_hotel', 'tipo_interaccion',
+                    'valor', 'fecha_interaccion', 'conteo')
+
+# =============================================================================
+# MESES
+# =============================================================================
+
+def inicio_mes(fecha):
+    """Primer día del mes de la fecha"""
+    return date(fecha.year, fecha.month, 1)
+
+
+def mes_siguiente(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def nombre_particion(mes):
+    return f'p{mes:%Y%m}'
+
+
+def _rango(mes):
+    """Límites [desde, hasta) del mes como datetime"""
+    return (datetime.combine(mes, datetime.min.time()),
+            datetime.combine(mes_siguiente(mes), datetime.min.time()))
+
+
+def retencion_configurada():
+    """
+    Retención por tipo de interacción según INTERACCIONES_RETENCION
+
+    Returns:
+        Diccionario tipo -> días (solo los tipos que vencen)
+    """
+    texto = current_app.config.get('INTERACCIONES_RETENCION', RETENCION) or ''
+    retencion = {}
+    for parte in texto.split(','):
+        if ':' not in parte:
+            continue
+        tipo, dias = (p.strip() for p in parte.split(':', 1))
+        if tipo and int(dias) > 0:
+            retencion[tipo] = int(dias)
+    return retencion
+
+
+def mes_vencido(mes, dias, ahora):
+    """True si el mes completo es anterior al límite de retención"""
+    return mes_siguiente(mes) <= (ahora - timedelta(days=dias)).date()
+
+# =============================================================================
+# PARTICIONES DE MYSQL
+# =============================================================================
+
+def _es_mysql():
+    return db.engine.dialect.name == 'mysql'
+
+
+def _definicion(mes):
+    return f"PARTITION {nombre_particion(mes)} VALUES LESS THAN (TO_DAYS('{mes_siguiente(mes):%Y-%m-%d}'))"
+
+
+def sql_particionar(meses):
+    """ALTER TABLE que particiona la tabla con un rango por mes más pfuturo"""
+    definiciones = [_definicion(mes) for mes in meses] + ['PARTITION pfuturo VALUES LESS THAN MAXVALUE']
+    return (f"ALTER TABLE {TABLA} PARTITION BY RANGE (TO_DAYS(fecha_interaccion)) (\n    "
+            + ",\n    ".join(definiciones) + "\n)")
+
+
+def sql_agregar_meses(meses):
+    """ALTER TABLE que parte pfuturo para agregar los meses indicados"""
+    definiciones = [_definicion(mes) for mes in meses] + ['PARTITION pfuturo VALUES LESS THAN MAXVALUE']
+    return (f"ALTER TABLE {TABLA} REORGANIZE PARTITION pfuturo INTO (\n    "
+            + ",\n    ".join(definiciones) + "\n)")
+
+
+def particiones_mysql():
+    """
+    Particiones mensuales actuales de la tabla (vacío si no está particionada)
+
+    Returns:
+        Diccionario mes (date) -> filas estimadas
+    """
+    filas = db.session.execute(text(
+        "SELECT PARTITION_NAME, TABLE_ROWS FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla AND PARTITION_NAME IS NOT NULL"
+    ), {'tabla': TABLA}).all()
+    particiones = {}
+    for nombre, filas_estimadas in filas:
+        if nombre.startswith('p') and nombre[1:].isdigit():
+            particiones[date(int(nombre[1:5]), int(nombre[5:7]), 1)] = filas_estimadas or 0
+    return particiones
+
+
+def _meses_entre(desde, hasta):
+    meses = []
+    mes = desde
+    while mes <= hasta:
+        meses.append(mes)
+        mes = mes_siguiente(mes)
+    return meses
+
+
+def crear_particiones(meses_adelante=MESES_ADELANTE, ahora=None):
+    """
+    Particiona la tabla por mes (la primera vez) o agrega los meses que faltan
+
+    Solo aplica a MySQL; en otros motores no hace nada.
+
+    Returns:
+        Lista de particiones creadas
+    """
+    if not _es_mysql():
+        logger.info("Particiones: el motor no es MySQL, se usa el borrado por meses")
+        return []
+
+    ahora = ahora or datetime.now()
+    ultimo = inicio_mes(ahora)
+    for _ in range(meses_adelante):
+        ultimo = mes_siguiente(ultimo)
+
+    existentes = particiones_mysql()
+    if existentes:
+        nuevos = _meses_entre(mes_siguiente(max(existentes)), ultimo)
+        if nuevos:
+            db.session.execute(text(sql_agregar_meses(nuevos)))
+        return [nombre_particion(mes) for mes in nuevos]
+
+    # Primera vez: fechas obligatorias, sin claves foráneas y clave primaria con la fecha
+    db.session.execute(text(f"UPDATE {TABLA} SET fecha_interaccion = NOW() WHERE fecha_interaccion IS NULL"))
+    db.session.commit()
+    claves = db.session.execute(text(
+        "SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS "
+        "WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = :tabla"
+    ), {'tabla': TABLA}).scalars().all()
+    for clave in claves:
+        db.session.execute(text(f"ALTER TABLE {TABLA} DROP FOREIGN KEY {clave}"))
+    db.session.execute(text(
+        f"ALTER TABLE {TABLA} MODIFY fecha_interaccion DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+        f"DROP PRIMARY KEY, ADD PRIMARY KEY (id_interaccion, fecha_interaccion)"
+    ))
+
+    primera = db.session.execute(select(func.min(InteraccionesUsuario.fecha_interaccion))).scalar()
+    meses = _meses_entre(inicio_mes(primera or ahora), ultimo)
+    db.session.execute(text(sql_particionar(meses)))
+    logger.info(f"Particiones: {TABLA} particionada en {len(meses)} meses")
+    return [nombre_particion(mes) for mes in meses]
+
+# =============================================================================
+# ARCHIVO MENSUAL
+# =============================================================================
+
+def ruta_archivo(directorio, mes):
+    return os.path.join(directorio, f'interacciones_{mes:%Y%m}.db')
+
+
+def archivar_mes(mes, tipos, directorio, tamano_lote=LOTE_RETENCION):
+    """
+    Copia las interacciones del mes y tipos indicados a su archivo SQLite
+
+    Se puede repetir: las filas ya archivadas (mismo id) se ignoran.
+
+    Returns:
+        Número de filas copiadas
+    """
+    os.makedirs(directorio, exist_ok=True)
+    desde, hasta = _rango(mes)
+    columnas = [getattr(InteraccionesUsuario, c) for c in COLUMNAS_ARCHIVO]
+    copiadas, ultimo = 0, 0
+
+    conexion = sqlite3.connect(ruta_archivo(directorio, mes))
+    try:
+        conexion.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABLA} (id_interaccion INTEGER PRIMARY KEY, id_usuario INTEGER, "
+            f"id_hotel INTEGER, tipo_interaccion TEXT, valor REAL, fecha_interaccion TEXT, conteo INTEGER)"
+        )
+        while True:
+            filas = db.session.execute(
+                select(*columnas)
+                .where(
+                    InteraccionesUsuario.fecha_interaccion >= desde,
+                    InteraccionesUsuario.fecha_interaccion < hasta,
+                    InteraccionesUsuario.tipo_interaccion.in_(tipos),
+                    InteraccionesUsuario.id_interaccion > ultimo,
+                )
+                .order_by(InteraccionesUsuario.id_interaccion)
+                .limit(tamano_lote)
+            ).all()
+            if not filas:
+                break
+            conexion.executemany(
+                f"INSERT OR IGNORE INTO {TABLA} VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(f.id_interaccion, f.id_usuario, f.id_hotel, f.tipo_interaccion,
+                  float(f.valor) if f.valor is not None else None,
+                  f.fecha_interaccion.isoformat(sep=' ') if f.fecha_interaccion else None,
+                  f.conteo) for f in filas]
+            )
+            conexion.commit()
+            copiadas += len(filas)
+            ultimo = filas[-1].id_interaccion
+    finally:
+        conexion.close()
+    return copiadas
+
+# =============================================================================
+# RETENCIÓN
+# =============================================================================
+
+def _borrar_por_lotes(mes, tipos, tamano_lote=LOTE_RETENCION):
+    desde, hasta = _rango(mes)
+    borradas = 0
+    while True:
+        ids = db.session.execute(
+            select(InteraccionesUsuario.id_interaccion)
+            .where(
+                InteraccionesUsuario.fecha_interaccion >= desde,
+                InteraccionesUsuario.fecha_interaccion < hasta,
+                InteraccionesUsuario.tipo_interaccion.in_(tipos),
+            )
+            .limit(tamano_lote)
+        ).scalars().all()
+        if not ids:
+            return borradas
+        db.session.execute(
+            InteraccionesUsuario.__table__.delete().where(InteraccionesUsuario.id_interaccion.in_(ids))
+        )
+        db.session.commit()
+        borradas += len(ids)
+
+
+def _meses_candidatos(particionada, ahora, dias_minimos):
+    """Meses que podrían tener algo vencido, del más antiguo al más reciente"""
+    limite = inicio_mes(ahora - timedelta(days=dias_minimos))
+    if particionada:
+        return sorted(mes for mes in particionada if mes < limite)
+    primera = db.session.execute(select(func.min(InteraccionesUsuario.fecha_interaccion))).scalar()
+    if primera is None:
+        return []
+    return [mes for mes in _meses_entre(inicio_mes(primera), limite) if mes < limite]
+
+
+def aplicar_retencion(ahora=None, archivar=None, dry_run=False, tamano_lote=LOTE_RETENCION):
+    """
+    Elimina (y opcionalmente archiva) los meses vencidos según la retención por tipo
+
+    Args:
+        ahora: Fecha de referencia (por defecto datetime.now())
+        archivar: Directorio del archivo mensual; None toma
+            INTERACCIONES_ARCHIVO_DIR y '' no archiva
+        dry_run: Solo informar lo que se haría
+        tamano_lote: Filas por lote en borrados y archivo
+
+    Returns:
+        Lista de acciones: diccionarios con mes ('AAAA-MM'), accion
+        ('drop_partition' o 'delete'), tipos, filas y archivo
+    """
+    ahora = ahora or datetime.now()
+    retencion = retencion_configurada()
+    if not retencion:
+        return []
+    if archivar is None:
+        archivar = current_app.config.get('INTERACCIONES_ARCHIVO_DIR') or ''
+
+    particionada = particiones_mysql() if _es_mysql() else {}
+    acciones = []
+    for mes in _meses_candidatos(particionada, ahora, min(retencion.values())):
+        desde, hasta = _rango(mes)
+        conteos = dict(db.session.execute(
+            select(InteraccionesUsuario.tipo_interaccion, func.count())
+            .where(InteraccionesUsuario.fecha_interaccion >= desde,
+                   InteraccionesUsuario.fecha_interaccion < hasta)
+            .group_by(InteraccionesUsuario.tipo_interaccion)
+        ).all())
+        vencidos = sorted(tipo for tipo, dias in retencion.items() if mes_vencido(mes, dias, ahora))
+        tipos = [tipo for tipo in vencidos if conteos.get(tipo)]
+        todo_vencido = set(conteos) <= set(vencidos)
+        if not tipos and not (particionada and todo_vencido and mes in particionada):
+            continue
+
+        accion = {
+            'mes': f'{mes:%Y-%m}',
+            'accion': 'drop_partition' if particionada and todo_vencido and mes in particionada else 'delete',
+            'tipos': tipos,
+            'filas': sum(conteos.get(tipo, 0) for tipo in tipos),
+            'archivo': ruta_archivo(archivar, mes) if archivar and tipos else None,
+        }
+        acciones.append(accion)
+        if dry_run:
+            continue
+
+        if accion['archivo']:
+            archivar_mes(mes, tipos, archivar, tamano_lote)
+        if accion['accion'] == 'drop_partition':
+            db.session.execute(text(f"ALTER TABLE {TABLA} DROP PARTITION {nombre_particion(mes)}"))
+        else:
+            _borrar_por_lotes(mes, tipos, tamano_lote)
+        db.session.commit()
+        logger.info(f"Retención: {accion['mes']} {accion['accion']} ({', '.join(tipos) or 'vacía'}, "
+                    f"{accion['filas']} filas{', archivadas' if accion['archivo'] else ''})")
+    return acciones
+
+
+def estado_meses():
+    """
+    Filas por mes y tipo en la tabla más los meses archivados
+
+    Returns:
+        Diccionario con meses ('AAAA-MM' -> {tipo: filas}), particionada y archivados
+    """
+    if _es_mysql():
+        mes = func.date_format(InteraccionesUsuario.fecha_interaccion, '%Y-%m')
+    else:
+        mes = func.strftime('%Y-%m', InteraccionesUsuario.fecha_interaccion)
+    meses = {}
+    for clave, tipo, filas in db.session.execute(
+        select(mes, InteraccionesUsuario.tipo_interaccion, func.count())
+        .group_by(mes, InteraccionesUsuario.tipo_interaccion)
+        .order_by(mes)
+    ).all():
+        meses.setdefault(clave or 'sin fecha', {})[tipo] = filas
+
+    directorio = current_app.config.get('INTERACCIONES_ARCHIVO_DIR') or ''
+    archivados = []
+    if directorio and os.path.isdir(directorio):
+        archivados = sorted(f[len('interacciones_'):-len('.db')] for f in os.listdir(directorio)
+                            if f.startswith('interacciones_') and f.endswith('.db'))
+    return {
+        'meses': meses,
+        'particionada': bool(_es_mysql() and particiones_mysql()),
+        'archivados': archivados,
+    }
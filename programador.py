@@ -0,0 +1,282 @@
+"""
+PROGRAMADOR DE SCRAPING - SISTEMA RECOMENDADOR DE HOTELES
+=========================================================
+
+Este archivo decide qué trabajos de scraping toca encolar y cuándo, para
+varios destinos y varias ventanas de fechas, sin repetir trabajo reciente.
+
+CARACTERÍSTICAS:
+- Destinos, ventanas de llegada y noches configurables (SCRAPING_DESTINOS,
+  SCRAPING_VENTANAS, SCRAPING_NOCHES)
+- Scraping completo semanal por destino (tarjetas, descripciones, imágenes)
+- Refresco de precios por ventana con cadencia según cercanía de la fecha:
+  llegadas próximas se refrescan más seguido que las lejanas
+- Prioridad a los hoteles más vistos: el refresco de precios se corta en
+  cuanto se encontraron todos
+- El estado de la última ejecución sale de la tabla `trabajos`, así que el
+  programador no guarda estado propio y puede reiniciarse en cualquier momento
+- Enriquecimiento continuo con la página de detalle de cada hotel
+- Compactación diaria de las vistas antiguas (eventos.compactar_vistas)
+- Retención diaria de interacciones por mes (particiones.py)
+- Registro de tareas periódicas para que otras etapas agreguen las suyas
+
+VERSIÓN: 2.0
+"""
+
+from datetime import date, datetime, timedelta
+import logging
+import time
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from models import db, Hoteles, InteraccionesUsuario, Trabajos
+from ingesta import slugify
+from trabajos import encolar_trabajo, TrabajoEnCurso
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Cada cuánto se repite el scraping completo de un destino
+INTERVALO_COMPLETO = timedelta(days=7)
+
+# Cadencia del refresco de precios según los días que faltan para la llegada:
+# (días máximos hasta el checkin, intervalo entre refrescos)
+CADENCIA_PRECIOS = [
+    (7, timedelta(hours=6)),
+    (30, timedelta(hours=24)),
+]
+CADENCIA_PRECIOS_LEJANA = timedelta(hours=72)
+
+# Hoteles prioritarios por destino y periodo de vistas considerado
+HOTELES_PRIORITARIOS = 30
+DIAS_POPULARIDAD = 14
+
+# Límite de hoteles por recorrido
+LIMITE_COMPLETO = 200
+LIMITE_PRECIOS = 100
+
+# Pasadas de enriquecimiento (páginas de detalle)
+INTERVALO_ENRIQUECIMIENTO = timedelta(hours=1)
+LIMITE_ENRIQUECIMIENTO = 100
+
+# Compactación de vistas antiguas y retención en interacciones_usuario
+INTERVALO_COMPACTACION = timedelta(days=1)
+INTERVALO_RETENCION = timedelta(days=1)
+
+# Agregados del panel de analítica
+INTERVALO_ANALITICA = timedelta(minutes=15)
+
+# Tareas periódicas registradas: nombre -> función(ahora) que devuelve
+# una lista de (tipo, parametros, clave)
+_tareas = {}
+
+
+def registrar_tarea(nombre):
+    """
+    Decorador que registra una tarea periódica del programador
+
+    La función recibe la fecha actual y devuelve los trabajos a encolar
+    como tuplas (tipo, parametros, clave).
+    """
+    def decorador(funcion):
+        _tareas[nombre] = funcion
+        return funcion
+    return decorador
+
+
+# =============================================================================
+# POLÍTICA DE REFRESCO
+# =============================================================================
+
+def intervalo_precios(dias_hasta_checkin):
+    """
+    Devuelve cada cuánto se refrescan los precios de una ventana
+
+    Args:
+        dias_hasta_checkin: Días desde hoy hasta la fecha de llegada
+
+    Returns:
+        timedelta con el intervalo entre refrescos
+    """
+    for dias_maximos, intervalo in CADENCIA_PRECIOS:
+        if dias_hasta_checkin <= dias_maximos:
+            return intervalo
+    return CADENCIA_PRECIOS_LEJANA
+
+
+def ultima_ejecucion(clave):
+    """
+    Fecha de creación del último trabajo no cancelado con esa clave
+
+    Los trabajos fallidos cuentan como ejecutados para que un destino que
+    falla no se reintente en cada ciclo; se reintenta en la siguiente cadencia.
+    """
+    return db.session.execute(
+        select(func.max(Trabajos.fecha_creacion)).where(
+            Trabajos.clave == clave,
+            Trabajos.estado != 'cancelado'
+        )
+    ).scalar()
+
+
+def _vencido(clave, intervalo, ahora):
+    ultima = ultima_ejecucion(clave)
+    return ultima is None or ahora - ultima >= intervalo
+
+
+def hoteles_prioritarios(destino, limite=HOTELES_PRIORITARIOS, dias=DIAS_POPULARIDAD, ahora=None):
+    """
+    Slugs de los hoteles más vistos de un destino en los últimos días
+
+    Args:
+        destino: Texto del destino (se busca en la ubicación del hotel)
+        limite: Número máximo de hoteles
+        dias: Periodo de vistas considerado
+
+    Returns:
+        Lista de slugs ordenada por número de vistas
+    """
+    desde = (ahora or datetime.now()) - timedelta(days=dias)
+    vistas = func.sum(InteraccionesUsuario.conteo)
+    return list(db.session.execute(
+        select(Hoteles.slug)
+        .join(InteraccionesUsuario, InteraccionesUsuario.id_hotel == Hoteles.id_hotel)
+        .where(
+            InteraccionesUsuario.tipo_interaccion == 'vista',
+            InteraccionesUsuario.fecha_interaccion >= desde,
+            Hoteles.ubicacion.ilike(f'%{destino}%')
+        )
+        .group_by(Hoteles.slug)
+        .order_by(vistas.desc())
+        .limit(limite)
+    ).scalars())
+
+
+def _lista_config(nombre):
+    return [v.strip() for v in str(current_app.config.get(nombre) or '').split(',') if v.strip()]
+
+
+# =============================================================================
+# TAREAS PERIÓDICAS DE SCRAPING
+# =============================================================================
+
+@registrar_tarea('scraping_completo')
+def tarea_scraping_completo(ahora):
+    """Scraping completo semanal de cada destino configurado"""
+    trabajos = []
+    for destino in _lista_config('SCRAPING_DESTINOS'):
+        clave = f'scraping:{slugify(destino)}'
+        if _vencido(clave, INTERVALO_COMPLETO, ahora):
+            trabajos.append(('scraping', {'destino': destino, 'hotel_limit': LIMITE_COMPLETO}, clave))
+    return trabajos
+
+
+@registrar_tarea('scraping_precios')
+def tarea_scraping_precios(ahora):
+    """Refresco de precios de cada destino y ventana según su cadencia"""
+    noches = int(current_app.config.get('SCRAPING_NOCHES') or 1)
+    hoy = ahora.date() if isinstance(ahora, datetime) else date.today()
+    trabajos = []
+    for destino in _lista_config('SCRAPING_DESTINOS'):
+        prioritarios = None
+        for ventana in _lista_config('SCRAPING_VENTANAS'):
+            dias = int(ventana)
+            clave = f'precios:{slugify(destino)}:{dias}'
+            if not _vencido(clave, intervalo_precios(dias), ahora):
+                continue
+            if prioritarios is None:
+                prioritarios = hoteles_prioritarios(destino, ahora=ahora)
+            checkin = hoy + timedelta(days=dias)
+            trabajos.append(('scraping_precios', {
+                'destino': destino,
+                'checkin': checkin.isoformat(),
+                'checkout': (checkin + timedelta(days=noches)).isoformat(),
+                'hotel_limit': LIMITE_PRECIOS,
+                'prioritarios': prioritarios,
+            }, clave))
+    return trabajos
+
+
+@registrar_tarea('enriquecimiento')
+def tarea_enriquecimiento(ahora):
+    """Pasada periódica de enriquecimiento con la página de detalle"""
+    if _vencido('enriquecimiento', INTERVALO_ENRIQUECIMIENTO, ahora):
+        return [('enriquecimiento', {'limite': LIMITE_ENRIQUECIMIENTO}, 'enriquecimiento')]
+    return []
+
+
+@registrar_tarea('compactacion_vistas')
+def tarea_compactacion_vistas(ahora):
+    """Compactación diaria de las vistas antiguas a una fila por usuario, hotel y día"""
+    if _vencido('compactacion_vistas', INTERVALO_COMPACTACION, ahora):
+        return [('compactacion_vistas', {}, 'compactacion_vistas')]
+    return []
+
+
+@registrar_tarea('retencion_interacciones')
+def tarea_retencion_interacciones(ahora):
+    """Particiones de los próximos meses y borrado de los meses vencidos, una vez al día"""
+    if _vencido('retencion_interacciones', INTERVALO_RETENCION, ahora):
+        return [('retencion_interacciones', {}, 'retencion_interacciones')]
+    return []
+
+
+@registrar_tarea('analitica')
+def tarea_analitica(ahora):
+    """Actualización incremental de los agregados por hora y día del panel de analítica"""
+    if _vencido('analitica', INTERVALO_ANALITICA, ahora):
+        return [('analitica', {}, 'analitica')]
+    return []
+
+
+# =============================================================================
+# CICLO DEL PROGRAMADOR
+# =============================================================================
+
+def ciclo_programador(ahora=None):
+    """
+    Ejecuta una pasada de todas las tareas periódicas y encola lo que toque
+
+    Args:
+        ahora: Fecha de referencia (por defecto datetime.now())
+
+    Returns:
+        Lista de IDs de los trabajos encolados
+    """
+    ahora = ahora or datetime.now()
+    encolados = []
+    for nombre, tarea in _tareas.items():
+        try:
+            pendientes = tarea(ahora)
+        except Exception as e:
+            logger.error(f"Error en la tarea periódica {nombre}: {e}")
+            db.session.rollback()
+            continue
+        for tipo, parametros, clave in pendientes:
+            try:
+                trabajo = encolar_trabajo(tipo, parametros, clave=clave)
+                encolados.append(trabajo.id_trabajo)
+                logger.info(f"Programador: trabajo {trabajo.id_trabajo} ({tipo}, {clave}) encolado")
+            except TrabajoEnCurso:
+                logger.info(f"Programador: {clave} ya está en curso, se omite")
+    return encolados
+
+
+def bucle_programador(intervalo=300, una_vez=False):
+    """
+    Bucle del programador (se lanza con `flask programador`)
+
+    Args:
+        intervalo: Segundos entre pasadas
+        una_vez: Ejecutar una sola pasada y salir
+    """
+    logger.info("Programador de scraping iniciado")
+    while True:
+        ciclo_programador()
+        if una_vez:
+            return
+        time.sleep(intervalo)
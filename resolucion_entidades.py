@@ -0,0 +1,255 @@
+"""
+RESOLUCIÓN DE ENTIDADES DE HOTELES - SISTEMA RECOMENDADOR DE HOTELES
+===================================================================
+
+Este archivo contiene la etapa que detecta el mismo hotel en varias fuentes
+(Booking.com, Trivago...) y los combina en un solo registro.
+
+CARACTERÍSTICAS:
+- Bloqueo por tokens normalizados del nombre y por celda geohash cuando
+  hay coordenadas: solo se comparan hoteles que comparten un bloque
+- Los tokens demasiado frecuentes ("hotel", "cartagena"...) no forman bloque,
+  así el número de comparaciones crece casi linealmente
+- Similitud difusa con fuzzywuzzy (difflib si no está instalado)
+- La ubicación valida los candidatos: sin ningún token de ubicación en común
+  no hay coincidencia; en la misma celda geohash basta una similitud menor
+- El hotel combinado conserva precio y enlace de cada fuente
+
+VERSIÓN: 2.0
+"""
+
+from collections import defaultdict
+from difflib import SequenceMatcher
+import logging
+import re
+import unicodedata
+
+try:
+    from fuzzywuzzy import fuzz
+except ImportError:
+    fuzz = None
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Palabras que no identifican a un hotel
+STOPWORDS = {
+    'hotel', 'hoteles', 'hostal', 'hostel', 'apartamento', 'apartamentos', 'apartment',
+    'apartments', 'casa', 'suites', 'suite', 'boutique', 'resort', 'spa', 'the', 'by',
+    'el', 'la', 'los', 'las', 'de', 'del', 'y', 'en', 'and', 'of',
+}
+
+# Orden de preferencia de las fuentes al combinar campos
+SOURCE_PRIORITY = ['booking', 'trivago']
+
+# Similitud mínima (0-100) para considerar dos hoteles el mismo
+MATCH_THRESHOLD = 88
+# Similitud mínima si los dos hoteles están en la misma celda geohash
+MATCH_THRESHOLD_SAME_CELL = 60
+
+# Un token presente en más hoteles que esto no forma bloque
+MAX_BLOCK_SIZE = 50
+
+# Precisión del geohash para bloquear por coordenadas (7 ≈ 150 m)
+GEOHASH_PRECISION = 7
+
+_GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# =============================================================================
+# NORMALIZACIÓN
+# =============================================================================
+
+def normalize_text(text):
+    """Minúsculas, sin acentos y sin signos de puntuación"""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+
+def name_tokens(name):
+    """Tokens significativos del nombre de un hotel"""
+    return [t for t in normalize_text(name).split() if t not in STOPWORDS and len(t) > 1]
+
+
+def location_tokens(location):
+    """Tokens de la ubicación (barrio, ciudad) sin palabras vacías"""
+    return {t for t in normalize_text(location).split() if t not in STOPWORDS and len(t) > 2}
+
+
+def geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """
+    Codifica unas coordenadas en geohash
+
+    Returns:
+        String geohash de la precisión pedida
+    """
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    bits, bit, even, result = 0, 0, True, []
+    while len(result) < precision:
+        interval, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            interval[0] = mid
+        else:
+            bits <<= 1
+            interval[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            result.append(_GEOHASH_BASE32[bits])
+            bits, bit = 0, 0
+    return ''.join(result)
+
+
+def name_similarity(a, b):
+    """
+    Similitud 0-100 entre dos nombres normalizados (independiente del orden)
+
+    Equivale a fuzz.token_sort_ratio; se usa difflib si fuzzywuzzy no está.
+    """
+    if fuzz is not None:
+        return fuzz.token_sort_ratio(a, b, force_ascii=False, full_process=False)
+    a, b = ' '.join(sorted(a.split())), ' '.join(sorted(b.split()))
+    return round(100 * SequenceMatcher(None, a, b).ratio())
+
+# =============================================================================
+# COMBINACIÓN DE HOTELES
+# =============================================================================
+
+class HotelDataMerger:
+    """
+    Resolución de entidades entre fuentes
+
+    Uso:
+        merger = HotelDataMerger()
+        hoteles = merger.merge(booking_hotels + trivago_hotels)
+    """
+
+    def __init__(self, threshold=MATCH_THRESHOLD, max_block_size=MAX_BLOCK_SIZE):
+        self.threshold = threshold
+        self.max_block_size = max_block_size
+        self.comparisons = 0
+
+    def _blocks(self, records):
+        """Agrupa los índices de los hoteles por token de nombre y por geohash"""
+        blocks = defaultdict(list)
+        for i, record in enumerate(records):
+            for token in set(record['tokens']):
+                blocks[('n', token)].append(i)
+            if record['geohash']:
+                blocks[('g', record['geohash'])].append(i)
+        return [indices for indices in blocks.values() if 1 < len(indices) <= self.max_block_size]
+
+    def _is_match(self, a, b):
+        if a['source'] == b['source'] and a['name'] != b['name']:
+            # Una misma fuente no repite un hotel con otro nombre
+            return False
+        same_cell = a['geohash'] is not None and a['geohash'] == b['geohash']
+        if not same_cell and a['location'] and b['location'] and not (a['location'] & b['location']):
+            return False
+
+        # La ciudad o el barrio dentro del nombre ("Hilton Cartagena") no distingue hoteles
+        location = a['location'] | b['location']
+        name_a = ' '.join(t for t in a['tokens'] if t not in location) or a['name']
+        name_b = ' '.join(t for t in b['tokens'] if t not in location) or b['name']
+
+        self.comparisons += 1
+        score = name_similarity(name_a, name_b)
+        return score >= (MATCH_THRESHOLD_SAME_CELL if same_cell else self.threshold)
+
+    def find_clusters(self, hotels):
+        """
+        Agrupa los hoteles que son la misma entidad
+
+        Returns:
+            Lista de listas de índices (un grupo por hotel real)
+        """
+        records = []
+        for hotel in hotels:
+            lat, lon = hotel.get('latitude'), hotel.get('longitude')
+            records.append({
+                'name': ' '.join(name_tokens(hotel.get('name') or hotel.get('nombre'))),
+                'tokens': name_tokens(hotel.get('name') or hotel.get('nombre')),
+                'location': location_tokens(hotel.get('location')),
+                'source': hotel.get('source') or 'booking',
+                'geohash': geohash(lat, lon) if lat is not None and lon is not None else None,
+            })
+
+        # Union-find sobre los pares que coinciden dentro de cada bloque
+        parent = list(range(len(records)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        compared = set()
+        for indices in self._blocks(records):
+            for pos, i in enumerate(indices):
+                for j in indices[pos + 1:]:
+                    if (i, j) in compared or find(i) == find(j):
+                        continue
+                    compared.add((i, j))
+                    if records[i]['name'] and self._is_match(records[i], records[j]):
+                        parent[find(j)] = find(i)
+
+        clusters = defaultdict(list)
+        for i in range(len(records)):
+            clusters[find(i)].append(i)
+        return list(clusters.values())
+
+    @staticmethod
+    def merge_cluster(hotels):
+        """
+        Combina los registros de un mismo hotel
+
+        Los campos generales se toman de la fuente preferida y se completan con
+        las demás; precio y enlace se guardan por fuente.
+        """
+        ordered = sorted(hotels, key=lambda h: SOURCE_PRIORITY.index(h.get('source'))
+                         if h.get('source') in SOURCE_PRIORITY else len(SOURCE_PRIORITY))
+        merged = dict(ordered[0])
+        for other in ordered[1:]:
+            for key, value in other.items():
+                if merged.get(key) in (None, '', [], {}) and value not in (None, '', [], {}):
+                    merged[key] = value
+
+        prices, sources = {}, []
+        for hotel in ordered:
+            source = hotel.get('source') or 'booking'
+            if source not in sources:
+                sources.append(source)
+            if hotel.get('link') and not merged.get(f'link_{source}'):
+                merged[f'link_{source}'] = hotel['link']
+            if hotel.get('price_amount') is not None and source not in prices:
+                prices[source] = {
+                    'amount': hotel['price_amount'],
+                    'currency': hotel.get('price_currency', 'COP'),
+                    'formatted': hotel.get('price'),
+                }
+        merged['sources'] = sources
+        merged['prices_by_source'] = prices
+        return merged
+
+    def merge(self, hotels):
+        """
+        Deduplica una lista de hoteles de varias fuentes
+
+        Args:
+            hotels: Lista de diccionarios de hoteles (con clave 'source')
+
+        Returns:
+            Lista de hoteles combinados, en el orden de primera aparición
+        """
+        hotels = list(hotels)
+        self.comparisons = 0
+        clusters = sorted(self.find_clusters(hotels), key=min)
+        merged = [self.merge_cluster([hotels[i] for i in cluster]) for cluster in clusters]
+        logger.info(f"Resolución de entidades: {len(hotels)} registros -> {len(merged)} hoteles "
+                    f"({self.comparisons} comparaciones)")
+        return merged
@@ -7,9 +7,15 @@ de hoteles desde diferentes fuentes como Booking.com, Trivago, etc.
 
 CARACTERÍSTICAS:
 - Scraping automatizado de múltiples fuentes
+- Deduplicación entre fuentes (resolucion_entidades.HotelDataMerger)
+- Crawling paginado de Booking.com como generador (iter_booking_hotels)
 - Procesamiento y limpieza de datos
-- Extracción de amenities, precios, ratings
+- Extracción de amenities, precios, ratings (motor de reglas de extraccion.py)
 - Manejo de errores y reintentos
+- Cortesía adaptativa por host: clasifica las respuestas (ok, throttled,
+  blocked, captcha, empty) y ajusta la concurrencia con AIMD (HostBudget)
+- Capturas HTML de páginas y tarjetas fallidas en el archivo raw (archivo_raw.py)
+- Métricas por etapa: fetch, parse y extract (metricas.py)
 - Configuración flexible de parámetros
 
 FUENTES SOPORTADAS:
@@ -31,6 +37,15 @@ from datetime import datetime, timedelta
 import re
 from urllib.parse import urljoin, urlparse
 import logging
+import os
+import threading
+from contextlib import contextmanager
+
+from extraccion import extraer_campos, parsear_numero
+from archivo_raw import archivar
+from resolucion_entidades import HotelDataMerger
+from catalogo_json import escribir_hoteles, iterar_hoteles
+from metricas import METRICAS, medir, registrar_respuesta, registrar_tarjeta
 
 # =============================================================================
 # CONFIGURACIÓN Y CONSTANTES
@@ -54,6 +69,35 @@ HEADERS = {
 BOOKING_BASE_URL = "https://www.booking.com"
 TRIVAGO_BASE_URL = "https://www.trivago.com"
 
+# Resultados por página en la búsqueda de Booking.com (parámetro rows)
+BOOKING_RESULTS_PER_PAGE = 25
+
+# Espera antes de un reintento, en múltiplos del delay entre peticiones
+RETRY_DELAY_FACTOR = 2
+
+# Clasificación de respuestas (classify_response)
+THROTTLE_STATUS = {429, 503}
+BLOCK_STATUS = {401, 403}
+# Marcas de páginas de desafío (AWS WAF, DataDome, reCAPTCHA visible). Las
+# páginas normales de Booking también cargan challenge.js y el iframe de
+# recaptcha, así que no sirven como marca.
+CAPTCHA_MARKERS = (b'gokuProps', b'AwsWafIntegration.checkForceRefresh', b'captcha-delivery.com',
+                   b'g-recaptcha', b'/captcha/')
+# Respuestas que reducen la concurrencia del host y alargan sus esperas
+PENALTY_OUTCOMES = {'throttled', 'blocked', 'captcha', 'empty', 'error'}
+# Respuestas que no vale la pena reintentar enseguida con las mismas cabeceras
+NO_RETRY_OUTCOMES = {'blocked', 'captcha', 'client_error'}
+
+# Multiplicador máximo del delay entre peticiones tras penalizaciones
+MAX_BACKOFF_FACTOR = 16.0
+# Recuperación del multiplicador por cada respuesta sana
+BACKOFF_RECOVERY = 0.9
+
+# Puntuación sin más texto ("8,5"), para fuentes que no usan "Puntuación:"
+RATING_SOLO_NUMERO = re.compile(r'\s*(\d{1,2}(?:[.,]\d+)?)\s*')
+# Puntuación de otras webs ("Excepcional 9,9 29 comentarios externos")
+RATING_EXTERNO = re.compile(r'(\d{1,2}[.,]\d)\b')
+
 # =============================================================================
 # FUNCIONES AUXILIARES DE SCRAPING
 # =============================================================================
@@ -62,10 +106,16 @@ def get_random_delay():
     """
     Genera un delay aleatorio para evitar detección como bot
     
+    Los límites salen de SCRAPING_DELAY_MIN y SCRAPING_DELAY_MAX (variables
+    de entorno, las mismas de config.py); 0 y 0 desactivan la espera, por
+    ejemplo contra el servidor local de benchmark_scraper.py.
+    
     Returns:
-        Tiempo de espera en segundos (entre 1 y 3 segundos)
+        Tiempo de espera en segundos (entre 1 y 3 segundos por defecto)
     """
-    return random.uniform(1, 3)
+    minimo = float(os.environ.get('SCRAPING_DELAY_MIN') or 1.0)
+    maximo = float(os.environ.get('SCRAPING_DELAY_MAX') or 3.0)
+    return random.uniform(minimo, max(minimo, maximo))
 
 def clean_text(text):
     """
@@ -104,29 +154,11 @@ def extract_price(price_text):
     
     # Limpiar texto
     price_text = clean_text(price_text)
-    
-    # Extraer números
-    numbers = re.findall(r'[\d,]+', price_text)
-    if numbers:
-        # Tomar el primer número encontrado
-        amount_str = numbers[0].replace(',', '')
-        try:
-            amount = int(amount_str)
-        except ValueError:
-            amount = None
-    else:
-        amount = None
-    
-    # Determinar moneda
-    currency = 'COP'
-    if '$' in price_text or 'USD' in price_text:
-        currency = 'USD'
-    elif '€' in price_text or 'EUR' in price_text:
-        currency = 'EUR'
+    campos = extraer_campos(price_text)
     
     return {
-        'amount': amount,
-        'currency': currency,
+        'amount': campos.get('precio'),
+        'currency': campos.get('precio_moneda', 'COP'),
         'formatted': price_text
     }
 
@@ -139,37 +171,26 @@ def extract_rating(rating_text):
         
     Returns:
         Diccionario con información procesada del rating
+        (incluye reviews_count cuando el texto trae el número de comentarios)
     """
     if not rating_text:
-        return {'score': None, 'max_score': 10, 'formatted': ''}
+        return {'score': None, 'max_score': 10, 'reviews_count': None, 'formatted': ''}
     
     # Limpiar texto
     rating_text = clean_text(rating_text)
+    campos = extraer_campos(rating_text)
     
-    # Buscar patrones de rating
-    patterns = [
-        r'(\d+(?:\.\d+)?)\s*/\s*(\d+)',  # 8.5/10
-        r'(\d+(?:\.\d+)?)\s*de\s*(\d+)',  # 8.5 de 10
-        r'(\d+(?:\.\d+)?)',  # Solo número
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, rating_text)
-        if match:
-            try:
-                score = float(match.group(1))
-                max_score = int(match.group(2)) if len(match.groups()) > 1 else 10
-                return {
-                    'score': score,
-                    'max_score': max_score,
-                    'formatted': rating_text
-                }
-            except ValueError:
-                continue
+    score = campos.get('puntuacion')
+    if score is None:
+        # Solo número (el texto es únicamente la puntuación)
+        solo_numero = RATING_SOLO_NUMERO.fullmatch(rating_text)
+        if solo_numero:
+            score = parsear_numero(solo_numero.group(1))
     
     return {
-        'score': None,
-        'max_score': 10,
+        'score': score,
+        'max_score': campos.get('puntuacion_maxima', 10),
+        'reviews_count': campos.get('comentarios'),
         'formatted': rating_text
     }
 
@@ -190,30 +211,34 @@ def extract_stars(stars_text):
     stars_text = clean_text(stars_text)
     
     # Buscar número de estrellas
-    star_match = re.search(r'(\d+)\s*estrellas?', stars_text, re.IGNORECASE)
-    if star_match:
-        try:
-            count = int(star_match.group(1))
-            return {
-                'count': count,
-                'formatted': stars_text
-            }
-        except ValueError:
-            pass
-    
-    # Buscar estrellas con símbolos
-    star_symbols = stars_text.count('★') + stars_text.count('⭐')
-    if star_symbols > 0:
-        return {
-            'count': star_symbols,
-            'formatted': stars_text
-        }
+    count = extraer_campos(stars_text).get('estrellas')
+    if count is None:
+        # Buscar estrellas con símbolos
+        count = (stars_text.count('★') + stars_text.count('⭐')) or None
     
     return {
-        'count': None,
+        'count': count,
         'formatted': stars_text
     }
 
+def count_rating_icons(container):
+    """
+    Cuenta las estrellas (o cuadrados, en alojamientos no hoteleros) de una tarjeta
+    
+    Booking.com dibuja cada estrella como un div con iconos SVG, sin texto.
+    
+    Args:
+        container: Elemento HTML de la tarjeta del hotel
+        
+    Returns:
+        Número de estrellas o None si la tarjeta no las muestra
+    """
+    for testid in ('rating-stars', 'rating-squares'):
+        rating_element = container.find('div', {'data-testid': testid})
+        if rating_element:
+            return len(rating_element.find_all('div', recursive=False)) or None
+    return None
+
 def extract_amenities(amenities_elements):
     """
     Extrae y procesa amenities de los elementos HTML
@@ -239,116 +264,359 @@ def extract_amenities(amenities_elements):
     
     return amenities
 
-def make_request(url, retries=3):
+def classify_response(response):
+    """
+    Clasifica una respuesta HTTP para la cortesía adaptativa
+    
+    Args:
+        response: Objeto Response de requests
+        
+    Returns:
+        'ok', 'throttled' (429/503), 'blocked' (401/403), 'captcha' (página
+        de desafío aunque venga con 200), 'client_error' (otro 4xx) o 'error'
+    """
+    content = getattr(response, 'content', b'') or b''
+    if any(marker in content for marker in CAPTCHA_MARKERS):
+        return 'captcha'
+    status = response.status_code
+    if status in THROTTLE_STATUS:
+        return 'throttled'
+    if status in BLOCK_STATUS:
+        return 'blocked'
+    if 400 <= status < 500:
+        return 'client_error'
+    if status >= 500:
+        return 'error'
+    return 'ok'
+
+def get_retry_after(response):
+    """Segundos de la cabecera Retry-After (solo el formato numérico) o None"""
+    value = (getattr(response, 'headers', None) or {}).get('Retry-After')
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class HostBudget:
+    """
+    Presupuesto de peticiones por host
+    
+    Limita las peticiones simultáneas a un mismo host y separa el inicio de
+    peticiones consecutivas con un delay aleatorio (get_random_delay). Es
+    seguro entre hilos, así que varios workers pueden compartirlo.
+    
+    El límite se adapta como en AIMD: cada respuesta sana (report 'ok') suma
+    1/límite hasta max_concurrent, cada penalización (throttled, blocked,
+    captcha, empty, error) lo divide a la mitad, duplica el multiplicador del
+    delay y pausa el host (Retry-After si viene, si no un delay de reintento).
+    """
+    
+    def __init__(self, max_concurrent=2, delay=get_random_delay, min_concurrent=1,
+                 max_backoff=MAX_BACKOFF_FACTOR):
+        self.max_concurrent = max_concurrent
+        self.min_concurrent = min_concurrent
+        self.max_backoff = max_backoff
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._hosts = {}
+    
+    def _state(self, host):
+        # Llamar con self._lock tomado
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {
+                'condition': threading.Condition(self._lock),
+                'active': 0,
+                'limit': float(self.max_concurrent),
+                'backoff': 1.0,
+                'next_at': 0.0,
+            }
+        return state
+    
+    @contextmanager
+    def slot(self, url):
+        """Espera turno para pedir la URL y libera el turno al salir"""
+        host = urlparse(url).netloc
+        with self._lock:
+            state = self._state(host)
+            while state['active'] >= int(state['limit']):
+                state['condition'].wait()
+            state['active'] += 1
+            now = time.monotonic()
+            start = max(now, state['next_at'])
+            state['next_at'] = start + self.delay() * state['backoff']
+        
+        try:
+            if start > now:
+                time.sleep(start - now)
+            yield
+        finally:
+            with self._lock:
+                state['active'] -= 1
+                state['condition'].notify()
+    
+    def report(self, url, outcome, retry_after=None):
+        """
+        Ajusta el presupuesto del host según el resultado de una petición
+        
+        Args:
+            url: URL pedida
+            outcome: Resultado de classify_response (o 'empty' si la página no
+                traía tarjetas)
+            retry_after: Pausa pedida por el servidor, en segundos (opcional)
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            state = self._state(host)
+            if outcome == 'ok':
+                state['limit'] = min(float(self.max_concurrent), state['limit'] + 1.0 / state['limit'])
+                state['backoff'] = max(1.0, state['backoff'] * BACKOFF_RECOVERY)
+            elif outcome in PENALTY_OUTCOMES:
+                state['limit'] = max(float(self.min_concurrent), state['limit'] / 2)
+                state['backoff'] = min(self.max_backoff, state['backoff'] * 2)
+                pause = retry_after if retry_after is not None else (
+                    RETRY_DELAY_FACTOR * self.delay() * state['backoff'])
+                state['next_at'] = max(state['next_at'], time.monotonic() + pause)
+            state['condition'].notify_all()
+            limit, backoff = state['limit'], state['backoff']
+        
+        METRICAS.incrementar('scraper_fetch_outcomes_total', outcome=outcome)
+        METRICAS.fijar('scraper_host_concurrency_limit', limit, host=host)
+        METRICAS.fijar('scraper_host_backoff_factor', backoff, host=host)
+        if outcome in PENALTY_OUTCOMES:
+            logger.warning(f"{host}: respuesta {outcome}, concurrencia {limit:.2f}, delay x{backoff:.1f}")
+    
+    def status(self):
+        """Estado actual por host: límite, peticiones activas y multiplicador del delay"""
+        with self._lock:
+            return {host: {'limit': round(state['limit'], 2), 'active': state['active'],
+                           'backoff': round(state['backoff'], 2)}
+                    for host, state in self._hosts.items()}
+
+# Presupuesto compartido por todo el scraping (búsqueda y páginas de detalle)
+HOST_BUDGET = HostBudget()
+
+def make_request(url, params=None, retries=3):
     """
     Realiza una petición HTTP con reintentos y delays
     
+    Cada respuesta se clasifica (classify_response) y se reporta a HOST_BUDGET,
+    que decide cuánto esperar antes del siguiente intento. Bloqueos y páginas
+    de desafío no se reintentan: con las mismas cabeceras darían lo mismo.
+    
     Args:
         url: URL a consultar
+        params: Parámetros de query string (opcional)
         retries: Número de reintentos en caso de error
         
     Returns:
         Objeto Response de requests o None si falla
     """
     for attempt in range(retries):
+        if attempt:
+            METRICAS.incrementar('scraper_retries_total')
         try:
-            # Delay aleatorio para evitar detección
-            time.sleep(get_random_delay())
-            
-            # Realizar petición
-            response = requests.get(url, headers=HEADERS, timeout=30)
-            response.raise_for_status()
-            
-            return response
-            
+            # Esperar turno en el presupuesto del host (delay aleatorio entre peticiones)
+            with HOST_BUDGET.slot(url):
+                with medir('fetch'):
+                    response = requests.get(url, params=params, headers=HEADERS, timeout=30)
+            registrar_respuesta(response.status_code, len(response.content))
         except requests.RequestException as e:
+            registrar_respuesta('error')
+            HOST_BUDGET.report(url, 'error')
             logger.warning(f"Intento {attempt + 1} falló para {url}: {e}")
-            
-            if attempt < retries - 1:
-                # Esperar más tiempo antes del siguiente intento
-                time.sleep(random.uniform(2, 5))
-            else:
-                logger.error(f"Todos los intentos fallaron para {url}")
-                return None
+            continue
+        
+        outcome = classify_response(response)
+        HOST_BUDGET.report(url, outcome, get_retry_after(response))
+        if outcome == 'ok':
+            return response
+        
+        logger.warning(f"Intento {attempt + 1} falló para {url}: HTTP {response.status_code} ({outcome})")
+        if outcome in NO_RETRY_OUTCOMES:
+            logger.error(f"Respuesta {outcome} para {url}, no se reintenta")
+            return None
     
+    logger.error(f"Todos los intentos fallaron para {url}")
     return None
 
 # =============================================================================
 # SCRAPER DE BOOKING.COM
 # =============================================================================
 
-def scrape_booking_hotels(destino="Cartagena", checkin=None, checkout=None, hotel_limit=200):
+def build_booking_search_params(destino, checkin, checkout, offset=0, rows=BOOKING_RESULTS_PER_PAGE):
     """
-    SCRAPER PRINCIPAL DE BOOKING.COM
-    
-    Extrae información de hoteles desde Booking.com con los parámetros especificados.
+    Construye los parámetros de la búsqueda de Booking.com para una página
     
     Args:
         destino: Ciudad o destino a buscar
         checkin: Fecha de check-in (formato YYYY-MM-DD)
         checkout: Fecha de check-out (formato YYYY-MM-DD)
-        hotel_limit: Número máximo de hoteles a scrapear
+        offset: Posición del primer resultado de la página
+        rows: Número de resultados por página
         
     Returns:
-        Lista de diccionarios con información de hoteles
+        Diccionario con los parámetros de la petición
     """
-    logger.info(f"Iniciando scraping de Booking.com para {destino}")
-    
-    # Configurar fechas por defecto si no se proporcionan
-    if not checkin:
-        checkin = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
-    if not checkout:
-        checkout = (datetime.now() + timedelta(days=14)).strftime('%Y-%m-%d')
-    
-    # Construir URL de búsqueda
-    search_url = f"{BOOKING_BASE_URL}/searchresults.html"
-    params = {
+    return {
         'ss': destino,
         'checkin': checkin,
         'checkout': checkout,
         'group_adults': '2',
         'no_rooms': '1',
-        'selected_currency': 'COP'
+        'selected_currency': 'COP',
+        'offset': str(offset),
+        'rows': str(rows)
     }
+
+def parse_booking_results(content):
+    """
+    Parsea una página de resultados de Booking.com y obtiene las tarjetas de hoteles
     
-    # Realizar petición inicial
-    response = make_request(search_url, params=params)
-    if not response:
-        logger.error("No se pudo obtener la página de búsqueda")
-        return []
+    Args:
+        content: HTML de la página de resultados (bytes o str)
+        
+    Returns:
+        Lista de elementos HTML, uno por tarjeta de hotel
+    """
+    with medir('parse'):
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Encontrar contenedores de hoteles
+        hotel_containers = soup.find_all('div', {'data-testid': 'property-card'})
+        
+        if not hotel_containers:
+            # Intentar con selectores alternativos
+            hotel_containers = soup.find_all('div', class_='sr_property_block')
     
-    # Parsear HTML
-    soup = BeautifulSoup(response.content, 'html.parser')
+    return hotel_containers
+
+def iter_booking_hotels(destino="Cartagena", checkin=None, checkout=None, hotel_limit=200,
+                        offset=0, rows=BOOKING_RESULTS_PER_PAGE):
+    """
+    GENERADOR PAGINADO DE HOTELES DE BOOKING.COM
     
-    # Encontrar contenedores de hoteles
-    hotel_containers = soup.find_all('div', {'data-testid': 'property-card'})
+    Recorre las páginas de resultados de Booking.com (parámetros offset/rows)
+    y entrega cada hotel en cuanto se parsea, sin acumular la lista completa
+    en memoria. Así el consumidor puede ir guardando resultados mientras el
+    crawl sigue en curso.
     
-    if not hotel_containers:
-        # Intentar con selectores alternativos
-        hotel_containers = soup.find_all('div', class_='sr_property_block')
+    Cada hotel incluye la clave 'page_offset' con el offset de la página de la
+    que proviene. Para reanudar un crawl interrumpido basta con volver a llamar
+    al generador con offset=<último page_offset recibido>.
     
-    logger.info(f"Encontrados {len(hotel_containers)} hoteles en la página")
+    Args:
+        destino: Ciudad o destino a buscar
+        checkin: Fecha de check-in (formato YYYY-MM-DD)
+        checkout: Fecha de check-out (formato YYYY-MM-DD)
+        hotel_limit: Número máximo de hoteles a entregar
+        offset: Offset de la primera página a consultar (para reanudar)
+        rows: Número de resultados por página
+        
+    Yields:
+        Diccionarios con información de cada hotel
+    """
+    logger.info(f"Iniciando scraping de Booking.com para {destino} (offset {offset})")
     
-    hotels_data = []
+    # Configurar fechas por defecto si no se proporcionan
+    if not checkin:
+        checkin = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
+    if not checkout:
+        checkout = (datetime.now() + timedelta(days=14)).strftime('%Y-%m-%d')
+    
+    search_url = f"{BOOKING_BASE_URL}/searchresults.html"
     processed_count = 0
+    seen_hotels = set()
     
-    for container in hotel_containers:
-        if processed_count >= hotel_limit:
+    while processed_count < hotel_limit:
+        params = build_booking_search_params(destino, checkin, checkout, offset=offset, rows=rows)
+        
+        response = make_request(search_url, params=params)
+        if not response:
+            logger.error(f"No se pudo obtener la página de búsqueda (offset {offset})")
+            return
+        
+        page_url = getattr(response, 'url', search_url)
+        page_ref = archivar(response.content, url=page_url, tipo='busqueda')
+        
+        hotel_containers = parse_booking_results(response.content)
+        logger.info(f"Encontrados {len(hotel_containers)} hoteles en la página (offset {offset}, captura {page_ref})")
+        
+        if not hotel_containers:
+            if offset == 0:
+                # Una primera página sin tarjetas suele ser un bloqueo blando
+                HOST_BUDGET.report(search_url, 'empty')
+                logger.warning(f"Página de búsqueda sin tarjetas (offset {offset}): posible bloqueo")
             break
         
-        try:
-            hotel_info = extract_hotel_info_booking(container)
-            if hotel_info:
-                hotels_data.append(hotel_info)
-                processed_count += 1
-                logger.info(f"Procesado hotel {processed_count}: {hotel_info.get('name', 'Sin nombre')}")
+        new_in_page = 0
+        for container in hotel_containers:
+            if processed_count >= hotel_limit:
+                break
+            
+            try:
+                with medir('extract'):
+                    hotel_info = extract_hotel_info_booking(container)
+            except Exception as e:
+                card_ref = archivar(str(container), url=page_url, tipo='tarjeta', motivo='error')
+                logger.error(f"Error procesando hotel (captura {card_ref}): {e}")
+                continue
+            
+            if not hotel_info:
+                card_ref = archivar(str(container), url=page_url, tipo='tarjeta', motivo='sin_nombre')
+                logger.warning(f"Tarjeta sin nombre en la página (offset {offset}, captura {card_ref})")
+                continue
+            
+            registrar_tarjeta(hotel_info)
+            
+            if hotel_info.get('price_amount') is None:
+                card_ref = archivar(str(container), url=page_url, hotel=hotel_info['name'],
+                                    tipo='tarjeta', motivo='sin_precio')
+                logger.warning(f"Hotel sin precio: {hotel_info['name']} (captura {card_ref})")
+            
+            # Booking repite hoteles entre páginas (destacados, patrocinados)
+            key = hotel_info.get('link') or hotel_info['name']
+            if key in seen_hotels:
+                continue
+            seen_hotels.add(key)
+            new_in_page += 1
+            
+            hotel_info['page_offset'] = offset
+            processed_count += 1
+            logger.info(f"Procesado hotel {processed_count}: {hotel_info.get('name', 'Sin nombre')}")
+            yield hotel_info
+        
+        # Última página: menos tarjetas de las pedidas o ninguna novedad
+        # (Booking devuelve la última página otra vez si el offset se pasa)
+        if len(hotel_containers) < rows or new_in_page == 0:
+            break
         
-        except Exception as e:
-            logger.error(f"Error procesando hotel: {e}")
-            continue
+        offset += len(hotel_containers)
     
-    logger.info(f"Scraping completado. {len(hotels_data)} hoteles procesados")
-    return hotels_data
+    logger.info(f"Scraping completado. {processed_count} hoteles procesados")
+
+def scrape_booking_hotels(destino="Cartagena", checkin=None, checkout=None, hotel_limit=200):
+    """
+    SCRAPER PRINCIPAL DE BOOKING.COM
+    
+    Extrae información de hoteles desde Booking.com con los parámetros especificados.
+    Envoltorio de iter_booking_hotels() para quien necesite la lista completa.
+    
+    Args:
+        destino: Ciudad o destino a buscar
+        checkin: Fecha de check-in (formato YYYY-MM-DD)
+        checkout: Fecha de check-out (formato YYYY-MM-DD)
+        hotel_limit: Número máximo de hoteles a scrapear
+        
+    Returns:
+        Lista de diccionarios con información de hoteles
+    """
+    return list(iter_booking_hotels(
+        destino=destino,
+        checkin=checkin,
+        checkout=checkout,
+        hotel_limit=hotel_limit
+    ))
 
 def extract_hotel_info_booking(container):
     """
@@ -363,6 +631,9 @@ def extract_hotel_info_booking(container):
     hotel_info = {}
     
     try:
+        # Campos numéricos de toda la tarjeta en una sola pasada
+        card_fields = extraer_campos(container.get_text(' '))
+        
         # ===== NOMBRE DEL HOTEL =====
         name_element = container.find('div', {'data-testid': 'title'})
         if not name_element:
@@ -379,7 +650,8 @@ def extract_hotel_info_booking(container):
             hotel_info['description'] = clean_text(description_element.get_text())
         
         # ===== UBICACIÓN =====
-        location_element = container.find('div', {'data-testid': 'address'})
+        # Booking usa <span data-testid="address"> en las tarjetas actuales
+        location_element = container.find(attrs={'data-testid': 'address'})
         if not location_element:
             location_element = container.find('span', class_='sr-hotel__address')
         
@@ -392,8 +664,12 @@ def extract_hotel_info_booking(container):
             price_element = container.find('span', class_='bui-price-display__value')
         
         if price_element:
+            hotel_info['price'] = clean_text(price_element.get_text())
+        if 'precio' in card_fields:
+            hotel_info['price_amount'] = card_fields['precio']
+            hotel_info['price_currency'] = card_fields['precio_moneda']
+        elif price_element:
             price_data = extract_price(price_element.get_text())
-            hotel_info['price'] = price_data['formatted']
             hotel_info['price_amount'] = price_data['amount']
             hotel_info['price_currency'] = price_data['currency']
         
@@ -403,20 +679,32 @@ def extract_hotel_info_booking(container):
             rating_element = container.find('div', class_='bui-review-score__badge')
         
         if rating_element:
-            rating_data = extract_rating(rating_element.get_text())
-            hotel_info['rating'] = rating_data['formatted']
-            hotel_info['rating_score'] = rating_data['score']
-            hotel_info['rating_max_score'] = rating_data['max_score']
+            hotel_info['rating'] = clean_text(rating_element.get_text())
+            hotel_info['rating_score'] = card_fields.get('puntuacion')
+            hotel_info['rating_max_score'] = card_fields.get('puntuacion_maxima', 10)
+        else:
+            # Sin comentarios en Booking la tarjeta muestra la puntuación externa
+            external_element = container.find('div', {'data-testid': 'external-review-score'})
+            external_score = RATING_EXTERNO.search(external_element.get_text(' ')) if external_element else None
+            if external_score:
+                hotel_info['rating'] = clean_text(external_element.get_text(' '))
+                hotel_info['rating_score'] = parsear_numero(external_score.group(1))
+                hotel_info['rating_max_score'] = 10
         
         # ===== ESTRELLAS =====
-        stars_element = container.find('div', {'data-testid': 'stars'})
-        if not stars_element:
-            stars_element = container.find('div', class_='sr-hotel__stars')
-        
-        if stars_element:
-            stars_data = extract_stars(stars_element.get_text())
-            hotel_info['stars'] = stars_data['formatted']
-            hotel_info['stars_count'] = stars_data['count']
+        stars_count = count_rating_icons(container)
+        if stars_count:
+            hotel_info['stars'] = f"{stars_count} estrellas"
+            hotel_info['stars_count'] = stars_count
+        else:
+            stars_element = container.find('div', {'data-testid': 'stars'})
+            if not stars_element:
+                stars_element = container.find('div', class_='sr-hotel__stars')
+            
+            if stars_element:
+                stars_data = extract_stars(stars_element.get_text())
+                hotel_info['stars'] = stars_data['formatted']
+                hotel_info['stars_count'] = stars_data['count']
         
         # ===== AMENITIES =====
         amenities_elements = container.find_all('div', {'data-testid': 'amenity'})
@@ -444,13 +732,8 @@ def extract_hotel_info_booking(container):
             hotel_info['link'] = urljoin(BOOKING_BASE_URL, link_element.get('href', ''))
         
         # ===== REVIEWS =====
-        reviews_element = container.find('div', {'data-testid': 'review-score'})
-        if reviews_element:
-            # Intentar extraer número de reviews
-            reviews_text = reviews_element.get_text()
-            reviews_match = re.search(r'(\d+)\s*reviews?', reviews_text, re.IGNORECASE)
-            if reviews_match:
-                hotel_info['reviews_count'] = int(reviews_match.group(1))
+        if 'comentarios' in card_fields:
+            hotel_info['reviews_count'] = card_fields['comentarios']
         
         # ===== METADATOS =====
         hotel_info['source'] = 'booking'
@@ -610,13 +893,17 @@ def scrape_hotels(destino="Cartagena", hotel_limit=20, sources=['booking']):
             all_hotels['trivago'] = []
     
     # Combinar todos los hoteles
-    combined_hotels = []
+    raw_hotels = []
     for source, hotels in all_hotels.items():
         for hotel in hotels:
             hotel['source'] = source
-            combined_hotels.append(hotel)
+            raw_hotels.append(hotel)
     
-    logger.info(f"Scraping completado. Total: {len(combined_hotels)} hoteles")
+    # El mismo hotel aparece en varias fuentes: combinarlo en un solo registro
+    combined_hotels = HotelDataMerger().merge(raw_hotels)
+    
+    logger.info(f"Scraping completado. Total: {len(combined_hotels)} hoteles "
+                f"({len(raw_hotels) - len(combined_hotels)} duplicados entre fuentes)")
     
     return {
         'hotels': combined_hotels,
@@ -626,7 +913,8 @@ def scrape_hotels(destino="Cartagena", hotel_limit=20, sources=['booking']):
             'hotel_limit': hotel_limit,
             'sources': sources,
             'scraped_at': datetime.now().isoformat(),
-            'total_hotels': len(combined_hotels)
+            'total_hotels': len(combined_hotels),
+            'merged_duplicates': len(raw_hotels) - len(combined_hotels)
         }
     }
 
@@ -639,19 +927,21 @@ def save_hotels_to_json(hotels_data, filename='hotels_scraped.json'):
     Guarda los datos de hoteles en un archivo JSON
     
     Args:
-        hotels_data: Datos de hoteles a guardar
-        filename: Nombre del archivo de salida
+        hotels_data: Iterable de hoteles (se escribe hotel a hotel)
+        filename: Nombre del archivo de salida (.jsonl para JSON Lines)
     """
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(hotels_data, f, ensure_ascii=False, indent=2)
-        logger.info(f"Datos guardados en {filename}")
+        written = escribir_hoteles(hotels_data, filename)
+        logger.info(f"Datos guardados en {filename} ({written} hoteles)")
     except Exception as e:
         logger.error(f"Error guardando datos: {e}")
 
 def load_hotels_from_json(filename='hotels_scraped.json'):
     """
-    Carga datos de hoteles desde un archivo JSON
+    Carga datos de hoteles desde un archivo JSON (array o JSON Lines)
+    
+    Para archivos grandes conviene recorrerlos con catalogo_json.iterar_hoteles
+    en lugar de cargar la lista.
     
     Args:
         filename: Nombre del archivo a cargar
@@ -660,8 +950,7 @@ def load_hotels_from_json(filename='hotels_scraped.json'):
         Datos de hoteles cargados
     """
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return list(iterar_hoteles(filename))
     except Exception as e:
         logger.error(f"Error cargando datos: {e}")
         return None
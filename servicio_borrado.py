@@ -0,0 +1,167 @@
+"""
+SERVICIO DE BORRADO - SISTEMA RECOMENDADOR DE HOTELES
+=====================================================
+
+Este archivo contiene el borrado del historial de un usuario (valoraciones
+e interacciones) y la eliminación de cuentas.
+
+CARACTERÍSTICAS:
+- Borrado por lotes: se leen BORRADO_LOTE ids, se borran con
+  DELETE ... WHERE id IN (...) y se confirma; cada transacción bloquea
+  pocas filas y poco tiempo, y las réplicas no reciben un DELETE enorme
+- Las cuentas con más de BORRADO_UMBRAL_TRABAJO filas se borran en un
+  trabajo en segundo plano ('borrado_usuario'); la petición vuelve al
+  momento con el id del trabajo
+- Un solo borrado activo por usuario (clave de concurrencia del trabajo)
+- Invalida la caché de favoritos del usuario
+
+USO:
+    id_trabajo, resumen = solicitar_borrado(id_usuario)
+    id_trabajo, resumen = solicitar_borrado(id_usuario, eliminar_cuenta=True)
+
+VERSIÓN: 2.0
+"""
+
+import logging
+
+from flask import current_app
+from sqlalchemy import select
+
+from models import db, Valoraciones, InteraccionesUsuario, PreferenciasUsuario, Usuario
+import servicio_favoritos
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Filas por lote (Config.BORRADO_LOTE)
+LOTE_BORRADO = 1000
+
+# Filas a partir de las cuales el borrado va a un trabajo (Config.BORRADO_UMBRAL_TRABAJO)
+UMBRAL_TRABAJO = 5000
+
+# Tablas con filas del usuario, en orden de borrado: (nombre, modelo, clave primaria)
+TABLAS_USUARIO = [
+    ('valoraciones', Valoraciones, Valoraciones.id_valoracion),
+    ('interacciones', InteraccionesUsuario, InteraccionesUsuario.id_interaccion),
+]
+
+# =============================================================================
+# BORRADO POR LOTES
+# =============================================================================
+
+def _config(clave, defecto):
+    return int(current_app.config.get(clave, defecto))
+
+
+def _borrar_por_lotes(modelo, clave, id_usuario, tamano_lote, al_borrar=None):
+    borradas = 0
+    while True:
+        ids = db.session.execute(
+            select(clave).where(modelo.id_usuario == id_usuario).limit(tamano_lote)
+        ).scalars().all()
+        if not ids:
+            return borradas
+        db.session.execute(modelo.__table__.delete().where(clave.in_(ids)))
+        db.session.commit()
+        borradas += len(ids)
+        if al_borrar is not None:
+            al_borrar(len(ids))
+
+
+def supera_umbral(id_usuario, umbral):
+    """True si el usuario tiene más de `umbral` filas en alguna tabla (sin contarlas todas)"""
+    for _, modelo, clave in TABLAS_USUARIO:
+        fila = db.session.execute(
+            select(clave).where(modelo.id_usuario == id_usuario).offset(umbral).limit(1)
+        ).first()
+        if fila is not None:
+            return True
+    return False
+
+
+def borrar_historial(id_usuario, tamano_lote=None, contexto=None, tablas=None):
+    """
+    Borra las valoraciones e interacciones del usuario por lotes
+
+    Args:
+        id_usuario: Usuario cuyo historial se borra
+        tamano_lote: Filas por transacción (por defecto BORRADO_LOTE)
+        contexto: ContextoTrabajo para reportar progreso (opcional)
+        tablas: Nombres de TABLAS_USUARIO a borrar (por defecto todas)
+
+    Returns:
+        Diccionario con las filas borradas por tabla
+    """
+    tamano_lote = tamano_lote or _config('BORRADO_LOTE', LOTE_BORRADO)
+    resumen = {}
+    total = [0]
+
+    def al_borrar(n):
+        total[0] += n
+        if contexto is not None:
+            contexto.reportar(total[0])
+
+    try:
+        for nombre, modelo, clave in TABLAS_USUARIO:
+            if tablas is not None and nombre not in tablas:
+                continue
+            resumen[nombre] = _borrar_por_lotes(modelo, clave, id_usuario, tamano_lote, al_borrar)
+    finally:
+        servicio_favoritos.invalidar(id_usuario)
+    return resumen
+
+
+def borrar_cuenta(id_usuario, tamano_lote=None, contexto=None):
+    """
+    Borra el historial por lotes y después las preferencias y el usuario
+
+    Returns:
+        Diccionario con las filas borradas por tabla y 'usuario' (0 o 1)
+    """
+    resumen = borrar_historial(id_usuario, tamano_lote, contexto)
+    PreferenciasUsuario.query.filter_by(id_usuario=id_usuario).delete()
+    resumen['usuario'] = Usuario.query.filter_by(id_usuario=id_usuario).delete()
+    db.session.commit()
+    return resumen
+
+# =============================================================================
+# SOLICITUD (EN LÍNEA O EN SEGUNDO PLANO)
+# =============================================================================
+
+def solicitar_borrado(id_usuario, eliminar_cuenta=False, id_solicitante=None, segundo_plano=None, tablas=None):
+    """
+    Borra el historial (o la cuenta) en la petición o en un trabajo
+
+    Args:
+        id_usuario: Usuario a borrar
+        eliminar_cuenta: Si además se elimina el usuario
+        id_solicitante: Usuario que pide el borrado (queda en el trabajo)
+        segundo_plano: True/False para forzarlo; None decide por
+            BORRADO_UMBRAL_TRABAJO
+        tablas: Nombres de TABLAS_USUARIO a borrar (se ignora al eliminar la cuenta)
+
+    Returns:
+        (id_trabajo, None) si se encoló un trabajo (o ya había uno activo),
+        (None, resumen) si se borró en la petición
+    """
+    from trabajos import encolar_trabajo, TrabajoEnCurso
+
+    if segundo_plano is None:
+        segundo_plano = supera_umbral(id_usuario, _config('BORRADO_UMBRAL_TRABAJO', UMBRAL_TRABAJO))
+
+    if segundo_plano:
+        parametros = {'id_usuario': id_usuario, 'eliminar_cuenta': eliminar_cuenta, 'tablas': tablas}
+        try:
+            trabajo = encolar_trabajo('borrado_usuario', parametros, clave=f'borrado:{id_usuario}',
+                                      id_usuario=id_solicitante)
+        except TrabajoEnCurso as e:
+            return e.trabajo_activo.id_trabajo, None
+        logger.info(f"Borrado del usuario {id_usuario} encolado (trabajo #{trabajo.id_trabajo})")
+        return trabajo.id_trabajo, None
+
+    if eliminar_cuenta:
+        return None, borrar_cuenta(id_usuario)
+    return None, borrar_historial(id_usuario, tablas=tablas)
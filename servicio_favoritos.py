@@ -0,0 +1,175 @@
+"""
+SERVICIO DE FAVORITOS - SISTEMA RECOMENDADOR DE HOTELES
+=======================================================
+
+Este archivo contiene el acceso a los hoteles favoritos de cada usuario
+(interacciones de tipo 'favorito').
+
+CARACTERÍSTICAS:
+- Página de favoritos con una sola consulta (JOIN con `hoteles`), del más
+  reciente al más antiguo
+- Conjunto de ids de favoritos por usuario en caché (LRU con caducidad),
+  para pintar el corazón de cada tarjeta sin una consulta por tarjeta
+- Marcar y desmarcar actualizan la caché en el momento
+- Versión de los favoritos en la sesión del usuario: si el cambio se hizo
+  en otro worker de gunicorn, la versión no coincide y se recarga el
+  conjunto; los cambios hechos por otros (un admin que borra el historial)
+  se ven al caducar la entrada
+
+USO:
+    ids = ids_favoritos(current_user.id_usuario)
+    hotel.id_hotel in ids
+
+VERSIÓN: 2.0
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import time
+import uuid
+
+from flask import has_request_context, session
+from sqlalchemy import select
+
+from models import db, Hoteles, InteraccionesUsuario
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Segundos que vale una entrada de la caché
+CACHE_TTL = 300
+
+# Usuarios en caché como máximo (se descartan los menos usados)
+CACHE_MAX_USUARIOS = 5000
+
+# Clave de la sesión con la versión de los favoritos del usuario
+CLAVE_SESION = 'favoritos_version'
+
+# id_usuario -> (expira, versión, frozenset de id_hotel)
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+# =============================================================================
+# CACHÉ DE IDS
+# =============================================================================
+
+def _version_sesion():
+    return session.get(CLAVE_SESION) if has_request_context() else None
+
+
+def _nueva_version():
+    if not has_request_context():
+        return None
+    version = uuid.uuid4().hex[:12]
+    session[CLAVE_SESION] = version
+    return version
+
+
+def _guardar(id_usuario, version, ids):
+    with _lock:
+        _cache[id_usuario] = (time.monotonic() + CACHE_TTL, version, ids)
+        _cache.move_to_end(id_usuario)
+        while len(_cache) > CACHE_MAX_USUARIOS:
+            _cache.popitem(last=False)
+
+
+def ids_favoritos(id_usuario):
+    """
+    Ids de los hoteles favoritos del usuario
+
+    Returns:
+        frozenset de id_hotel (de la caché si está vigente)
+    """
+    version = _version_sesion()
+    with _lock:
+        entrada = _cache.get(id_usuario)
+        if entrada is not None and entrada[0] > time.monotonic() and entrada[1] == version:
+            _cache.move_to_end(id_usuario)
+            return entrada[2]
+
+    ids = frozenset(db.session.execute(
+        select(InteraccionesUsuario.id_hotel).where(
+            InteraccionesUsuario.id_usuario == id_usuario,
+            InteraccionesUsuario.tipo_interaccion == 'favorito'
+        )
+    ).scalars())
+    _guardar(id_usuario, version, ids)
+    return ids
+
+
+def es_favorito(id_usuario, id_hotel):
+    return id_hotel in ids_favoritos(id_usuario)
+
+
+def invalidar(id_usuario):
+    """Descarta los favoritos en caché del usuario (tras borrar su historial)"""
+    with _lock:
+        _cache.pop(id_usuario, None)
+
+# =============================================================================
+# CONSULTAS Y CAMBIOS
+# =============================================================================
+
+def hoteles_favoritos(id_usuario):
+    """
+    Hoteles favoritos del usuario con una sola consulta
+
+    Returns:
+        Lista de objetos Hoteles, del favorito más reciente al más antiguo
+    """
+    hoteles = db.session.execute(
+        select(Hoteles)
+        .join(InteraccionesUsuario, InteraccionesUsuario.id_hotel == Hoteles.id_hotel)
+        .where(
+            InteraccionesUsuario.id_usuario == id_usuario,
+            InteraccionesUsuario.tipo_interaccion == 'favorito'
+        )
+        .order_by(InteraccionesUsuario.fecha_interaccion.desc(), InteraccionesUsuario.id_interaccion.desc())
+    ).scalars().all()
+    # Un mismo hotel puede estar repetido si se marcó dos veces a la vez
+    vistos = set()
+    return [h for h in hoteles if not (h.id_hotel in vistos or vistos.add(h.id_hotel))]
+
+
+def agregar_favorito(id_usuario, id_hotel):
+    """
+    Marca un hotel como favorito
+
+    Returns:
+        True si se agregó, False si ya era favorito
+    """
+    ids = ids_favoritos(id_usuario)
+    if id_hotel in ids:
+        return False
+    db.session.add(InteraccionesUsuario(
+        id_usuario=id_usuario,
+        id_hotel=id_hotel,
+        tipo_interaccion='favorito',
+        valor=1.0,
+        fecha_interaccion=datetime.now()
+    ))
+    db.session.commit()
+    _guardar(id_usuario, _nueva_version(), ids | {id_hotel})
+    return True
+
+
+def quitar_favorito(id_usuario, id_hotel):
+    """
+    Quita un hotel de los favoritos
+
+    Returns:
+        True si se quitó, False si no era favorito
+    """
+    ids = ids_favoritos(id_usuario)
+    if id_hotel not in ids:
+        return False
+    InteraccionesUsuario.query.filter_by(
+        id_usuario=id_usuario,
+        id_hotel=id_hotel,
+        tipo_interaccion='favorito'
+    ).delete()
+    db.session.commit()
+    _guardar(id_usuario, _nueva_version(), ids - {id_hotel})
+    return True
@@ -0,0 +1,135 @@
+"""
+SERVICIO DE HISTORIAL - SISTEMA RECOMENDADOR DE HOTELES
+=======================================================
+
+Este archivo contiene la lectura paginada del historial de interacciones
+de un usuario (vistas, favoritos y valoraciones).
+
+CARACTERÍSTICAS:
+- Paginación por cursor (keyset) sobre (fecha_interaccion, id_interaccion):
+  cada página cuesta lo mismo aunque el usuario tenga miles de eventos
+- El día de cada evento se calcula en la consulta (DATE()) y las filas
+  llegan ya ordenadas, agrupadas por día
+- Solo se cargan los hoteles de la página, en la misma consulta (JOIN) y
+  solo con las columnas que pinta el timeline
+- Índice idx_interacciones_usuario_fecha (id_usuario, fecha_interaccion)
+
+USO:
+    pagina = pagina_historial(current_user.id_usuario)
+    pagina = pagina_historial(current_user.id_usuario, antes=pagina['siguiente'])
+
+VERSIÓN: 2.0
+"""
+
+from datetime import datetime
+from itertools import groupby
+
+from sqlalchemy import and_, func, or_, select
+
+from models import db, Hoteles, InteraccionesUsuario
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Eventos por página si no se indica (Config.HISTORIAL_POR_PAGINA)
+POR_PAGINA = 50
+
+# Máximo que se acepta del cliente en ?limite=
+MAX_POR_PAGINA = 200
+
+# =============================================================================
+# CURSOR
+# =============================================================================
+
+def codificar_cursor(fecha, id_interaccion):
+    """Cursor opaco para pedir los eventos anteriores a este"""
+    return f"{fecha.strftime('%Y%m%d%H%M%S%f')}.{id_interaccion}"
+
+
+def decodificar_cursor(cursor):
+    """
+    Returns:
+        (fecha, id_interaccion) o None si el cursor no es válido
+    """
+    try:
+        fecha, id_interaccion = cursor.split('.')
+        return datetime.strptime(fecha, '%Y%m%d%H%M%S%f'), int(id_interaccion)
+    except (AttributeError, ValueError):
+        return None
+
+# =============================================================================
+# CONSULTA
+# =============================================================================
+
+def _evento(fila):
+    return {
+        'id_interaccion': fila.id_interaccion,
+        'tipo': fila.tipo_interaccion,
+        'fecha': fila.fecha_interaccion.strftime('%H:%M'),
+        'conteo': fila.conteo or 1,
+        'id': fila.id_hotel,
+        'name': fila.nombre or '',
+        'slug': fila.slug or '',
+        'image': fila.imagen_url or '',
+    }
+
+
+def pagina_historial(id_usuario, antes=None, limite=POR_PAGINA):
+    """
+    Una página del historial, del evento más reciente al más antiguo
+
+    Args:
+        id_usuario: Usuario del historial
+        antes: Cursor devuelto por la página anterior (None para la primera)
+        limite: Eventos por página
+
+    Returns:
+        {'dias': [{'fecha': 'AAAA-MM-DD', 'eventos': [...]}, ...],
+         'siguiente': cursor o None si no hay más}
+        Un día puede continuar en la página siguiente.
+    """
+    limite = max(1, min(int(limite), MAX_POR_PAGINA))
+    dia = func.date(InteraccionesUsuario.fecha_interaccion).label('dia')
+    consulta = (
+        select(
+            InteraccionesUsuario.id_interaccion,
+            InteraccionesUsuario.tipo_interaccion,
+            InteraccionesUsuario.fecha_interaccion,
+            InteraccionesUsuario.conteo,
+            InteraccionesUsuario.id_hotel,
+            dia,
+            Hoteles.nombre,
+            Hoteles.slug,
+            Hoteles.imagen_url,
+        )
+        .outerjoin(Hoteles, Hoteles.id_hotel == InteraccionesUsuario.id_hotel)
+        .where(
+            InteraccionesUsuario.id_usuario == id_usuario,
+            InteraccionesUsuario.fecha_interaccion.isnot(None)
+        )
+        .order_by(InteraccionesUsuario.fecha_interaccion.desc(), InteraccionesUsuario.id_interaccion.desc())
+        .limit(limite + 1)
+    )
+
+    posicion = decodificar_cursor(antes) if antes else None
+    if posicion is not None:
+        fecha, id_interaccion = posicion
+        consulta = consulta.where(or_(
+            InteraccionesUsuario.fecha_interaccion < fecha,
+            and_(InteraccionesUsuario.fecha_interaccion == fecha,
+                 InteraccionesUsuario.id_interaccion < id_interaccion)
+        ))
+
+    filas = db.session.execute(consulta).all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+
+    dias = [
+        {'fecha': str(fecha), 'eventos': [_evento(f) for f in grupo]}
+        for fecha, grupo in groupby(filas, key=lambda f: f.dia)
+    ]
+    siguiente = None
+    if hay_mas:
+        siguiente = codificar_cursor(filas[-1].fecha_interaccion, filas[-1].id_interaccion)
+    return {'dias': dias, 'siguiente': siguiente}
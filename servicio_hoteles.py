@@ -0,0 +1,144 @@
+"""
+SERVICIO DE HOTELES - SISTEMA RECOMENDADOR DE HOTELES
+=====================================================
+
+Este archivo contiene un mapa compartido id_hotel -> resumen del hotel
+(nombre, slug, imagen y estrellas) para las páginas por usuario (perfil,
+detalle de usuario en el admin) que solo muestran unos pocos hoteles.
+
+CARACTERÍSTICAS:
+- Resúmenes como tuplas con nombre (ResumenHotel): unos cientos de bytes
+  por hotel en lugar de la fila completa con reviews e imágenes
+- Consulta por lotes: obtener_resumenes(ids) lee solo los ids que faltan,
+  primero del snapshot del catálogo (mmap) y después con un único
+  SELECT ... WHERE id_hotel IN (...) de cuatro columnas
+- Invalidación por versión: el mapa se vacía cuando cambia la versión del
+  snapshot del catálogo o al pasar CACHE_TTL; la ingesta y el
+  enriquecimiento quitan del mapa los hoteles que modifican
+
+USO:
+    hoteles = obtener_resumenes(i.id_hotel for i in interacciones)
+    hoteles[id_hotel].nombre
+
+VERSIÓN: 2.0
+"""
+
+from collections import namedtuple
+import threading
+import time
+
+from sqlalchemy import select
+
+from models import db, Hoteles
+from ingesta import registrar_invalidador
+from snapshot_catalogo import obtener_catalogo
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Segundos que vale el mapa sin snapshot que marque la versión (cambios
+# hechos en otro proceso)
+CACHE_TTL = 600
+
+# Hoteles en el mapa como máximo; al superarlo se vacía
+CACHE_MAX_HOTELES = 50000
+
+ResumenHotel = namedtuple('ResumenHotel', ['id_hotel', 'nombre', 'slug', 'imagen_url', 'stars_count'])
+
+_resumenes = {}
+_version = None
+_expira = 0.0
+_lock = threading.Lock()
+
+# =============================================================================
+# CONSULTA POR LOTES
+# =============================================================================
+
+def _desde_snapshot(catalogo, ids):
+    resumenes = {}
+    for id_hotel in ids:
+        i = catalogo.posicion(id_hotel)
+        if i is not None:
+            resumenes[id_hotel] = ResumenHotel(
+                id_hotel,
+                catalogo.cadena('nombre', i),
+                catalogo.cadena('slug', i),
+                catalogo.cadena('imagen_url', i),
+                catalogo.valor('stars_count', i),
+            )
+    return resumenes
+
+
+def _desde_base(ids):
+    filas = db.session.execute(
+        select(Hoteles.id_hotel, Hoteles.nombre, Hoteles.slug, Hoteles.imagen_url, Hoteles.stars_count)
+        .where(Hoteles.id_hotel.in_(ids))
+    ).all()
+    return {
+        f.id_hotel: ResumenHotel(f.id_hotel, f.nombre or '', f.slug or '', f.imagen_url or '', f.stars_count or 0)
+        for f in filas
+    }
+
+
+def obtener_resumenes(ids):
+    """
+    Resúmenes de varios hoteles de una vez
+
+    Args:
+        ids: Iterable de id_hotel (se ignoran repetidos, None y los que no
+            son enteros, como el nombre que guardan las valoraciones antiguas)
+
+    Returns:
+        Diccionario id_hotel -> ResumenHotel (sin los ids que no existen)
+    """
+    global _version, _expira
+    ids = {int(i) for i in ids if i is not None and str(i).strip().isdigit()}
+    if not ids:
+        return {}
+
+    catalogo = obtener_catalogo()
+    version = catalogo.version if catalogo is not None else None
+    ahora = time.monotonic()
+    with _lock:
+        if version != _version or ahora > _expira:
+            _resumenes.clear()
+            _version = version
+            _expira = ahora + CACHE_TTL
+        encontrados = {i: _resumenes[i] for i in ids if i in _resumenes}
+
+    faltan = ids - encontrados.keys()
+    if faltan:
+        nuevos = _desde_snapshot(catalogo, faltan) if catalogo is not None else {}
+        # Hoteles posteriores al snapshot o sin snapshot
+        if len(nuevos) < len(faltan):
+            nuevos.update(_desde_base(faltan - nuevos.keys()))
+        with _lock:
+            if len(_resumenes) + len(nuevos) > CACHE_MAX_HOTELES:
+                _resumenes.clear()
+            _resumenes.update(nuevos)
+        encontrados.update(nuevos)
+    return encontrados
+
+
+def obtener_resumen(id_hotel):
+    """Resumen de un hotel o None"""
+    return obtener_resumenes([id_hotel]).get(id_hotel)
+
+# =============================================================================
+# INVALIDACIÓN
+# =============================================================================
+
+@registrar_invalidador
+def invalidar_resumenes(ids):
+    """
+    Invalidador de ingesta: quita del mapa los hoteles modificados
+    """
+    with _lock:
+        for id_hotel in ids:
+            _resumenes.pop(id_hotel, None)
+
+
+def vaciar_resumenes():
+    with _lock:
+        _resumenes.clear()
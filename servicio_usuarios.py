@@ -0,0 +1,151 @@
+"""
+SERVICIO DE USUARIOS - SISTEMA RECOMENDADOR DE HOTELES
+======================================================
+
+Este archivo contiene el directorio de usuarios del panel de
+administración.
+
+CARACTERÍSTICAS:
+- Paginación en el servidor por cursor sobre el email (único): cada página
+  es un rango de idx_usuario_email, sin OFFSET
+- Búsqueda por prefijo de email o de nombre (LIKE 'texto%'), que usa
+  idx_usuario_email e idx_usuario_nombre
+- Estadísticas de la página (valoraciones, vistas, favoritos y última
+  actividad) en una sola consulta agrupada (UNION ALL de valoraciones e
+  interacciones con GROUP BY id_usuario), solo para los usuarios mostrados
+
+USO:
+    pagina = directorio_usuarios(buscar='ana')
+    pagina = directorio_usuarios(buscar='ana', despues=pagina['siguiente'])
+
+VERSIÓN: 2.0
+"""
+
+from sqlalchemy import case, func, literal, or_, select, union_all
+
+from models import db, Usuario, Valoraciones, InteraccionesUsuario
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Usuarios por página si no se indica
+POR_PAGINA = 50
+
+# Máximo que se acepta del cliente
+MAX_POR_PAGINA = 200
+
+# =============================================================================
+# ESTADÍSTICAS
+# =============================================================================
+
+def estadisticas_usuarios(ids):
+    """
+    Valoraciones, vistas, favoritos y última actividad de varios usuarios
+
+    Args:
+        ids: Lista de id_usuario
+
+    Returns:
+        Diccionario id_usuario -> {'valoraciones', 'vistas', 'favoritos', 'ultima_actividad'}
+        (los usuarios sin actividad no aparecen)
+    """
+    if not ids:
+        return {}
+    actividad = union_all(
+        select(
+            Valoraciones.id_usuario.label('id_usuario'),
+            literal('valoracion').label('origen'),
+            literal(1).label('conteo'),
+            Valoraciones.fecha_valoracion.label('fecha'),
+        ).where(Valoraciones.id_usuario.in_(ids)),
+        select(
+            InteraccionesUsuario.id_usuario,
+            InteraccionesUsuario.tipo_interaccion,
+            InteraccionesUsuario.conteo,
+            InteraccionesUsuario.fecha_interaccion,
+        ).where(
+            InteraccionesUsuario.id_usuario.in_(ids),
+            InteraccionesUsuario.tipo_interaccion.in_(['vista', 'favorito'])
+        ),
+    ).subquery()
+
+    def suma(origen, valor):
+        return func.coalesce(func.sum(case((actividad.c.origen == origen, valor), else_=0)), 0)
+
+    filas = db.session.execute(
+        select(
+            actividad.c.id_usuario,
+            suma('valoracion', 1).label('valoraciones'),
+            suma('vista', actividad.c.conteo).label('vistas'),
+            suma('favorito', 1).label('favoritos'),
+            func.max(actividad.c.fecha).label('ultima_actividad'),
+        ).group_by(actividad.c.id_usuario)
+    ).all()
+    return {
+        f.id_usuario: {
+            'valoraciones': int(f.valoraciones),
+            'vistas': int(f.vistas),
+            'favoritos': int(f.favoritos),
+            'ultima_actividad': f.ultima_actividad,
+        }
+        for f in filas
+    }
+
+# =============================================================================
+# DIRECTORIO
+# =============================================================================
+
+def _prefijo(texto):
+    """Patrón LIKE 'texto%' con los comodines del texto escapados"""
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def directorio_usuarios(buscar=None, despues=None, limite=POR_PAGINA):
+    """
+    Una página del directorio de usuarios, ordenado por email
+
+    Args:
+        buscar: Prefijo de email o de nombre (opcional)
+        despues: Email del último usuario de la página anterior
+        limite: Usuarios por página
+
+    Returns:
+        {'usuarios': [{id_usuario, nombre, email, fecha_registro, ultimo_login,
+                       es_admin, valoraciones, vistas, favoritos, ultima_actividad}],
+         'siguiente': email para pedir la página siguiente o None}
+    """
+    limite = max(1, min(int(limite), MAX_POR_PAGINA))
+    consulta = select(
+        Usuario.id_usuario, Usuario.nombre_usuario, Usuario.email,
+        Usuario.fecha_registro, Usuario.ultimo_login, Usuario.es_admin,
+    ).order_by(Usuario.email).limit(limite + 1)
+
+    buscar = (buscar or '').strip()
+    if buscar:
+        patron = _prefijo(buscar)
+        consulta = consulta.where(or_(
+            Usuario.email.like(patron, escape='\\'),
+            Usuario.nombre_usuario.like(patron, escape='\\'),
+        ))
+    if despues:
+        consulta = consulta.where(Usuario.email > despues)
+
+    filas = db.session.execute(consulta).all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+
+    estadisticas = estadisticas_usuarios([f.id_usuario for f in filas])
+    vacias = {'valoraciones': 0, 'vistas': 0, 'favoritos': 0, 'ultima_actividad': None}
+    usuarios = [
+        dict({
+            'id_usuario': f.id_usuario,
+            'nombre': f.nombre_usuario,
+            'email': f.email,
+            'fecha_registro': f.fecha_registro,
+            'ultimo_login': f.ultimo_login,
+            'es_admin': bool(f.es_admin),
+        }, **estadisticas.get(f.id_usuario, vacias))
+        for f in filas
+    ]
+    return {'usuarios': usuarios, 'siguiente': filas[-1].email if hay_mas else None}
@@ -0,0 +1,364 @@
+"""
+SNAPSHOT DEL CATÁLOGO DE HOTELES - SISTEMA RECOMENDADOR DE HOTELES
+==================================================================
+
+Este archivo contiene una copia de solo lectura de la tabla `hoteles` en
+formato columnar, pensada para abrirse con mmap desde cada worker web.
+
+CARACTERÍSTICAS:
+- Columnas numéricas como arrays NumPy (.npy) abiertos con mmap_mode='r'
+- Columnas de texto como un heap UTF-8 más un array de offsets
+- Versiones inmutables en subdirectorios y un puntero ACTUAL que se
+  reemplaza de forma atómica: los lectores nunca ven un snapshot a medias
+- Todos los workers de gunicorn mapean los mismos archivos y comparten
+  las páginas en la caché del sistema operativo
+- Se reescribe solo (con una pequeña demora para agrupar lotes) cuando la
+  ingesta o el enriquecimiento modifican hoteles
+- Las rutas de lectura (/api/hotels, recomendaciones) leen del snapshot y
+  solo consultan la base de datos si todavía no existe
+
+El directorio se configura con CATALOGO_SNAPSHOT_DIR; sin valor, el snapshot
+está desactivado y todo se lee de la base de datos.
+
+VERSIÓN: 2.0
+"""
+
+from datetime import datetime
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+
+from models import db, Hoteles
+from ingesta import registrar_invalidador
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+FORMATO = 1
+
+# Columnas numéricas: columna -> (dtype, valor para NULL)
+COLUMNAS_NUMERICAS = {
+    'id_hotel': ('int64', 0),
+    'precio_amount': ('float64', np.nan),
+    'rating_score': ('float64', np.nan),
+    'rating_max_score': ('int32', 10),
+    'stars_count': ('int32', 0),
+    'reviews_count': ('int32', 0),
+}
+
+# Columnas de texto (heap + offsets)
+COLUMNAS_TEXTO = [
+    'nombre', 'slug', 'descripcion', 'ubicacion', 'precio_formatted', 'stars_formatted',
+    'rating_formatted', 'imagen_url', 'imagenes', 'amenities', 'reviews', 'link_booking',
+    'fuente_principal',
+]
+
+# Segundos entre el primer cambio de hoteles y la reescritura del snapshot
+DEMORA_REESCRITURA = 5.0
+
+# Cada cuánto un worker comprueba si hay una versión nueva
+INTERVALO_COMPROBACION = 1.0
+
+# Versiones anteriores que se conservan (un worker puede tenerlas abiertas)
+VERSIONES_CONSERVADAS = 2
+
+# =============================================================================
+# ESCRITURA
+# =============================================================================
+
+def _directorio():
+    return current_app.config.get('CATALOGO_SNAPSHOT_DIR')
+
+
+def escribir_snapshot(directorio=None):
+    """
+    Escribe un snapshot nuevo con todos los hoteles y lo publica
+
+    Args:
+        directorio: Directorio base (por defecto CATALOGO_SNAPSHOT_DIR)
+
+    Returns:
+        Nombre de la versión publicada
+    """
+    directorio = directorio or _directorio()
+    if not directorio:
+        raise ValueError("CATALOGO_SNAPSHOT_DIR no está configurado")
+    os.makedirs(directorio, exist_ok=True)
+    version = datetime.now().strftime('v%Y%m%d%H%M%S%f')
+    temporal = os.path.join(directorio, f'.{version}.tmp')
+    os.makedirs(temporal)
+
+    columnas = [getattr(Hoteles, c) for c in list(COLUMNAS_NUMERICAS) + COLUMNAS_TEXTO]
+    numericas = {c: [] for c in COLUMNAS_NUMERICAS}
+    heaps = {c: (bytearray(), [0]) for c in COLUMNAS_TEXTO}
+
+    resultado = db.session.execute(
+        select(*columnas).order_by(Hoteles.id_hotel).execution_options(yield_per=1000)
+    )
+    total = 0
+    for fila in resultado:
+        fila = fila._mapping
+        for columna, (_, nulo) in COLUMNAS_NUMERICAS.items():
+            valor = fila[columna]
+            numericas[columna].append(nulo if valor is None else valor)
+        for columna in COLUMNAS_TEXTO:
+            heap, offsets = heaps[columna]
+            heap += (fila[columna] or '').encode('utf-8')
+            offsets.append(len(heap))
+        total += 1
+
+    for columna, (dtype, _) in COLUMNAS_NUMERICAS.items():
+        np.save(os.path.join(temporal, f'{columna}.npy'), np.array(numericas[columna], dtype=dtype))
+    for columna, (heap, offsets) in heaps.items():
+        np.save(os.path.join(temporal, f'{columna}.offsets.npy'), np.array(offsets, dtype='int64'))
+        with open(os.path.join(temporal, f'{columna}.heap'), 'wb') as f:
+            f.write(heap)
+
+    with open(os.path.join(temporal, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'formato': FORMATO,
+            'version': version,
+            'hoteles': total,
+            'numericas': {c: d for c, (d, _) in COLUMNAS_NUMERICAS.items()},
+            'texto': COLUMNAS_TEXTO,
+            'fecha': datetime.now().isoformat(),
+        }, f, ensure_ascii=False, indent=2)
+
+    os.replace(temporal, os.path.join(directorio, version))
+    puntero = os.path.join(directorio, 'ACTUAL')
+    with open(puntero + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(puntero + '.tmp', puntero)
+
+    _limpiar_versiones(directorio, version)
+    logger.info(f"Snapshot del catálogo {version} publicado ({total} hoteles)")
+    return version
+
+
+def _limpiar_versiones(directorio, actual):
+    versiones = sorted(v for v in os.listdir(directorio) if v.startswith('v') and v != actual)
+    for version in versiones[:-(VERSIONES_CONSERVADAS - 1) or None]:
+        try:
+            shutil.rmtree(os.path.join(directorio, version))
+        except OSError:
+            # En Windows no se puede borrar un archivo mapeado por otro worker
+            pass
+
+# =============================================================================
+# LECTURA
+# =============================================================================
+
+class HotelSnapshot:
+    """
+    Vista de un hotel del snapshot con los mismos atributos que Hoteles
+
+    Solo lee las columnas a las que se accede.
+    """
+    __slots__ = ('_catalogo', '_i')
+
+    def __init__(self, catalogo, i):
+        self._catalogo = catalogo
+        self._i = i
+
+    def __getattr__(self, columna):
+        return self._catalogo.valor(columna, self._i)
+
+    def to_dict(self):
+        return self._catalogo.to_dict(self._i)
+
+
+class CatalogoSnapshot:
+    """
+    Snapshot abierto con mmap (solo lectura)
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(os.path.join(ruta, 'manifest.json'), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('formato') != FORMATO:
+            raise ValueError(f"Formato de snapshot no soportado: {self.manifest.get('formato')}")
+        self.version = self.manifest['version']
+        self.total = self.manifest['hoteles']
+
+        self._numericas = {
+            c: np.load(os.path.join(ruta, f'{c}.npy'), mmap_mode='r')
+            for c in self.manifest['numericas']
+        }
+        self._offsets = {}
+        self._heaps = {}
+        for columna in self.manifest['texto']:
+            self._offsets[columna] = np.load(os.path.join(ruta, f'{columna}.offsets.npy'), mmap_mode='r')
+            with open(os.path.join(ruta, f'{columna}.heap'), 'rb') as f:
+                # mmap no admite archivos vacíos
+                self._heaps[columna] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) \
+                    if os.fstat(f.fileno()).st_size else b''
+
+        ids = self._numericas['id_hotel']
+        self._posiciones = {int(id_hotel): i for i, id_hotel in enumerate(ids)}
+        self._json_api = None
+
+    def __len__(self):
+        return self.total
+
+    def columna(self, nombre):
+        """Array NumPy (mmap) de una columna numérica"""
+        return self._numericas[nombre]
+
+    def cadena(self, columna, i):
+        offsets = self._offsets[columna]
+        return self._heaps[columna][int(offsets[i]):int(offsets[i + 1])].decode('utf-8')
+
+    def valor(self, columna, i):
+        """Valor de una columna para la fila i, con None donde la tabla tiene NULL"""
+        if columna in self._numericas:
+            valor = self._numericas[columna][i]
+            if columna in ('precio_amount', 'rating_score'):
+                return None if np.isnan(valor) else float(valor)
+            return int(valor)
+        if columna in self._heaps:
+            return self.cadena(columna, i) or None
+        if columna == 'id':
+            return self.valor('id_hotel', i)
+        raise AttributeError(columna)
+
+    def posicion(self, id_hotel):
+        """Fila de un hotel por id, o None"""
+        return self._posiciones.get(id_hotel)
+
+    def hoteles(self, posiciones=None):
+        """Lista de HotelSnapshot (todas las filas o las posiciones dadas)"""
+        return [HotelSnapshot(self, i) for i in (range(self.total) if posiciones is None else posiciones)]
+
+    def to_dict(self, i):
+        """Mismo diccionario que Hoteles.to_dict()"""
+        amenities = self.cadena('amenities', i) or None
+        if amenities and amenities.strip().startswith('['):
+            try:
+                amenities = json.loads(amenities)
+            except Exception:
+                pass
+        images, reviews = [], []
+        for columna, destino in (('imagenes', images), ('reviews', reviews)):
+            texto = self.cadena(columna, i)
+            if texto:
+                try:
+                    destino.extend(json.loads(texto))
+                except Exception:
+                    pass
+
+        return {
+            'id': self.valor('id_hotel', i),
+            'name': self.cadena('nombre', i),
+            'slug': self.cadena('slug', i),
+            'description': self.cadena('descripcion', i),
+            'location': self.cadena('ubicacion', i),
+            'price': self.cadena('precio_formatted', i),
+            'stars': self.cadena('stars_formatted', i),
+            'stars_count': self.valor('stars_count', i),
+            'image': self.cadena('imagen_url', i),
+            'images': images,
+            'rating': self.cadena('rating_formatted', i),
+            'rating_score': self.valor('rating_score', i),
+            'rating_max_score': self.valor('rating_max_score', i) or 10,
+            'amenities': amenities,
+            'reviews': reviews,
+            'todas_opiniones': reviews,
+            'link': self.cadena('link_booking', i),
+            'fuente_principal': self.cadena('fuente_principal', i),
+        }
+
+    def json_api(self):
+        """Respuesta JSON de /api/hotels, serializada una vez por versión"""
+        if self._json_api is None:
+            self._json_api = json.dumps([self.to_dict(i) for i in range(self.total)], ensure_ascii=False)
+        return self._json_api
+
+# =============================================================================
+# SNAPSHOT COMPARTIDO DEL PROCESO
+# =============================================================================
+
+_catalogo = None
+_ultima_comprobacion = 0.0
+_lock = threading.Lock()
+
+
+def obtener_catalogo():
+    """
+    Devuelve el snapshot actual del proceso, o None si todavía no hay snapshot
+
+    Comprueba el puntero ACTUAL como mucho una vez por segundo y abre la
+    versión nueva cuando cambia.
+    """
+    global _catalogo, _ultima_comprobacion
+    ahora = time.monotonic()
+    if _catalogo is not None and ahora - _ultima_comprobacion < INTERVALO_COMPROBACION:
+        return _catalogo
+
+    directorio = _directorio()
+    if not directorio:
+        return None
+    with _lock:
+        _ultima_comprobacion = ahora
+        try:
+            with open(os.path.join(directorio, 'ACTUAL'), encoding='utf-8') as f:
+                version = f.read().strip()
+        except OSError:
+            _catalogo = None
+            return None
+        if _catalogo is None or _catalogo.version != version \
+                or os.path.dirname(_catalogo.ruta) != directorio:
+            try:
+                _catalogo = CatalogoSnapshot(os.path.join(directorio, version))
+            except (OSError, ValueError) as e:
+                logger.error(f"No se pudo abrir el snapshot del catálogo {version}: {e}")
+                return _catalogo
+        return _catalogo
+
+# =============================================================================
+# REESCRITURA AUTOMÁTICA TRAS LA INGESTA
+# =============================================================================
+
+_temporizador = None
+
+
+def _reescribir(app):
+    global _temporizador
+    with _lock:
+        _temporizador = None
+    with app.app_context():
+        try:
+            escribir_snapshot()
+        except Exception as e:
+            logger.error(f"Error escribiendo el snapshot del catálogo: {e}")
+        finally:
+            db.session.remove()
+
+
+@registrar_invalidador
+def programar_reescritura(ids):
+    """
+    Invalidador de ingesta: reescribe el snapshot DEMORA_REESCRITURA segundos
+    después del primer cambio, agrupando todos los lotes de ese intervalo
+    """
+    global _temporizador
+    if not _directorio():
+        return
+    app = current_app._get_current_object()
+    with _lock:
+        if _temporizador is not None:
+            return
+        _temporizador = threading.Timer(DEMORA_REESCRITURA, _reescribir, args=(app,))
+        _temporizador.daemon = True
+        _temporizador.start()
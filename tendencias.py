@@ -0,0 +1,337 @@
+"""
+HOTELES EN TENDENCIA - SISTEMA RECOMENDADOR DE HOTELES
+======================================================
+
+Este archivo contiene contadores de popularidad por hotel (vistas, favoritos
+y valoraciones) con decaimiento exponencial, en memoria, para responder
+"qué se está mirando ahora" sin consultar las tablas de eventos.
+
+CARACTERÍSTICAS:
+- Cada contador pierde la mitad de su valor cada TENDENCIAS_VIDA_MEDIA_HORAS;
+  se guarda el valor y la fecha a la que está decaído, así un evento solo
+  actualiza su hotel (O(1)) y el decaimiento se aplica al leer
+- Actualización desde las rutas que escriben interacciones: detalle del
+  hotel (vista), favoritos (alta y baja) y valoraciones
+- Snapshot en la tabla tendencias_hotel cada TENDENCIAS_INTERVALO_SNAPSHOT
+  segundos desde un hilo de cada proceso: suma los incrementos del proceso
+  (SELECT ... FOR UPDATE) y relee la tabla, así los workers de gunicorn ven
+  la actividad de los demás y los contadores sobreviven a un reinicio
+- Al terminar el proceso se guarda lo pendiente (atexit)
+- Puntuación de tendencia: vistas + 5 x favoritos + 3 x valoraciones
+
+USO:
+    tendencias.registrar(hotel.id_hotel, 'vista')
+    tendencias.registrar(hotel.id_hotel, 'valoracion', puntuacion=4)
+    tendencias.hoteles_tendencia(10)
+
+VERSIÓN: 2.0
+"""
+
+import atexit
+from datetime import datetime
+import heapq
+import logging
+import os
+import threading
+
+from sqlalchemy import inspect, select
+
+from models import db, TendenciasHotel
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Valores por defecto (se configuran con init_tendencias)
+VIDA_MEDIA_HORAS = 24
+INTERVALO_SNAPSHOT = 60
+
+# Posición de cada tipo de interacción en los contadores
+INDICES = {'vista': 0, 'favorito': 1, 'valoracion': 2}
+
+# Peso de vistas, favoritos y valoraciones en la puntuación de tendencia
+PESOS = (1.0, 5.0, 3.0)
+
+# Hoteles con puntuación menor no se cargan en memoria (sin actividad reciente)
+PUNTUACION_MINIMA = 0.01
+
+# Hoteles por respuesta como máximo
+MAX_HOTELES = 100
+
+# Filas por SELECT ... FOR UPDATE al guardar el snapshot
+LOTE_SNAPSHOT = 500
+
+# Estado del módulo: id_hotel -> [vistas, favoritos, valoraciones, suma_puntuacion, fecha]
+_app = None
+_vida_media = VIDA_MEDIA_HORAS * 3600
+_intervalo = INTERVALO_SNAPSHOT
+_contadores = {}
+_pendientes = {}
+_cargado_pid = None
+_hilo = None
+_pid = None
+_detener = threading.Event()
+_lock = threading.Lock()
+
+
+def init_tendencias(app):
+    """
+    Configura los contadores de tendencia para la aplicación Flask
+
+    Args:
+        app: Aplicación Flask (el hilo del snapshot corre dentro de su app_context)
+    """
+    global _app, _vida_media, _intervalo
+    _app = app
+    _vida_media = float(app.config.get('TENDENCIAS_VIDA_MEDIA_HORAS', VIDA_MEDIA_HORAS)) * 3600
+    # En pruebas no hay hilo: la base de datos desaparece antes que el proceso
+    _intervalo = 0 if app.config.get('TESTING') else \
+        int(app.config.get('TENDENCIAS_INTERVALO_SNAPSHOT', INTERVALO_SNAPSHOT))
+
+# =============================================================================
+# CONTADORES CON DECAIMIENTO
+# =============================================================================
+
+def _factor(desde, hasta):
+    """Fracción que queda de un valor de `desde` en `hasta`"""
+    segundos = (hasta - desde).total_seconds()
+    return 0.5 ** (segundos / _vida_media) if segundos > 0 else 1.0
+
+
+def _sumar(destino, id_hotel, valores, fecha):
+    """Suma `valores` (decaídos a `fecha`) al contador del hotel, a la fecha más reciente"""
+    actual = destino.get(id_hotel)
+    if actual is None:
+        destino[id_hotel] = list(valores) + [fecha]
+        return
+    if fecha >= actual[4]:
+        f = _factor(actual[4], fecha)
+        actual[:4] = [a * f + v for a, v in zip(actual[:4], valores)]
+        actual[4] = fecha
+    else:
+        f = _factor(fecha, actual[4])
+        actual[:4] = [a + v * f for a, v in zip(actual[:4], valores)]
+
+
+def _valores(tipo, signo, puntuacion):
+    valores = [0.0, 0.0, 0.0, 0.0]
+    valores[INDICES[tipo]] = float(signo)
+    if tipo == 'valoracion' and puntuacion is not None:
+        valores[3] = float(signo) * float(puntuacion)
+    return valores
+
+
+def registrar(id_hotel, tipo, puntuacion=None, signo=1, fecha=None):
+    """
+    Cuenta una interacción en los contadores del proceso
+
+    Args:
+        id_hotel: Hotel
+        tipo: 'vista', 'favorito' o 'valoracion'
+        puntuacion: Puntuación de la valoración
+        signo: -1 para descontar (quitar un favorito)
+        fecha: Fecha del evento (por defecto ahora)
+    """
+    fecha = fecha or datetime.now()
+    valores = _valores(tipo, signo, puntuacion)
+    with _lock:
+        _sumar(_contadores, id_hotel, valores, fecha)
+        actual = _contadores[id_hotel]
+        actual[:4] = [max(0.0, v) for v in actual[:4]]
+        _sumar(_pendientes, id_hotel, valores, fecha)
+    _asegurar_hilo()
+
+
+def _puntuacion(contador):
+    return sum(p * v for p, v in zip(PESOS, contador[:3]))
+
+
+def hoteles_tendencia(limite=10, ahora=None):
+    """
+    Hoteles con más actividad reciente
+
+    Args:
+        limite: Hoteles a devolver (como máximo MAX_HOTELES)
+        ahora: Fecha a la que se decaen los contadores
+
+    Returns:
+        Lista de {'id_hotel', 'puntuacion', 'vistas', 'favoritos',
+        'valoraciones', 'puntuacion_media'}, de mayor a menor puntuación
+    """
+    global _cargado_pid
+    ahora = ahora or datetime.now()
+    if _cargado_pid != os.getpid():
+        try:
+            sincronizar(ahora)
+        except Exception as e:
+            # Sin snapshot se sirve lo del proceso; el hilo lo vuelve a intentar
+            _cargado_pid = os.getpid()
+            logger.warning(f"No se pudo cargar el snapshot de tendencias: {e}")
+    _asegurar_hilo()
+    limite = max(1, min(int(limite), MAX_HOTELES))
+    with _lock:
+        # Cada contador está decaído a su propia fecha: se compara a `ahora`
+        mejores = heapq.nlargest(limite, _contadores.items(),
+                                 key=lambda item: _puntuacion(item[1]) * _factor(item[1][4], ahora))
+    resultado = []
+    for id_hotel, (vistas, favoritos, valoraciones, suma, fecha) in mejores:
+        f = _factor(fecha, ahora)
+        resultado.append({
+            'id_hotel': id_hotel,
+            'puntuacion': round(_puntuacion((vistas, favoritos, valoraciones)) * f, 3),
+            'vistas': round(vistas * f, 3),
+            'favoritos': round(favoritos * f, 3),
+            'valoraciones': round(valoraciones * f, 3),
+            'puntuacion_media': round(suma / valoraciones, 2) if valoraciones > 1e-9 else None,
+        })
+    return [h for h in resultado if h['puntuacion'] > 0]
+
+
+def ordenar_por_tendencia(hoteles, limite=10, catalogo=None):
+    """
+    Los `limite` hoteles de la lista en tendencia, completados con el resto
+    en su orden (usuarios sin historial)
+
+    Args:
+        hoteles: Lista de Hoteles o HotelSnapshot
+        limite: Hoteles a devolver
+        catalogo: Snapshot del que sale `hoteles` (busca por posición sin
+            recorrer la lista)
+    """
+    ids = [t['id_hotel'] for t in hoteles_tendencia(MAX_HOTELES)]
+    if catalogo is not None:
+        posiciones = [catalogo.posicion(i) for i in ids]
+        elegidos = catalogo.hoteles([p for p in posiciones if p is not None][:limite])
+    else:
+        por_id = {h.id_hotel: h for h in hoteles}
+        elegidos = [por_id[i] for i in ids if i in por_id][:limite]
+    if len(elegidos) < limite:
+        vistos = {h.id_hotel for h in elegidos}
+        for hotel in hoteles:
+            if len(elegidos) >= limite:
+                break
+            if hotel.id_hotel not in vistos:
+                elegidos.append(hotel)
+    return elegidos
+
+# =============================================================================
+# SNAPSHOT EN LA BASE DE DATOS
+# =============================================================================
+
+def _guardar(pendientes, ahora):
+    """Suma los incrementos a tendencias_hotel, decayendo cada fila a `ahora`"""
+    ids = sorted(pendientes)
+    for inicio in range(0, len(ids), LOTE_SNAPSHOT):
+        lote = ids[inicio:inicio + LOTE_SNAPSHOT]
+        filas = {
+            f.id_hotel: f for f in db.session.execute(
+                select(TendenciasHotel).where(TendenciasHotel.id_hotel.in_(lote)).with_for_update()
+            ).scalars()
+        }
+        for id_hotel in lote:
+            delta = pendientes[id_hotel]
+            fd = _factor(delta[4], ahora)
+            fila = filas.get(id_hotel)
+            if fila is None:
+                fila = TendenciasHotel(id_hotel=id_hotel, vistas=0, favoritos=0, valoraciones=0,
+                                       suma_puntuacion=0, actualizado=ahora)
+                db.session.add(fila)
+            ff = _factor(fila.actualizado, ahora)
+            fila.vistas = max(0.0, fila.vistas * ff + delta[0] * fd)
+            fila.favoritos = max(0.0, fila.favoritos * ff + delta[1] * fd)
+            fila.valoraciones = max(0.0, fila.valoraciones * ff + delta[2] * fd)
+            fila.suma_puntuacion = max(0.0, fila.suma_puntuacion * ff + delta[3] * fd)
+            fila.actualizado = ahora
+        db.session.commit()
+
+
+def sincronizar(ahora=None):
+    """
+    Guarda los incrementos del proceso y recarga los contadores de la tabla
+
+    Returns:
+        Diccionario con 'guardados' (hoteles con incrementos) y 'hoteles' en memoria
+    """
+    global _pendientes, _contadores, _cargado_pid
+    ahora = ahora or datetime.now()
+    with _lock:
+        pendientes, _pendientes = _pendientes, {}
+    try:
+        if pendientes:
+            _guardar(pendientes, ahora)
+    except Exception:
+        db.session.rollback()
+        # Se devuelven a la cola para el siguiente snapshot
+        with _lock:
+            for id_hotel, valores in pendientes.items():
+                _sumar(_pendientes, id_hotel, valores[:4], valores[4])
+        raise
+
+    nuevos = {}
+    for id_hotel, *valores, actualizado in db.session.execute(
+        select(TendenciasHotel.id_hotel, TendenciasHotel.vistas, TendenciasHotel.favoritos,
+               TendenciasHotel.valoraciones, TendenciasHotel.suma_puntuacion, TendenciasHotel.actualizado)
+    ):
+        if _puntuacion(valores) * _factor(actualizado, ahora) >= PUNTUACION_MINIMA:
+            nuevos[id_hotel] = valores + [actualizado]
+    with _lock:
+        # Lo registrado mientras se guardaba sigue pendiente y se suma encima
+        for id_hotel, valores in _pendientes.items():
+            _sumar(nuevos, id_hotel, valores[:4], valores[4])
+        _contadores = nuevos
+        _cargado_pid = os.getpid()
+    return {'guardados': len(pendientes), 'hoteles': len(nuevos)}
+
+# =============================================================================
+# HILO DEL SNAPSHOT
+# =============================================================================
+
+def _bucle_snapshot():
+    while True:
+        detener = _detener.wait(_intervalo)
+        with _app.app_context():
+            try:
+                # Al cerrar solo se guarda lo pendiente, y si la tabla sigue existiendo
+                if not detener:
+                    sincronizar()
+                elif _pendientes and inspect(db.engine).has_table(TendenciasHotel.__tablename__):
+                    sincronizar()
+            except Exception as e:
+                logger.error(f"Error guardando el snapshot de tendencias: {e}")
+        if detener:
+            return
+
+
+def _asegurar_hilo():
+    global _hilo, _pid
+    if _app is None or _intervalo <= 0:
+        return
+    if _hilo is not None and _pid == os.getpid() and _hilo.is_alive():
+        return
+    with _lock:
+        if _hilo is not None and _pid == os.getpid() and _hilo.is_alive():
+            return
+        _detener.clear()
+        _pid = os.getpid()
+        _hilo = threading.Thread(target=_bucle_snapshot, name='tendencias', daemon=True)
+        _hilo.start()
+
+
+def vaciar(espera=5.0):
+    """
+    Detiene el hilo del snapshot después de guardar lo pendiente
+
+    Returns:
+        True si el hilo terminó dentro de `espera` segundos
+    """
+    hilo = _hilo
+    if hilo is None or _pid != os.getpid() or not hilo.is_alive():
+        return True
+    _detener.set()
+    hilo.join(espera)
+    return not hilo.is_alive()
+
+
+atexit.register(vaciar)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los agregados del panel de analítica
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+from models import db, AnaliticaDia, AnaliticaHora, Hoteles, InteraccionesUsuario, Valoraciones
+from analitica import actualizar_agregados, resumen_analitica, ultimas_horas
+
+AHORA = datetime(2026, 5, 10, 12, 30)
+
+
+@pytest.fixture
+def app_db(app_db):
+    db.session.add_all([
+        Hoteles(id_hotel=1, nombre='Hotel Uno', slug='hotel-uno'),
+        Hoteles(id_hotel=2, nombre='Hotel Dos', slug='hotel-dos'),
+    ])
+    db.session.add_all([
+        InteraccionesUsuario(id_usuario=1, id_hotel=1, tipo_interaccion='vista', valor=1, conteo=3,
+                             fecha_interaccion=datetime(2026, 5, 9, 10, 5)),
+        InteraccionesUsuario(id_usuario=2, id_hotel=1, tipo_interaccion='vista', valor=1,
+                             fecha_interaccion=datetime(2026, 5, 10, 11, 40)),
+        InteraccionesUsuario(id_usuario=2, id_hotel=1, tipo_interaccion='favorito', valor=1,
+                             fecha_interaccion=datetime(2026, 5, 10, 11, 45)),
+        InteraccionesUsuario(id_usuario=1, id_hotel=2, tipo_interaccion='vista', valor=1,
+                             fecha_interaccion=datetime(2026, 5, 10, 12, 10)),
+        # Valoraciones con el id numérico y con el nombre del hotel (filas antiguas)
+        Valoraciones(id_usuario=1, id_hotel='1', puntuacion=8, fecha_valoracion=datetime(2026, 5, 9, 10, 20)),
+        Valoraciones(id_usuario=2, id_hotel='Hotel Uno', puntuacion=10,
+                     fecha_valoracion=datetime(2026, 5, 10, 11, 50)),
+    ])
+    db.session.commit()
+    return app_db
+
+
+def test_agregados_por_hora_y_dia(app_db):
+    resumen = actualizar_agregados(ahora=AHORA)
+
+    assert resumen['desde'] == '2026-05-09T10:00:00'
+    vistas = {(h.periodo, h.id_hotel): h.eventos for h in AnaliticaHora.query.filter_by(tipo='vista')}
+    assert vistas == {
+        (datetime(2026, 5, 9, 10), 1): 3,
+        (datetime(2026, 5, 10, 11), 1): 1,
+        (datetime(2026, 5, 10, 12), 2): 1,
+    }
+    dias = {(d.fecha.isoformat(), d.tipo, d.puntuacion): d.eventos
+            for d in AnaliticaDia.query.filter_by(id_hotel=1)}
+    assert dias == {
+        ('2026-05-09', 'vista', 0): 3,
+        ('2026-05-09', 'valoracion', 8): 1,
+        ('2026-05-10', 'vista', 0): 1,
+        ('2026-05-10', 'favorito', 0): 1,
+        ('2026-05-10', 'valoracion', 10): 1,
+    }
+
+
+def test_pasada_incremental_recoge_vistas_fusionadas(app_db):
+    actualizar_agregados(ahora=AHORA)
+
+    # La vista reciente se fusiona con otra (más conteo y fecha nueva) y
+    # llega un evento nuevo: la ventana de recálculo los recoge
+    vista = InteraccionesUsuario.query.filter_by(id_usuario=1, id_hotel=2).one()
+    vista.conteo = 2
+    vista.fecha_interaccion = datetime(2026, 5, 10, 12, 25)
+    db.session.add(InteraccionesUsuario(id_usuario=3, id_hotel=2, tipo_interaccion='favorito', valor=1,
+                                        fecha_interaccion=datetime(2026, 5, 10, 12, 28)))
+    db.session.commit()
+    resumen = actualizar_agregados(ahora=AHORA)
+
+    assert resumen['desde'] == '2026-05-10T10:00:00'
+    # El día anterior no se vuelve a calcular
+    assert AnaliticaDia.query.filter_by(fecha=datetime(2026, 5, 9).date(), tipo='vista').one().eventos == 3
+    hoy = resumen_analitica(dias=2, ahora=AHORA)
+    assert hoy['serie'][-1] == {'fecha': '2026-05-10', 'vistas': 3, 'favoritos': 2, 'valoraciones': 1}
+
+
+def test_panel_lee_solo_agregados(app_db):
+    actualizar_agregados(ahora=AHORA)
+    consultas = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *a: consultas.append(a[2]))
+
+    resumen = resumen_analitica(dias=7, ahora=AHORA)
+    horas = ultimas_horas(ahora=AHORA)
+
+    assert not any('interacciones_usuario' in c or 'valoraciones' in c for c in consultas)
+    assert resumen['totales'] == {'vistas': 5, 'favoritos': 1, 'valoraciones': 2,
+                                  'puntuacion_media': 9.0, 'conversion_favoritos': 0.2}
+    assert resumen['distribucion_puntuaciones']['8'] == 1
+    assert resumen['distribucion_puntuaciones']['10'] == 1
+    assert [(h['nombre'], h['vistas'], h['favoritos']) for h in resumen['top_hoteles']] == [
+        ('Hotel Uno', 4, 1), ('Hotel Dos', 1, 0)]
+    assert len(horas) == 24
+    assert horas[-1] == {'hora': '2026-05-10T12:00:00', 'vistas': 1, 'favoritos': 0, 'valoraciones': 0}
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Pruebas del archivo de páginas crudas
+"""
+
+import os
+
+import pytest
+from archivo_raw import ArchivoRaw, importar_volcados
+
+HTML = '<html><body>' + '<div data-testid="property-card">Hotel</div>' * 200 + '</body></html>'
+
+
+@pytest.fixture
+def archivo(tmp_path):
+    archivo = ArchivoRaw(str(tmp_path / 'archivo_raw'))
+    yield archivo
+    archivo.cerrar()
+
+
+def test_deduplicacion_y_lectura(archivo):
+    primero = archivo.guardar(HTML, url='https://www.booking.com/a', tipo='busqueda')
+    segundo = archivo.guardar(HTML.encode('utf-8'), url='https://www.booking.com/b', tipo='busqueda')
+    otro = archivo.guardar('<html></html>', hotel='Casa Agena', tipo='tarjeta', motivo='sin_precio')
+    archivo.esperar()
+
+    assert primero == segundo != otro
+    assert archivo.leer(primero).decode('utf-8') == HTML
+
+    estadisticas = archivo.estadisticas()
+    assert estadisticas['capturas'] == 3 and estadisticas['blobs'] == 2
+    assert estadisticas['bytes_en_disco'] * 10 < estadisticas['bytes_originales']
+
+    assert [c['hash'] for c in archivo.buscar(hotel='Casa Agena')] == [otro]
+    assert len(archivo.buscar(tipo='busqueda')) == 2
+    with pytest.raises(FileNotFoundError):
+        archivo.leer('0' * 64)
+
+
+def test_importar_volcados(archivo, tmp_path):
+    ruta = tmp_path / 'debug_no_price_Casa_Agena.html'
+    ruta.write_text(HTML, encoding='utf-8')
+
+    assert importar_volcados(archivo, [str(ruta)], borrar=True) == 1
+    assert not os.path.exists(ruta)
+    captura = archivo.buscar(hotel='Casa_Agena')[0]
+    assert captura['motivo'] == 'sin_precio'
+    assert archivo.leer(captura['hash']).decode('utf-8') == HTML
+
+
+def test_importar_volcados_no_borra_si_falla_la_escritura(archivo, tmp_path, monkeypatch):
+    buena = tmp_path / 'debug_no_price_Casa_Agena.html'
+    buena.write_text(HTML, encoding='utf-8')
+    mala = tmp_path / 'debug_no_price_Otro.html'
+    mala.write_text('<html>otro</html>', encoding='utf-8')
+    escribir = archivo._escribir_blob
+
+    def escribir_o_fallar(hash_contenido, contenido, compresor):
+        if b'otro' in contenido:
+            raise OSError('disco lleno')
+        return escribir(hash_contenido, contenido, compresor)
+
+    monkeypatch.setattr(archivo, '_escribir_blob', escribir_o_fallar)
+    importar_volcados(archivo, [str(buena), str(mala)], borrar=True)
+
+    assert not os.path.exists(buena)
+    assert os.path.exists(mala)
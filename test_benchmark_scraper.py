@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Pruebas del benchmark del scraper (servidor local, sin red)
+"""
+
+import os
+
+import pytest
+import benchmark_scraper
+from benchmark_scraper import (ServidorReplay, cargar_referencia, cargar_tarjetas, comparar,
+                               medir_precision, medir_scraping)
+
+
+def _tarjeta(nombre):
+    return (nombre, f'<div data-testid="property-card"><div data-testid="title">{nombre}</div>'
+                    f'<a data-testid="title-link" href="/hotel/co/{nombre.lower()}.html"></a></div>')
+
+
+def test_scraping_contra_el_servidor_local(monkeypatch):
+    # Desde el entorno del benchmark no debe quedar nada al terminar
+    monkeypatch.delenv('ARCHIVO_RAW_DIR', raising=False)
+    tarjetas = [_tarjeta(f'Hotel{i}') for i in range(30)]
+    resultado = medir_scraping(tarjetas)
+    assert resultado['scraping_hoteles'] == 30
+    # 25 resultados por página: dos páginas
+    assert resultado['scraping_paginas'] == 2
+    assert resultado['scraping_pico_memoria_mb'] > 0
+    assert 'ARCHIVO_RAW_DIR' not in os.environ
+
+
+def test_comparar_con_la_referencia():
+    referencia = {'parseo_paginas_por_segundo': 10.0, 'scraping_pico_memoria_mb': 10.0, 'precision': 1.0}
+    resultados = {'parseo_paginas_por_segundo': 7.0, 'scraping_pico_memoria_mb': 11.0, 'precision': 1.0}
+    regresiones = {m: r for m, _, _, _, r in comparar(resultados, referencia, tolerancia=0.25)}
+    assert regresiones == {'parseo_paginas_por_segundo': True, 'scraping_pico_memoria_mb': False,
+                           'precision': False}
+
+
+@pytest.mark.skipif(not os.path.exists(benchmark_scraper.ARCHIVO_REFERENCIA), reason='Sin referencia')
+def test_precision_de_la_extraccion():
+    """Los HTML guardados de Booking.com se siguen extrayendo como se espera"""
+    resultado = medir_precision(cargar_tarjetas(), cargar_referencia()['esperado'])
+    assert resultado['fallos'] == []
+    assert resultado['precision'] == 1.0
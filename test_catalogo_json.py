@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la importación y exportación JSON en streaming
+"""
+
+import json
+
+import pytest
+from models import Hoteles
+import catalogo_json
+from catalogo_json import (escribir_hoteles, exportar_catalogo, importar_catalogo,
+                           iterar_hoteles, normalizar_archivo)
+
+HOTELES = [
+    {'nombre': 'Casa Agena', 'location': 'Getsemaní, Cartagena', 'price': 'COP 350.000',
+     'price_amount': 350000.0, 'rating_score': 9.2, 'amenities': ['WiFi', 'Piscina'],
+     'link': 'https://www.booking.com/hotel/co/casa-agena.html'},
+    {'name': 'Hotel Caribe', 'nombre': 'Caribe', 'stars_count': 5, 'reviews_count': 1200},
+    {'description': 'Sin nombre'},
+]
+
+
+@pytest.mark.parametrize('nombre', ['hoteles.json', 'hoteles.jsonl'])
+def test_lectura_y_normalizacion(tmp_path, monkeypatch, nombre):
+    # Bloques diminutos para que los hoteles queden partidos entre lecturas
+    monkeypatch.setattr(catalogo_json, 'TAMANO_BLOQUE', 7)
+    monkeypatch.setattr(catalogo_json, 'ijson', None)
+    ruta = str(tmp_path / nombre)
+    assert escribir_hoteles(iter(HOTELES), ruta) == 3
+
+    resumen = {}
+    hoteles = list(iterar_hoteles(ruta, resumen))
+    assert [h.get('name') for h in hoteles] == ['Casa Agena', 'Hotel Caribe', None]
+    assert all('nombre' not in h for h in hoteles)
+    assert hoteles[0]['amenities'] == ['WiFi', 'Piscina']
+    assert resumen == {'leidos': 3, 'corregidos': 2, 'sin_nombre': 1}
+
+
+def test_linea_invalida_se_omite(tmp_path):
+    ruta = tmp_path / 'hoteles.jsonl'
+    ruta.write_text('{"name": "Uno"}\n{roto\n\n{"name": "Dos"}\n', encoding='utf-8')
+    assert [h['name'] for h in iterar_hoteles(str(ruta))] == ['Uno', 'Dos']
+
+
+def test_normalizar_archivo_en_sitio(tmp_path):
+    ruta = tmp_path / 'hoteles_scrapeados.json'
+    ruta.write_text(json.dumps(HOTELES, ensure_ascii=False, indent=2), encoding='utf-8')
+    resumen = normalizar_archivo(str(ruta))
+    assert resumen['corregidos'] == 2
+    assert [h.get('name') for h in json.loads(ruta.read_text(encoding='utf-8'))] == \
+        ['Casa Agena', 'Hotel Caribe', None]
+    assert not (tmp_path / 'hoteles_scrapeados.json.tmp').exists()
+
+
+def test_exportar_e_importar(app_db, tmp_path):
+    entrada = str(tmp_path / 'entrada.json')
+    escribir_hoteles(HOTELES, entrada)
+    resumen = importar_catalogo(entrada)
+    assert (resumen['leidos'], resumen['insertados'], resumen['descartados']) == (3, 2, 1)
+
+    salida = str(tmp_path / 'catalogo.jsonl')
+    assert exportar_catalogo(salida, tamano_lote=1) == 2
+    casa, caribe = iterar_hoteles(salida)
+    assert (casa['name'], casa['price_amount'], casa['amenities']) == ('Casa Agena', 350000.0, ['WiFi', 'Piscina'])
+    assert casa['link'] == 'https://www.booking.com/hotel/co/casa-agena.html'
+    assert (caribe['stars_count'], caribe['reviews_count']) == (5, 1200)
+
+    # Reimportar la exportación no cambia nada
+    resumen = importar_catalogo(salida)
+    assert (resumen['sin_cambios'], resumen['insertados'], resumen['actualizados']) == (2, 0, 0)
+    assert Hoteles.query.count() == 2
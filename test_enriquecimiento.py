@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Pruebas del enriquecimiento con la página de detalle (sin red)
+"""
+
+import json
+from datetime import datetime
+
+from models import db, Hoteles
+import enriquecimiento
+from enriquecimiento import enriquecer_hoteles, hoteles_pendientes, parse_detalle
+
+DETALLE = '''
+<html><head>
+<script type="application/ld+json">
+{"@type": "Hotel", "name": "Casa Agena", "telephone": "+57 605 1234567",
+ "hasMap": "https://maps.googleapis.com/maps/api/staticmap?center=10.4267,-75.5476&zoom=15"}
+</script></head><body>
+<img src="https://cf.bstatic.com/xdata/images/hotel/max1024x768/111.jpg?k=a">
+<img src="https://cf.bstatic.com/xdata/images/hotel/square60/111.jpg?k=a">
+<img src="https://cf.bstatic.com/xdata/images/hotel/max1024x768/222.jpg?k=b">
+<div data-testid="review-subscore"><span>Personal</span><span>9,1</span></div>
+<div data-testid="review-subscore"><span>Relación calidad-precio</span><span>8,4</span></div>
+<div data-testid="review-subscore"><span>Ubicación</span><span>9,6</span></div>
+</body></html>
+'''
+
+
+def _hotel(nombre, **columnas):
+    hotel = Hoteles(nombre=nombre, slug=nombre.lower().replace(' ', '-'),
+                    link_booking=f'https://www.booking.com/hotel/co/{nombre}.html?checkin=x', **columnas)
+    db.session.add(hotel)
+    return hotel
+
+
+def test_parse_detalle():
+    datos = parse_detalle(DETALLE)
+    assert (datos['latitud'], datos['longitud']) == (10.4267, -75.5476)
+    assert datos['telefono'] == '+57 605 1234567'
+    assert len(json.loads(datos['imagenes'])) == 2
+    assert datos['puntuacion_personal'] == 9.1
+    assert datos['puntuacion_calidad_precio'] == 8.4
+    assert datos['puntuacion_ubicacion'] == 9.6
+    assert 'website' not in datos
+
+
+def test_prioridad_y_reanudacion(app_db, monkeypatch):
+    completo = _hotel('Completo', latitud=1.0, telefono='1', website='w', imagenes='["x"]',
+                      fecha_enriquecimiento=datetime(2020, 1, 1))
+    _hotel('Nuevo')
+    db.session.commit()
+
+    pedidos = []
+
+    def fake_descargar(link, id_hotel=None):
+        pedidos.append(link)
+        return DETALLE
+
+    monkeypatch.setattr(enriquecimiento, '_descargar', fake_descargar)
+    assert [h for h, _ in hoteles_pendientes()][0] != completo.id_hotel
+
+    resumen = enriquecer_hoteles(limite=10, trabajadores=2)
+    assert resumen == {'enriquecidos': 2, 'sin_cambios': 0, 'fallidos': 0}
+    assert Hoteles.query.filter_by(nombre='Nuevo').one().puntuacion_personal == 9.1
+    # Un campo que la página no trae no borra el dato guardado
+    assert Hoteles.query.filter_by(nombre='Completo').one().website == 'w'
+
+    # Ya visitados: la siguiente pasada no tiene nada pendiente
+    assert hoteles_pendientes() == []
+    assert enriquecer_hoteles() == {'enriquecidos': 0, 'sin_cambios': 0, 'fallidos': 0}
+    assert len(pedidos) == 2
+
+
+def test_hotel_borrado_durante_la_descarga(app_db, monkeypatch):
+    hotel = _hotel('Sigue')
+    db.session.commit()
+    # El hotel 999 estaba pendiente pero se borró mientras se descargaba su página
+    pendientes = [(999, 'https://www.booking.com/hotel/co/borrado.html'), (hotel.id_hotel, hotel.link_booking)]
+    monkeypatch.setattr(enriquecimiento, 'hoteles_pendientes', lambda *a: pendientes)
+    monkeypatch.setattr(enriquecimiento, '_descargar', lambda link, id_hotel=None: DETALLE)
+
+    assert enriquecer_hoteles(trabajadores=2) == {'enriquecidos': 1, 'sin_cambios': 0, 'fallidos': 1}
+    assert Hoteles.query.filter_by(nombre='Sigue').one().puntuacion_personal == 9.1
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la ingesta de eventos de interacción en segundo plano
+"""
+
+from datetime import datetime, timedelta
+import queue
+import time
+
+import pytest
+from models import db, InteraccionesUsuario
+import eventos
+from eventos import compactar_vistas, init_eventos, registrar_vista, vaciar
+
+
+@pytest.fixture
+def config_app(tmp_path):
+    # Archivo y no memoria: el escritor usa su propia conexión
+    return {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'eventos.db'}",
+            'EVENTOS_LOTE': 3,
+            'EVENTOS_INTERVALO_MS': 50}
+
+
+@pytest.fixture
+def app_db(app_db):
+    init_eventos(app_db)
+    yield app_db
+    vaciar()
+
+
+def _vistas():
+    db.session.expire_all()
+    return InteraccionesUsuario.query.filter_by(tipo_interaccion='vista').count()
+
+
+def test_vistas_por_lotes_y_vaciado_al_cerrar(app_db):
+    antes = eventos.estadisticas()
+    for id_hotel in range(7):
+        assert registrar_vista(1, id_hotel + 1)
+    assert vaciar()
+
+    despues = eventos.estadisticas()
+    assert _vistas() == 7
+    assert despues['escritos'] - antes['escritos'] == 7
+    # Lotes de 3 como máximo: al menos 3 INSERT
+    assert despues['lotes'] - antes['lotes'] >= 3
+    assert despues['pendientes'] == 0
+
+
+def test_vistas_se_escriben_tras_el_intervalo(app_db):
+    registrar_vista(1, 1)
+    limite = time.monotonic() + 2
+    while _vistas() == 0 and time.monotonic() < limite:
+        time.sleep(0.02)
+    assert _vistas() == 1
+
+
+def test_cola_llena_descarta_sin_bloquear(app_db, monkeypatch):
+    monkeypatch.setattr(eventos, '_asegurar_hilo', lambda: None)
+    monkeypatch.setattr(eventos, '_cola', queue.Queue(maxsize=1))
+    antes = eventos.estadisticas()['descartados']
+    assert registrar_vista(1, 1)
+    assert not registrar_vista(1, 2)
+    assert eventos.estadisticas()['descartados'] == antes + 1
+
+
+def test_modo_sincrono(app_db, monkeypatch):
+    monkeypatch.setattr(eventos, '_modo', 'sincrono')
+    registrar_vista(1, 1)
+    assert _vistas() == 1
+
+
+def test_vistas_repetidas_en_la_ventana_suman_conteo(app_db, monkeypatch):
+    monkeypatch.setattr(eventos, '_modo', 'sincrono')
+    base = datetime(2026, 3, 1, 10, 0)
+    registrar_vista(1, 1, fecha=base)
+    registrar_vista(1, 1, fecha=base + timedelta(minutes=5))
+    registrar_vista(1, 2, fecha=base + timedelta(minutes=6))
+    # Otra ventana de 30 minutos: fila nueva
+    registrar_vista(1, 1, fecha=base + timedelta(minutes=40))
+
+    filas = InteraccionesUsuario.query.order_by(InteraccionesUsuario.id_interaccion).all()
+    assert [(f.id_hotel, f.conteo) for f in filas] == [(1, 2), (2, 1), (1, 1)]
+    assert filas[0].fecha_interaccion == base + timedelta(minutes=5)
+
+
+def test_lote_agrupa_antes_de_insertar(app_db):
+    base = datetime(2026, 3, 1, 10, 0)
+    for minuto in range(5):
+        registrar_vista(1, 1, fecha=base + timedelta(minutes=minuto))
+    vaciar()
+    fila = InteraccionesUsuario.query.one()
+    assert fila.conteo == 5
+
+
+def test_lote_con_vistas_y_otros_tipos(app_db):
+    base = datetime(2026, 3, 1, 10, 0)
+    registrar_vista(1, 1, fecha=base)
+    registrar_vista(1, 1, fecha=base + timedelta(minutes=1))
+    eventos.registrar_evento(1, 2, 'favorito', fecha=base)
+    eventos.registrar_evento(1, 3, 'valoracion', 4.0, fecha=base)
+    vaciar()
+
+    filas = {f.tipo_interaccion: f for f in InteraccionesUsuario.query.all()}
+    assert eventos.estadisticas()['fallidos'] == 0
+    assert (filas['vista'].id_hotel, filas['vista'].conteo) == (1, 2)
+    assert (filas['favorito'].id_hotel, filas['favorito'].conteo) == (2, 1)
+    assert (filas['valoracion'].valor, filas['valoracion'].conteo) == (4.0, 1)
+
+
+def test_compactar_vistas_antiguas(app_db, monkeypatch):
+    monkeypatch.setattr(eventos, '_modo', 'sincrono')
+    ahora = datetime(2026, 3, 20, 12, 0)
+    viejo = datetime(2026, 3, 1, 8, 0)
+    for horas in (0, 2, 5):
+        registrar_vista(1, 1, fecha=viejo + timedelta(hours=horas))
+    registrar_vista(1, 2, fecha=viejo)
+    registrar_vista(1, 1, fecha=viejo + timedelta(days=1))
+    # Recientes: no se tocan
+    registrar_vista(1, 1, fecha=ahora - timedelta(hours=1))
+    registrar_vista(1, 1, fecha=ahora - timedelta(hours=3))
+
+    resumen = compactar_vistas(dias=7, ahora=ahora)
+    assert resumen == {'grupos': 1, 'filas_eliminadas': 2}
+    filas = InteraccionesUsuario.query.filter(InteraccionesUsuario.fecha_interaccion < ahora - timedelta(days=7)).all()
+    assert sorted((f.id_hotel, f.fecha_interaccion, f.conteo) for f in filas) == [
+        (1, viejo + timedelta(hours=5), 3),
+        (1, viejo + timedelta(days=1), 1),
+        (2, viejo, 1),
+    ]
+    assert _vistas() == 5
+    assert compactar_vistas(dias=7, ahora=ahora) == {'grupos': 0, 'filas_eliminadas': 0}
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Pruebas del motor de extracción de campos
+"""
+
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+from extraccion import extraer_campos, parsear_numero
+from scraper import extract_hotel_info_booking
+
+
+@pytest.mark.parametrize('texto, entero, esperado', [
+    ('154.700', True, 154700),
+    ('1.292.000', True, 1292000),
+    ('1,586', True, 1586),
+    ('8,7', False, 8.7),
+    ('8.5', False, 8.5),
+    ('1.234,5', False, 1234.5),
+    ('abc', False, None),
+])
+def test_parsear_numero(texto, entero, esperado):
+    assert parsear_numero(texto, entero=entero) == esperado
+
+
+def test_extraer_campos_tarjeta():
+    texto = ('Hilton Cartagena Puntuación: 8,4 8,4 Muy bien · 1.586 comentarios '
+             'a 3,7 km del centro COP\xa01.221.000 COP\xa0959.640 Precio original COP\xa01.221.000. '
+             'Precio actual COP\xa0959.640. + COP\xa0182.300 de impuestos y cargos')
+    campos = extraer_campos(texto)
+    assert campos['precio'] == 959640 and campos['precio_moneda'] == 'COP'
+    assert campos['impuestos'] == 182300
+    assert campos['puntuacion'] == 8.4
+    assert campos['comentarios'] == 1586
+
+
+def test_extraer_campos_rating_legacy():
+    assert extraer_campos('Puntuación: 8,1\n8,1\nMuy bien\n194 comentarios') == {
+        'puntuacion': 8.1, 'comentarios': 194
+    }
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('Muy bien 8,5/10', {'puntuacion': 8.5, 'puntuacion_maxima': 10}),
+    ('Fabuloso 4.5 de 5', {'puntuacion': 4.5, 'puntuacion_maxima': 5}),
+    # Frases de la tarjeta que no son puntuaciones
+    ('Fabuloso 9,0 desde 2 de 5 noches', {}),
+    ('Muy bien 8,1 194 comentarios 1 de 5 habitaciones disponibles', {'comentarios': 194}),
+])
+def test_extraer_puntuacion_sobre_maximo(texto, esperado):
+    assert extraer_campos(texto) == esperado
+
+
+@pytest.mark.skipif(not os.path.exists('prueba.txt'), reason='Requiere prueba.txt')
+def test_tarjetas_reales():
+    with open('prueba.txt', encoding='utf-8', errors='replace') as f:
+        soup = BeautifulSoup(f.read(), 'html.parser')
+    hoteles = [extract_hotel_info_booking(c) for c in soup.find_all('div', {'data-testid': 'property-card'})]
+    hilton = next(h for h in hoteles if h['name'] == 'Hilton Cartagena')
+    assert hilton['price_amount'] == 959640
+    assert hilton['rating_score'] == 8.4
+    assert hilton['reviews_count'] == 1586
+    assert hilton['stars_count'] == 4
+    assert all(h['price_amount'] for h in hoteles)
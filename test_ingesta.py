@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la ingesta por lotes de hoteles scrapeados
+"""
+
+from models import Hoteles
+import ingesta
+from ingesta import ingestar_hoteles, hotel_a_fila, calcular_huella
+
+
+def _hotel(nombre, precio=100000):
+    return {
+        'name': nombre,
+        'price': f'COP {precio}',
+        'price_amount': precio,
+        'rating': 'Puntuación: 8,1\n8,1\nMuy bien\n194 comentarios',
+        'amenities': ['wifi', 'piscina'],
+        'link': f'https://www.booking.com/hotel/co/{nombre}.html',
+        'source': 'booking',
+    }
+
+
+def test_hotel_a_fila_recorta_y_normaliza():
+    fila = hotel_a_fila(_hotel('Hotel Álamo'))
+    assert fila['slug'] == 'hotel-alamo'
+    assert fila['amenities'] == 'wifi, piscina'
+    assert len(fila['rating_formatted']) == 20
+    assert hotel_a_fila({'price': 'Consultar'}) is None
+
+
+def test_ingestar_hoteles_inserta_actualiza_y_omite(app_db):
+    resumen = ingestar_hoteles((_hotel(f'Hotel {i}') for i in range(5)), tamano_lote=2)
+    assert resumen['insertados'] == 5
+    assert Hoteles.query.count() == 5
+
+    segunda = [_hotel(f'Hotel {i}') for i in range(5)] + [_hotel('Hotel 5'), {'price': 'sin nombre'}]
+    segunda[0] = _hotel('Hotel 0', precio=120000)
+    resumen = ingestar_hoteles(segunda, tamano_lote=3)
+    assert resumen == {'insertados': 1, 'actualizados': 1, 'sin_cambios': 4, 'descartados': 1}
+    assert Hoteles.query.filter_by(slug='hotel-0').one().precio_amount == 120000
+
+
+def test_huella_ignora_enlaces_y_espacios():
+    base = hotel_a_fila(_hotel('Hotel Uno'))
+    otra = _hotel('Hotel  Uno')
+    otra['link'] = 'https://www.booking.com/hotel/co/uno.html?sid=otra-sesion'
+    assert calcular_huella(base) == calcular_huella(hotel_a_fila(otra))
+    assert calcular_huella(base) != calcular_huella(hotel_a_fila(_hotel('Hotel Uno', precio=1)))
+
+
+def test_ingesta_invalida_solo_hoteles_cambiados(app_db, monkeypatch):
+    ingestar_hoteles([_hotel('Hotel A'), _hotel('Hotel B')])
+    invalidados = []
+    monkeypatch.setattr(ingesta, '_invalidadores', [invalidados.extend])
+
+    ingestar_hoteles([_hotel('Hotel A'), _hotel('Hotel B', precio=90000)])
+    assert invalidados == [Hoteles.query.filter_by(slug='hotel-b').one().id_hotel]
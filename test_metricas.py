@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Pruebas de las métricas del scraping (sin red)
+"""
+
+import pytest
+import requests
+import scraper
+import metricas
+from metricas import Metricas, ejecucion, medir, registrar_tarjeta
+
+
+@pytest.fixture(autouse=True)
+def registro_limpio(monkeypatch):
+    monkeypatch.setattr(metricas, 'METRICAS', Metricas())
+    monkeypatch.setattr(scraper, 'METRICAS', metricas.METRICAS)
+
+
+def test_formato_prometheus():
+    registro = Metricas(buckets=(0.1, 1.0))
+    registro.observar('scraper_stage_seconds', 0.05, stage='parse')
+    registro.observar('scraper_stage_seconds', 0.5, stage='parse')
+    registro.incrementar('scraper_http_responses_total', status=200)
+    registro.incrementar('scraper_http_responses_total', 2, status=503)
+    texto = registro.texto_prometheus()
+
+    assert '# TYPE scraper_stage_seconds histogram' in texto
+    assert 'scraper_stage_seconds_bucket{stage="parse",le="0.1"} 1' in texto
+    assert 'scraper_stage_seconds_bucket{stage="parse",le="1"} 2' in texto
+    assert 'scraper_stage_seconds_bucket{stage="parse",le="+Inf"} 2' in texto
+    assert 'scraper_stage_seconds_count{stage="parse"} 2' in texto
+    assert 'scraper_http_responses_total{status="503"} 2' in texto
+
+
+def test_make_request_cuenta_bytes_estados_y_reintentos(monkeypatch):
+    respuestas = iter([503, 200])
+
+    class _Respuesta:
+        def __init__(self, status_code):
+            self.status_code = status_code
+            self.content = b'x' * 100
+
+        def raise_for_status(self):
+            if self.status_code >= 400:
+                raise requests.HTTPError(response=self)
+
+    monkeypatch.setattr(scraper.requests, 'get', lambda *a, **k: _Respuesta(next(respuestas)))
+    monkeypatch.setattr(scraper.time, 'sleep', lambda s: None)
+    monkeypatch.setattr(scraper, 'HOST_BUDGET', scraper.HostBudget(delay=lambda: 0))
+
+    with ejecucion('prueba') as resumen:
+        assert scraper.make_request('https://www.booking.com/x').status_code == 200
+    assert resumen['http'] == {'503': 1, '200': 1}
+    assert (resumen['bytes'], resumen['reintentos']) == (200, 1)
+    assert resumen['etapas']['fetch']['llamadas'] == 2
+
+
+def test_resumen_de_ejecucion(tmp_path):
+    with medir('parse'):
+        pass
+    archivo = tmp_path / 'metricas' / 'scraper.prom'
+    with ejecucion('prueba', archivo=str(archivo)) as resumen:
+        with medir('extract'):
+            registrar_tarjeta({'name': 'Casa', 'price_amount': 1000, 'rating_score': None})
+        registrar_tarjeta({'name': 'Otro', 'price_amount': None})
+
+    assert list(resumen['etapas']) == ['extract']
+    assert resumen['tarjetas'] == 2
+    assert resumen['campos']['price_amount'] == 0.5
+    assert 'rating_score' not in resumen['campos']
+    assert 'scraper_cards_total 2' in archivo.read_text(encoding='utf-8')
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Pruebas del motor de migraciones por lotes
+"""
+
+import pytest
+from models import db, Hoteles, Migraciones
+from migraciones import ejecutar_migracion, estado_migracion
+
+
+@pytest.fixture
+def app_db(app_db):
+    for i in range(7):
+        db.session.add(Hoteles(nombre=f'Hotel {i}', slug=f'hotel-{i}', rating=8.0 + i / 10,
+                               precio_promedio=100000 if i % 2 else None))
+    db.session.add(Hoteles(nombre='Casa Cuatro', slug='casa', stars_count=3,
+                           fuente_principal='trivago', version_scraping='2.0'))
+    db.session.commit()
+    return app_db
+
+
+def test_dry_run_no_guarda(app_db):
+    resumen = ejecutar_migracion('hoteles_estructura_v2', tamano_lote=3, dry_run=True)
+    assert (resumen['estado'], resumen['procesados'], resumen['modificados'], resumen['lotes']) == \
+        ('completada', 8, 7, 3)
+    assert estado_migracion('hoteles_estructura_v2') is None
+    assert Hoteles.query.filter(Hoteles.rating_score.isnot(None)).count() == 0
+
+
+def test_reanuda_desde_el_punto_de_control(app_db):
+    # Primera ejecución interrumpida tras dos lotes
+    resumen = ejecutar_migracion('hoteles_estructura_v2', tamano_lote=3, max_lotes=2)
+    assert resumen['estado'] == 'en_curso'
+    estado = estado_migracion('hoteles_estructura_v2')
+    assert (estado['estado'], estado['procesados'], estado['ultimo_id']) == ('en_curso', 6, 6)
+
+    resumen = ejecutar_migracion('hoteles_estructura_v2', tamano_lote=3)
+    assert (resumen['estado'], resumen['procesados']) == ('completada', 2)
+    estado = estado_migracion('hoteles_estructura_v2')
+    assert (estado['procesados'], estado['modificados']) == (8, 7)
+    assert estado['fecha_fin'] is not None
+
+    hotel = Hoteles.query.filter_by(slug='hotel-1').one()
+    assert (hotel.rating_score, hotel.rating_formatted, hotel.precio_amount) == (8.1, '8.1/10', 100000)
+    assert (hotel.stars_count, hotel.stars_formatted) == (1, '1 ⭐')
+    assert Hoteles.query.filter_by(slug='casa').one().stars_count == 3
+
+    # Completada: no se vuelve a recorrer salvo con reiniciar
+    assert ejecutar_migracion('hoteles_estructura_v2')['procesados'] == 0
+    resumen = ejecutar_migracion('hoteles_estructura_v2', reiniciar=True)
+    assert (resumen['procesados'], resumen['modificados']) == (8, 0)
+    assert db.session.get(Migraciones, 'hoteles_estructura_v2').procesados == 8
+
+
+def test_setters_del_modelo(app_db):
+    hotel = Hoteles(nombre='Nuevo', slug='nuevo')
+    hotel.set_amenities_list(['WiFi', 'Piscina'])
+    hotel.set_imagenes_list(['https://img/1.jpg'])
+    hotel.set_reviews_list(['Muy bueno'])
+    hotel.metadata_scraping = '{"content_hash": "abc"}'
+    hotel.set_metadata_dict({'destination': 'Cartagena'})
+    assert hotel.get_amenities_list() == ['WiFi', 'Piscina']
+    assert hotel.amenities_raw == '["WiFi", "Piscina"]'
+    assert hotel.get_imagenes_list() == ['https://img/1.jpg']
+    assert hotel.get_reviews_list() == ['Muy bueno']
+    assert hotel.get_metadata_dict() == {'destination': 'Cartagena', 'content_hash': 'abc'}
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la retención de interacciones por mes (SQLite, sin particiones)
+"""
+
+from datetime import date, datetime
+import sqlite3
+
+import pytest
+from models import db, InteraccionesUsuario
+from particiones import aplicar_retencion, mes_vencido, sql_agregar_meses, sql_particionar
+
+
+@pytest.fixture
+def config_app():
+    return {'INTERACCIONES_RETENCION': 'vista:90,valoracion:0',
+            'INTERACCIONES_ARCHIVO_DIR': ''}
+
+
+def _interaccion(tipo, fecha, id_usuario=1):
+    db.session.add(InteraccionesUsuario(id_usuario=id_usuario, id_hotel=1, tipo_interaccion=tipo,
+                                        valor=1.0, fecha_interaccion=fecha))
+
+
+def test_sql_de_particiones_mysql():
+    sql = sql_particionar([date(2026, 1, 1), date(2026, 2, 1)])
+    assert 'PARTITION BY RANGE (TO_DAYS(fecha_interaccion))' in sql
+    assert "PARTITION p202601 VALUES LESS THAN (TO_DAYS('2026-02-01'))" in sql
+    assert "PARTITION p202602 VALUES LESS THAN (TO_DAYS('2026-03-01'))" in sql
+    assert sql.rstrip().endswith('PARTITION pfuturo VALUES LESS THAN MAXVALUE\n)')
+    assert 'REORGANIZE PARTITION pfuturo' in sql_agregar_meses([date(2026, 12, 1)])
+    assert "TO_DAYS('2027-01-01')" in sql_agregar_meses([date(2026, 12, 1)])
+
+
+def test_mes_vencido_es_por_mes_completo():
+    ahora = datetime(2026, 6, 15)
+    # Límite: 2026-03-17; marzo todavía tiene días dentro de la retención
+    assert mes_vencido(date(2026, 2, 1), 90, ahora)
+    assert not mes_vencido(date(2026, 3, 1), 90, ahora)
+
+
+def test_retencion_por_tipo_con_archivo(app_db, tmp_path):
+    ahora = datetime(2026, 6, 15)
+    for dia in (3, 10, 20):
+        _interaccion('vista', datetime(2026, 1, dia))
+    _interaccion('favorito', datetime(2026, 1, 5))
+    _interaccion('valoracion', datetime(2026, 1, 6))
+    _interaccion('vista', datetime(2026, 2, 1))
+    _interaccion('vista', datetime(2026, 5, 1))
+    db.session.commit()
+
+    simulacion = aplicar_retencion(ahora=ahora, archivar=str(tmp_path), dry_run=True)
+    assert [(a['mes'], a['accion'], a['tipos'], a['filas']) for a in simulacion] == [
+        ('2026-01', 'delete', ['vista'], 3),
+        ('2026-02', 'delete', ['vista'], 1),
+    ]
+    assert InteraccionesUsuario.query.count() == 7
+
+    aplicar_retencion(ahora=ahora, archivar=str(tmp_path), tamano_lote=2)
+    restantes = sorted((i.tipo_interaccion, i.fecha_interaccion.month) for i in InteraccionesUsuario.query.all())
+    assert restantes == [('favorito', 1), ('valoracion', 1), ('vista', 5)]
+
+    with sqlite3.connect(tmp_path / 'interacciones_202601.db') as conexion:
+        assert conexion.execute('SELECT COUNT(*) FROM interacciones_usuario').fetchone() == (3,)
+
+    # Repetir no encuentra nada más
+    assert aplicar_retencion(ahora=ahora, archivar=str(tmp_path)) == []
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Pruebas del programador de scraping y de la ingesta de precios por ventana
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from models import db, Hoteles, PreciosVentana, Trabajos
+import trabajos
+from ingesta import ingestar_hoteles, ingestar_precios_ventana
+from programador import ciclo_programador, intervalo_precios
+
+
+@pytest.fixture
+def config_app():
+    return {'TRABAJOS_MODO': 'proceso',
+            'SCRAPING_DESTINOS': 'Cartagena, Medellín',
+            'SCRAPING_VENTANAS': '3,45',
+            'SCRAPING_NOCHES': 2}
+
+
+@pytest.fixture
+def app_db(app_db):
+    trabajos.init_trabajos(app_db)
+    return app_db
+
+
+def test_intervalo_precios_segun_cercania():
+    assert intervalo_precios(3) < intervalo_precios(14) < intervalo_precios(45)
+
+
+def test_ciclo_respeta_cadencia(app_db):
+    ahora = datetime(2026, 3, 1, 8, 0)
+    encolados = ciclo_programador(ahora)
+    # 2 destinos x (1 completo + 2 ventanas) + enriquecimiento + compactación
+    # de vistas + retención de interacciones + analítica
+    assert len(encolados) == 10
+    precios = Trabajos.query.filter_by(clave='precios:cartagena:3').one()
+    assert precios.get_parametros()['checkin'] == '2026-03-04'
+    assert precios.get_parametros()['checkout'] == '2026-03-06'
+
+    # Los activos no se duplican
+    assert ciclo_programador(ahora) == []
+
+    # Marcar todo como completado: a las 7 horas solo vencen la ventana
+    # cercana, el enriquecimiento (cada hora) y la analítica (cada 15 minutos)
+    for trabajo in Trabajos.query.all():
+        trabajo.estado, trabajo.clave_activa, trabajo.fecha_creacion = 'completado', None, ahora
+    db.session.commit()
+    claves = {db.session.get(Trabajos, i).clave for i in ciclo_programador(ahora + timedelta(hours=7))}
+    assert claves == {'precios:cartagena:3', 'precios:medellin:3', 'enriquecimiento', 'analitica'}
+
+
+def test_ingesta_precios_ventana(app_db):
+    ingestar_hoteles([{'name': 'Hotel Uno', 'price': 'COP 100.000', 'price_amount': 100000}])
+    hotel = {'name': 'Hotel Uno', 'price': 'COP 120.000', 'price_amount': 120000}
+    checkin, checkout = date(2026, 3, 4), date(2026, 3, 6)
+
+    resumen = ingestar_precios_ventana([hotel, {'name': 'Desconocido', 'price': 'COP 1', 'price_amount': 1}], checkin, checkout)
+    assert resumen == {'actualizados': 1, 'sin_cambios': 0, 'desconocidos': 1}
+    assert ingestar_precios_ventana([hotel], checkin, checkout)['sin_cambios'] == 1
+
+    precio = PreciosVentana.query.one()
+    assert precio.precio_amount == 120000
+    # El precio principal del hotel no cambia
+    assert Hoteles.query.one().precio_amount == 100000
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la resolución de entidades entre fuentes
+"""
+
+from resolucion_entidades import HotelDataMerger, geohash, name_similarity
+
+
+def test_combina_mismo_hotel_entre_fuentes():
+    hoteles = [
+        {'name': 'Hotel Casa San Agustín', 'location': 'Centro, Cartagena de Indias', 'source': 'booking',
+         'link': 'https://www.booking.com/hotel/co/casa-san-agustin.html', 'price': 'COP 1.200.000',
+         'price_amount': 1200000, 'price_currency': 'COP'},
+        {'name': 'Hilton Cartagena', 'location': 'Laguito, Cartagena de Indias', 'source': 'booking',
+         'link': 'https://www.booking.com/hotel/co/hilton.html', 'price_amount': 959640},
+        {'name': 'Casa San Agustin Hotel', 'location': 'Cartagena', 'source': 'trivago',
+         'link': 'https://www.trivago.com/casa-san-agustin', 'price': '$310', 'price_amount': 310,
+         'price_currency': 'USD', 'description': 'Hotel colonial'},
+        {'name': 'Hotel Caribe by Faranda', 'location': 'Bocagrande, Cartagena', 'source': 'trivago',
+         'link': 'https://www.trivago.com/caribe'},
+    ]
+
+    combinados = HotelDataMerger().merge(hoteles)
+
+    assert [h['name'] for h in combinados] == ['Hotel Casa San Agustín', 'Hilton Cartagena', 'Hotel Caribe by Faranda']
+    casa = combinados[0]
+    assert casa['sources'] == ['booking', 'trivago']
+    assert casa['link_booking'].startswith('https://www.booking.com')
+    assert casa['link_trivago'] == 'https://www.trivago.com/casa-san-agustin'
+    assert casa['prices_by_source']['trivago']['currency'] == 'USD'
+    assert casa['price_amount'] == 1200000
+    # Campos que faltan en la fuente preferida se completan con las demás
+    assert casa['description'] == 'Hotel colonial'
+
+
+def test_no_combina_hoteles_distintos_en_otra_zona():
+    hoteles = [
+        {'name': 'Hotel Marina Real', 'location': 'Bocagrande, Cartagena', 'source': 'booking'},
+        {'name': 'Hotel Marina Real', 'location': 'El Poblado, Medellín', 'source': 'trivago'},
+        {'name': 'Hotel Marina', 'location': 'Bocagrande, Cartagena', 'source': 'trivago'},
+    ]
+    assert len(HotelDataMerger().merge(hoteles)) == 3
+    assert name_similarity('marina real', 'marina') < 88
+
+
+def test_bloqueo_evita_comparaciones_cuadraticas():
+    hoteles = [{'name': f'Hotel Cartagena Palmera{i} Suites', 'location': 'Cartagena', 'source': 'booking'}
+               for i in range(2000)]
+    merger = HotelDataMerger()
+    assert len(merger.merge(hoteles)) == 2000
+    # 'cartagena' está en todos los hoteles y no forma bloque
+    assert merger.comparisons == 0
+
+
+def test_bloqueo_por_geohash():
+    assert geohash(57.64911, 10.40744, precision=11) == 'u4pruydqqvj'
+    hoteles = [
+        {'name': 'Movich Hotel Cartagena de Indias', 'latitude': 10.4236, 'longitude': -75.5519,
+         'source': 'booking'},
+        {'name': 'Hotel Movich Cartagena', 'latitude': 10.4237, 'longitude': -75.5519, 'source': 'trivago'},
+    ]
+    assert len(HotelDataMerger().merge(hoteles)) == 1
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Pruebas del scraper de Booking.com (sin red)
+"""
+
+import pytest
+import scraper
+
+
+def _pagina(nombres):
+    """Construye una página de resultados de Booking.com con una tarjeta por nombre"""
+    tarjetas = ''.join(
+        f'<div data-testid="property-card">'
+        f'<div data-testid="title">{nombre}</div>'
+        f'<a data-testid="title-link" href="/hotel/co/{nombre.lower().replace(" ", "-")}.html"></a>'
+        f'</div>'
+        for nombre in nombres
+    )
+    return f'<html><body>{tarjetas}</body></html>'.encode('utf-8')
+
+
+class _Respuesta:
+    def __init__(self, content):
+        self.content = content
+
+
+@pytest.fixture
+def paginas(monkeypatch, tmp_path):
+    """Simula Booking.com con 3 páginas de 2 hoteles y registra los offsets pedidos"""
+    monkeypatch.setenv('ARCHIVO_RAW_DIR', str(tmp_path / 'archivo_raw'))
+    hoteles = [f'Hotel {i}' for i in range(6)]
+    offsets = []
+
+    def fake_request(url, params=None, retries=3):
+        offset = int(params['offset'])
+        rows = int(params['rows'])
+        offsets.append(offset)
+        return _Respuesta(_pagina(hoteles[offset:offset + rows]))
+
+    monkeypatch.setattr(scraper, 'make_request', fake_request)
+    return offsets
+
+
+def test_iter_booking_hotels_pagina_hasta_el_limite(paginas):
+    hoteles = list(scraper.iter_booking_hotels(hotel_limit=5, rows=2))
+    assert [h['name'] for h in hoteles] == [f'Hotel {i}' for i in range(5)]
+    assert paginas == [0, 2, 4]
+    assert hoteles[-1]['page_offset'] == 4
+
+
+def test_iter_booking_hotels_reanuda_desde_offset(paginas):
+    hoteles = list(scraper.iter_booking_hotels(hotel_limit=10, offset=4, rows=2))
+    assert [h['name'] for h in hoteles] == ['Hotel 4', 'Hotel 5']
+    # La página vacía en offset 6 termina el crawl
+    assert paginas == [4, 6]
+
+
+def test_iter_booking_hotels_es_perezoso(paginas):
+    generador = scraper.iter_booking_hotels(hotel_limit=10, rows=2)
+    assert next(generador)['name'] == 'Hotel 0'
+    assert paginas == [0]
+
+
+class _RespuestaHTTP:
+    def __init__(self, status_code, content=b'<html></html>', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+def test_classify_response():
+    assert scraper.classify_response(_RespuestaHTTP(200)) == 'ok'
+    assert scraper.classify_response(_RespuestaHTTP(429)) == 'throttled'
+    assert scraper.classify_response(_RespuestaHTTP(403)) == 'blocked'
+    assert scraper.classify_response(_RespuestaHTTP(404)) == 'client_error'
+    assert scraper.classify_response(_RespuestaHTTP(502)) == 'error'
+    desafio = b'<html><script>window.gokuProps = {};</script></html>'
+    assert scraper.classify_response(_RespuestaHTTP(200, desafio)) == 'captcha'
+    # Las páginas normales cargan challenge.js y el iframe de recaptcha
+    normal = b'<script src="https://x.awswaf.com/challenge.js"></script><iframe src="/recaptcha/api2/aframe">'
+    assert scraper.classify_response(_RespuestaHTTP(200, normal)) == 'ok'
+
+
+def test_host_budget_aimd():
+    presupuesto = scraper.HostBudget(max_concurrent=4, delay=lambda: 0)
+    url = 'https://www.booking.com/searchresults.html'
+    presupuesto.report(url, 'throttled', retry_after=0)
+    presupuesto.report(url, 'captcha', retry_after=0)
+    estado = presupuesto.status()['www.booking.com']
+    assert (estado['limit'], estado['backoff']) == (1.0, 4.0)
+
+    # Crecimiento aditivo: vuelve al máximo tras varias respuestas sanas
+    for _ in range(12):
+        presupuesto.report(url, 'ok')
+    estado = presupuesto.status()['www.booking.com']
+    assert estado['limit'] == 4.0
+    assert estado['backoff'] < 4.0
+
+
+def test_make_request_no_reintenta_un_desafio(monkeypatch):
+    peticiones = []
+
+    def fake_get(url, **kwargs):
+        peticiones.append(url)
+        return _RespuestaHTTP(200, b'<div class="g-recaptcha"></div>')
+
+    monkeypatch.setattr(scraper.requests, 'get', fake_get)
+    monkeypatch.setattr(scraper, 'HOST_BUDGET', scraper.HostBudget(delay=lambda: 0))
+    assert scraper.make_request('https://www.booking.com/x') is None
+    assert len(peticiones) == 1
+    assert scraper.HOST_BUDGET.status()['www.booking.com']['limit'] == 1.0
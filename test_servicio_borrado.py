@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Pruebas del borrado por lotes de historial y cuentas
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+from models import db, InteraccionesUsuario, PreferenciasUsuario, Trabajos, Usuario, Valoraciones
+import trabajos
+from trabajos import ejecutar_trabajo
+from servicio_borrado import borrar_historial, solicitar_borrado
+
+
+@pytest.fixture
+def config_app():
+    return {'TRABAJOS_MODO': 'proceso',
+            'BORRADO_LOTE': 4,
+            'BORRADO_UMBRAL_TRABAJO': 10}
+
+
+@pytest.fixture
+def app_db(app_db, monkeypatch):
+    monkeypatch.setattr(trabajos, 'INTERVALO_LATIDO', 0)
+    trabajos.init_trabajos(app_db)
+    return app_db
+
+
+def _usuario(interacciones, valoraciones=0):
+    usuario = Usuario(nombre_usuario='u', email=f'u{datetime.now().timestamp()}@x.com', password_hash='x')
+    db.session.add(usuario)
+    db.session.flush()
+    db.session.add(PreferenciasUsuario(id_usuario=usuario.id_usuario))
+    for i in range(interacciones):
+        db.session.add(InteraccionesUsuario(id_usuario=usuario.id_usuario, id_hotel=i + 1, valor=1,
+                                            tipo_interaccion='vista', fecha_interaccion=datetime.now()))
+    for i in range(valoraciones):
+        db.session.add(Valoraciones(id_usuario=usuario.id_usuario, id_hotel=i + 1, puntuacion=8))
+    db.session.commit()
+    return usuario.id_usuario
+
+
+def test_borra_por_lotes_sin_tocar_otros_usuarios(app_db):
+    id_usuario = _usuario(9, valoraciones=2)
+    otro = _usuario(3)
+    borrados = []
+    event.listen(db.engine, 'before_cursor_execute',
+                 lambda *a: borrados.append(a[2]) if a[2].lstrip().upper().startswith('DELETE') else None)
+
+    resumen = borrar_historial(id_usuario)
+
+    assert resumen == {'valoraciones': 2, 'interacciones': 9}
+    # 9 interacciones en lotes de 4 + 1 lote de valoraciones
+    assert len(borrados) == 4
+    assert InteraccionesUsuario.query.filter_by(id_usuario=otro).count() == 3
+
+
+def test_cuenta_pequena_se_borra_en_la_peticion(app_db):
+    id_usuario = _usuario(5)
+
+    id_trabajo, resumen = solicitar_borrado(id_usuario, eliminar_cuenta=True)
+
+    assert id_trabajo is None
+    assert resumen == {'valoraciones': 0, 'interacciones': 5, 'usuario': 1}
+    assert db.session.get(Usuario, id_usuario) is None
+    assert PreferenciasUsuario.query.count() == 0
+
+
+def test_cuenta_grande_va_a_un_trabajo(app_db):
+    id_usuario = _usuario(12)
+
+    id_trabajo, resumen = solicitar_borrado(id_usuario, eliminar_cuenta=True)
+    assert resumen is None
+    # Mientras el trabajo está activo no se encola otro
+    assert solicitar_borrado(id_usuario, eliminar_cuenta=True) == (id_trabajo, None)
+    assert InteraccionesUsuario.query.count() == 12
+
+    ejecutar_trabajo(id_trabajo)
+    trabajo = db.session.get(Trabajos, id_trabajo)
+    assert trabajo.estado == 'completado'
+    assert InteraccionesUsuario.query.count() == 0
+    assert db.session.get(Usuario, id_usuario) is None
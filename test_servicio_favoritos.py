@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Pruebas del servicio de favoritos (consulta única y caché de ids)
+"""
+
+from datetime import datetime, timedelta
+
+import os
+
+import jinja2
+import pytest
+from flask import render_template
+from sqlalchemy import event
+from models import db, Hoteles, InteraccionesUsuario
+import servicio_favoritos
+from servicio_favoritos import agregar_favorito, hoteles_favoritos, ids_favoritos, invalidar, quitar_favorito
+
+
+@pytest.fixture
+def app_db(app_db):
+    for i in range(4):
+        db.session.add(Hoteles(nombre=f'Hotel {i}', slug=f'hotel-{i}'))
+    db.session.commit()
+    servicio_favoritos._cache.clear()
+    return app_db
+
+
+def _contar_consultas():
+    consultas = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *a: consultas.append(a[2]))
+    return consultas
+
+
+def test_pagina_de_favoritos_en_una_consulta(app_db):
+    hoy = datetime.now()
+    for dias, id_hotel in ((3, 1), (1, 3), (2, 2)):
+        db.session.add(InteraccionesUsuario(id_usuario=7, id_hotel=id_hotel, tipo_interaccion='favorito',
+                                            valor=1, fecha_interaccion=hoy - timedelta(days=dias)))
+    db.session.add(InteraccionesUsuario(id_usuario=7, id_hotel=4, tipo_interaccion='vista',
+                                        valor=1, fecha_interaccion=hoy))
+    db.session.commit()
+    db.session.expire_all()
+
+    consultas = _contar_consultas()
+    hoteles = hoteles_favoritos(7)
+    nombres = [h.nombre for h in hoteles]
+
+    assert nombres == ['Hotel 2', 'Hotel 1', 'Hotel 0']
+    assert len(consultas) == 1
+
+
+def test_cache_de_ids_se_actualiza_al_marcar_y_desmarcar(app_db):
+    assert ids_favoritos(7) == frozenset()
+    consultas = _contar_consultas()
+
+    assert agregar_favorito(7, 2)
+    assert not agregar_favorito(7, 2)
+    assert ids_favoritos(7) == {2}
+    # Solo el INSERT: los ids salen de la caché
+    assert sum(c.lstrip().upper().startswith('SELECT') for c in consultas) == 0
+
+    assert quitar_favorito(7, 2)
+    assert not quitar_favorito(7, 2)
+    assert ids_favoritos(7) == frozenset()
+    assert InteraccionesUsuario.query.filter_by(id_usuario=7).count() == 0
+
+
+def test_invalidar_recarga_desde_la_base(app_db):
+    agregar_favorito(7, 1)
+    InteraccionesUsuario.query.filter_by(id_usuario=7).delete()
+    db.session.commit()
+    assert ids_favoritos(7) == {1}
+
+    invalidar(7)
+    assert ids_favoritos(7) == frozenset()
+
+
+def test_plantilla_muestra_nombre_e_imagen(app_db):
+    db.session.get(Hoteles, 2).imagen_url = '/img/2.jpg'
+    db.session.add(InteraccionesUsuario(id_usuario=7, id_hotel=2, tipo_interaccion='favorito', valor=1,
+                                        fecha_interaccion=datetime.now()))
+    db.session.commit()
+    # base.html mínima: solo se prueba el bloque de la página
+    app_db.jinja_loader = jinja2.ChoiceLoader([
+        jinja2.DictLoader({'base.html': '{% block content %}{% endblock %}'}),
+        jinja2.FileSystemLoader(os.path.dirname(os.path.abspath(__file__))),
+    ])
+    app_db.jinja_env.globals['csrf_token'] = lambda: 'x'
+
+    with app_db.test_request_context():
+        html = render_template('favoritos.html', fav_hoteles=hoteles_favoritos(7))
+
+    assert '>Hotel 1</a>' in html
+    assert 'src="/img/2.jpg"' in html
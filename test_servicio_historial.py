@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Pruebas del historial paginado por cursor
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from models import db, Hoteles, InteraccionesUsuario
+from servicio_historial import decodificar_cursor, pagina_historial
+
+
+@pytest.fixture
+def app_db(app_db):
+    for i in range(3):
+        db.session.add(Hoteles(nombre=f'Hotel {i}', slug=f'hotel-{i}', imagen_url=f'/img/{i}.jpg'))
+    # 3 días con 4 eventos cada uno; dos eventos con la misma hora
+    inicio = datetime(2026, 3, 10, 9, 0)
+    for dia in range(3):
+        for j in range(4):
+            fecha = inicio + timedelta(days=dia, hours=min(j, 2))
+            db.session.add(InteraccionesUsuario(id_usuario=1, id_hotel=j % 3 + 1, valor=1,
+                                                tipo_interaccion='favorito' if j == 0 else 'vista',
+                                                fecha_interaccion=fecha))
+    db.session.add(InteraccionesUsuario(id_usuario=2, id_hotel=1, tipo_interaccion='vista', valor=1,
+                                        fecha_interaccion=inicio))
+    db.session.commit()
+    return app_db
+
+
+def _ids(pagina):
+    return [e['id_interaccion'] for d in pagina['dias'] for e in d['eventos']]
+
+
+def test_paginas_recorren_todo_sin_repetir(app_db):
+    consultas = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *a: consultas.append(a[2]))
+
+    vistos, cursor, paginas = [], None, 0
+    while True:
+        pagina = pagina_historial(1, antes=cursor, limite=5)
+        vistos += _ids(pagina)
+        paginas += 1
+        cursor = pagina['siguiente']
+        if cursor is None:
+            break
+
+    assert paginas == 3
+    assert len(vistos) == len(set(vistos)) == 12
+    # Una consulta por página (hoteles en el mismo JOIN)
+    assert len(consultas) == 3
+
+
+def test_primera_pagina_agrupada_por_dia(app_db):
+    pagina = pagina_historial(1, limite=6)
+
+    assert [d['fecha'] for d in pagina['dias']] == ['2026-03-12', '2026-03-11']
+    assert len(pagina['dias'][0]['eventos']) == 4
+    primero = pagina['dias'][0]['eventos'][0]
+    assert primero['fecha'] == '11:00'
+    assert primero['slug'].startswith('hotel-') and primero['image'].startswith('/img/')
+    assert decodificar_cursor(pagina['siguiente'])[0] == datetime(2026, 3, 11, 11, 0)
+
+
+def test_cursor_invalido_devuelve_la_primera_pagina(app_db):
+    assert _ids(pagina_historial(1, antes='basura', limite=3)) == _ids(pagina_historial(1, limite=3))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Pruebas del mapa compartido de resúmenes de hoteles
+"""
+
+import pytest
+from sqlalchemy import event
+from models import db, Hoteles, InteraccionesUsuario, Valoraciones
+import servicio_hoteles
+from servicio_hoteles import invalidar_resumenes, obtener_resumenes
+import snapshot_catalogo
+from snapshot_catalogo import escribir_snapshot
+
+
+@pytest.fixture
+def config_app():
+    return {'CATALOGO_SNAPSHOT_DIR': ''}
+
+
+@pytest.fixture
+def app_db(app_db):
+    for i in range(1, 6):
+        db.session.add(Hoteles(nombre=f'Hotel {i}', slug=f'hotel-{i}', stars_count=i,
+                               imagen_url=f'/img/{i}.jpg', reviews='["larga"]'))
+    db.session.commit()
+    servicio_hoteles.vaciar_resumenes()
+    return app_db
+
+
+def _contar_consultas():
+    consultas = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *a: consultas.append(a[2]))
+    return consultas
+
+
+def test_solo_consulta_los_ids_que_faltan(app_db):
+    consultas = _contar_consultas()
+
+    resumenes = obtener_resumenes([2, 4, 4, None, 99])
+    assert sorted(resumenes) == [2, 4]
+    assert resumenes[4].nombre == 'Hotel 4' and resumenes[4].stars_count == 4
+    assert len(consultas) == 1 and 'reviews' not in consultas[0]
+
+    obtener_resumenes([2, 4])
+    assert len(consultas) == 1
+    obtener_resumenes([2, 3])
+    assert len(consultas) == 2
+
+
+def test_invalidador_recarga_hoteles_modificados(app_db):
+    assert obtener_resumenes([1])[1].nombre == 'Hotel 1'
+    db.session.get(Hoteles, 1).nombre = 'Hotel Uno'
+    db.session.commit()
+    assert obtener_resumenes([1])[1].nombre == 'Hotel 1'
+
+    invalidar_resumenes([1])
+    assert obtener_resumenes([1])[1].nombre == 'Hotel Uno'
+
+
+def test_lee_del_snapshot_y_vacia_al_cambiar_version(app_db, tmp_path):
+    app_db.config['CATALOGO_SNAPSHOT_DIR'] = str(tmp_path / 'snapshot')
+    escribir_snapshot()
+    consultas = _contar_consultas()
+
+    assert obtener_resumenes([3])[3].slug == 'hotel-3'
+    assert consultas == []
+
+    db.session.get(Hoteles, 3).nombre = 'Hotel Tres'
+    db.session.commit()
+    escribir_snapshot()
+    snapshot_catalogo._ultima_comprobacion = 0.0
+    assert obtener_resumenes([3])[3].nombre == 'Hotel Tres'
+
+
+def test_ignora_ids_que_no_son_enteros(app_db):
+    # Las valoraciones antiguas guardan el nombre del hotel en id_hotel
+    db.session.add_all([
+        Valoraciones(id_usuario=1, id_hotel='Hotel 2', puntuacion=4),
+        InteraccionesUsuario(id_usuario=1, id_hotel=2, tipo_interaccion='vista', valor=1),
+    ])
+    db.session.commit()
+    valoraciones = Valoraciones.query.filter_by(id_usuario=1).all()
+    interacciones = InteraccionesUsuario.query.filter_by(id_usuario=1).all()
+
+    resumenes = obtener_resumenes([v.id_hotel for v in valoraciones] + [i.id_hotel for i in interacciones])
+
+    assert list(resumenes) == [2]
+    assert obtener_resumenes(['Hotel 2', '', None]) == {}
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Pruebas del directorio de usuarios del admin
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+from models import db, InteraccionesUsuario, Usuario, Valoraciones
+from servicio_usuarios import directorio_usuarios
+
+
+@pytest.fixture
+def app_db(app_db):
+    for nombre in ('ana', 'andres', 'beatriz', 'carlos', 'an_a'):
+        db.session.add(Usuario(nombre_usuario=nombre.capitalize(), email=f'{nombre}@x.com', password_hash='x'))
+    db.session.commit()
+    return app_db
+
+
+def _id(email):
+    return Usuario.query.filter_by(email=email).one().id_usuario
+
+
+def test_estadisticas_de_la_pagina_en_una_consulta(app_db):
+    ana = _id('ana@x.com')
+    db.session.add_all([
+        InteraccionesUsuario(id_usuario=ana, id_hotel=1, tipo_interaccion='vista', valor=1, conteo=3,
+                             fecha_interaccion=datetime(2026, 5, 1)),
+        InteraccionesUsuario(id_usuario=ana, id_hotel=2, tipo_interaccion='vista', valor=1,
+                             fecha_interaccion=datetime(2026, 5, 2)),
+        InteraccionesUsuario(id_usuario=ana, id_hotel=2, tipo_interaccion='favorito', valor=1,
+                             fecha_interaccion=datetime(2026, 5, 3)),
+        Valoraciones(id_usuario=ana, id_hotel=2, puntuacion=9, fecha_valoracion=datetime(2026, 5, 4)),
+    ])
+    db.session.commit()
+    consultas = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *a: consultas.append(a[2]))
+
+    usuarios = {u['email']: u for u in directorio_usuarios()['usuarios']}
+
+    # Una consulta para la página y otra para todas las estadísticas
+    assert len(consultas) == 2
+    assert usuarios['ana@x.com']['vistas'] == 4
+    assert usuarios['ana@x.com']['favoritos'] == 1
+    assert usuarios['ana@x.com']['valoraciones'] == 1
+    assert usuarios['ana@x.com']['ultima_actividad'] == datetime(2026, 5, 4)
+    assert usuarios['carlos@x.com']['vistas'] == 0
+
+
+def test_paginas_por_cursor(app_db):
+    primera = directorio_usuarios(limite=2)
+    segunda = directorio_usuarios(despues=primera['siguiente'], limite=2)
+    tercera = directorio_usuarios(despues=segunda['siguiente'], limite=2)
+
+    emails = [u['email'] for p in (primera, segunda, tercera) for u in p['usuarios']]
+    assert emails == sorted(emails) and len(emails) == 5
+    assert tercera['siguiente'] is None
+
+
+def test_busqueda_por_prefijo_escapa_comodines(app_db):
+    assert [u['email'] for u in directorio_usuarios(buscar='an')['usuarios']] == \
+        ['an_a@x.com', 'ana@x.com', 'andres@x.com']
+    assert [u['email'] for u in directorio_usuarios(buscar='an_')['usuarios']] == ['an_a@x.com']
+    assert [u['nombre'] for u in directorio_usuarios(buscar='Bea')['usuarios']] == ['Beatriz']
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Pruebas del snapshot columnar del catálogo
+"""
+
+import json
+import os
+
+import pytest
+from models import db, Hoteles
+import snapshot_catalogo
+from snapshot_catalogo import CatalogoSnapshot, escribir_snapshot, obtener_catalogo
+
+
+@pytest.fixture
+def config_app(tmp_path):
+    return {'CATALOGO_SNAPSHOT_DIR': str(tmp_path / 'snapshot')}
+
+
+@pytest.fixture
+def app_db(app_db, monkeypatch):
+    monkeypatch.setattr(snapshot_catalogo, 'INTERVALO_COMPROBACION', 0)
+    monkeypatch.setattr(snapshot_catalogo, '_catalogo', None)
+    return app_db
+
+
+def _hoteles():
+    db.session.add_all([
+        Hoteles(nombre='Casa Agena', slug='casa-agena', ubicacion='Getsemaní, Cartagena',
+                precio_amount=350000, precio_formatted='COP 350.000', rating_score=9.2,
+                rating_formatted='9,2', stars_count=4, reviews_count=512,
+                amenities='["WiFi", "Piscina"]', imagenes='["https://img/1.jpg"]',
+                reviews='["Excelente ubicación"]', link_booking='https://booking.com/casa-agena'),
+        Hoteles(nombre='Hotel Ñandú', slug='hotel-nandu'),
+    ])
+    db.session.commit()
+
+
+def test_snapshot_igual_que_la_tabla(app_db):
+    _hoteles()
+    escribir_snapshot()
+    catalogo = obtener_catalogo()
+
+    assert len(catalogo) == 2
+    assert json.loads(catalogo.json_api()) == [h.to_dict() for h in Hoteles.query.order_by(Hoteles.id_hotel)]
+
+    casa, nandu = catalogo.hoteles()
+    assert (casa.nombre, casa.rating_score, casa.stars_count) == ('Casa Agena', 9.2, 4)
+    # Los NULL de la tabla vuelven como None
+    assert (nandu.rating_score, nandu.precio_amount, nandu.amenities) == (None, None, None)
+    assert nandu.nombre == 'Hotel Ñandú'
+    assert catalogo.posicion(nandu.id_hotel) == 1
+
+
+def test_version_nueva_y_limpieza(app_db):
+    _hoteles()
+    directorio = app_db.config['CATALOGO_SNAPSHOT_DIR']
+    primera = escribir_snapshot()
+    assert obtener_catalogo().version == primera
+
+    db.session.add(Hoteles(nombre='Hotel Caribe', slug='hotel-caribe'))
+    db.session.commit()
+    escribir_snapshot()
+    tercera = escribir_snapshot()
+
+    catalogo = obtener_catalogo()
+    assert catalogo.version == tercera and len(catalogo) == 3
+    versiones = [v for v in os.listdir(directorio) if v.startswith('v')]
+    assert len(versiones) == snapshot_catalogo.VERSIONES_CONSERVADAS
+    assert primera not in versiones
+
+
+def test_sin_snapshot_y_catalogo_vacio(app_db):
+    assert obtener_catalogo() is None
+    version = escribir_snapshot()
+    catalogo = CatalogoSnapshot(os.path.join(app_db.config['CATALOGO_SNAPSHOT_DIR'], version))
+    assert len(catalogo) == 0 and catalogo.json_api() == '[]'
+
+    app_db.config['CATALOGO_SNAPSHOT_DIR'] = ''
+    assert obtener_catalogo() is None
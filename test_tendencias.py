@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los contadores de hoteles en tendencia
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from models import db, Hoteles, TendenciasHotel
+import tendencias
+from tendencias import hoteles_tendencia, ordenar_por_tendencia, registrar, sincronizar
+
+AHORA = datetime(2026, 5, 10, 12, 0)
+
+
+@pytest.fixture
+def app_db(app_db, monkeypatch):
+    monkeypatch.setattr(tendencias, '_contadores', {})
+    monkeypatch.setattr(tendencias, '_pendientes', {})
+    monkeypatch.setattr(tendencias, '_cargado_pid', None)
+    monkeypatch.setattr(tendencias, '_vida_media', 24 * 3600)
+    return app_db
+
+
+def _reiniciar_proceso(monkeypatch):
+    monkeypatch.setattr(tendencias, '_contadores', {})
+    monkeypatch.setattr(tendencias, '_pendientes', {})
+    monkeypatch.setattr(tendencias, '_cargado_pid', None)
+
+
+def test_decaimiento_y_orden(app_db):
+    for _ in range(4):
+        registrar(1, 'vista', fecha=AHORA - timedelta(hours=24))
+    registrar(2, 'favorito', fecha=AHORA)
+    registrar(3, 'valoracion', puntuacion=4, fecha=AHORA)
+    registrar(3, 'valoracion', puntuacion=2, fecha=AHORA)
+
+    ranking = hoteles_tendencia(ahora=AHORA)
+
+    # 2 valoraciones x 3 > 1 favorito x 5 > 4 vistas a mitad de valor
+    assert [h['id_hotel'] for h in ranking] == [3, 2, 1]
+    assert ranking[2]['vistas'] == 2.0
+    assert ranking[0]['puntuacion_media'] == 3.0
+
+    # Quitar un favorito no deja contadores negativos
+    registrar(2, 'favorito', signo=-1, fecha=AHORA)
+    registrar(2, 'favorito', signo=-1, fecha=AHORA)
+    assert [h['id_hotel'] for h in hoteles_tendencia(ahora=AHORA)] == [3, 1]
+
+
+def test_snapshot_sobrevive_al_reinicio_y_suma_procesos(app_db, monkeypatch):
+    registrar(1, 'vista', fecha=AHORA - timedelta(hours=24))
+    registrar(1, 'favorito', fecha=AHORA - timedelta(hours=24))
+    assert sincronizar(ahora=AHORA) == {'guardados': 1, 'hoteles': 1}
+    fila = db.session.get(TendenciasHotel, 1)
+    assert (fila.vistas, fila.favoritos, fila.actualizado) == (0.5, 0.5, AHORA)
+
+    # Otro proceso (o el mismo tras reiniciar) suma sus vistas a la fila
+    _reiniciar_proceso(monkeypatch)
+    registrar(1, 'vista', fecha=AHORA)
+    sincronizar(ahora=AHORA)
+    _reiniciar_proceso(monkeypatch)
+
+    ranking = hoteles_tendencia(ahora=AHORA + timedelta(hours=24))
+    assert ranking == [{'id_hotel': 1, 'puntuacion': 2.0, 'vistas': 0.75, 'favoritos': 0.25,
+                        'valoraciones': 0.0, 'puntuacion_media': None}]
+
+
+def test_arranque_en_frio_con_tendencia(app_db):
+    for id_hotel in range(1, 6):
+        db.session.add(Hoteles(id_hotel=id_hotel, nombre=f'Hotel {id_hotel}', slug=f'hotel-{id_hotel}'))
+    db.session.commit()
+    hoteles = Hoteles.query.order_by(Hoteles.id_hotel).all()
+    registrar(4, 'favorito')
+    registrar(5, 'vista')
+    registrar(99, 'vista')  # Hotel que ya no está en el catálogo
+
+    elegidos = ordenar_por_tendencia(hoteles, limite=3)
+
+    assert [h.id_hotel for h in elegidos] == [4, 5, 1]
+
+
+def test_orden_con_contadores_de_fechas_distintas(app_db):
+    # 100 vistas de hace una semana valen menos que 10 de ahora
+    for _ in range(100):
+        registrar(1, 'vista', fecha=AHORA - timedelta(days=7))
+    for _ in range(10):
+        registrar(2, 'vista', fecha=AHORA)
+
+    ranking = hoteles_tendencia(ahora=AHORA)
+
+    assert [h['id_hotel'] for h in ranking] == [2, 1]
+    assert ranking[1]['puntuacion'] == 0.781
+    assert hoteles_tendencia(limite=1, ahora=AHORA)[0]['id_hotel'] == 2
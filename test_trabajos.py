@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Pruebas del sistema de trabajos en segundo plano
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from models import db, Trabajos
+import trabajos
+from trabajos import encolar_trabajo, ejecutar_trabajo, cancelar_trabajo, registrar_tipo, TrabajoEnCurso
+
+
+@registrar_tipo('prueba')
+def _trabajo_prueba(contexto, unidades, cancelar_en=None):
+    for i in range(1, unidades + 1):
+        if i == cancelar_en:
+            cancelar_trabajo(contexto.id_trabajo)
+        contexto.reportar(i, total=unidades)
+    return {'procesadas': unidades}
+
+
+@pytest.fixture
+def config_app():
+    return {'TRABAJOS_MODO': 'proceso'}
+
+
+@pytest.fixture
+def app_db(app_db, monkeypatch):
+    monkeypatch.setattr(trabajos, 'INTERVALO_LATIDO', 0)
+    trabajos.init_trabajos(app_db)
+    return app_db
+
+
+def test_un_trabajo_activo_por_clave(app_db):
+    primero = encolar_trabajo('prueba', {'unidades': 3}, clave='scraping:cartagena')
+    with pytest.raises(TrabajoEnCurso):
+        encolar_trabajo('prueba', {'unidades': 3}, clave='scraping:cartagena')
+    encolar_trabajo('prueba', {'unidades': 3}, clave='scraping:medellin')
+
+    assert ejecutar_trabajo(primero.id_trabajo) == 'completado'
+    trabajo = db.session.get(Trabajos, primero.id_trabajo)
+    assert trabajo.to_dict()['resultado'] == {'procesadas': 3}
+    assert trabajo.progreso == 3 and trabajo.clave_activa is None
+
+    # Terminado el primero, la clave queda libre
+    encolar_trabajo('prueba', {'unidades': 1}, clave='scraping:cartagena')
+
+
+def test_cancelacion_cooperativa(app_db):
+    trabajo = encolar_trabajo('prueba', {'unidades': 10, 'cancelar_en': 4}, clave='x')
+    assert ejecutar_trabajo(trabajo.id_trabajo) == 'cancelado'
+    assert db.session.get(Trabajos, trabajo.id_trabajo).progreso == 4
+
+
+def test_cancelar_trabajo_pendiente(app_db):
+    trabajo = encolar_trabajo('prueba', {'unidades': 1}, clave='x')
+    assert cancelar_trabajo(trabajo.id_trabajo)
+    assert ejecutar_trabajo(trabajo.id_trabajo) is None
+    assert db.session.get(Trabajos, trabajo.id_trabajo).estado == 'cancelado'
+
+
+class _PoolDeMemoria:
+    """Pool que solo anota lo que se le envía"""
+
+    def __init__(self):
+        self.enviados = []
+
+    def submit(self, funcion, id_trabajo):
+        self.enviados.append(id_trabajo)
+
+
+def test_pendiente_perdido_con_el_pool_se_reenvia(app_db, monkeypatch):
+    # Un pendiente que estaba en el pool de un proceso que se reinició
+    perdido = encolar_trabajo('prueba', {'unidades': 1}, clave='scraping:cartagena')
+    perdido.fecha_actualizacion = datetime.now() - trabajos.TIEMPO_HUERFANO - timedelta(minutes=1)
+    db.session.commit()
+    pool = _PoolDeMemoria()
+    monkeypatch.setattr(trabajos, '_modo', 'hilo')
+    monkeypatch.setattr(trabajos, '_ejecutor', pool)
+
+    # La clave sigue ocupada, pero el pendiente vuelve a lanzarse
+    with pytest.raises(TrabajoEnCurso):
+        encolar_trabajo('prueba', {'unidades': 1}, clave='scraping:cartagena')
+    assert pool.enviados == [perdido.id_trabajo]
+    # Reciente: no se reenvía en cada intento
+    with pytest.raises(TrabajoEnCurso):
+        encolar_trabajo('prueba', {'unidades': 1}, clave='scraping:cartagena')
+    assert pool.enviados == [perdido.id_trabajo]
+
+    assert ejecutar_trabajo(perdido.id_trabajo) == 'completado'
+    encolar_trabajo('prueba', {'unidades': 1}, clave='scraping:cartagena')
+
+
+def test_init_reenvia_pendientes_en_modo_hilo(app_db, monkeypatch):
+    pendiente = encolar_trabajo('prueba', {'unidades': 1}, clave='x')
+    pool = _PoolDeMemoria()
+    monkeypatch.setattr(trabajos, '_ejecutor', pool)
+    app_db.config['TRABAJOS_MODO'] = 'hilo'
+    try:
+        trabajos.init_trabajos(app_db)
+    finally:
+        app_db.config['TRABAJOS_MODO'] = 'proceso'
+        trabajos.init_trabajos(app_db)
+    assert pool.enviados == [pendiente.id_trabajo]
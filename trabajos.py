@@ -0,0 +1,589 @@
+"""
+TRABAJOS EN SEGUNDO PLANO - SISTEMA RECOMENDADOR DE HOTELES
+===========================================================
+
+Este archivo contiene el sistema de trabajos en segundo plano. Las tareas
+largas (como el scraping lanzado desde el panel de administración) se
+registran en la tabla `trabajos` y se ejecutan fuera de la petición HTTP,
+así no ocupan un worker de gunicorn durante minutos.
+
+CARACTERÍSTICAS:
+- Cola persistente en la tabla `trabajos` (estado, progreso, resultado)
+- Ejecución en un pool de hilos del propio proceso o en un proceso
+  trabajador aparte (`flask trabajador`), según TRABAJOS_MODO
+- Progreso y latido (heartbeat) guardados en la base de datos
+- Cancelación cooperativa: el trabajo revisa la bandera entre unidades
+- Un solo trabajo activo por clave (por ejemplo, un scraping por destino)
+- Resumen de métricas por etapa de cada trabajo (metricas.py) en su resultado
+
+USO:
+    trabajo = encolar_trabajo('scraping', {'destino': 'Cartagena'}, clave='cartagena')
+    # ... luego se consulta /admin/trabajos/<id> para ver el progreso
+
+VERSIÓN: 2.0
+"""
+
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from models import db, Trabajos
+from metricas import ejecucion
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONFIGURACIÓN Y CONSTANTES
+# =============================================================================
+
+# Estados en los que un trabajo ocupa su clave de concurrencia
+ESTADOS_ACTIVOS = ('pendiente', 'en_curso')
+
+# Cada cuánto (segundos) se escribe el progreso y se revisa la cancelación
+INTERVALO_LATIDO = 2.0
+
+# Un trabajo en curso sin latido durante este tiempo se considera huérfano
+# (el proceso que lo ejecutaba murió)
+TIEMPO_HUERFANO = timedelta(minutes=10)
+
+# Estado del módulo (se configura con init_trabajos)
+_app = None
+_ejecutor = None
+_modo = 'hilo'
+
+# Registro de tipos de trabajo: tipo -> función
+_tipos = {}
+
+# =============================================================================
+# EXCEPCIONES
+# =============================================================================
+
+class TrabajoEnCurso(Exception):
+    """Ya hay un trabajo activo con la misma clave de concurrencia"""
+
+    def __init__(self, trabajo_activo):
+        super().__init__(f"Ya hay un trabajo activo para '{trabajo_activo.clave}' (#{trabajo_activo.id_trabajo})")
+        self.trabajo_activo = trabajo_activo
+
+class TrabajoCancelado(Exception):
+    """Se solicitó la cancelación del trabajo en ejecución"""
+
+# =============================================================================
+# CONTEXTO DE EJECUCIÓN
+# =============================================================================
+
+class ContextoTrabajo:
+    """
+    CONTEXTO QUE RECIBE CADA FUNCIÓN DE TRABAJO
+
+    Permite reportar progreso y revisar la cancelación sin escribir en la base
+    de datos en cada unidad procesada: ambas cosas se hacen como mucho una vez
+    cada INTERVALO_LATIDO segundos.
+    """
+
+    def __init__(self, id_trabajo):
+        self.id_trabajo = id_trabajo
+        self._ultimo_latido = 0.0
+        self.progreso = 0
+        self._total = None
+        self._mensaje = None
+
+    def reportar(self, progreso, total=None, mensaje=None):
+        """
+        Reporta el progreso del trabajo y revisa si se pidió cancelarlo
+
+        Raises:
+            TrabajoCancelado: Si el administrador canceló el trabajo
+        """
+        self.progreso = progreso
+        if total is not None:
+            self._total = total
+        if mensaje is not None:
+            self._mensaje = mensaje[:255]
+
+        if time.monotonic() - self._ultimo_latido >= INTERVALO_LATIDO:
+            self.latido()
+
+    def latido(self):
+        """
+        Guarda el progreso en la base de datos y revisa la bandera de cancelación
+        """
+        self._ultimo_latido = time.monotonic()
+        valores = {'progreso': self.progreso, 'fecha_actualizacion': datetime.now()}
+        if self._total is not None:
+            valores['total'] = self._total
+        if self._mensaje is not None:
+            valores['mensaje'] = self._mensaje
+
+        db.session.execute(update(Trabajos).where(Trabajos.id_trabajo == self.id_trabajo).values(**valores))
+        db.session.commit()
+
+        cancelar = db.session.query(Trabajos.cancelar).filter_by(id_trabajo=self.id_trabajo).scalar()
+        if cancelar:
+            raise TrabajoCancelado()
+
+# =============================================================================
+# REGISTRO DE TIPOS Y CONFIGURACIÓN
+# =============================================================================
+
+def registrar_tipo(tipo):
+    """
+    Decorador para registrar la función que ejecuta un tipo de trabajo
+
+    La función recibe un ContextoTrabajo y los parámetros del trabajo como
+    argumentos con nombre, y retorna un resultado serializable a JSON.
+    """
+    def decorador(funcion):
+        _tipos[tipo] = funcion
+        return funcion
+    return decorador
+
+def init_trabajos(app):
+    """
+    Configura el sistema de trabajos para la aplicación Flask
+
+    Args:
+        app: Aplicación Flask (los trabajos corren dentro de su app_context)
+    """
+    global _app, _ejecutor, _modo
+    _app = app
+    _modo = app.config.get('TRABAJOS_MODO', 'hilo')
+    if _modo == 'hilo' and _ejecutor is None:
+        _ejecutor = ThreadPoolExecutor(
+            max_workers=app.config.get('TRABAJOS_MAX_WORKERS', 2),
+            thread_name_prefix='trabajo'
+        )
+    if _modo == 'hilo':
+        # Los pendientes del pool de un proceso anterior (reinicio o
+        # reciclado del worker) no los lanza nadie más
+        with app.app_context():
+            try:
+                _reenviar_pendientes(antiguedad=timedelta(0))
+            except Exception as e:
+                db.session.rollback()
+                logger.debug(f"No se pudieron revisar los trabajos pendientes: {e}")
+
+# =============================================================================
+# ENCOLADO, CONSULTA Y CANCELACIÓN
+# =============================================================================
+
+def encolar_trabajo(tipo, parametros, clave=None, id_usuario=None):
+    """
+    Registra un trabajo nuevo y, en modo 'hilo', lo lanza en el pool
+
+    Args:
+        tipo: Tipo de trabajo registrado con registrar_tipo()
+        parametros: Diccionario con los parámetros (serializable a JSON)
+        clave: Clave de concurrencia; solo puede haber un trabajo activo por clave
+        id_usuario: Usuario que lanzó el trabajo
+
+    Returns:
+        Objeto Trabajos creado
+
+    Raises:
+        TrabajoEnCurso: Si ya existe un trabajo activo con la misma clave
+    """
+    if tipo not in _tipos:
+        raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+
+    ahora = datetime.now()
+    trabajo = Trabajos(
+        tipo=tipo,
+        clave=clave,
+        clave_activa=clave,
+        estado='pendiente',
+        parametros=json.dumps(parametros, ensure_ascii=False, default=str),
+        progreso=0,
+        id_usuario=id_usuario,
+        fecha_creacion=ahora,
+        fecha_actualizacion=ahora
+    )
+    db.session.add(trabajo)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        _liberar_huerfanos(clave)
+        activo = Trabajos.query.filter_by(clave_activa=clave).first()
+        if activo is None:
+            # El trabajo activo era huérfano y se liberó: reintentar una vez
+            return encolar_trabajo(tipo, parametros, clave=clave, id_usuario=id_usuario)
+        # Un pendiente antiguo puede haberse perdido con el pool de otro proceso
+        _reenviar_pendientes(clave)
+        raise TrabajoEnCurso(activo)
+
+    logger.info(f"Trabajo #{trabajo.id_trabajo} ({tipo}) encolado")
+
+    if _modo == 'hilo' and _ejecutor is not None:
+        _ejecutor.submit(_ejecutar_en_app, trabajo.id_trabajo)
+
+    return trabajo
+
+def obtener_trabajo(id_trabajo):
+    """
+    Obtiene un trabajo por su id (o None si no existe)
+    """
+    return db.session.get(Trabajos, id_trabajo)
+
+def cancelar_trabajo(id_trabajo):
+    """
+    Solicita la cancelación de un trabajo
+
+    Un trabajo pendiente se cancela de inmediato; uno en curso se detiene
+    en su próximo latido.
+
+    Returns:
+        True si el trabajo estaba activo y se marcó para cancelar
+    """
+    trabajo = obtener_trabajo(id_trabajo)
+    if not trabajo or trabajo.estado not in ESTADOS_ACTIVOS:
+        return False
+
+    # Solo se cancela directamente si nadie lo ha reclamado todavía
+    cancelado = db.session.execute(
+        update(Trabajos)
+        .where(Trabajos.id_trabajo == id_trabajo, Trabajos.estado == 'pendiente')
+        .values(estado='cancelado', cancelar=True, clave_activa=None, fecha_fin=datetime.now())
+    ).rowcount
+    if not cancelado:
+        trabajo.cancelar = True
+    db.session.commit()
+    return True
+
+def trabajos_recientes(tipo=None, limite=10):
+    """
+    Obtiene los últimos trabajos, más recientes primero
+    """
+    consulta = Trabajos.query
+    if tipo:
+        consulta = consulta.filter_by(tipo=tipo)
+    return consulta.order_by(Trabajos.id_trabajo.desc()).limit(limite).all()
+
+def _liberar_huerfanos(clave=None):
+    """
+    Marca como fallidos los trabajos en curso sin latido reciente
+
+    Args:
+        clave: Limitar a una clave de concurrencia (opcional)
+    """
+    limite = datetime.now() - TIEMPO_HUERFANO
+    consulta = update(Trabajos).where(
+        Trabajos.estado == 'en_curso',
+        Trabajos.fecha_actualizacion < limite
+    )
+    if clave is not None:
+        consulta = consulta.where(Trabajos.clave == clave)
+    liberados = db.session.execute(consulta.values(
+        estado='fallido',
+        clave_activa=None,
+        mensaje='Trabajo interrumpido (sin latido del trabajador)',
+        fecha_fin=datetime.now()
+    )).rowcount
+    db.session.commit()
+    if liberados:
+        logger.warning(f"{liberados} trabajos huérfanos marcados como fallidos")
+    return liberados
+
+def _reenviar_pendientes(clave=None, antiguedad=TIEMPO_HUERFANO):
+    """
+    Modo 'hilo': lanza en el pool de este proceso los trabajos pendientes
+    sin cambios desde hace `antiguedad`
+
+    Los pendientes solo viven en el pool del proceso que los encoló; si ese
+    proceso se reinicia antes de ejecutarlos, nadie los lanzaría y su clave
+    quedaría ocupada para siempre. Reenviar uno que otro proceso aún tiene
+    en cola es inofensivo: solo uno lo reclama (_reclamar).
+
+    Returns:
+        Número de trabajos reenviados
+    """
+    if _modo != 'hilo' or _ejecutor is None:
+        return 0
+    ahora = datetime.now()
+    consulta = db.session.query(Trabajos.id_trabajo).filter(
+        Trabajos.estado == 'pendiente',
+        Trabajos.fecha_actualizacion <= ahora - antiguedad
+    )
+    if clave is not None:
+        consulta = consulta.filter(Trabajos.clave_activa == clave)
+    ids = [id_trabajo for (id_trabajo,) in consulta.order_by(Trabajos.id_trabajo).all()]
+    if not ids:
+        return 0
+    # Se marca la fecha para no reenviarlos en cada intento de encolar
+    db.session.execute(
+        update(Trabajos).where(Trabajos.id_trabajo.in_(ids), Trabajos.estado == 'pendiente')
+        .values(fecha_actualizacion=ahora)
+    )
+    db.session.commit()
+    for id_trabajo in ids:
+        _ejecutor.submit(_ejecutar_en_app, id_trabajo)
+    logger.warning(f"{len(ids)} trabajos pendientes reenviados al pool")
+    return len(ids)
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+def _reclamar(id_trabajo):
+    """
+    Pasa un trabajo de 'pendiente' a 'en_curso' de forma atómica
+
+    Returns:
+        True si este proceso reclamó el trabajo
+    """
+    ahora = datetime.now()
+    reclamado = db.session.execute(
+        update(Trabajos)
+        .where(Trabajos.id_trabajo == id_trabajo, Trabajos.estado == 'pendiente')
+        .values(estado='en_curso', fecha_inicio=ahora, fecha_actualizacion=ahora)
+    ).rowcount
+    db.session.commit()
+    return reclamado == 1
+
+def _finalizar(id_trabajo, estado, progreso, resultado=None, mensaje=None):
+    """
+    Registra el final de un trabajo y libera su clave de concurrencia
+    """
+    valores = {
+        'estado': estado,
+        'progreso': progreso,
+        'clave_activa': None,
+        'fecha_fin': datetime.now(),
+        'fecha_actualizacion': datetime.now()
+    }
+    if resultado is not None:
+        valores['resultado'] = json.dumps(resultado, ensure_ascii=False, default=str)
+    if mensaje is not None:
+        valores['mensaje'] = mensaje[:255]
+    db.session.execute(update(Trabajos).where(Trabajos.id_trabajo == id_trabajo).values(**valores))
+    db.session.commit()
+
+def ejecutar_trabajo(id_trabajo):
+    """
+    Ejecuta un trabajo pendiente (debe llamarse dentro de un app_context)
+
+    Returns:
+        Estado final del trabajo, o None si otro proceso ya lo había reclamado
+    """
+    if not _reclamar(id_trabajo):
+        return None
+
+    trabajo = obtener_trabajo(id_trabajo)
+    funcion = _tipos.get(trabajo.tipo)
+    contexto = ContextoTrabajo(id_trabajo)
+    logger.info(f"Iniciando trabajo #{id_trabajo} ({trabajo.tipo})")
+
+    try:
+        if funcion is None:
+            raise ValueError(f"Tipo de trabajo desconocido: {trabajo.tipo}")
+        with ejecucion(f'trabajo #{id_trabajo} ({trabajo.tipo})',
+                       archivo=current_app.config.get('METRICAS_ARCHIVO')) as metricas:
+            resultado = funcion(contexto, **trabajo.get_parametros())
+        if isinstance(resultado, dict) and metricas['etapas']:
+            resultado['metricas'] = metricas
+    except TrabajoCancelado:
+        db.session.rollback()
+        _finalizar(id_trabajo, 'cancelado', contexto.progreso, mensaje='Cancelado por el administrador')
+        logger.info(f"Trabajo #{id_trabajo} cancelado")
+        return 'cancelado'
+    except Exception as e:
+        db.session.rollback()
+        _finalizar(id_trabajo, 'fallido', contexto.progreso, mensaje=f'Error: {e}')
+        logger.error(f"Trabajo #{id_trabajo} falló: {e}")
+        return 'fallido'
+
+    _finalizar(id_trabajo, 'completado', contexto.progreso, resultado=resultado, mensaje='Completado')
+    logger.info(f"Trabajo #{id_trabajo} completado")
+    return 'completado'
+
+def _ejecutar_en_app(id_trabajo):
+    """
+    Punto de entrada de los hilos del pool: abre un app_context propio
+    """
+    with _app.app_context():
+        try:
+            ejecutar_trabajo(id_trabajo)
+        finally:
+            db.session.remove()
+
+def bucle_trabajador(intervalo=2.0, una_vez=False):
+    """
+    BUCLE DEL PROCESO TRABAJADOR (modo 'proceso')
+
+    Reclama y ejecuta los trabajos pendientes en orden de llegada. Se usa
+    desde el comando `flask trabajador`, fuera de los workers web.
+
+    Args:
+        intervalo: Segundos de espera cuando no hay trabajos pendientes
+        una_vez: Procesar los pendientes actuales y terminar
+    """
+    while True:
+        _liberar_huerfanos()
+        pendientes = [
+            id_trabajo for (id_trabajo,) in
+            db.session.query(Trabajos.id_trabajo)
+            .filter_by(estado='pendiente')
+            .order_by(Trabajos.id_trabajo)
+            .all()
+        ]
+        for id_trabajo in pendientes:
+            ejecutar_trabajo(id_trabajo)
+
+        if una_vez:
+            return
+        if not pendientes:
+            time.sleep(intervalo)
+
+# =============================================================================
+# TIPOS DE TRABAJO
+# =============================================================================
+
+@registrar_tipo('scraping')
+def trabajo_scraping(contexto, destino, hotel_limit=20, checkin=None, checkout=None, offset=0):
+    """
+    TRABAJO DE SCRAPING DE BOOKING.COM
+
+    Recorre las páginas de Booking.com y guarda los hoteles por lotes a medida
+    que llegan. El progreso es el número de hoteles recibidos.
+
+    Returns:
+        Resumen de la ingesta más el último offset de página procesado
+    """
+    from scraper import iter_booking_hotels
+    from ingesta import ingestar_hoteles
+
+    estado = {'ultimo_offset': offset}
+
+    def hoteles():
+        recibidos = 0
+        for hotel in iter_booking_hotels(destino=destino, checkin=checkin, checkout=checkout,
+                                         hotel_limit=hotel_limit, offset=offset):
+            recibidos += 1
+            estado['ultimo_offset'] = hotel.get('page_offset', offset)
+            contexto.reportar(recibidos, total=hotel_limit, mensaje=hotel.get('name'))
+            yield hotel
+
+    resumen = ingestar_hoteles(hoteles())
+    resumen.update(estado)
+    return resumen
+
+
+@registrar_tipo('scraping_precios')
+def trabajo_scraping_precios(contexto, destino, checkin, checkout, hotel_limit=100, prioritarios=None):
+    """
+    TRABAJO DE REFRESCO DE PRECIOS PARA UNA VENTANA DE FECHAS
+
+    Recorre los resultados de Booking.com para la estadía checkin-checkout y
+    guarda solo los precios en precios_ventana. Si se indican hoteles
+    prioritarios (slugs), el recorrido se corta en cuanto todos aparecieron,
+    sin llegar a hotel_limit.
+
+    Returns:
+        Resumen de la ingesta de precios más los prioritarios no encontrados
+    """
+    from scraper import iter_booking_hotels
+    from ingesta import ingestar_precios_ventana, slugify
+
+    pendientes = set(prioritarios or [])
+
+    def hoteles():
+        recibidos = 0
+        for hotel in iter_booking_hotels(destino=destino, checkin=checkin, checkout=checkout,
+                                         hotel_limit=hotel_limit):
+            recibidos += 1
+            contexto.reportar(recibidos, total=hotel_limit, mensaje=hotel.get('name'))
+            yield hotel
+            if pendientes:
+                pendientes.discard(slugify(hotel.get('name') or ''))
+                if not pendientes:
+                    break
+
+    resumen = ingestar_precios_ventana(hoteles(), checkin, checkout)
+    resumen['prioritarios_sin_encontrar'] = len(pendientes)
+    return resumen
+
+
+@registrar_tipo('enriquecimiento')
+def trabajo_enriquecimiento(contexto, limite=100):
+    """
+    TRABAJO DE ENRIQUECIMIENTO CON LA PÁGINA DE DETALLE
+
+    Visita las páginas de detalle de los hoteles pendientes (ver enriquecimiento.py).
+
+    Returns:
+        Resumen con hoteles enriquecidos, sin cambios y fallidos
+    """
+    from enriquecimiento import enriquecer_hoteles
+
+    return enriquecer_hoteles(limite=limite, contexto=contexto)
+
+
+@registrar_tipo('compactacion_vistas')
+def trabajo_compactacion_vistas(contexto, dias=None):
+    """
+    TRABAJO DE COMPACTACIÓN DE VISTAS
+
+    Deja una fila por usuario, hotel y día para las vistas antiguas (ver eventos.py).
+
+    Returns:
+        Resumen con grupos compactados y filas eliminadas
+    """
+    from eventos import compactar_vistas, VISTAS_DIAS_DETALLE
+
+    return compactar_vistas(dias=VISTAS_DIAS_DETALLE if dias is None else dias)
+
+
+@registrar_tipo('retencion_interacciones')
+def trabajo_retencion_interacciones(contexto):
+    """
+    TRABAJO DE RETENCIÓN DE INTERACCIONES
+
+    Crea las particiones de los próximos meses (MySQL) y archiva y elimina
+    los meses vencidos según INTERACCIONES_RETENCION (ver particiones.py).
+
+    Returns:
+        Particiones creadas y acciones de retención aplicadas
+    """
+    from particiones import aplicar_retencion, crear_particiones
+
+    creadas = crear_particiones()
+    return {'particiones_creadas': creadas, 'acciones': aplicar_retencion()}
+
+
+@registrar_tipo('borrado_usuario')
+def trabajo_borrado_usuario(contexto, id_usuario, eliminar_cuenta=False, tablas=None):
+    """
+    TRABAJO DE BORRADO DE UN USUARIO GRANDE
+
+    Borra por lotes el historial del usuario y, si se pidió, la cuenta
+    (ver servicio_borrado.py). El progreso es el número de filas borradas.
+
+    Returns:
+        Filas borradas por tabla
+    """
+    from servicio_borrado import borrar_cuenta, borrar_historial
+
+    if eliminar_cuenta:
+        return borrar_cuenta(id_usuario, contexto=contexto)
+    return borrar_historial(id_usuario, contexto=contexto, tablas=tablas)
+
+
+@registrar_tipo('analitica')
+def trabajo_analitica(contexto):
+    """
+    TRABAJO DE AGREGADOS DE ANALÍTICA
+
+    Recalcula las horas y días pendientes de analitica_hora y analitica_dia
+    (ver analitica.py).
+
+    Returns:
+        Horas y días escritos y horas antiguas borradas
+    """
+    from analitica import actualizar_agregados
+
+    return actualizar_agregados()
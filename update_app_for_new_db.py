@@ -3,10 +3,12 @@
 Script para actualizar la aplicación Flask para usar la nueva estructura de base de datos enriquecida
 """
 
-import json
+import argparse
 from datetime import datetime
 from models import db, Hoteles, Usuario, PreferenciasUsuario, InteraccionesUsuario, Valoraciones, ReviewsScraping
-from scraper import AdvancedBookingScraper, HotelDataMerger
+from scraper import HotelDataMerger
+from ingesta import slugify
+from migraciones import ejecutar_migracion, LOTE_MIGRACION
 
 def migrate_hotel_data_to_new_structure(hotel_data):
     """
@@ -14,11 +16,12 @@ def migrate_hotel_data_to_new_structure(hotel_data):
     """
     try:
         # Crear o actualizar hotel en la base de datos
-        hotel = Hoteles.query.filter_by(slug=hotel_data['slug']).first()
+        slug = hotel_data.get('slug') or slugify(hotel_data['name'])
+        hotel = Hoteles.query.filter_by(slug=slug).first()
         
         if not hotel:
             hotel = Hoteles()
-            hotel.slug = hotel_data['slug']
+            hotel.slug = slug
         
         # Información básica
         hotel.nombre = hotel_data['name']
@@ -194,71 +197,39 @@ def test_new_structure():
         print(f"❌ Error en prueba de nueva estructura: {e}")
         return False
 
-def migrate_existing_data():
+def migrate_existing_data(dry_run=False, tamano_lote=LOTE_MIGRACION, reiniciar=False):
     """
     Migra datos existentes a la nueva estructura
+    
+    Usa el motor de migraciones por lotes (migraciones.py): cada lote de
+    hoteles se confirma con su punto de control, así que la tabla no queda
+    bloqueada durante toda la migración y una ejecución interrumpida continúa
+    donde se quedó.
+    
+    Args:
+        dry_run: Solo contar los hoteles que cambiarían
+        tamano_lote: Hoteles por lote
+        reiniciar: Volver a recorrer la tabla desde el principio
     """
     try:
-        hotels = Hoteles.query.all()
-        migrated_count = 0
-        
-        for hotel in hotels:
-            # Generar slug si no existe
-            if not hotel.slug:
-                hotel.slug = hotel.nombre.lower().replace(' ', '-').replace('á', 'a').replace('é', 'e')
-            
-            # Migrar rating si existe
-            if hotel.rating and not hotel.rating_score:
-                hotel.rating_score = hotel.rating
-                hotel.rating_formatted = f"{hotel.rating:.1f}/10"
-            
-            # Migrar precio si existe
-            if hotel.precio_promedio and not hotel.precio_amount:
-                hotel.precio_amount = hotel.precio_promedio
-                hotel.precio_formatted = f"${hotel.precio_promedio:,}".replace(",", ".")
-                hotel.precio_currency = 'COP'
-            
-            # Migrar estrellas si no existen
-            if not hotel.stars_count and hotel.nombre:
-                # Intentar extraer estrellas del nombre o descripción
-                if '5' in hotel.nombre or 'cinco' in hotel.nombre.lower():
-                    hotel.stars_count = 5
-                elif '4' in hotel.nombre or 'cuatro' in hotel.nombre.lower():
-                    hotel.stars_count = 4
-                elif '3' in hotel.nombre or 'tres' in hotel.nombre.lower():
-                    hotel.stars_count = 3
-                elif '2' in hotel.nombre or 'dos' in hotel.nombre.lower():
-                    hotel.stars_count = 2
-                elif '1' in hotel.nombre or 'uno' in hotel.nombre.lower():
-                    hotel.stars_count = 1
-                else:
-                    hotel.stars_count = 0
-                
-                if hotel.stars_count > 0:
-                    hotel.stars_formatted = f"{hotel.stars_count} {'⭐' * hotel.stars_count}"
-                else:
-                    hotel.stars_formatted = 'Sin clasificar'
-            
-            # Establecer fuente principal
-            if not hotel.fuente_principal:
-                hotel.fuente_principal = 'booking'
-            
-            # Establecer versión de scraping
-            if not hotel.version_scraping:
-                hotel.version_scraping = '2.0'
-            
-            migrated_count += 1
-        
-        db.session.commit()
-        print(f"✅ Migración completada: {migrated_count} hoteles actualizados")
+        resumen = ejecutar_migracion('hoteles_estructura_v2', tamano_lote=tamano_lote,
+                                     dry_run=dry_run, reiniciar=reiniciar)
+        prefijo = "Simulación" if dry_run else "Migración"
+        print(f"✅ {prefijo} {resumen['estado']}: {resumen['modificados']} de {resumen['procesados']} "
+              f"hoteles actualizados ({resumen['filas_por_segundo']} hoteles/s)")
         return True
         
     except Exception as e:
         print(f"❌ Error en migración: {e}")
-        db.session.rollback()
         return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Actualizar la base de datos a la estructura 2.0')
+    parser.add_argument('--dry-run', action='store_true', help='Simular la migración sin guardar cambios')
+    parser.add_argument('--lote', type=int, default=LOTE_MIGRACION, help='Hoteles por lote')
+    parser.add_argument('--reiniciar', action='store_true', help='Ignorar el punto de control')
+    args = parser.parse_args()
+    
     print("🔄 Actualizando aplicación para nueva estructura de base de datos...")
     
     # Importar app para acceder a la base de datos
@@ -268,7 +239,7 @@ if __name__ == "__main__":
         print("1. Probando nueva estructura...")
         if test_new_structure():
             print("2. Migrando datos existentes...")
-            if migrate_existing_data():
+            if migrate_existing_data(dry_run=args.dry_run, tamano_lote=args.lote, reiniciar=args.reiniciar):
                 print("3. Actualizando rutas de aplicación...")
                 update_app_routes_for_new_structure()
                 print("✅ Actualización completada exitosamente!")